@@ -0,0 +1,26 @@
+// Generated by python -m src.knowledge_graph.loaders.text_indexes; edit the generator, not this file.
+
+// Normalised lookup keys (index_rewrite turns '(?i)...' regexes into key lookups)
+MATCH (n) WHERE n.name IS NOT NULL SET n.nameKey = toLower(trim(n.name));
+MATCH (n) WHERE n.fullName IS NOT NULL SET n.fullNameKey = toLower(trim(n.fullName));
+
+// Per-label TEXT indexes on the keys
+CREATE TEXT INDEX component_name_key_text IF NOT EXISTS FOR (n:`Component`) ON (n.nameKey);
+CREATE TEXT INDEX concept_name_key_text IF NOT EXISTS FOR (n:`Concept`) ON (n.nameKey);
+CREATE TEXT INDEX curve_name_key_text IF NOT EXISTS FOR (n:`Curve`) ON (n.nameKey);
+CREATE TEXT INDEX file_type_name_key_text IF NOT EXISTS FOR (n:`FileType`) ON (n.nameKey);
+CREATE TEXT INDEX file_type_full_name_key_text IF NOT EXISTS FOR (n:`FileType`) ON (n.fullNameKey);
+CREATE TEXT INDEX geo_name_key_text IF NOT EXISTS FOR (n:`GEO`) ON (n.nameKey);
+CREATE TEXT INDEX left_track_edge_value_name_key_text IF NOT EXISTS FOR (n:`Left_Track_Edge_Value`) ON (n.nameKey);
+CREATE TEXT INDEX linear_type_name_key_text IF NOT EXISTS FOR (n:`Linear_Type`) ON (n.nameKey);
+CREATE TEXT INDEX log_type_name_key_text IF NOT EXISTS FOR (n:`Log_Type`) ON (n.nameKey);
+CREATE TEXT INDEX right_track_edge_value_name_key_text IF NOT EXISTS FOR (n:`Right_Track_Edge_Value`) ON (n.nameKey);
+CREATE TEXT INDEX scales_name_key_text IF NOT EXISTS FOR (n:`Scales`) ON (n.nameKey);
+CREATE TEXT INDEX settings_name_key_text IF NOT EXISTS FOR (n:`Settings`) ON (n.nameKey);
+CREATE TEXT INDEX system_name_key_text IF NOT EXISTS FOR (n:`System`) ON (n.nameKey);
+
+// Full-text index for lookups without a label (recreated: its label list may have grown)
+DROP INDEX entity_text IF EXISTS;
+CREATE FULLTEXT INDEX entity_text IF NOT EXISTS
+FOR (n:`Component`|`Concept`|`Curve`|`FileType`|`GEO`|`Left_Track_Edge_Value`|`Linear_Type`|`Log_Type`|`Right_Track_Edge_Value`|`Scales`|`Settings`|`System`)
+ON EACH [n.name, n.fullName, n.description, n.details];
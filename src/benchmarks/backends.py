@@ -0,0 +1,251 @@
+"""
+backends.py
+===========
+
+Offline LLM, graph and retrieval backends for :mod:`qa_benchmark`.
+
+* **stub** – :class:`StubChatModel` answers every prompt shape the QA stack
+  produces (ReAct step, Cypher generation, QA over context) after a
+  synthetic delay, and :class:`StubGraph` returns canned rows.  Retrieval
+  runs for real over the shipped file-type chunks with a hashing embedder.
+* **replay** – a :class:`~src.qa_bot.core.cassette.Cassette` holds LLM
+  completions, graph rows and retrieved chunks recorded from a live run,
+  keyed by a hash of the normalised request.  The ``Cassette*`` wrappers
+  (re-exported here) record when given a live backend and replay when
+  given ``None``.
+
+Whatever the backend, :class:`MeteredGraph`, :class:`StageMeter` and
+:func:`metered` attribute the time of every call to a stage (``llm``,
+``graph``, ``retrieval``) of the question being run, and count tokens.
+"""
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from ..data_processing.chunking.chunker import approx_tokens
+from ..data_processing.search.bm25 import tokenize
+from ..qa_bot.core.cassette import (  # noqa: F401  (the replay backend)
+    Cassette, CassetteChatModel, CassetteGraph, CassetteMiss, CassetteRetriever, cassette_retrieve, request_key,
+)
+
+# ───────────────────────────── metering ──────────────────────────────────
+_SAMPLE: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("qa_sample", default=None)
+
+
+def new_sample() -> Dict[str, Any]:
+    return {"stages": {}, "calls": {}, "tokens": {"prompt": 0, "completion": 0}, "rows": 0}
+
+
+@contextmanager
+def sampling(sample: Dict[str, Any]):
+    """Attributes every metered call in this context (and LangChain's worker threads) to *sample*."""
+    token = _SAMPLE.set(sample)
+    try:
+        yield sample
+    finally:
+        _SAMPLE.reset(token)
+
+
+def record(stage: str, seconds: float) -> None:
+    sample = _SAMPLE.get()
+    if sample is not None:
+        sample["stages"][stage] = sample["stages"].get(stage, 0.0) + seconds
+        sample["calls"][stage] = sample["calls"].get(stage, 0) + 1
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def metered(name: str, fn: Callable) -> Callable:
+    def wrapper(*args, **kwargs):
+        with stage(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+class StageMeter(BaseCallbackHandler):
+    """Times chat-model and retriever runs and counts their tokens."""
+
+    def __init__(self):
+        self._open: Dict[UUID, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], kind: str, prompt_tokens: int = 0):
+        with self._lock:
+            # A recording retriever calling the real one is a single call
+            if parent_run_id not in self._open:
+                self._open[run_id] = (kind, time.perf_counter(), prompt_tokens, _SAMPLE.get())
+
+    def _end(self, run_id: UUID, completion_tokens: int = 0, usage: Optional[Dict] = None):
+        with self._lock:
+            opened = self._open.pop(run_id, None)
+        if opened is None:
+            return
+        kind, start, prompt_tokens, sample = opened
+        if sample is None:
+            return
+        sample["stages"][kind] = sample["stages"].get(kind, 0.0) + time.perf_counter() - start
+        sample["calls"][kind] = sample["calls"].get(kind, 0) + 1
+        if kind == "llm":
+            usage = usage or {}
+            sample["tokens"]["prompt"] += usage.get("input_tokens") or prompt_tokens
+            sample["tokens"]["completion"] += usage.get("output_tokens") or completion_tokens
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        text = " ".join(str(m.content) for batch in messages for m in batch)
+        self._start(run_id, parent_run_id, "llm", approx_tokens(text))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "llm", approx_tokens(" ".join(prompts)))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        text, usage = "", {}
+        for generations in response.generations:
+            for generation in generations:
+                text += generation.text
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or usage
+        self._end(run_id, approx_tokens(text) if text else 0, usage)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "retrieval")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+
+class MeteredGraph:
+    """
+    ``GraphStore`` facade over anything with ``query(cypher, params)``: a
+    live ``Neo4jGraph``, a :class:`CassetteGraph` or a :class:`StubGraph`.
+    Holds the schema that ``SchemaService.apply_to`` installs.
+    """
+
+    _enhanced_schema = False
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.structured_schema: Dict[str, Any] = getattr(inner, "structured_schema", {}) or {}
+        self.schema: str = getattr(inner, "schema", "") or ""
+
+    @property
+    def get_schema(self) -> str:
+        return self.schema
+
+    @property
+    def get_structured_schema(self) -> Dict[str, Any]:
+        return self.structured_schema
+
+    def query(self, query: str, params: Optional[dict] = None) -> List[Dict[str, Any]]:
+        with stage("graph"):
+            rows = self.inner.query(query, params or {})
+        sample = _SAMPLE.get()
+        if sample is not None:
+            sample["rows"] += len(rows)
+        return rows
+
+    def refresh_schema(self) -> None:
+        pass
+
+    def add_graph_documents(self, *args, **kwargs) -> None:
+        raise NotImplementedError("The benchmark graph is read-only")
+
+    def __getattr__(self, name):
+        # e.g. ``_driver`` for Neo4jVector in live mode
+        return getattr(self.inner, name)
+
+
+# ─────────────────────────────── stubs ───────────────────────────────────
+def normalize_question(text: str) -> str:
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Deterministic chat model that sleeps ``latency`` seconds plus
+    ``per_token`` per output token and answers by prompt shape.  When a
+    known question (see ``answers``) appears in the prompt it replies with
+    that question's expected answer, so accuracy checks the plumbing.
+    """
+
+    latency: float = 0.05
+    per_token: float = 0.0
+    answers: Dict[str, str] = {}
+    cypher: str = "MATCH (n:Settings) RETURN n.name AS name LIMIT 10"
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def reply(self, prompt: str) -> str:
+        if "New input:" in prompt:                          # ReAct agent step
+            request = prompt.rsplit("New input:", 1)[1]
+            question = request.strip().split("\n", 1)[0].strip()
+            if "Observation:" in request:
+                return f"Thought: Do I need to use a tool? No\nFinal Answer: {self.answer(question)}"
+            return f"Thought: Do I need to use a tool? Yes\nAction: kg_info\nAction Input: {question}"
+        if re.search(r"generate cypher", prompt, re.IGNORECASE):
+            return self.cypher
+        return self.answer(prompt)
+
+    def answer(self, text: str) -> str:
+        text = normalize_question(text)
+        for question, answer in self.answers.items():
+            if question and question in text:
+                return answer
+        return "I don't know."
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = self.reply("\n".join(str(m.content) for m in messages))
+        time.sleep(self.latency + self.per_token * approx_tokens(text))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+class StubGraph:
+    """Returns ``rows`` canned records per query after ``latency`` seconds."""
+
+    def __init__(self, latency: float = 0.005, rows: int = 5):
+        self.latency = latency
+        self.rows = [{"name": f"Setting {i}", "value": i} for i in range(rows)]
+
+    def query(self, query: str, params: Optional[dict] = None) -> List[Dict[str, Any]]:
+        time.sleep(self.latency)
+        return [dict(r) for r in self.rows]
+
+
+def hashing_backend(dim: int = 384) -> Callable[[List[str]], np.ndarray]:
+    """Bag-of-hashed-tokens embedder: no model, but texts sharing words stay close."""
+    def encode(texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little")
+                out[row, h % dim] += 1.0 if h & (1 << 31) else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+    return encode
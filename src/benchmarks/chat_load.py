@@ -0,0 +1,107 @@
+"""
+chat_load.py
+============
+
+Load test for the chat service with the LLM and Neo4j stubbed out.
+
+Each simulated turn sleeps for the graph round trips and streams tokens over
+the LLM latency, so the numbers show what the service adds: queuing,
+thread hand-off, session persistence and backpressure.  For every
+concurrency level it reports p50/p95/p99 end-to-end latency, throughput and
+how many requests were refused with 503.
+
+    python -m src.benchmarks.chat_load --levels 1 4 16 64 --requests 200
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+from aiohttp import ClientSession, web
+
+from ..qa_bot.service.server import ChatService, make_app
+from ..qa_bot.service.sessions import SessionStore
+
+
+def stub_responder(llm_seconds: float = 0.2, graph_seconds: float = 0.05,
+                   graph_calls: int = 1, tokens: int = 20):
+    """Stand-in for the agent: ``graph_calls`` queries, then a streamed answer."""
+    def respond(message: str, history: List[Dict[str, str]], on_token: Callable[[str], None]) -> str:
+        for _ in range(graph_calls):
+            time.sleep(graph_seconds)
+        words = []
+        for i in range(tokens):
+            time.sleep(llm_seconds / tokens)
+            words.append(f"w{i}")
+            on_token(f"w{i} ")
+        return f"{' '.join(words)} (turn {len(history) // 2 + 1})"
+    return respond
+
+
+async def _client(http: ClientSession, url: str, count: int, latencies: List[float], rejected: List[int]):
+    session_id = None
+    for _ in range(count):
+        start = time.perf_counter()
+        async with http.post(url, json={"message": "How many tracks can I define?",
+                                        "session_id": session_id}) as response:
+            if response.status == 503:
+                rejected.append(1)
+                continue
+            response.raise_for_status()
+            session_id = (await response.json())["session_id"]
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_level(concurrency: int, requests: int, service_kwargs: dict) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as sessions_dir:
+        service = ChatService(sessions=SessionStore(sessions_dir), **service_kwargs)
+        runner = web.AppRunner(make_app(service))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        latencies: List[float] = []
+        rejected: List[int] = []
+        try:
+            async with ClientSession() as http:
+                per_client = max(1, requests // concurrency)
+                start = time.perf_counter()
+                await asyncio.gather(*(
+                    _client(http, f"http://127.0.0.1:{port}/chat", per_client, latencies, rejected)
+                    for _ in range(concurrency)
+                ))
+                elapsed = time.perf_counter() - start
+        finally:
+            await runner.cleanup()
+
+    p50, p95, p99 = (np.percentile(latencies, [50, 95, 99]) if latencies else (float("nan"),) * 3)
+    return {"concurrency": concurrency, "ok": len(latencies), "rejected": len(rejected),
+            "p50": p50, "p95": p95, "p99": p99, "rps": len(latencies) / elapsed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the chat service with a stub agent")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--requests", type=int, default=128, help="requests per level")
+    parser.add_argument("--workers", type=int, default=8, help="service max_concurrency")
+    parser.add_argument("--queue", type=int, default=32, help="service max_queue")
+    parser.add_argument("--llm-ms", type=float, default=200)
+    parser.add_argument("--graph-ms", type=float, default=50)
+    args = parser.parse_args(argv)
+
+    service_kwargs = {
+        "respond": stub_responder(args.llm_ms / 1000, args.graph_ms / 1000),
+        "max_concurrency": args.workers,
+        "max_queue": args.queue,
+    }
+    print(f"{'clients':>7} {'ok':>5} {'503':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>7}")
+    for level in args.levels:
+        r = asyncio.run(run_level(level, args.requests, service_kwargs))
+        print(f"{r['concurrency']:>7} {r['ok']:>5} {r['rejected']:>5} {r['p50'] * 1000:>8.0f} "
+              f"{r['p95'] * 1000:>8.0f} {r['p99'] * 1000:>8.0f} {r['rps']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+embedding_throughput.py
+=======================
+
+Sentences per second, and per core, of the fp32 SentenceTransformer
+against the int8 ONNX engine (:mod:`~src.data_processing.embeddings.onnx_engine`)
+on 1…N worker processes.  Each ONNX row also reports its cosine agreement
+with the reference vectors.  The texts are page chunks of the ingested
+corpus, or synthetic sentences of mixed length.
+
+    python -m src.benchmarks.embedding_throughput --texts 2000
+    python -m src.benchmarks.embedding_throughput --synthetic --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from ..data_processing.embeddings.onnx_engine import (
+    DEFAULT_MODEL, OnnxEmbeddingPool, agreement, export, model_dir, sample_texts,
+)
+from ..data_processing.embeddings.service import sentence_transformer_backend
+
+WORDS = ("curve track log scale shading depth splice template lithology modifier export file "
+         "format data header value limit display setting symbol interval column").split()
+
+
+def synthetic_texts(n, seed=0):
+    """Lengths skewed like the corpus: mostly short, some near the 256-token limit."""
+    rng = np.random.default_rng(seed)
+    lengths = np.clip(rng.lognormal(3.3, 0.8, size=n).astype(int), 3, 220)
+    return [" ".join(rng.choice(WORDS, size=k)) for k in lengths]
+
+
+def _timed(encode, texts):
+    encode(texts[:8])                                       # load the model / start the workers
+    start = time.perf_counter()
+    vectors = encode(texts)
+    return vectors, len(texts) / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--synthetic", action="store_true", help="no corpus needed")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, max(1, cores // 2), cores}))
+    parser.add_argument("--skip-reference", action="store_true")
+    args = parser.parse_args(argv)
+
+    texts = synthetic_texts(args.texts) if args.synthetic else sample_texts(args.texts)
+    directory = model_dir(args.model)
+    if not (directory / "model.int8.onnx").exists():
+        export(args.model, directory)
+
+    rows, reference = [], None
+    if not args.skip_reference:
+        reference, rate = _timed(sentence_transformer_backend(args.model), texts)
+        rows.append(("fp32 torch", f"{cores} threads", rate, rate / cores, None))
+    for quantized in (False, True):
+        for workers in args.workers:
+            pool = OnnxEmbeddingPool(directory, workers=workers, quantized=quantized, min_parallel=0)
+            try:
+                vectors, rate = _timed(pool, texts)
+            finally:
+                pool.close()
+            check = agreement(lambda _: reference, lambda _: vectors, texts) if reference is not None else None
+            rows.append((f"onnx {'int8' if quantized else 'fp32'}", f"{workers} proc", rate, rate / workers, check))
+
+    lengths = [len(t.split()) for t in texts]
+    print(f"{len(texts)} texts, {np.mean(lengths):.0f} words mean / {max(lengths)} max, {cores} cores")
+    print(f"{'backend':<12}{'workers':<11}{'sent/s':>9}{'per core':>10}{'cos mean':>10}{'cos min':>9}")
+    for backend, workers, rate, per_core, check in rows:
+        cos = f"{check['mean']:>10.4f}{check['min']:>9.4f}" if check else f"{'-':>10}{'-':>9}"
+        print(f"{backend:<12}{workers:<11}{rate:>9.1f}{per_core:>10.1f}{cos}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+export_memory.py
+================
+
+Peak-memory comparison of the materialising graph export
+(``extract_graph_data`` → ``format_data_for_llm`` → ``save_docs_to_file``)
+against ``stream_export`` on a synthetic graph served by the in-process fake
+driver.
+
+    python -m src.benchmarks.export_memory --nodes 50000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from ..knowledge_graph.core.knowledge_exporter import CurveGraphLoader
+from ..tests.fakes import FakeDriver, graph_responder, synthetic_graph
+
+
+def _measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--nodes", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    nodes, rels = synthetic_graph(args.nodes)
+    loader = CurveGraphLoader.from_driver(FakeDriver(graph_responder(nodes, rels)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def materialised():
+            node_list, rel_list = loader.extract_graph_data()
+            docs = loader.format_data_for_llm(node_list, rel_list)
+            loader.save_docs_to_file(docs, os.path.join(tmp, "legacy.txt"))
+
+        results = [("materialised text", *_measure(materialised))]
+        for fmt in ("text", "jsonl", "nt"):
+            path = os.path.join(tmp, f"stream.{fmt}")
+            results.append((f"streaming {fmt}",
+                            *_measure(lambda: loader.stream_export(path, fmt, args.page_size))))
+
+    print(f"{len(nodes)} nodes, {len(rels)} relationships, page size {args.page_size}")
+    print(f"{'mode':<20}{'peak MiB':>10}{'seconds':>10}")
+    for name, peak, elapsed in results:
+        print(f"{name:<20}{peak / 2**20:>10.1f}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+graph_snapshot.py
+=================
+
+Latency of the agent's query shapes on the in-memory graph snapshot, and
+optionally the same queries on Neo4j (``--neo4j``) for comparison.
+Snapshot times include the Cypher-subset evaluation; parsing is cached
+the way repeated plan-cache queries hit it.
+
+    python -m src.benchmarks.graph_snapshot --from-dump src/tests/records.json
+    python -m src.benchmarks.graph_snapshot --neo4j      # exported snapshot vs live graph
+"""
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from ..qa_bot.core.graph_snapshot import DEFAULT_SNAPSHOT_DIR, GraphSnapshot
+
+QUERIES = {
+    "entity lookup": ("MATCH (n) WHERE n.name =~ '(?i)' + $e0 RETURN n.name AS name, labels(n) AS labels",
+                      {"e0": "odf"}),
+    "1 hop": ("MATCH (s:System)-[:HAS_FILE_TYPE]->(f:FileType) RETURN f.name AS name, f.fullName AS fullName", {}),
+    "2 hop": ("MATCH (g:GEO)-[:HAS_TOPIC]->()-[:HAS_FILE_TYPE]->(f) RETURN DISTINCT f.name AS name", {}),
+    "1-3 hop": ("MATCH (g:GEO)-[*1..3]->(x) RETURN DISTINCT x.name AS name LIMIT 50", {}),
+    "attributes": ("MATCH (s)-[:HAS_ATTRIBUTE]->(a) WHERE toLower(s.name) = toLower($e0) "
+                   "RETURN a.name AS attribute", {"e0": "scales"}),
+}
+
+
+def _time(run, repeat: int) -> dict:
+    run()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = run()
+        samples.append(time.perf_counter() - start)
+    return {"p50_ms": statistics.median(samples) * 1e3, "max_ms": max(samples) * 1e3, "rows": len(rows)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Graph snapshot query latency")
+    parser.add_argument("--from-dump", type=Path, default=None)
+    parser.add_argument("--snapshot-dir", type=Path, default=DEFAULT_SNAPSHOT_DIR)
+    parser.add_argument("--neo4j", action="store_true", help="also time the queries on the live graph")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    snapshot = (GraphSnapshot.from_dump(args.from_dump) if args.from_dump
+                else GraphSnapshot.load(args.snapshot_dir))
+    print(f"Loaded {snapshot.node_count} nodes / {snapshot.edge_count} relationships "
+          f"in {(time.perf_counter() - start) * 1e3:.1f} ms")
+    graph = None
+    if args.neo4j:
+        from ..qa_bot.core.graph import get_graph
+        graph = get_graph()
+
+    print(f"{'query':<15}{'snapshot p50':>14}{'max':>10}{'rows':>6}" + (f"{'neo4j p50':>12}" if graph else ""))
+    for name, (cypher, params) in QUERIES.items():
+        local = _time(lambda: snapshot.query(cypher, params), args.repeat)
+        line = f"{name:<15}{local['p50_ms']:>11.3f} ms{local['max_ms']:>7.2f} ms{local['rows']:>6}"
+        if graph is not None:
+            remote = _time(lambda: graph.query(cypher, params), max(args.repeat // 10, 5))
+            line += f"{remote['p50_ms']:>9.2f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
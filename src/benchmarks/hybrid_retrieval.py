@@ -0,0 +1,82 @@
+"""
+hybrid_retrieval.py
+===================
+
+Shows that hybrid retrieval stays flat as the graph grows, unlike the old
+``retrieval_query``, which expanded every ``Type`` node on every search.
+
+A synthetic graph of N ``Type`` nodes (each with formats and attributes) is
+held in memory.  The legacy path walks every node's neighbourhood, as the
+old query did.  The hybrid path fuses a fixed-size dense candidate list
+with BM25 hits over node names and expands only the fused hits.  The dense
+candidates stand in for the vector index, whose cost is sub-linear in N.
+
+    python -m src.benchmarks.hybrid_retrieval --sizes 1000 10000 100000
+"""
+import argparse
+import random
+import time
+
+from ..data_processing.search.bm25 import BM25Index
+from ..qa_bot.tools.hybrid import HybridRetriever, format_context
+
+
+def synthetic_graph(n_types: int, fanout: int = 6, seed: int = 0):
+    rng = random.Random(seed)
+    nodes, adjacency = {}, {}
+    for i in range(n_types):
+        node_id = f"type:{i}"
+        nodes[node_id] = {"id": node_id, "label": "Type", "name": f"Curve Type {i}",
+                          "text": f"Curve type {i} with scale {rng.choice(['linear', 'log'])}"}
+        adjacency[node_id] = [
+            {"rel": rng.choice(["HAS_ATTRIBUTE", "HAS_FORMAT"]), "label": "Attribute",
+             "name": f"attr {i}.{j}"} for j in range(fanout)
+        ]
+    return nodes, adjacency
+
+
+def legacy_context(nodes, adjacency):
+    """What the old retrieval_query assembled: every Type with all neighbours."""
+    return format_context([{**node, "neighbours": adjacency[node_id]} for node_id, node in nodes.items()])
+
+
+def hybrid_retriever(nodes, adjacency, k):
+    lexical_index = BM25Index.build({"id": n["id"], "title": n["name"], "text": n["text"]}
+                                    for n in nodes.values())
+    ids = list(nodes)
+
+    def dense(question, candidates):
+        return [(ids[i], 1.0 - i / 100) for i in range(min(candidates, len(ids)))]
+
+    def lexical(question, candidates):
+        return [(doc["id"], score) for doc, score in lexical_index.search(question, candidates)]
+
+    def expand(hit_ids, per_hit):
+        return [{**nodes[i], "neighbours": adjacency[i][:per_hit]} for i in hit_ids]
+
+    return HybridRetriever(dense, lexical, expand, k=k)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Legacy vs hybrid retrieval as the graph grows")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'nodes':>8} {'legacy ms':>10} {'legacy chars':>13} {'hybrid ms':>10} {'hybrid chars':>13}  stages (ms)")
+    for size in args.sizes:
+        nodes, adjacency = synthetic_graph(size)
+        start = time.perf_counter()
+        legacy = legacy_context(nodes, adjacency)
+        legacy_ms = (time.perf_counter() - start) * 1e3
+
+        retriever = hybrid_retriever(nodes, adjacency, args.k)
+        result = retriever.retrieve(f"curve type {size // 2} log scale")
+        context = format_context(result["hits"])
+        stages = ", ".join(f"{k} {v * 1e3:.2f}" for k, v in result["timings"].items())
+        print(f"{size:>8} {legacy_ms:>10.1f} {len(legacy):>13} "
+              f"{result['timings']['total'] * 1e3:>10.2f} {len(context):>13}  {stages}")
+
+
+if __name__ == "__main__":
+    main()
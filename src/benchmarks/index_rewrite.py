@@ -0,0 +1,73 @@
+"""
+index_rewrite.py
+================
+
+Database hits of the agent's lookup shapes before and after
+:func:`~src.qa_bot.core.index_rewrite.rewrite`, from ``PROFILE`` on the
+live graph.  It also checks that both forms return the same rows.  Run
+``python -m src.knowledge_graph.core.setup_runner`` first, so the keys and
+indexes exist.
+
+    python -m src.benchmarks.index_rewrite
+    python -m src.benchmarks.index_rewrite --dry-run      # show the rewrites only
+"""
+import argparse
+import os
+import time
+
+from ..qa_bot.core.index_rewrite import rewrite
+
+QUERIES = {
+    "regex literal": ("MATCH (f:FileType) WHERE f.name =~ '(?i)odf' RETURN f.name AS name, f.fullName AS fullName", {}),
+    "regex param": ("MATCH (f:FileType)-[:CONTAINS]->(c) WHERE f.name =~ '(?i)' + $e0 RETURN c.name AS name",
+                    {"e0": "ODT"}),
+    "contains": ("MATCH (f:FileType) WHERE f.fullName =~ '(?i).*database.*' RETURN f.name AS name", {}),
+    "toLower": ("MATCH (s:Scales)-[:HAS_ATTRIBUTE]->(a) WHERE toLower(s.name) = toLower($e0) "
+                "RETURN a.name AS attribute", {"e0": "scales"}),
+    "no label": ("MATCH (n) WHERE n.name =~ '(?i)' + $e0 RETURN n.name AS name, labels(n) AS labels",
+                 {"e0": "odf"}),
+}
+
+
+def _db_hits(plan) -> int:
+    return plan.get("dbHits", 0) + sum(_db_hits(child) for child in plan.get("children", []))
+
+
+def _profile(session, cypher: str, params: dict):
+    start = time.perf_counter()
+    result = session.run("PROFILE " + cypher, params)
+    rows = [r.data() for r in result]
+    summary = result.consume()
+    return _db_hits(summary.profile or {}), rows, (time.perf_counter() - start) * 1e3
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PROFILE db hits before/after the index rewrite")
+    parser.add_argument("--dry-run", action="store_true", help="print the rewritten queries without Neo4j")
+    args = parser.parse_args(argv)
+
+    if args.dry_run:
+        for name, (cypher, _params) in QUERIES.items():
+            result = rewrite(cypher)
+            print(f"── {name}: {', '.join(result.changes) or 'unchanged'}\n   {cypher}\n   {result.cypher}")
+        return
+
+    from dotenv import load_dotenv
+    from neo4j import GraphDatabase
+    load_dotenv()
+    driver = GraphDatabase.driver(os.getenv("NEO4J_URI"), auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")))
+    try:
+        print(f"{'query':<15}{'db hits before':>16}{'after':>8}{'ms before':>11}{'after':>8}  rows")
+        with driver.session() as session:
+            for name, (cypher, params) in QUERIES.items():
+                before_hits, before_rows, before_ms = _profile(session, cypher, params)
+                after_hits, after_rows, after_ms = _profile(session, rewrite(cypher).cypher, params)
+                same = sorted(map(repr, before_rows)) == sorted(map(repr, after_rows))
+                print(f"{name:<15}{before_hits:>16}{after_hits:>8}{before_ms:>11.1f}{after_ms:>8.1f}  "
+                      f"{len(after_rows)}{'' if same else ' (rows differ!)'}")
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
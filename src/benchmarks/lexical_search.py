@@ -0,0 +1,51 @@
+"""
+lexical_search.py
+=================
+
+Query latency of the BM25 index built from ``Data/whxdata``.
+
+Every topic title is reused as a query (plus a few exact-term probes) and
+the p50/p99 latency of ``BM25Index.search`` is reported.
+
+    python -m src.benchmarks.lexical_search --repeat 20
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from ..data_processing.search.bm25 import BM25Index, build_index
+
+PROBES = ["ODF", "OIF tracks", "gamma ray", "maximum number of lithology types", "GR_1", "0x0"]
+
+
+def measure(index: BM25Index, queries, repeat: int = 10, k: int = 5):
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, k)
+            latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1e3
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark BM25 query latency")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_index("whxdata", tmp)
+        index = BM25Index.load(tmp)             # memory-mapped, as served
+        queries = [doc["title"] for doc in index.docs] + PROBES
+        ms = measure(index, queries, args.repeat, args.k)
+
+    print(f"{len(index)} docs, {len(index.terms)} terms, {len(ms)} queries")
+    print(f"p50 {np.percentile(ms, 50):.3f} ms   p99 {np.percentile(ms, 99):.3f} ms   "
+          f"max {ms.max():.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+"""
+qa_benchmark.py
+===============
+
+Runs the project's recorded questions through the three QA paths and
+reports latency, throughput, tokens and accuracy.
+
+* ``agent``  – ``generate_response`` (ReAct agent → ``kg_info`` → Cypher QA),
+  with the answer cache off and a fresh Cypher plan cache per run.
+* ``vector`` – the ``vector.py`` retrieval chain (vector retriever + Ollama).
+* ``rag``    – the FAISS RAG chain from ``builder.py``.
+
+Questions come from ``Data/expected_query_responses.xlsx`` and
+``Data/feedback_dataset.json`` (answers rated 8+ are the expected answers),
+``Data/log_questions.txt``, ``Data/timed_responses.json`` and
+``text_files/questions.txt``, de-duplicated.  Answers are scored by whether
+they contain every number of the expected answer (the facts these questions
+ask for are limits and counts) and by token F1.
+
+Backends (see :mod:`backends`):
+
+* ``stub``   – synthetic LLM/graph latency, no services; measures our own
+  code: prompt assembly, parsing, plan cache, formatting, retrieval glue.
+* ``replay`` – a cassette recorded with ``--backend live --record``.
+* ``live``   – the configured OpenAI/Ollama endpoints and Neo4j.
+
+The JSON report carries the git commit, so two reports show what a change
+did; ``--baseline`` compares against one and exits 1 on a regression.
+
+    python -m src.benchmarks.qa_benchmark --backend stub --workers 8
+    python -m src.benchmarks.qa_benchmark --backend live --record --workers 1
+    python -m src.benchmarks.qa_benchmark --backend replay --baseline Output/benchmarks/before.json
+    python -m src.benchmarks.qa_benchmark --backend replay --replay-latency recorded
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager, nullcontext, redirect_stdout
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .backends import (
+    Cassette, CassetteChatModel, CassetteGraph, CassetteRetriever, MeteredGraph, StageMeter,
+    StubChatModel, StubGraph, cassette_retrieve, hashing_backend, metered, new_sample,
+    normalize_question, sampling,
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+DATA_DIR = PROJECT_ROOT / "Data"
+DEFAULT_OUTPUT_DIR = PROJECT_ROOT / "Output" / "benchmarks"
+DEFAULT_CASSETTE = DEFAULT_OUTPUT_DIR / "cassette.jsonl.gz"
+SCHEMA_DUMP = PROJECT_ROOT / "src" / "tests" / "records.json"
+
+PIPELINES = ("agent", "vector", "rag")
+SOURCES = ("expected", "feedback", "log", "timed", "questions")
+STAGES = ("total", "llm", "graph", "retrieval")
+GOOD_RATING = 8
+
+
+# ───────────────────────────── question set ──────────────────────────────
+def _read_expected() -> List[Dict[str, Any]]:
+    try:
+        import pandas as pd
+        frame = pd.read_excel(DATA_DIR / "expected_query_responses.xlsx")
+    except ImportError as e:              # openpyxl is only needed here
+        print(f"Skipping expected_query_responses.xlsx: {e}", file=sys.stderr)
+        return []
+    return [{"question": q, "expected": str(a)} for q, a in zip(frame["Question"], frame["Response"])
+            if isinstance(q, str)]
+
+
+def _read_feedback() -> List[Dict[str, Any]]:
+    rows = json.loads((DATA_DIR / "feedback_dataset.json").read_text(encoding="utf-8"))
+    return [{"question": r["question"],
+             "expected": r["response"] if float(r.get("rating-score") or 0) >= GOOD_RATING else None}
+            for r in rows]
+
+
+def _read_log() -> List[Dict[str, Any]]:
+    lines = (DATA_DIR / "log_questions.txt").read_text(encoding="utf-8").splitlines()
+    return [{"question": line.strip()} for line in lines if line.strip()]
+
+
+def _read_timed() -> List[Dict[str, Any]]:
+    rows = json.loads((DATA_DIR / "timed_responses.json").read_text(encoding="utf-8"))
+    return [{"question": r["question"], "recorded_seconds": r["response_time"]} for r in rows]
+
+
+def _read_questions() -> List[Dict[str, Any]]:
+    text = (PROJECT_ROOT / "text_files" / "questions.txt").read_text(encoding="utf-8")
+    # Numbered questions, not always one per line
+    return [{"question": q.strip()} for q in re.split(r"(?:^|\s)\d+\.\s", text) if q.strip()]
+
+
+_READERS = {"expected": _read_expected, "feedback": _read_feedback, "log": _read_log,
+            "timed": _read_timed, "questions": _read_questions}
+
+
+def load_questions(sources: Sequence[str] = SOURCES) -> List[Dict[str, Any]]:
+    """
+    Returns ``{"question", "expected", "recorded_seconds", "sources"}`` per
+    distinct question; later sources fill in fields earlier ones lack.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for source in sources:
+        for row in _READERS[source]():
+            item = merged.setdefault(normalize_question(row["question"]), {
+                "question": row["question"].strip(), "expected": None,
+                "recorded_seconds": None, "sources": []})
+            item["sources"].append(source)
+            for field in ("expected", "recorded_seconds"):
+                if item[field] is None and row.get(field) is not None:
+                    item[field] = row[field]
+    return list(merged.values())
+
+
+# ─────────────────────────────── scoring ─────────────────────────────────
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_WORD = re.compile(r"\w+")
+
+
+def numbers(text: str) -> set:
+    return {n.replace(",", "") for n in _NUMBER.findall(text)}
+
+
+def token_f1(answer: str, expected: str) -> float:
+    got, want = Counter(_WORD.findall(answer.lower())), Counter(_WORD.findall(expected.lower()))
+    common = sum((got & want).values())
+    if not common:
+        return 0.0
+    precision, recall = common / sum(got.values()), common / sum(want.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def score(answer: str, expected: str) -> Dict[str, Any]:
+    """``fact_match``: every number of *expected* appears in *answer* (F1 ≥ 0.5 if it has none)."""
+    f1 = token_f1(answer, expected)
+    wanted = numbers(expected)
+    return {"fact_match": wanted <= numbers(answer) if wanted else f1 >= 0.5, "f1": f1}
+
+
+# ─────────────────────────────── backends ────────────────────────────────
+def _schema_service(structured: Optional[Dict[str, Any]]):
+    from ..qa_bot.core.kg_schema import SchemaService
+    if structured is None:
+        return SchemaService.from_dump(SCHEMA_DUMP)
+    service = SchemaService(query=None, snapshot_path=None)
+    service.structured, service.fingerprint = structured, "cassette"
+    return service
+
+
+def _offline_chunks(cache_dir: Path):
+    """FAISS store and LangChain retriever over the file-type chunks, embedded without a model."""
+    from langchain_core.vectorstores import InMemoryVectorStore
+    from ..data_processing.embeddings.service import CachedEmbeddings, EmbeddingService
+    from ..data_processing.graph.builder import build_chunks
+    from ..data_processing.graph.vector_store import VectorStore
+
+    service = EmbeddingService(model_name="hashing-384", cache_dir=cache_dir, backend=hashing_backend())
+    chunks = build_chunks()
+    store = VectorStore(dim=384)
+    store.sync(chunks, service.embed)
+
+    def retrieve(question: str, k: int = 3) -> List[str]:
+        return [meta["text"] for meta, _ in store.search(service.embed([question]), k)[0]]
+
+    vector_store = InMemoryVectorStore.from_texts([c["text"] for c in chunks.values()],
+                                                  CachedEmbeddings(service))
+    return retrieve, vector_store.as_retriever()
+
+
+@contextmanager
+def installed_backends(backend: str, questions: List[Dict[str, Any]], cassette: Optional[Cassette],
+                       llm_latency: float, per_token: float, graph_latency: float,
+                       warm_up: Optional[Dict[str, float]] = None
+                       ) -> Iterator[Dict[str, Callable[[str, list], str]]]:
+    """
+    Swaps the chosen backend into the resource registry and yields one
+    ``(question, callbacks) -> answer`` callable per pipeline.  Build times
+    of the shared resources go into *warm_up*.
+    """
+    warm_up = {} if warm_up is None else warm_up
+    from ..data_processing.graph import builder
+    from ..qa_bot.core import agent
+    from ..qa_bot.core.resources import registry
+    from ..qa_bot.tools import vector
+
+    overridden = ("llm", "graph", "schema", "kg_cypher_chain", "agent_executor", "chunk_chain")
+    saved = {"ANSWER_CACHE_ENABLED": agent.ANSWER_CACHE_ENABLED, "DEFAULT_PLAN_DIR": agent.DEFAULT_PLAN_DIR}
+    with tempfile.TemporaryDirectory() as scratch, ExitStack() as cleanup:
+        cleanup.callback(registry.reset, *overridden)
+        cleanup.callback(lambda: [setattr(agent, k, v) for k, v in saved.items()])
+        agent.ANSWER_CACHE_ENABLED = False
+        agent.DEFAULT_PLAN_DIR = Path(scratch) / "cypher_plans"
+        registry.reset(*overridden)
+
+        if backend == "live":
+            llm, rag_llm, ollama = registry.get("llm"), builder.get_rag_llm(), registry.get("ollama_llm")
+            graph = registry.get("graph")
+            # Behind the process-wide cassette when CASSETTE is set
+            retrieve, retriever = builder.rag_retriever(), vector.chunk_retriever()
+            if cassette is not None:
+                llm, rag_llm, ollama = (CassetteChatModel(cassette=cassette, inner=m) for m in (llm, rag_llm, ollama))
+                graph = CassetteGraph(cassette, graph)
+                retrieve = cassette_retrieve(cassette, retrieve)
+                retriever = CassetteRetriever(cassette=cassette, inner=retriever)
+            registry.override("graph", MeteredGraph(graph))
+            cassette_schema = None
+        else:
+            if backend == "replay":
+                llm = CassetteChatModel(cassette=cassette, latency=llm_latency)
+                graph = CassetteGraph(cassette, latency=graph_latency)
+                retrieve = cassette_retrieve(cassette)
+                retriever = CassetteRetriever(cassette=cassette)
+                cassette_schema = cassette.schema
+            else:
+                answers = {normalize_question(q["question"]): q["expected"] for q in questions if q["expected"]}
+                llm = StubChatModel(latency=llm_latency, per_token=per_token, answers=answers)
+                graph = StubGraph(latency=graph_latency)
+                retrieve, retriever = _offline_chunks(Path(scratch) / "embeddings")
+                cassette_schema = None
+            rag_llm = ollama = llm
+            registry.override("graph", MeteredGraph(graph))
+            schema = _schema_service(cassette_schema)
+            schema.apply_to(registry.get("graph"))
+            registry.override("schema", schema)
+
+        registry.override("llm", llm)
+        if backend == "live" and cassette is not None:
+            cassette.schema = agent.get_schema_service().current()
+
+        chunk_chain = vector.build_chunk_chain(ollama, retriever)
+        rag_chain = builder.build_rag_chain(rag_llm, metered("retrieval", retrieve))
+        # Build the chains now so the first timed question does not pay for it
+        warm_up.update(registry.warm_up("schema", "kg_cypher_chain", "agent_executor"))
+        yield {
+            "agent": lambda q, callbacks: agent.generate_response(q, callbacks=callbacks),
+            "vector": lambda q, callbacks: chunk_chain.invoke(
+                {"input": q}, config={"callbacks": callbacks})["answer"],
+            "rag": lambda q, callbacks: rag_chain.invoke(
+                {"question": q}, config={"callbacks": callbacks}),
+        }
+
+
+# ─────────────────────────────── running ─────────────────────────────────
+def run_pipeline(answer: Callable[[str, list], str], questions: List[Dict[str, Any]],
+                 workers: int = 4, repeat: int = 1) -> Dict[str, Any]:
+    """Answers every question (``repeat`` times) on *workers* threads."""
+    meter = StageMeter()
+
+    def run_one(item: Dict[str, Any]) -> Dict[str, Any]:
+        sample = new_sample()
+        with sampling(sample):
+            start = time.perf_counter()
+            try:
+                text, error = answer(item["question"], [meter]), None
+            except Exception as e:
+                text, error = "", f"{type(e).__name__}: {e}"
+            sample["stages"]["total"] = time.perf_counter() - start
+        sample.update(question=item["question"], answer=text, error=error)
+        if item.get("expected") and error is None:
+            sample["score"] = score(text, item["expected"])
+        return sample
+
+    work = [item for _ in range(repeat) for item in questions]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        samples = list(pool.map(run_one, work))
+    return {"wall_seconds": time.perf_counter() - start, "samples": samples}
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(np.mean(values))}
+
+
+def summarize(run: Dict[str, Any]) -> Dict[str, Any]:
+    samples = run["samples"]
+    ok = [s for s in samples if s["error"] is None]
+    scored = [s["score"] for s in ok if "score" in s]
+    prompt = sum(s["tokens"]["prompt"] for s in ok)
+    completion = sum(s["tokens"]["completion"] for s in ok)
+    return {
+        "questions": len(samples),
+        "errors": len(samples) - len(ok),
+        "wall_seconds": run["wall_seconds"],
+        "throughput_qps": len(ok) / run["wall_seconds"] if run["wall_seconds"] else 0.0,
+        "latency": {stage: _percentiles([s["stages"].get(stage, 0.0) for s in ok]) for stage in STAGES},
+        "calls_per_question": {stage: float(np.mean([s["calls"].get(stage, 0) for s in ok])) if ok else 0.0
+                               for stage in STAGES[1:]},
+        "tokens": {"prompt": prompt, "completion": completion,
+                   "per_question": (prompt + completion) / len(ok) if ok else 0.0},
+        "accuracy": {"scored": len(scored),
+                     "fact_match": float(np.mean([s["fact_match"] for s in scored])) if scored else None,
+                     "f1": float(np.mean([s["f1"] for s in scored])) if scored else None},
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2) -> List[str]:
+    """Regressions of *report* against *baseline*: slower p95, lower throughput or accuracy."""
+    problems = []
+    for name, now in report["pipelines"].items():
+        before = baseline.get("pipelines", {}).get(name)
+        if not before:
+            continue
+        p95_now, p95_before = now["latency"]["total"].get("p95"), before["latency"]["total"].get("p95")
+        if p95_now and p95_before and p95_now > p95_before * (1 + tolerance):
+            problems.append(f"{name}: p95 {p95_before * 1e3:.1f} -> {p95_now * 1e3:.1f} ms")
+        if now["throughput_qps"] < before["throughput_qps"] * (1 - tolerance):
+            problems.append(f"{name}: throughput {before['throughput_qps']:.2f} -> {now['throughput_qps']:.2f} q/s")
+        acc_now, acc_before = now["accuracy"]["fact_match"], before["accuracy"]["fact_match"]
+        if acc_now is not None and acc_before is not None and acc_now < acc_before - 0.05:
+            problems.append(f"{name}: fact match {acc_before:.0%} -> {acc_now:.0%}")
+        if now["errors"] > before["errors"]:
+            problems.append(f"{name}: errors {before['errors']} -> {now['errors']}")
+    return problems
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_summary(name: str, summary: Dict[str, Any]) -> None:
+    latency = summary["latency"]
+    stages = "  ".join(f"{stage} {latency[stage]['p50'] * 1e3:.1f}/{latency[stage]['p95'] * 1e3:.1f}"
+                       for stage in STAGES if latency[stage])
+    accuracy = summary["accuracy"]
+    acc = (f"fact {accuracy['fact_match']:.0%} f1 {accuracy['f1']:.2f} (n={accuracy['scored']})"
+           if accuracy["scored"] else "no expected answers")
+    print(f"{name:>6}: {summary['questions']} q, {summary['errors']} errors, "
+          f"{summary['throughput_qps']:.2f} q/s, {summary['tokens']['per_question']:.0f} tok/q, {acc}")
+    print(f"        p50/p95 ms  {stages}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="QA latency/accuracy benchmark over the recorded questions")
+    parser.add_argument("--pipelines", nargs="+", choices=PIPELINES, default=list(PIPELINES))
+    parser.add_argument("--backend", choices=("stub", "replay", "live"), default="stub")
+    parser.add_argument("--cassette", type=Path, default=DEFAULT_CASSETTE,
+                        help="replayed with --backend replay, written with --record")
+    parser.add_argument("--record", action="store_true", help="record a cassette (live backend only)")
+    parser.add_argument("--sources", nargs="+", choices=SOURCES, default=list(SOURCES))
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the question set")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per stubbed/replayed LLM call")
+    parser.add_argument("--per-token", type=float, default=0.0, help="extra stub seconds per output token")
+    parser.add_argument("--graph-latency", type=float, default=0.005, help="seconds per stubbed/replayed query")
+    parser.add_argument("--replay-latency", default=None,
+                        help="replay delay instead of the fixed ones: 'recorded', 'recorded*0.5' or seconds")
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None, help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--verbose", action="store_true", help="keep the agent's own stdout")
+    args = parser.parse_args(argv)
+    if args.record and args.backend != "live":
+        parser.error("--record needs --backend live")
+
+    questions = load_questions(args.sources)[:args.limit]
+    cassette = (Cassette(args.cassette, latency=args.replay_latency or 0.0)
+                if args.backend == "replay" or args.record else None)
+    if args.backend == "replay" and args.replay_latency:
+        args.llm_latency = args.graph_latency = 0.0
+    recorded = [q["recorded_seconds"] for q in questions if q["recorded_seconds"]]
+    print(f"{len(questions)} questions ({sum(1 for q in questions if q['expected'])} with expected answers), "
+          f"backend {args.backend}, {args.workers} workers", file=sys.stderr)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": _git("rev-parse", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "backend": args.backend, "workers": args.workers, "repeat": args.repeat,
+            "llm_latency": args.llm_latency, "graph_latency": args.graph_latency,
+            "replay_latency": args.replay_latency,
+            "python": platform.python_version(), "questions": len(questions),
+            "recorded_seconds": _percentiles(recorded),
+            "warm_up_seconds": {},
+        },
+        "pipelines": {},
+        "samples": {},
+    }
+    with installed_backends(args.backend, questions, cassette, args.llm_latency, args.per_token,
+                            args.graph_latency, report["meta"]["warm_up_seconds"]) as pipelines:
+        for name in args.pipelines:
+            with (nullcontext() if args.verbose else redirect_stdout(io.StringIO())):
+                run = run_pipeline(pipelines[name], questions, args.workers, args.repeat)
+            report["pipelines"][name] = summarize(run)
+            report["samples"][name] = run["samples"]
+            _print_summary(name, report["pipelines"][name])
+
+    if args.record:
+        cassette.save()
+        print(f"Recorded cassette {args.cassette}")
+    if cassette is not None:
+        report["meta"]["cassette_misses"] = cassette.misses
+    if recorded:
+        print(f"Recorded production latency: p50 {report['meta']['recorded_seconds']['p50']:.1f} s")
+
+    commit = (report["meta"]["commit"] or "nocommit")[:10]
+    output = args.output or DEFAULT_OUTPUT_DIR / f"qa_{commit}_{args.backend}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Wrote {output}")
+
+    if args.baseline:
+        problems = compare(report, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+startup.py
+==========
+
+Cold-import benchmark for the QA bot.
+
+Imports the ``qa_bot`` modules in a fresh interpreter under
+``python -X importtime`` with outbound sockets disabled, reports the slowest
+imports, and exits non-zero if importing pulled in a model runtime (torch,
+sentence-transformers, ...) or tried to open a connection.
+
+    python -m src.benchmarks.startup
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+QA_BOT_MODULES = (
+    "src.qa_bot.core.agent",
+    "src.qa_bot.core.kg_schema",
+    "src.qa_bot.tools.cypher",
+    "src.qa_bot.tools.vector",
+    "src.qa_bot.tools.lexical",
+)
+
+# Importing any of these means a model is being loaded eagerly.
+FORBIDDEN_MODULES = ("torch", "sentence_transformers", "transformers", "langchain_huggingface")
+
+_PROBE = r"""
+import json, socket, sys, time, traceback
+
+attempts = []
+
+def _refuse(self, address, *args):
+    attempts.append(repr(address))
+    raise OSError("network access during import")
+
+socket.socket.connect = _refuse
+socket.socket.connect_ex = _refuse
+
+error = None
+start = time.perf_counter()
+try:
+    for name in sys.argv[1:]:
+        __import__(name)
+except BaseException:
+    error = traceback.format_exc()
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "connections": attempts,
+                  "modules": sorted(sys.modules), "error": error}))
+"""
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(modules=QA_BOT_MODULES):
+    """Runs the probe in a subprocess and returns its report."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE, *modules],
+        capture_output=True, text=True, cwd=PROJECT_ROOT,
+    )
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    top_level = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match and len(match.group(3)) <= 3:          # our modules and their direct imports
+            top_level.append((int(match.group(2)) / 1e6, match.group(4)))
+    report["slowest"] = sorted(top_level, reverse=True)[:15]
+    report["forbidden"] = [
+        m for m in report.pop("modules")
+        if m.split(".")[0] in FORBIDDEN_MODULES and "." not in m
+    ]
+    return report
+
+
+def problems(report):
+    found = []
+    if report["error"]:
+        found.append(f"import failed:\n{report['error']}")
+    if report["forbidden"]:
+        found.append(f"heavy modules imported eagerly: {', '.join(report['forbidden'])}")
+    if report["connections"]:
+        found.append(f"sockets opened during import: {', '.join(report['connections'])}")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold import of the QA bot")
+    parser.add_argument("modules", nargs="*", default=list(QA_BOT_MODULES))
+    args = parser.parse_args(argv)
+
+    report = measure(args.modules)
+    print(f"Imported {len(args.modules)} modules in {report['seconds']:.3f}s")
+    print(f"{'cumulative s':>12}  module")
+    for seconds, name in report["slowest"]:
+        print(f"{seconds:>12.3f}  {name}")
+
+    found = problems(report)
+    for problem in found:
+        print(f"FAIL: {problem}")
+    sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+tracing_overhead.py
+===================
+
+Cost of a span per call, with tracing off, metrics only, and metrics plus
+JSONL export.  Compare the "off" column with the bare loop: that is what
+the instrumentation adds to every request when ``QA_TRACE`` is unset.
+
+    python -m src.benchmarks.tracing_overhead --calls 200000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from ..qa_bot.core import tracing
+
+
+def _work(i: int) -> int:
+    return i * 2
+
+
+def bare(calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        _work(i)
+    return time.perf_counter() - start
+
+
+def spanned(calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        with tracing.span("bench.work", i=i) as s:
+            s.set(rows=_work(i))
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-span tracing overhead")
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    results = {"bare loop": bare(args.calls)}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("off", "metrics", "jsonl"):
+            tracing.configure(mode, Path(tmp) / "spans.jsonl")
+            results[f"span ({mode})"] = spanned(args.calls)
+        tracing.configure("off")
+
+    for name, seconds in results.items():
+        print(f"{name:>16}: {seconds / args.calls * 1e9:>8.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+vector_index.py
+===============
+
+Recall@k versus query latency of the approximate ``VectorStore`` kinds
+against the exact flat index, on clustered synthetic 384-d vectors.
+
+    python -m src.benchmarks.vector_index --vectors 20000 --k 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ..data_processing.graph.vector_store import VectorStore
+
+
+def clustered_vectors(n, dim, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return centres[labels] + 0.3 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def _build(kind, ids, vectors, **params):
+    store = VectorStore(vectors.shape[1], kind, **params)
+    start = time.perf_counter()
+    store.upsert(ids, vectors, [{} for _ in ids])
+    return store, time.perf_counter() - start
+
+
+def _run(store, queries, k):
+    start = time.perf_counter()
+    results = store.search(queries, k)
+    per_query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return [{m["chunk_id"] for m, _ in row} for row in results], per_query_ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    data = clustered_vectors(args.vectors + args.queries, args.dim, clusters=64)
+    vectors, queries = data[:args.vectors], data[args.vectors:]
+    ids = [f"chunk:{i}" for i in range(args.vectors)]
+
+    flat, build = _build("flat", ids, vectors)
+    truth, latency = _run(flat, queries, args.k)
+    rows = [("flat", "-", build, latency, 1.0)]
+
+    nlist = max(16, int(4 * np.sqrt(args.vectors)))
+    ivf, build = _build("ivf", ids, vectors, nlist=nlist)
+    for nprobe in (1, 4, 16, 64):
+        ivf.set_search_params(nprobe=nprobe)
+        found, latency = _run(ivf, queries, args.k)
+        recall = np.mean([len(f & t) / args.k for f, t in zip(found, truth)])
+        rows.append(("ivf", f"nprobe={nprobe}", build, latency, recall))
+
+    hnsw, build = _build("hnsw", ids, vectors)
+    for ef in (16, 32, 64, 128):
+        hnsw.set_search_params(ef_search=ef)
+        found, latency = _run(hnsw, queries, args.k)
+        recall = np.mean([len(f & t) / args.k for f, t in zip(found, truth)])
+        rows.append(("hnsw", f"ef={ef}", build, latency, recall))
+
+    print(f"{args.vectors} x {args.dim}-d vectors, {args.queries} queries, k={args.k}")
+    print(f"{'index':<6}{'setting':<12}{'build s':>9}{'ms/query':>10}{f'recall@{args.k}':>11}")
+    for kind, setting, build, latency, recall in rows:
+        print(f"{kind:<6}{setting:<12}{build:>9.2f}{latency:>10.3f}{recall:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
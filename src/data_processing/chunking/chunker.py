@@ -0,0 +1,220 @@
+"""
+chunker.py
+==========
+
+Splits parsed help pages (see ``file_io.corpus``) into retrieval chunks.
+
+* **Boilerplate** – RoboHelp template lines (navigation, the "Maximize
+  screen" banner, return glyphs) and any line found on more than
+  ``boilerplate_share`` of all pages are removed before chunking.
+* **Structure** – chunks follow the page's heading sections; small
+  neighbouring sections are packed together, and long ones are split at
+  line and then sentence boundaries, all under ``max_tokens``.  Tables
+  become their own chunks with one ``header: value`` line per row, so each
+  row keeps its column names and the repeated header row is not stored
+  as text.
+* **Near-duplicates** – chunks whose MinHash similarity to an earlier chunk
+  exceeds the threshold are dropped before they reach the embedder.
+
+Every chunk text starts with a ``Title > Heading`` breadcrumb so it stands
+on its own.
+
+    python -m src.data_processing.chunking.chunker --corpus-dir Output/corpus
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from .minhash import MinHashLSH, deduplicate
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_OUTPUT_DIR = PROJECT_ROOT / "Output" / "chunks"
+
+TEMPLATE_BOILERPLATE = {
+    "*Maximize screen to view table of contents*", "Back", "Forward", "↵", "Contact us",
+}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def approx_tokens(text: str) -> int:
+    """Cheap stand-in for a tokenizer: MiniLM averages ~1.3 tokens per word."""
+    return int(len(text.split()) * 1.3) + 1
+
+
+class Chunker:
+    """
+    Args:
+        max_tokens (int): Budget per chunk, breadcrumb included.
+        min_tokens (int): Sections below this are packed with their neighbours.
+        boilerplate_share (float): Lines on more than this share of pages are
+            dropped (only applied when at least 10 pages are chunked).
+        dedup_threshold (float | None): MinHash similarity for dropping a
+            chunk; ``None`` keeps everything.
+        count_tokens (callable): Token counter.
+    """
+
+    def __init__(self, max_tokens: int = 256, min_tokens: int = 48, boilerplate_share: float = 0.5,
+                 dedup_threshold: Optional[float] = 0.85, count_tokens: Callable[[str], int] = approx_tokens):
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        self.boilerplate_share = boilerplate_share
+        self.dedup_threshold = dedup_threshold
+        self.count_tokens = count_tokens
+        self.stats: Dict[str, int] = {}
+
+    # ── boilerplate ──
+    def boilerplate(self, pages: Sequence[Dict]) -> set:
+        lines = set(TEMPLATE_BOILERPLATE)
+        if len(pages) >= 10:
+            seen = Counter()
+            for page in pages:
+                seen.update({line for s in page["sections"] for line in s["text"].split("\n")})
+            lines |= {line for line, n in seen.items() if n > self.boilerplate_share * len(pages)}
+        return lines
+
+    # ── chunking ──
+    def chunk_page(self, page: Dict, boilerplate: set) -> List[Dict]:
+        title = page["title"]
+        table_cells = {cell for table in page["tables"] for row in table["rows"] for cell in row}
+        chunks: List[Dict] = []
+
+        pending_heading, pending = "", []
+
+        def emit(heading: str, lines: List[str]):
+            for text in self._split(lines, self._breadcrumb(title, heading)):
+                chunks.append({"heading": heading, "kind": "text", "text": text})
+
+        for section in page["sections"]:
+            lines = [l for l in section["text"].split("\n")
+                     if l.strip() and l not in boilerplate and l not in table_cells]
+            if not lines:
+                continue
+            body = ([f"{section['heading']}"] if pending and section["heading"] else []) + lines
+            if pending and self.count_tokens("\n".join(pending + body)) <= self.max_tokens:
+                pending += body
+                continue
+            if pending:
+                emit(pending_heading, pending)
+            pending_heading, pending = section["heading"], lines
+            if self.count_tokens("\n".join(pending)) >= self.min_tokens:
+                emit(pending_heading, pending)
+                pending_heading, pending = "", []
+        if pending:
+            emit(pending_heading, pending)
+
+        for table in page["tables"]:
+            rows = [r for r in table["rows"] if not all(c in boilerplate for c in r)]
+            if not rows:
+                continue
+            header, body = (rows[0], rows[1:]) if len(rows) > 1 else ([], rows)
+            lines = [
+                "; ".join(f"{h}: {c}" if h else c for h, c in zip(header + [""] * len(row), row) if c)
+                for row in body
+            ]
+            heading = " | ".join(header)
+            for text in self._split(lines, self._breadcrumb(title, heading)):
+                chunks.append({"heading": heading, "kind": "table", "text": text})
+
+        return [{"id": f"{page['path']}#{i}", "path": page["path"], "title": title,
+                 "tokens": self.count_tokens(c["text"]), **c}
+                for i, c in enumerate(chunks)]
+
+    @staticmethod
+    def _breadcrumb(title: str, heading: str) -> str:
+        return f"{title} > {heading}" if heading and heading != title else title
+
+    def _split(self, lines: List[str], breadcrumb: str) -> List[str]:
+        """Packs *lines* under the budget, breaking long lines into sentences."""
+        budget = self.max_tokens - self.count_tokens(breadcrumb)
+        pieces: List[str] = []
+        for line in lines:
+            if self.count_tokens(line) <= budget:
+                pieces.append(line)
+                continue
+            words: List[str] = []
+            for sentence in _SENTENCE_END.split(line):
+                for word in sentence.split():
+                    if words and self.count_tokens(" ".join(words + [word])) > budget:
+                        pieces.append(" ".join(words))
+                        words = []
+                    words.append(word)
+                if words and self.count_tokens(" ".join(words)) > budget // 2:
+                    pieces.append(" ".join(words))
+                    words = []
+            if words:
+                pieces.append(" ".join(words))
+
+        texts, current = [], []
+        for piece in pieces:
+            if current and self.count_tokens("\n".join(current + [piece])) > budget:
+                texts.append(current)
+                current = []
+            current.append(piece)
+        if current:
+            texts.append(current)
+        return [breadcrumb + "\n" + "\n".join(t) for t in texts]
+
+    def chunk(self, pages: Iterable[Dict]) -> List[Dict]:
+        """Chunks every page, then drops near-duplicate chunks."""
+        pages = list(pages)
+        boilerplate = self.boilerplate(pages)
+        raw_tokens = sum(self.count_tokens(p["text"]) for p in pages)
+        chunks = [c for page in pages for c in self.chunk_page(page, boilerplate)]
+
+        dropped: Dict[str, str] = {}
+        if self.dedup_threshold is not None:
+            # Compare bodies only; identical breadcrumbs would inflate similarity
+            body = {c["id"]: c["text"].split("\n", 1)[-1] for c in chunks}
+            _, dropped = deduplicate(((c["id"], body[c["id"]]) for c in chunks),
+                                     MinHashLSH(threshold=self.dedup_threshold))
+        kept = [c for c in chunks if c["id"] not in dropped]
+        for chunk in kept:
+            chunk["duplicates"] = [d for d, k in dropped.items() if k == chunk["id"]]
+
+        self.stats = {
+            "pages": len(pages),
+            "boilerplate_lines": len(boilerplate),
+            "chunks": len(chunks),
+            "duplicates_dropped": len(dropped),
+            "kept": len(kept),
+            "page_tokens": raw_tokens,
+            "chunk_tokens": sum(c["tokens"] for c in kept),
+        }
+        return kept
+
+
+def chunk_corpus(corpus_dir: Optional[Path] = None, **kwargs) -> List[Dict]:
+    """Chunks ``pages.parquet`` from an ingested corpus."""
+    from ..file_io.corpus import DEFAULT_OUTPUT_DIR as CORPUS_DIR, iter_pages
+    chunker = Chunker(**kwargs)
+    chunks = chunker.chunk(iter_pages(corpus_dir or CORPUS_DIR,
+                                      columns=["path", "title", "text", "sections", "tables"]))
+    print(f"Chunking: {chunker.stats}")
+    return chunks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chunk the parsed help pages")
+    parser.add_argument("--corpus-dir", type=Path, default=None)
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--dedup-threshold", type=float, default=0.85)
+    args = parser.parse_args(argv)
+
+    chunks = chunk_corpus(args.corpus_dir, max_tokens=args.max_tokens,
+                          dedup_threshold=args.dedup_threshold)
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    with open(args.output_dir / "chunks.jsonl", "w", encoding="utf-8") as fh:
+        for chunk in chunks:
+            fh.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+    print(f"Wrote {len(chunks)} chunks to {args.output_dir / 'chunks.jsonl'}")
+
+
+if __name__ == "__main__":
+    main()
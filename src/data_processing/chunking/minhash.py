@@ -0,0 +1,116 @@
+"""
+minhash.py
+==========
+
+MinHash signatures and banded LSH for near-duplicate detection.
+
+Each text is reduced to its set of word *shingles*.  A signature keeps the
+minimum of ``num_perm`` universal hashes over those shingles, so the share of
+equal positions between two signatures estimates their Jaccard similarity.
+Signatures are split into ``bands`` bands of ``num_perm / bands`` rows, and
+texts that collide in any band are candidates.  Only candidates get their
+estimated similarity checked against the threshold, so deduplication stays
+close to linear in the number of texts.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_MERSENNE = np.uint64((1 << 31) - 1)
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = 3) -> set:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _hash32(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+class MinHashLSH:
+    """
+    Args:
+        num_perm (int): Signature length.
+        bands (int): LSH bands; ``num_perm`` must be divisible by it.
+        threshold (float): Estimated Jaccard similarity at which two texts
+            count as near-duplicates.
+        shingle_size (int): Words per shingle.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, threshold: float = 0.85,
+                 shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_MERSENNE), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE), num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter((_hash32(s) for s in shingles(text, self.shingle_size)), dtype=np.uint64)
+        if not len(hashes):
+            return np.full(self.num_perm, int(_MERSENNE), dtype=np.uint64)
+        hashes %= _MERSENNE
+        # (a * x + b) mod p for every permutation x shingle; a, x < 2^31 so no overflow
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE).min(axis=1)
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> float:
+        return float(np.mean(a == b))
+
+    def query(self, text: str, signature: Optional[np.ndarray] = None) -> Optional[Tuple[str, float]]:
+        """Most similar indexed key at or above the threshold, if any."""
+        signature = self.signature(text) if signature is None else signature
+        candidates = set()
+        for band, buckets in enumerate(self._buckets):
+            candidates.update(buckets.get(self._band_key(signature, band), ()))
+        best = None
+        for key in candidates:
+            score = self.similarity(signature, self._signatures[key])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
+
+    def insert(self, key: str, text: str, signature: Optional[np.ndarray] = None) -> None:
+        signature = self.signature(text) if signature is None else signature
+        self._signatures[key] = signature
+        for band, buckets in enumerate(self._buckets):
+            buckets.setdefault(self._band_key(signature, band), []).append(key)
+
+    def _band_key(self, signature: np.ndarray, band: int) -> bytes:
+        return signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+
+def deduplicate(items: Iterable[Tuple[str, str]], lsh: Optional[MinHashLSH] = None
+                ) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Keeps the first of every group of near-duplicate ``(key, text)`` items.
+
+    Returns:
+        (kept keys, {dropped key: key of the kept near-duplicate})
+    """
+    lsh = lsh or MinHashLSH()
+    kept, dropped = [], {}
+    for key, text in items:
+        signature = lsh.signature(text)
+        match = lsh.query(text, signature)
+        if match:
+            dropped[key] = match[0]
+        else:
+            lsh.insert(key, text, signature)
+            kept.append(key)
+    return kept, dropped
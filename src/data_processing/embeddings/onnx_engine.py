@@ -0,0 +1,312 @@
+"""
+onnx_engine.py
+==============
+
+CPU embedding engine for all-MiniLM-L6-v2 (384-d).  It runs the same model
+as :func:`~.service.sentence_transformer_backend`, exported to ONNX with
+int8-quantised weights, on ONNX Runtime instead of fp32 PyTorch.
+
+* **Export** – :func:`export` traces the transformer once and saves
+  ``model.onnx`` (fp32), ``model.int8.onnx`` (dynamic int8 quantisation)
+  and ``tokenizer.json``.  Export needs ``torch`` and ``transformers``;
+  the runtime only needs ``onnxruntime`` and ``tokenizers``.
+* **Length buckets** – texts are sorted by token count and grouped so each
+  batch pads to about ``batch_tokens`` tokens.  A short question never
+  waits behind a 256-token chunk.  Mean pooling and L2 normalisation
+  match the sentence-transformers pipeline.
+* **Process pool** – :class:`OnnxEmbeddingPool` shards a call across
+  worker processes, one single-threaded session each, so throughput
+  scales with cores.  Each shard holds texts of similar length.  Small
+  calls, such as one query, stay in-process.
+* **Agreement** – :func:`agreement` compares the engine with the
+  reference model by cosine similarity.  ``check`` exits non-zero below
+  ``--min-cosine``.
+
+Select it with ``EMBEDDING_BACKEND=onnx`` (see :class:`~.service.EmbeddingService`);
+its vectors are cached apart from the fp32 ones.
+
+    python -m src.data_processing.embeddings.onnx_engine export
+    python -m src.data_processing.embeddings.onnx_engine check --sample 512
+    python -m src.benchmarks.embedding_throughput
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_ONNX_DIR = PROJECT_ROOT / "Output" / "onnx"
+MAX_SEQ_LENGTH = 256                # all-MiniLM-L6-v2's sentence-transformers limit
+INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+Backend = Callable[[List[str]], np.ndarray]
+
+
+def model_dir(model_name: str = DEFAULT_MODEL, root: Path = DEFAULT_ONNX_DIR) -> Path:
+    return Path(root) / model_name.replace("/", "__")
+
+
+# ───────────────────────────── export ─────────────────────────────────────
+def export(model_name: str = DEFAULT_MODEL, directory: Optional[Path] = None, opset: int = 14) -> Path:
+    """Writes the fp32 and int8 ONNX models plus ``tokenizer.json`` to *directory*."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    directory = Path(directory or model_dir(model_name))
+    directory.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(directory)                    # tokenizer.json for the runtime
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    class Encoder(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids, return_dict=False)[0]
+
+    sample = tokenizer(["an example sentence to trace"], return_tensors="pt")
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in INPUTS}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(Encoder(model), tuple(sample[name] for name in INPUTS), str(directory / "model.onnx"),
+                          input_names=list(INPUTS), output_names=["last_hidden_state"],
+                          dynamic_axes=dynamic, opset_version=opset)
+    quantize_dynamic(str(directory / "model.onnx"), str(directory / "model.int8.onnx"), weight_type=QuantType.QInt8)
+    (directory / "meta.json").write_text(json.dumps({
+        "model": model_name, "dim": model.config.hidden_size, "max_seq_length": MAX_SEQ_LENGTH}), encoding="utf-8")
+    return directory
+
+
+# ───────────────────────────── batching ───────────────────────────────────
+def length_buckets(lengths: Sequence[int], batch_tokens: int = 8192, max_batch: int = 256) -> List[np.ndarray]:
+    """
+    Indices grouped into batches of similar length, so that a batch padded
+    to its longest member holds at most ``batch_tokens`` tokens.
+    """
+    order = np.argsort(np.asarray(lengths), kind="stable")
+    batches, current = [], []
+    for i in order:
+        # Ascending order: the newest member sets the padded width
+        if current and ((len(current) + 1) * lengths[i] > batch_tokens or len(current) == max_batch):
+            batches.append(np.array(current))
+            current = []
+        current.append(int(i))
+    if current:
+        batches.append(np.array(current))
+    return batches
+
+
+def length_shards(texts: Sequence[str], shards: int) -> List[np.ndarray]:
+    """Indices split into *shards* contiguous runs of the texts sorted by length."""
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    return [s for s in np.array_split(order, min(shards, len(texts))) if len(s)]
+
+
+def mean_pool(hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Masked mean over tokens, L2-normalised (sentence-transformers' Pooling + Normalize)."""
+    weights = mask[..., None].astype(np.float32)
+    pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+    return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+
+# ───────────────────────────── runtime ────────────────────────────────────
+class OnnxEncoder:
+    """
+    One ONNX Runtime session plus tokenizer.
+
+    Args:
+        directory (Path): Output of :func:`export`.
+        threads (int): Intra-op threads; 1 inside a worker pool.
+        quantized (bool): Run ``model.int8.onnx`` rather than ``model.onnx``.
+        batch_tokens (int): Padded tokens per batch (see :func:`length_buckets`).
+    """
+
+    def __init__(self, directory: Path, threads: int = 1, quantized: bool = True, batch_tokens: int = 8192):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        directory = Path(directory)
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        self.dim = meta["dim"]
+        self.batch_tokens = batch_tokens
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(directory / ("model.int8.onnx" if quantized else "model.onnx")),
+                                            options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(str(directory / "tokenizer.json"))
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length=meta.get("max_seq_length", MAX_SEQ_LENGTH))
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        if not texts:
+            return out
+        encodings = self.tokenizer.encode_batch(list(texts))
+        lengths = [len(e.ids) for e in encodings]
+        for batch in length_buckets(lengths, self.batch_tokens):
+            width = max(lengths[i] for i in batch)
+            feeds = {name: np.zeros((len(batch), width), dtype=np.int64) for name in INPUTS}
+            for row, i in enumerate(batch):
+                e = encodings[i]
+                feeds["input_ids"][row, :lengths[i]] = e.ids
+                feeds["attention_mask"][row, :lengths[i]] = e.attention_mask
+                feeds["token_type_ids"][row, :lengths[i]] = e.type_ids
+            hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self._inputs})[0]
+            out[batch] = mean_pool(hidden, feeds["attention_mask"])
+        return out
+
+
+_WORKER: Optional[OnnxEncoder] = None
+
+
+def _init_worker(directory: str, threads: int, quantized: bool, batch_tokens: int) -> None:
+    global _WORKER
+    _WORKER = OnnxEncoder(Path(directory), threads, quantized, batch_tokens)
+
+
+def _encode_shard(texts: List[str]) -> np.ndarray:
+    return _WORKER.encode(texts)
+
+
+class OnnxEmbeddingPool:
+    """
+    :class:`OnnxEncoder` sharded across worker processes.
+
+    Args:
+        directory (Path): Output of :func:`export`.
+        workers (int | None): Processes (default: CPU count).
+        threads_per_worker (int): Intra-op threads per process.
+        min_parallel (int): Calls with fewer texts run in-process.
+        quantized (bool): int8 (default) or the fp32 export.
+        batch_tokens (int): Padded tokens per batch.
+    """
+
+    def __init__(self, directory: Path, workers: Optional[int] = None, threads_per_worker: int = 1,
+                 min_parallel: int = 64, quantized: bool = True, batch_tokens: int = 8192):
+        self.directory = Path(directory)
+        self.workers = workers or os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker
+        self.min_parallel = min_parallel
+        self.quantized = quantized
+        self.batch_tokens = batch_tokens
+        self._local: Optional[OnnxEncoder] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _encoder(self) -> OnnxEncoder:
+        if self._local is None:
+            self._local = OnnxEncoder(self.directory, self.threads_per_worker, self.quantized, self.batch_tokens)
+        return self._local
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: ONNX Runtime's thread pools do not survive fork
+            self._pool = ProcessPoolExecutor(
+                self.workers, mp_context=get_context("spawn"), initializer=_init_worker,
+                initargs=(str(self.directory), self.threads_per_worker, self.quantized, self.batch_tokens))
+        return self._pool
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        if self.workers == 1 or len(texts) < self.min_parallel:
+            return self._encoder().encode(texts)
+        # A few shards per worker keeps them all busy when lengths are skewed
+        shards = length_shards(texts, self.workers * 4)
+        vectors = self._executor().map(_encode_shard, [[texts[i] for i in shard] for shard in shards])
+        out = None
+        for shard, block in zip(shards, vectors):
+            if out is None:
+                out = np.empty((len(texts), block.shape[1]), dtype=np.float32)
+            out[shard] = block
+        return out
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def onnx_backend(model_name: str = DEFAULT_MODEL, directory: Optional[Path] = None,
+                 workers: Optional[int] = None) -> Backend:
+    """Exports the model on first use if needed, then starts the pool; nothing happens on construction."""
+    pool = None
+
+    def encode(texts: List[str]) -> np.ndarray:
+        nonlocal pool
+        if pool is None:
+            path = Path(directory or model_dir(model_name))
+            if not (path / "model.int8.onnx").exists():
+                export(model_name, path)
+            pool = OnnxEmbeddingPool(path, workers or int(os.getenv("EMBEDDING_WORKERS", "0")) or None)
+        return pool(texts)
+
+    return encode
+
+
+# ───────────────────────────── agreement ──────────────────────────────────
+def agreement(reference: Backend, candidate: Backend, texts: List[str]) -> Dict[str, float]:
+    """Cosine similarity between the two backends' vectors for the same texts."""
+    a, b = np.asarray(reference(texts), dtype=np.float32), np.asarray(candidate(texts), dtype=np.float32)
+    a /= np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b /= np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    cosine = (a * b).sum(axis=1)
+    return {"texts": len(texts), "min": float(cosine.min()), "p01": float(np.percentile(cosine, 1)),
+            "mean": float(cosine.mean())}
+
+
+def sample_texts(limit: int, seed: int = 0) -> List[str]:
+    """Page chunks of the ingested corpus (``python -m src.data_processing.file_io.corpus``)."""
+    from ..chunking.chunker import chunk_corpus
+    texts = [c["text"] for c in chunk_corpus()]
+    rng = np.random.default_rng(seed)
+    return [texts[i] for i in sorted(rng.choice(len(texts), size=min(limit, len(texts)), replace=False))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ONNX/int8 MiniLM embedding engine")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--dir", type=Path, default=None)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("export", help="export and quantise the model")
+    check = sub.add_parser("check", help="cosine agreement with the sentence-transformers model")
+    check.add_argument("--sample", type=int, default=512)
+    check.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args(argv)
+
+    directory = Path(args.dir or model_dir(args.model))
+    if args.command == "export":
+        export(args.model, directory)
+        sizes = {p.name: f"{p.stat().st_size / 2 ** 20:.1f} MiB" for p in sorted(directory.glob("*.onnx"))}
+        print(f"Exported {args.model} -> {directory} {sizes}")
+        return
+
+    from .service import sentence_transformer_backend
+    texts = sample_texts(args.sample)
+    pool = OnnxEmbeddingPool(directory)
+    try:
+        result = agreement(sentence_transformer_backend(args.model), pool, texts)
+    finally:
+        pool.close()
+    print(json.dumps(result, indent=1))
+    if result["min"] < args.min_cosine:
+        print(f"FAIL: min cosine {result['min']:.4f} < {args.min_cosine}")
+        sys.exit(1)
+    print(f"OK: min cosine {result['min']:.4f} >= {args.min_cosine}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+service.py
+==========
+
+Content-addressed embedding service shared by the FAISS builder and the QA
+bot's vector tools.
+
+Vectors live in an append-only float32 matrix per model (``vectors.f32``,
+read back through ``numpy.memmap``) next to ``keys.txt``, whose *n*-th line is
+the hash of the normalised text stored in row *n*.  Only cache misses reach
+the model, in large batches, so re-indexing an unchanged corpus performs no
+forward passes at all.
+
+``EMBEDDING_BACKEND=onnx`` swaps the fp32 SentenceTransformer for the
+int8 ONNX engine in :mod:`.onnx_engine`, which runs on a process pool
+sized by ``EMBEDDING_WORKERS`` (default: CPU count).  Its vectors go to a
+separate cache.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_CACHE_DIR = PROJECT_ROOT / "Output" / "embedding_cache"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")      # or "onnx"
+
+Backend = Callable[[List[str]], np.ndarray]
+
+
+def normalize_text(text: str) -> str:
+    """NFKC-normalises and collapses whitespace so trivial edits share a key."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def text_key(text: str) -> str:
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _model_slug(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+
+
+class EmbeddingCache:
+    """
+    Append-only on-disk vector store for a single model.
+
+    Args:
+        directory (Path): Folder holding ``vectors.f32``, ``keys.txt`` and
+            ``meta.json``; created on first write.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    @property
+    def _keys_path(self) -> Path:
+        return self.directory / "keys.txt"
+
+    def _load(self) -> None:
+        meta = self.directory / "meta.json"
+        if not meta.exists():
+            return
+        self.dim = json.loads(meta.read_text(encoding="utf-8"))["dim"]
+        text = self._keys_path.read_text(encoding="utf-8") if self._keys_path.exists() else ""
+        keys = text.split("\n")[:-1]                   # a key without its newline is torn
+        # Vectors are flushed before keys, so a torn write leaves trailing
+        # rows (the last maybe partial) that no key refers to.  Cut both
+        # files back to the rows with keys before anything is appended.
+        stored = self._vectors_path.stat().st_size // (4 * self.dim) if self._vectors_path.exists() else 0
+        keys = keys[:stored]
+        if self._vectors_path.exists() and self._vectors_path.stat().st_size != len(keys) * 4 * self.dim:
+            with self._vectors_path.open("r+b") as fh:
+                fh.truncate(len(keys) * 4 * self.dim)
+        if len(text) != sum(len(k) + 1 for k in keys):
+            self._keys_path.write_text("".join(f"{k}\n" for k in keys), encoding="utf-8")
+        self._rows = {key: row for row, key in enumerate(keys)}
+        self._matrix = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def matrix(self) -> np.ndarray:
+        """Memory-mapped view of every cached vector (rows in insertion order)."""
+        if self._matrix is None or self._matrix.shape[0] != len(self._rows):
+            if not self._rows:
+                return np.empty((0, self.dim or 0), dtype=np.float32)
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r",
+                                     shape=(len(self._rows), self.dim))
+        return self._matrix
+
+    def get(self, keys: Sequence[str]) -> np.ndarray:
+        rows = [self._rows[k] for k in keys]
+        return np.asarray(self.matrix()[rows])
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self.directory.mkdir(parents=True, exist_ok=True)
+                (self.directory / "meta.json").write_text(json.dumps({"dim": self.dim}), encoding="utf-8")
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-d vectors, got {vectors.shape[1]}-d")
+
+            fresh = [(k, v) for k, v in zip(keys, vectors) if k not in self._rows]
+            if not fresh:
+                return
+            with self._vectors_path.open("ab") as fh:
+                fh.write(np.stack([v for _, v in fresh]).tobytes())
+            with self._keys_path.open("a", encoding="utf-8") as fh:
+                fh.write("".join(f"{k}\n" for k, _ in fresh))
+            for key, _ in fresh:
+                self._rows[key] = len(self._rows)
+
+
+def sentence_transformer_backend(model_name: str) -> Backend:
+    """Loads the SentenceTransformer on first use, not on construction."""
+    model = None
+
+    def encode(texts: List[str]) -> np.ndarray:
+        nonlocal model
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)
+        return model.encode(texts, batch_size=64, convert_to_numpy=True)
+
+    return encode
+
+
+class EmbeddingService:
+    """
+    Embeds text through an :class:`EmbeddingCache`, calling the model only
+    for texts it has never seen.
+
+    Args:
+        model_name (str): Model identifier; also namespaces the cache.
+        cache_dir (Path): Root of the on-disk cache.
+        batch_size (int): Texts per model call.
+        backend (callable | None): ``texts -> (n, dim) array``; defaults to
+            a lazily loaded SentenceTransformer for *model_name*, or the
+            ONNX engine under ``EMBEDDING_BACKEND=onnx``.
+        variant (str | None): Cache namespace for vectors of a different
+            runtime of the same model (``"onnx-int8"`` for the ONNX engine).
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, cache_dir: Path = DEFAULT_CACHE_DIR,
+                 batch_size: int = 512, backend: Optional[Backend] = None, variant: Optional[str] = None):
+        if backend is None and EMBEDDING_BACKEND == "onnx":
+            from .onnx_engine import onnx_backend
+            backend, variant = onnx_backend(model_name), variant or "onnx-int8"
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.backend = backend or sentence_transformer_backend(model_name)
+        slug = _model_slug(model_name) + (f"@{_model_slug(variant)}" if variant else "")
+        self.cache = EmbeddingCache(Path(cache_dir) / slug)
+        self.hits = 0
+        self.misses = 0
+        self.forward_passes = 0
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self.cache.dim
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Returns an ``(len(texts), dim)`` float32 matrix."""
+        keys = [text_key(t) for t in texts]
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in self.cache or key in missing:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing[key] = text
+
+        pending = list(missing.items())
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            vectors = self.backend([normalize_text(text) for _, text in batch])
+            self.forward_passes += 1
+            self.cache.add([key for key, _ in batch], np.asarray(vectors))
+
+        if not keys:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self.cache.get(keys)
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "forward_passes": self.forward_passes,
+            "cached_vectors": len(self.cache),
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain ``Embeddings`` adapter over :class:`EmbeddingService`."""
+
+    def __init__(self, service: Optional[EmbeddingService] = None):
+        self.service = service or EmbeddingService()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.service.embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.service.embed_one(text).tolist()
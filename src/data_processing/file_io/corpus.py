@@ -0,0 +1,289 @@
+"""
+corpus.py
+=========
+
+Incremental ingestion of the whole GEO Help Guide under ``Data/``.
+
+Every topic page is discovered, hashed, and (only if its content changed since
+the last run) parsed across a process pool.  The result is a single Parquet
+file with one row per page holding its title, plain text, heading sections,
+content tables and outgoing links.  A JSON manifest of content hashes lets a
+re-run skip every unchanged page.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .loaders import make_soup
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_DATA_DIR = PROJECT_ROOT / "Data"
+DEFAULT_OUTPUT_DIR = PROJECT_ROOT / "Output" / "corpus"
+
+# Bump when the extracted columns change so stale intermediates are rebuilt.
+SCHEMA_VERSION = 1
+
+# RoboHelp skin, search data and assets – not topic pages.
+EXCLUDED_DIRS = {"template", "whxdata", "assets"}
+
+# Navigation chrome repeated on every RoboHelp page.
+NAV_TABLE_CLASSES = {"Table_Style_Back_Forward"}
+NAV_CONTAINER_CLASSES = {"topic-header", "topic-header-shadow"}
+
+PAGE_SCHEMA = pa.schema([
+    ("path", pa.string()),
+    ("sha256", pa.string()),
+    ("title", pa.string()),
+    ("text", pa.string()),
+    ("sections", pa.list_(pa.struct([
+        ("level", pa.int8()),
+        ("heading", pa.string()),
+        ("text", pa.string()),
+    ]))),
+    ("tables", pa.list_(pa.struct([
+        ("css_class", pa.string()),
+        ("rows", pa.list_(pa.list_(pa.string()))),
+    ]))),
+    ("links", pa.list_(pa.struct([
+        ("href", pa.string()),
+        ("text", pa.string()),
+    ]))),
+])
+
+_HEADINGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+
+# ───────────────────────────── discovery ──────────────────────────────────
+def discover_pages(data_dir: Path = DEFAULT_DATA_DIR) -> List[Path]:
+    """
+    Lists every ``.htm`` topic page below *data_dir*, skipping the RoboHelp
+    skin, search data and asset folders.
+
+    Args:
+        data_dir (Path): Root of the exported help guide.
+
+    Returns:
+        list[Path]: Page paths, sorted for deterministic output.
+    """
+    data_dir = Path(data_dir)
+    pages = []
+    for root, dirs, files in os.walk(data_dir):
+        if Path(root) == data_dir:
+            dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS]
+        pages.extend(Path(root) / f for f in files if f.lower().endswith(".htm"))
+    return sorted(pages)
+
+
+def content_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+# ───────────────────────────── parsing ────────────────────────────────────
+def _clean(text: str) -> str:
+    return " ".join(text.split())
+
+
+def parse_page(html_content, rel_path: str = "", sha256: str = "") -> Dict:
+    """
+    Extracts title, text, sections, tables and links from one topic page.
+
+    Args:
+        html_content (str | bytes): Raw page content.
+        rel_path (str): Page path relative to the data directory.
+        sha256 (str): Content hash recorded alongside the row.
+
+    Returns:
+        dict: One row matching :data:`PAGE_SCHEMA`.
+    """
+    soup = make_soup(html_content)
+    title = _clean(soup.title.get_text()) if soup.title else ""
+
+    for tag in soup(["script", "style", "noscript"]):
+        tag.decompose()
+    for tag in soup.find_all(class_=lambda c: c in NAV_CONTAINER_CLASSES):
+        tag.decompose()
+    for tag in soup.find_all("table", class_=lambda c: c in NAV_TABLE_CLASSES):
+        tag.decompose()
+
+    body = soup.body or soup
+
+    tables = []
+    for table in body.find_all("table"):
+        rows = []
+        for tr in table.find_all("tr"):
+            cells = [_clean(td.get_text(" ")) for td in tr.find_all(["td", "th"])]
+            if any(cells):
+                rows.append(cells)
+        if rows:
+            css_class = " ".join(table.get("class") or [])
+            tables.append({"css_class": css_class, "rows": rows})
+
+    links = []
+    for a in body.find_all("a", href=True):
+        href = a["href"].strip()
+        if not href or href.startswith(("javascript:", "#")):
+            continue
+        links.append({"href": href, "text": _clean(a.get_text(" "))})
+
+    # Sections run from one heading to the next; text before the first
+    # heading belongs to an untitled level-0 section.
+    sections = []
+    current = {"level": 0, "heading": "", "parts": []}
+    for element in body.find_all(list(_HEADINGS) + ["p", "li", "td", "th", "pre"]):
+        if element.name in _HEADINGS:
+            sections.append(current)
+            current = {
+                "level": int(element.name[1]),
+                "heading": _clean(element.get_text(" ")),
+                "parts": [],
+            }
+        elif element.find(["p", "li", "td", "th"]) is None:
+            text = _clean(element.get_text(" "))
+            if text:
+                current["parts"].append(text)
+    sections.append(current)
+    sections = [
+        {"level": s["level"], "heading": s["heading"], "text": "\n".join(s["parts"])}
+        for s in sections
+        if s["heading"] or s["parts"]
+    ]
+
+    return {
+        "path": rel_path,
+        "sha256": sha256,
+        "title": title,
+        "text": _clean(body.get_text(" ")),
+        "sections": sections,
+        "tables": tables,
+        "links": links,
+    }
+
+
+def _parse_file(args) -> Dict:
+    """Process-pool entry point: ``(abs_path, rel_path, sha256) -> row``."""
+    abs_path, rel_path, sha256 = args
+    with open(abs_path, "rb") as fh:
+        return parse_page(fh.read(), rel_path, sha256)
+
+
+# ───────────────────────────── manifest ───────────────────────────────────
+def _load_manifest(path: Path) -> Dict[str, str]:
+    if not path.exists():
+        return {}
+    with path.open(encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    if manifest.get("schema_version") != SCHEMA_VERSION:
+        return {}
+    return manifest.get("pages", {})
+
+
+def _save_manifest(path: Path, pages: Dict[str, str]) -> None:
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as fh:
+        json.dump({"schema_version": SCHEMA_VERSION, "pages": pages}, fh, indent=1, sort_keys=True)
+    tmp.replace(path)
+
+
+# ───────────────────────────── pipeline ───────────────────────────────────
+def _parse_all(jobs: List[tuple], workers: Optional[int]) -> List[Dict]:
+    # A pool costs more than it saves for a handful of edited pages.
+    if workers == 1 or len(jobs) < 8:
+        return [_parse_file(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+        return list(pool.map(_parse_file, jobs, chunksize=chunksize))
+
+
+def ingest_corpus(
+    data_dir: Path = DEFAULT_DATA_DIR,
+    output_dir: Path = DEFAULT_OUTPUT_DIR,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> Dict[str, int]:
+    """
+    Parses every changed page under *data_dir* into ``pages.parquet``.
+
+    Pages whose SHA-256 matches ``manifest.json`` are carried over from the
+    previous Parquet file untouched; deleted pages are dropped.
+
+    Args:
+        data_dir (Path): Root of the exported help guide.
+        output_dir (Path): Where ``pages.parquet`` and ``manifest.json`` live.
+        workers (int | None): Process-pool size (default: CPU count).
+        force (bool): Ignore the manifest and re-parse everything.
+
+    Returns:
+        dict: Counts of ``total``, ``parsed``, ``unchanged`` and ``removed`` pages.
+    """
+    data_dir, output_dir = Path(data_dir), Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    parquet_path = output_dir / "pages.parquet"
+    manifest_path = output_dir / "manifest.json"
+
+    previous = {} if force or not parquet_path.exists() else _load_manifest(manifest_path)
+
+    current: Dict[str, str] = {}
+    jobs = []
+    for page in discover_pages(data_dir):
+        rel_path = page.relative_to(data_dir).as_posix()
+        sha256 = content_hash(page.read_bytes())
+        current[rel_path] = sha256
+        if previous.get(rel_path) != sha256:
+            jobs.append((str(page), rel_path, sha256))
+
+    kept = [p for p in current if p in previous and previous[p] == current[p]]
+    removed = [p for p in previous if p not in current]
+
+    if not jobs and not removed and parquet_path.exists():
+        return {"total": len(current), "parsed": 0, "unchanged": len(kept), "removed": 0}
+
+    rows = _parse_all(jobs, workers)
+    table = pa.Table.from_pylist(rows, schema=PAGE_SCHEMA)
+    if kept:
+        old = pq.read_table(parquet_path, schema=PAGE_SCHEMA)
+        old = old.filter(pc.is_in(old["path"], value_set=pa.array(kept)))
+        table = pa.concat_tables([old, table])
+    table = table.sort_by("path")
+
+    tmp = parquet_path.with_suffix(".tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    tmp.replace(parquet_path)
+    _save_manifest(manifest_path, current)
+
+    return {"total": len(current), "parsed": len(jobs), "unchanged": len(kept), "removed": len(removed)}
+
+
+def iter_pages(output_dir: Path = DEFAULT_OUTPUT_DIR, columns: Optional[Iterable[str]] = None):
+    """Yields page rows from ``pages.parquet`` one record batch at a time."""
+    parquet_file = pq.ParquetFile(Path(output_dir) / "pages.parquet")
+    for batch in parquet_file.iter_batches(columns=list(columns) if columns else None):
+        yield from batch.to_pylist()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse the GEO Help Guide into pages.parquet")
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR)
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="re-parse every page")
+    args = parser.parse_args(argv)
+
+    stats = ingest_corpus(args.data_dir, args.output_dir, args.workers, args.force)
+    print(
+        f"{stats['total']} pages: {stats['parsed']} parsed, "
+        f"{stats['unchanged']} unchanged, {stats['removed']} removed"
+    )
+
+
+if __name__ == "__main__":
+    main()
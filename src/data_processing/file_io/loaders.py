@@ -1,7 +1,28 @@
 # load_filetypes.py
 
+import warnings
+
 import pandas as pd
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, FeatureNotFound, XMLParsedAsHTMLWarning
+
+# RoboHelp pages open with an <?xml?> prolog but are plain HTML.
+warnings.filterwarnings('ignore', category=XMLParsedAsHTMLWarning)
+
+def make_soup(html_content):
+    """
+    Parses HTML with the lxml backend, falling back to the pure-Python
+    ``html.parser`` when lxml is not installed.
+
+    Args:
+        html_content (str | bytes): Raw page content.
+
+    Returns:
+        bs4.BeautifulSoup: The parsed document.
+    """
+    try:
+        return BeautifulSoup(html_content, 'lxml')
+    except FeatureNotFound:
+        return BeautifulSoup(html_content, 'html.parser')
 
 def extract_geo_file_types(htm_file_path):
     """
@@ -18,7 +39,7 @@ def extract_geo_file_types(htm_file_path):
         html_content = file.read()
     
     # Parse the HTML using BeautifulSoup
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = make_soup(html_content)
     
     # Find the main table (it has class "Table_Style_1")
     table = soup.find('table', {'class': 'Table_Style_1'})
@@ -1,33 +1,31 @@
 import os
 import json
-import faiss
+from functools import lru_cache
+
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
-from neo4j import GraphDatabase
-from langchain_ollama import ChatOllama
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-import ipywidgets as widgets
-from IPython.display import display, clear_output
 
-# --- Load Cypher Instructions ---
-cypher_file_path = os.path.join('..', '..', '..', 'cypher', 'filetypes', 'filetypes.cypher')
-if not os.path.exists(cypher_file_path):
-    raise FileNotFoundError(f"Cypher file not found at: {cypher_file_path}")
-with open(cypher_file_path, 'r') as file:
-    cypher_content = file.read()
-instructions = [instruction.strip() for instruction in cypher_content.split(';') if instruction.strip()]
+from ..chunking.chunker import chunk_corpus
+from ..embeddings.service import EmbeddingService
+from .vector_store import VectorStore
+
+# Paths are resolved from this file so the module works from any cwd
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+INDEX_DIR = os.path.join(PROJECT_ROOT, 'Output', 'faiss', 'filetypes')
+PAGES_INDEX_DIR = os.path.join(PROJECT_ROOT, 'Output', 'faiss', 'pages')
+
+# Nothing below runs at import time: the setup script, embedder, vector
+# store and LLM are built on first use (or by main()).
 
 # --- Load Environment Variables ---
-project_root = os.path.join('..', '..', '..', '.env')
-load_dotenv(project_root)
-NEO4J_URI = os.getenv("NEO4J_URI")
-NEO4J_USER = os.getenv("NEO4J_USERNAME")
-NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+load_dotenv(os.path.join(PROJECT_ROOT, '.env'))
+
 
 # --- Neo4j Connection ---
 class Neo4jConnector:
     def __init__(self, uri, user, password):
+        from neo4j import GraphDatabase
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
     def close(self):
         self.driver.close()
@@ -36,61 +34,95 @@ class Neo4jConnector:
             result = session.run(query, **kwargs)
             return list(result)
 
-neo4j_conn = Neo4jConnector(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+
+# --- Load Cypher Instructions ---
+def load_instructions():
+    cypher_file_path = os.path.join(PROJECT_ROOT, 'cypher', 'filetypes', 'filetypes.cypher')
+    if not os.path.exists(cypher_file_path):
+        raise FileNotFoundError(f"Cypher file not found at: {cypher_file_path}")
+    with open(cypher_file_path, 'r') as file:
+        cypher_content = file.read()
+    return [instruction.strip() for instruction in cypher_content.split(';') if instruction.strip()]
+
 
 # --- Execute Cypher Instructions ---
-for i, instruction in enumerate(instructions, 1):
+def run_setup():
+    instructions = load_instructions()
+    neo4j_conn = Neo4jConnector(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
     try:
-        print(f"\nExecuting instruction {i}/{len(instructions)}: {instruction[:50]}...")
-        results = neo4j_conn.run_query(instruction)
-        if results:
-            print(f"Results from instruction {i}:")
-            for record in results:
-                print(record)
-        else:
-            print(f"Instruction {i} executed successfully (no results returned)")
-    except Exception as e:
-        print(f"Error executing instruction {i}: {str(e)}")
-        continue
-
-neo4j_conn.close()
-
-# --- Load JSON Data ---
-json_file_path = os.path.join('..', '..', '..', 'Training_Info', 'filetypes.json')
-with open(json_file_path, 'r') as f:
-    filetypes = json.load(f)
-
-# --- Create Chunks ---
-chunks = []
-chunk_id_to_info = {}
-for idx, ftype in enumerate(filetypes):
-    chunk_text = f"""
+        for i, instruction in enumerate(instructions, 1):
+            try:
+                print(f"\nExecuting instruction {i}/{len(instructions)}: {instruction[:50]}...")
+                results = neo4j_conn.run_query(instruction)
+                if results:
+                    print(f"Results from instruction {i}:")
+                    for record in results:
+                        print(record)
+                else:
+                    print(f"Instruction {i} executed successfully (no results returned)")
+            except Exception as e:
+                print(f"Error executing instruction {i}: {str(e)}")
+                continue
+    finally:
+        neo4j_conn.close()
+
+
+# --- Load JSON Data & Create Chunks ---
+def build_chunks():
+    json_file_path = os.path.join(PROJECT_ROOT, 'Training_Info', 'filetypes.json')
+    with open(json_file_path, 'r') as f:
+        filetypes = json.load(f)
+
+    chunk_records = {}
+    for ftype in filetypes:
+        chunk_text = f"""
 Name: {ftype['name']}
 Extension(s): {ftype['extension']}
 Description: {ftype['description']}
 Loadable in GEO: {ftype['load']}
 Exportable from GEO: {ftype['export']}
 """
-    chunks.append(chunk_text)
-    chunk_id_to_info[idx] = chunk_text
+        chunk_records[f"filetype:{ftype['name']}"] = {"text": chunk_text}
+    return chunk_records
 
-for idx, chunk in enumerate(chunks):
-    print(f"Chunk {idx}:\n{chunk}\n{'-'*50}")
 
 # --- Embedding and Vector Index ---
-embedder = SentenceTransformer('all-MiniLM-L6-v2')
-embeddings = embedder.encode(chunks, convert_to_numpy=True)
-dimension = embeddings.shape[1]
-index = faiss.IndexFlatL2(dimension)
-index.add(embeddings)
+@lru_cache(maxsize=1)
+def get_embedder():
+    # Only chunks missing from the on-disk cache reach the model
+    return EmbeddingService()
 
-# --- RAG Setup ---
-llm_model = ChatOllama(model="llama3.2:1b", temperature=0, num_predict=150)
 
+@lru_cache(maxsize=1)
+def get_store():
+    store = VectorStore.load_or_create(INDEX_DIR, dim=384)
+    sync_stats = store.sync(build_chunks(), get_embedder().embed)
+    if sync_stats["upserted"] or sync_stats["deleted"]:
+        store.save(INDEX_DIR)
+    print(f"Vector store: {sync_stats}, embedding cache: {get_embedder().stats()}")
+    return store
+
+
+def build_page_chunks():
+    # Help pages split by heading/table, boilerplate stripped and
+    # near-duplicates dropped before anything is embedded
+    return {chunk["id"]: chunk for chunk in chunk_corpus()}
+
+
+@lru_cache(maxsize=1)
+def get_page_store():
+    store = VectorStore.load_or_create(PAGES_INDEX_DIR, dim=384)
+    sync_stats = store.sync(build_page_chunks(), get_embedder().embed)
+    if sync_stats["upserted"] or sync_stats["deleted"]:
+        store.save(PAGES_INDEX_DIR)
+    print(f"Page store: {sync_stats}, embedding cache: {get_embedder().stats()}")
+    return store
+
+
+# --- RAG Setup ---
 def retriever(question, k=3):
-    query_vec = embedder.encode([question], convert_to_numpy=True)
-    D, I = index.search(query_vec, k)
-    top_chunks = [chunk_id_to_info[i] for i in I[0]]
+    query_vec = get_embedder().embed([question])
+    top_chunks = [meta["text"] for meta, _ in get_store().search(query_vec, k)[0]]
     print("\n[Top Retrieved Chunks]:")
     for i, chunk in enumerate(top_chunks, 1):
         print(f"\nChunk {i}:\n{chunk}\n" + "-"*40)
@@ -105,7 +137,7 @@ def format_context(top_chunks):
 
 template = """You are a geoscience file format expert. The user will ask about file types used in GEO. Each chunk below contains information in structured format with fields like 'Name', 'Extension', 'Description', 'Loadable in GEO', and 'Exportable from GEO'.
 
-Use ONLY the following context to answer the question. Do NOT use external knowledge. 
+Use ONLY the following context to answer the question. Do NOT use external knowledge.
 
 Context:
 {context}
@@ -114,46 +146,87 @@ Question: {question}
 """
 prompt = ChatPromptTemplate.from_template(template)
 
-rag_chain = (
-    {"context": lambda x: format_context(retriever(x["question"])), "question": lambda x: x["question"]}
-    | prompt
-    | llm_model
-    | StrOutputParser()
-)
+
+@lru_cache(maxsize=1)
+def get_rag_llm():
+    from ...qa_bot.core.llm_gateway import GatewayChatModel
+    return GatewayChatModel(backend="ollama", model="llama3.2:1b", temperature=0, max_tokens=150)
+
+
+def build_rag_chain(llm, retrieve=retriever):
+    """The RAG chain over any chat model and ``question -> chunks`` retriever."""
+    return (
+        {"context": lambda x: format_context(retrieve(x["question"])), "question": lambda x: x["question"]}
+        | prompt
+        | llm
+        | StrOutputParser()
+    )
+
+
+def rag_retriever():
+    """:func:`retriever`, behind the process-wide cassette when there is one."""
+    from ...qa_bot.core.cassette import cassette_retrieve, get_cassette
+    cassette = get_cassette()
+    if cassette is None:
+        return retriever
+    # Replay needs neither the FAISS store nor the embedding model
+    return cassette_retrieve(cassette, None if cassette.replaying else retriever)
+
+
+@lru_cache(maxsize=1)
+def get_rag_chain():
+    return build_rag_chain(get_rag_llm(), rag_retriever())
 
 def answer_question(question, k=3):
-    response = rag_chain.invoke({"question": question})
+    response = get_rag_chain().invoke({"question": question})
     return response
 
+
 # --- Interactive UI ---
-input_box = widgets.Text(
-    placeholder='Ask about file formats used in GEO...',
-    description='Question:',
-    layout=widgets.Layout(width='90%')
-)
-output_area = widgets.Output()
-submit_button = widgets.Button(description="Submit", button_style='primary')
-
-def on_submit_button_clicked(b):
-    question = input_box.value.strip()
-    if not question:
+def show_ui():
+    import ipywidgets as widgets
+    from IPython.display import display, clear_output
+
+    input_box = widgets.Text(
+        placeholder='Ask about file formats used in GEO...',
+        description='Question:',
+        layout=widgets.Layout(width='90%')
+    )
+    output_area = widgets.Output()
+    submit_button = widgets.Button(description="Submit", button_style='primary')
+
+    def on_submit_button_clicked(b):
+        question = input_box.value.strip()
+        if not question:
+            with output_area:
+                clear_output()
+                print("Please enter a question.")
+            return
         with output_area:
             clear_output()
-            print("Please enter a question.")
-        return
-    with output_area:
-        clear_output()
-        try:
-            print("Answering your question...")
-            response = answer_question(question)
-            print("\nAnswer:\n", response)
-        except Exception as e:
-            print(f"An error occurred: {e}")
-
-submit_button.on_click(on_submit_button_clicked)
-display(widgets.VBox([input_box, submit_button, output_area]))
-
-# --- Examples ---
-print(answer_question("What is a VIEW file?"))
-print(answer_question("What is a GEO Graph Database?"))
-print(answer_question("What is a GeoGraph Database file?"))
\ No newline at end of file
+            try:
+                print("Answering your question...")
+                response = answer_question(question)
+                print("\nAnswer:\n", response)
+            except Exception as e:
+                print(f"An error occurred: {e}")
+
+    submit_button.on_click(on_submit_button_clicked)
+    display(widgets.VBox([input_box, submit_button, output_area]))
+
+
+def main():
+    run_setup()
+    for idx, (chunk_id, chunk) in enumerate(build_chunks().items()):
+        print(f"Chunk {idx} ({chunk_id}):\n{chunk['text']}\n{'-'*50}")
+    get_store()
+    show_ui()
+
+    # --- Examples ---
+    print(answer_question("What is a VIEW file?"))
+    print(answer_question("What is a GEO Graph Database?"))
+    print(answer_question("What is a GeoGraph Database file?"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+extraction.py
+=============
+
+LLM extraction of typed entities and relationships from the parsed help
+pages (``Output/corpus/pages.parquet``) into bulk-loadable records.
+
+* Each page (split into parts of at most ``max_chars``) becomes one JSON
+  prompt that lists the labels, properties and relationship patterns of the
+  live schema (:class:`~src.qa_bot.core.kg_schema.SchemaService`).
+* Outputs are cached by the SHA-256 of model + prompt, so an unchanged
+  page under an unchanged schema is never sent again.  The cache is an
+  append-only ``cache.jsonl``, and only parseable outputs are cached.
+* At most ``concurrency`` prompts are in flight, which matches Ollama's
+  ``OLLAMA_NUM_PARALLEL``.
+* Every node and relationship is checked against the schema.  Unknown
+  labels, properties and relationship patterns are dropped and counted, and
+  property values are coerced to the schema type.
+* Results are :class:`NodeRecord` / :class:`RelationshipRecord` for
+  :class:`BulkLoader`, merged on ``name``.
+
+    python -m src.data_processing.graph.extraction --limit 20
+    python -m src.data_processing.graph.extraction --load
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ...knowledge_graph.loaders.bulk_loader import NodeRecord, RelationshipRecord
+from ...qa_bot.core.tracing import span
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_OUTPUT_DIR = PROJECT_ROOT / "Output" / "extraction"
+
+# Part of every cache key: bump when the prompt wording changes
+PROMPT_VERSION = 1
+MAX_PAGE_CHARS = 6000
+
+PROMPT = """You extract a knowledge graph from one page of the GEO Help Guide.
+Use ONLY these node labels and their properties:
+{labels}
+Use ONLY these relationships (source label -[TYPE]-> target label):
+{relationships}
+
+Reply with JSON only, in this shape:
+{{"nodes": [{{"label": "...", "name": "...", "properties": {{}}}}],
+  "relationships": [{{"source": "<node name>", "type": "...", "target": "<node name>"}}]}}
+Every node needs a name.  Leave out anything the page does not state.
+
+Page: {title}
+{text}
+"""
+
+
+@lru_cache(maxsize=1)
+def get_extraction_llm():
+    from ...qa_bot.core.llm_gateway import GatewayChatModel
+    return GatewayChatModel(backend="ollama", model="llama3.2:1b", temperature=0, format="json")
+
+
+# ───────────────────────────── schema checks ──────────────────────────────
+_COERCE = {"STRING": str, "INTEGER": int, "FLOAT": float,
+           "BOOLEAN": lambda v: v if isinstance(v, bool) else str(v).lower() in ("true", "yes", "1")}
+
+
+class SchemaValidator:
+    """Checks extracted items against a ``SchemaService.structured`` schema."""
+
+    def __init__(self, structured: Dict[str, Any]):
+        self.properties = {label: {p["property"]: p["type"] for p in props}
+                           for label, props in structured["node_props"].items()}
+        self.patterns = {(r["start"], r["type"], r["end"]) for r in structured["relationships"]}
+        self.rejected: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _reject(self, reason: str) -> None:
+        with self._lock:
+            self.rejected[reason] += 1
+
+    def prompt_lines(self) -> Tuple[str, str]:
+        labels = "\n".join(f"- {label}: {', '.join(sorted(props))}" for label, props in sorted(self.properties.items()))
+        rels = "\n".join(f"- {s} -[{t}]-> {e}" for s, t, e in sorted(self.patterns))
+        return labels, rels
+
+    def node(self, item: Any) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        if not isinstance(item, dict):
+            self._reject("malformed node")
+            return None
+        label, name = item.get("label"), item.get("name")
+        if label not in self.properties:
+            self._reject("unknown label")
+            return None
+        if not isinstance(name, str) or not name.strip():
+            self._reject("unnamed node")
+            return None
+        props = {}
+        for key, value in (item.get("properties") or {}).items():
+            kind = self.properties[label].get(key)
+            if key == "name" or value is None:
+                continue
+            if kind is None:
+                self._reject("unknown property")
+                continue
+            try:
+                props[key] = _COERCE[kind](value) if kind in _COERCE else value
+            except (TypeError, ValueError):
+                self._reject("bad property value")
+        return label, name.strip(), props
+
+    def relationship(self, item: Any, labels: Dict[str, str]) -> Optional[Tuple[str, str, str]]:
+        if not isinstance(item, dict):
+            self._reject("malformed relationship")
+            return None
+        source, rel_type, target = item.get("source"), item.get("type"), item.get("target")
+        if source not in labels or target not in labels:
+            self._reject("dangling relationship")
+            return None
+        if (labels[source], rel_type, labels[target]) not in self.patterns:
+            self._reject("unknown relationship pattern")
+            return None
+        return source, rel_type, target
+
+
+# ───────────────────────────── output cache ───────────────────────────────
+class ExtractionCache:
+    """``key -> parsed output``; appended to ``cache.jsonl`` so a crash loses at most a line."""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = Path(path) if path else None
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            for line in self.path.read_text(encoding="utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:                  # torn last line
+                    continue
+                self._entries[entry["key"]] = entry["output"]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self._entries.get(key)
+
+    def put(self, key: str, output: Dict) -> None:
+        with self._lock:
+            self._entries[key] = output
+            if self.path is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps({"key": key, "output": output}, ensure_ascii=False) + "\n")
+
+
+def parse_output(text: str) -> Dict:
+    """The JSON object in a model reply, tolerating code fences and chatter around it."""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("no JSON object in the reply")
+    data = json.loads(text[start:end + 1])
+    if not isinstance(data, dict):
+        raise ValueError("reply is not a JSON object")
+    return {"nodes": data.get("nodes") or [], "relationships": data.get("relationships") or []}
+
+
+def split_text(text: str, max_chars: int = MAX_PAGE_CHARS) -> List[str]:
+    """Paragraph-aligned parts of at most *max_chars* (a longer paragraph is cut)."""
+    parts, current = [], ""
+    for paragraph in text.split("\n"):
+        if current and len(current) + len(paragraph) + 1 > max_chars:
+            parts.append(current)
+            current = ""
+        while len(paragraph) > max_chars:
+            parts.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        current = f"{current}\n{paragraph}" if current else paragraph
+    if current.strip():
+        parts.append(current)
+    return parts or [""]
+
+
+# ───────────────────────────── pipeline ───────────────────────────────────
+@dataclass
+class ExtractionReport:
+    pages: int = 0
+    prompts: int = 0
+    cache_hits: int = 0
+    llm_errors: int = 0
+    invalid_outputs: int = 0
+    nodes: int = 0
+    relationships: int = 0
+    rejected: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.cache_hits / self.prompts if self.prompts else 0.0
+
+    @property
+    def pages_per_minute(self) -> float:
+        return 60 * self.pages / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        rejected = ", ".join(f"{k}: {v}" for k, v in sorted(self.rejected.items())) or "none"
+        return (f"{self.pages} pages ({self.prompts} prompts) in {self.seconds:.1f}s – "
+                f"{self.pages_per_minute:,.1f} pages/min, cache hit rate {self.hit_rate:.0%}; "
+                f"{self.nodes} nodes, {self.relationships} relationships; "
+                f"{self.llm_errors} LLM errors, {self.invalid_outputs} invalid outputs; rejected: {rejected}")
+
+
+class GraphExtractor:
+    """
+    Args:
+        llm: LangChain chat model (default: the local Ollama model in JSON mode).
+        schema (dict): ``SchemaService.structured``.
+        cache_path (Path | None): ``cache.jsonl``; ``None`` keeps the cache in memory.
+        concurrency (int): Prompts in flight at once.
+        max_chars (int): Page text per prompt.
+    """
+
+    def __init__(self, llm, schema: Dict[str, Any], cache_path: Optional[Path] = DEFAULT_OUTPUT_DIR / "cache.jsonl",
+                 concurrency: int = 4, max_chars: int = MAX_PAGE_CHARS):
+        self.llm = llm
+        self.validator = SchemaValidator(schema)
+        self.cache = ExtractionCache(cache_path)
+        self.concurrency = concurrency
+        self.max_chars = max_chars
+        self.model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+
+    def prompts(self, page: Dict) -> List[str]:
+        labels, rels = self.validator.prompt_lines()
+        return [PROMPT.format(labels=labels, relationships=rels, title=page.get("title") or page.get("path", ""),
+                              text=part) for part in split_text(page.get("text") or "", self.max_chars)]
+
+    def cache_key(self, prompt: str) -> str:
+        return hashlib.sha256(f"{PROMPT_VERSION}\0{self.model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def _complete(self, prompt: str, report: ExtractionReport, lock: threading.Lock) -> Optional[Dict]:
+        key = self.cache_key(prompt)
+        with span("extraction.prompt") as s:
+            cached = self.cache.get(key)
+            s.set(**{"cache.extraction": "miss" if cached is None else "hit"})
+            if cached is not None:
+                with lock:
+                    report.cache_hits += 1
+                return cached
+            try:
+                reply = self.llm.invoke(prompt).content
+            except Exception as e:
+                s.set(error=type(e).__name__)
+                with lock:
+                    report.llm_errors += 1
+                return None
+            try:
+                output = parse_output(reply)
+            except ValueError:                                # incl. JSONDecodeError; retried next run
+                with lock:
+                    report.invalid_outputs += 1
+                return None
+            self.cache.put(key, output)
+            return output
+
+    def extract(self, pages: Iterable[Dict]) -> Tuple[List[NodeRecord], List[RelationshipRecord], ExtractionReport]:
+        """Runs every page part through the model (or the cache) and validates the results."""
+        report, lock = ExtractionReport(), threading.Lock()
+        start = time.perf_counter()
+        jobs = []
+        for page in pages:
+            report.pages += 1
+            jobs.extend(self.prompts(page))
+        report.prompts = len(jobs)
+        with span("extraction.run", pages=report.pages, prompts=report.prompts):
+            with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as pool:
+                outputs = list(pool.map(lambda p: self._complete(p, report, lock), jobs))
+
+        nodes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        labels: Dict[str, str] = {}
+        rels = set()
+        for output in filter(None, outputs):
+            page_labels = {}
+            for item in output["nodes"]:
+                node = self.validator.node(item)
+                if node is None:
+                    continue
+                label, name, props = node
+                merged = nodes.setdefault((label, name), {})
+                for key, value in props.items():
+                    merged.setdefault(key, value)             # first page to state a value wins
+                page_labels[name] = label
+                labels.setdefault(name, label)
+            for item in output["relationships"]:
+                rel = self.validator.relationship(item, {**labels, **page_labels})
+                if rel is not None:
+                    source, rel_type, target = rel
+                    rels.add((page_labels.get(source, labels[source]), source, rel_type,
+                              page_labels.get(target, labels[target]), target))
+
+        node_records = [NodeRecord(label, {"name": name}, props) for (label, name), props in nodes.items()]
+        rel_records = [RelationshipRecord(rel_type, sl, {"name": s}, tl, {"name": t})
+                       for sl, s, rel_type, tl, t in sorted(rels)]
+        report.nodes, report.relationships = len(node_records), len(rel_records)
+        report.rejected = dict(self.validator.rejected)
+        report.seconds = time.perf_counter() - start
+        return node_records, rel_records, report
+
+
+def save_records(nodes: List[NodeRecord], relationships: List[RelationshipRecord], path: Path) -> None:
+    """Writes the records as JSONL (``kind`` = ``node`` / ``relationship``) for review or later loading."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        for rec in nodes:
+            f.write(json.dumps({"kind": "node", **rec.__dict__}, ensure_ascii=False) + "\n")
+        for rec in relationships:
+            f.write(json.dumps({"kind": "relationship", **rec.__dict__}, ensure_ascii=False) + "\n")
+
+
+def main(argv=None):
+    from ..file_io.corpus import DEFAULT_OUTPUT_DIR as CORPUS_DIR, iter_pages
+
+    parser = argparse.ArgumentParser(description="Extract graph records from the parsed help pages")
+    parser.add_argument("--corpus-dir", type=Path, default=CORPUS_DIR)
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--schema-dump", type=Path, default=None,
+                        help="records.json export to take the schema from instead of Neo4j")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=None, help="only the first N pages")
+    parser.add_argument("--load", action="store_true", help="bulk-load the records into Neo4j")
+    args = parser.parse_args(argv)
+
+    from ...qa_bot.core.kg_schema import SchemaService, get_schema_service
+    schema = (SchemaService.from_dump(args.schema_dump) if args.schema_dump else get_schema_service()).structured
+    pages = list(iter_pages(args.corpus_dir, columns=("path", "title", "text")))[:args.limit]
+
+    extractor = GraphExtractor(get_extraction_llm(), schema, args.output_dir / "cache.jsonl", args.concurrency)
+    nodes, rels, report = extractor.extract(pages)
+    save_records(nodes, rels, args.output_dir / "records.jsonl")
+    print(report)
+
+    if args.load:
+        import os
+        from ...knowledge_graph.loaders.curve_graph_loader import CurveGraphLoader
+        loader = CurveGraphLoader(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+        try:
+            print(f"Loaded: {loader.load_records(nodes, rels)}")
+        finally:
+            loader.close()
+
+
+if __name__ == "__main__":
+    main()
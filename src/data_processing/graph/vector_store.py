@@ -0,0 +1,209 @@
+"""
+vector_store.py
+===============
+
+Persistent FAISS index plus id → chunk metadata for the file-type RAG.
+
+Chunks are addressed by a stable string id (e.g. ``filetype:ODF``) that is
+hashed to a 63-bit FAISS id, so they can be upserted or deleted individually.
+A saved store is reopened memory-mapped and read-only; the first write
+transparently reloads it into memory.
+
+Three index kinds are supported:
+
+* ``flat`` – exact ``IndexFlatL2`` (the default, same results as before).
+* ``ivf``  – ``IndexIVFFlat`` probing ``nprobe`` of ``nlist`` cells.
+* ``hnsw`` – ``IndexHNSWFlat``.  HNSW graphs cannot drop vectors, so updates
+  and deletes of existing ids rebuild the graph from the live vectors.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+INDEX_KINDS = ("flat", "ivf", "hnsw")
+
+
+def faiss_id(chunk_id: str) -> int:
+    """Stable non-negative int64 id for a chunk id string."""
+    digest = hashlib.blake2b(chunk_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") & 0x7FFF_FFFF_FFFF_FFFF
+
+
+class VectorStore:
+    """
+    Args:
+        dim (int): Vector dimension (384 for all-MiniLM-L6-v2).
+        kind (str): ``flat``, ``ivf`` or ``hnsw``.
+        nlist (int): IVF cells; the first upsert must bring at least this
+            many vectors to train the quantiser.
+        nprobe (int): IVF cells searched per query.
+        hnsw_m (int): HNSW neighbours per node.
+        ef_search (int): HNSW candidate list size at query time.
+    """
+
+    def __init__(self, dim: int, kind: str = "flat", nlist: int = 16, nprobe: int = 4,
+                 hnsw_m: int = 32, ef_search: int = 64):
+        if kind not in INDEX_KINDS:
+            raise ValueError(f"kind must be one of {INDEX_KINDS}, got {kind!r}")
+        self.dim = dim
+        self.kind = kind
+        self.params = {"nlist": nlist, "nprobe": nprobe, "hnsw_m": hnsw_m, "ef_search": ef_search}
+        self.metadata: Dict[int, dict] = {}
+        self.index = self._new_index()
+        self._path: Optional[Path] = None
+        self._read_only = False
+
+    # ── construction ──
+    def _new_index(self):
+        if self.kind == "flat":
+            return faiss.IndexIDMap2(faiss.IndexFlatL2(self.dim))
+        if self.kind == "ivf":
+            index = faiss.IndexIVFFlat(faiss.IndexFlatL2(self.dim), self.dim, self.params["nlist"])
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)
+            index.nprobe = self.params["nprobe"]
+            return index
+        hnsw = faiss.IndexHNSWFlat(self.dim, self.params["hnsw_m"])
+        hnsw.hnsw.efSearch = self.params["ef_search"]
+        return faiss.IndexIDMap2(hnsw)
+
+    def _apply_search_params(self) -> None:
+        if self.kind == "ivf":
+            faiss.extract_index_ivf(self.index).nprobe = self.params["nprobe"]
+        elif self.kind == "hnsw":
+            faiss.downcast_index(self.index.index).hnsw.efSearch = self.params["ef_search"]
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        """Trades recall for latency on an existing IVF/HNSW index."""
+        if nprobe is not None:
+            self.params["nprobe"] = nprobe
+        if ef_search is not None:
+            self.params["ef_search"] = ef_search
+        self._apply_search_params()
+
+    # ── persistence ──
+    def save(self, directory) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(self.index, str(directory / "index.faiss"))
+        with (directory / "metadata.json").open("w", encoding="utf-8") as fh:
+            json.dump({str(k): v for k, v in self.metadata.items()}, fh, ensure_ascii=False)
+        with (directory / "store.json").open("w", encoding="utf-8") as fh:
+            json.dump({"dim": self.dim, "kind": self.kind, "params": self.params}, fh)
+
+    @classmethod
+    def load(cls, directory, mmap: bool = True) -> "VectorStore":
+        directory = Path(directory)
+        config = json.loads((directory / "store.json").read_text(encoding="utf-8"))
+        store = cls(config["dim"], config["kind"], **config["params"])
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        store.index = faiss.read_index(str(directory / "index.faiss"), flags)
+        store._apply_search_params()
+        with (directory / "metadata.json").open(encoding="utf-8") as fh:
+            store.metadata = {int(k): v for k, v in json.load(fh).items()}
+        store._path, store._read_only = directory, mmap
+        return store
+
+    @classmethod
+    def load_or_create(cls, directory, dim: int, **kwargs) -> "VectorStore":
+        if (Path(directory) / "store.json").exists():
+            return cls.load(directory)
+        return cls(dim, **kwargs)
+
+    def _ensure_writable(self) -> None:
+        if self._read_only:
+            self.index = faiss.read_index(str(self._path / "index.faiss"))
+            self._apply_search_params()
+            self._read_only = False
+
+    # ── mutation ──
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return faiss_id(chunk_id) in self.metadata
+
+    def get(self, chunk_id: str) -> Optional[dict]:
+        return self.metadata.get(faiss_id(chunk_id))
+
+    def upsert(self, chunk_ids: Sequence[str], vectors: np.ndarray,
+               metadata: Optional[Sequence[dict]] = None) -> None:
+        """Adds new chunks and replaces the vectors of existing ones."""
+        if not len(chunk_ids):
+            return
+        self._ensure_writable()
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        ids = np.array([faiss_id(c) for c in chunk_ids], dtype=np.int64)
+        metadata = metadata or [{} for _ in chunk_ids]
+
+        existing = [i for i in ids.tolist() if i in self.metadata]
+        if self.kind == "hnsw" and existing:
+            self._rebuild(drop=set(existing), extra=(ids, vectors))
+        else:
+            if existing:
+                self.index.remove_ids(np.array(existing, dtype=np.int64))
+            if self.kind == "ivf" and not self.index.is_trained:
+                if len(vectors) < self.params["nlist"]:
+                    raise ValueError(
+                        f"IVF needs at least nlist={self.params['nlist']} vectors to train, got {len(vectors)}"
+                    )
+                self.index.train(vectors)
+            self.index.add_with_ids(vectors, ids)
+
+        for i, chunk_id, meta in zip(ids.tolist(), chunk_ids, metadata):
+            self.metadata[i] = {"chunk_id": chunk_id, **meta}
+
+    def delete(self, chunk_ids: Iterable[str]) -> int:
+        ids = [faiss_id(c) for c in chunk_ids if faiss_id(c) in self.metadata]
+        if not ids:
+            return 0
+        self._ensure_writable()
+        if self.kind == "hnsw":
+            self._rebuild(drop=set(ids))
+        else:
+            self.index.remove_ids(np.array(ids, dtype=np.int64))
+        for i in ids:
+            del self.metadata[i]
+        return len(ids)
+
+    def _rebuild(self, drop: set, extra: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> None:
+        keep = [i for i in self.metadata if i not in drop]
+        old = self.index
+        self.index = self._new_index()
+        if keep:
+            vectors = np.vstack([old.reconstruct(i) for i in keep])
+            self.index.add_with_ids(vectors, np.array(keep, dtype=np.int64))
+        if extra is not None:
+            self.index.add_with_ids(extra[1], extra[0])
+
+    def sync(self, chunks: Dict[str, dict], embed: Callable[[List[str]], np.ndarray]) -> Dict[str, int]:
+        """
+        Makes the store match *chunks* (``chunk_id -> metadata`` with a
+        ``text`` field), embedding only chunks whose text changed.
+
+        Returns:
+            dict: Counts of ``upserted``, ``deleted`` and ``unchanged`` chunks.
+        """
+        changed = [cid for cid, meta in chunks.items() if (self.get(cid) or {}).get("text") != meta["text"]]
+        stale = [meta["chunk_id"] for meta in self.metadata.values() if meta["chunk_id"] not in chunks]
+        deleted = self.delete(stale)
+        if changed:
+            self.upsert(changed, embed([chunks[c]["text"] for c in changed]), [chunks[c] for c in changed])
+        return {"upserted": len(changed), "deleted": deleted, "unchanged": len(chunks) - len(changed)}
+
+    # ── queries ──
+    def search(self, query_vectors: np.ndarray, k: int = 3) -> List[List[Tuple[dict, float]]]:
+        """Returns, per query, up to *k* ``(metadata, distance)`` pairs."""
+        query_vectors = np.ascontiguousarray(np.atleast_2d(query_vectors), dtype=np.float32)
+        if not self.metadata:
+            return [[] for _ in range(len(query_vectors))]
+        distances, ids = self.index.search(query_vectors, min(k, len(self.metadata)))
+        return [
+            [(self.metadata[i], float(d)) for i, d in zip(row_ids, row_d) if i in self.metadata]
+            for row_ids, row_d in zip(ids.tolist(), distances.tolist())
+        ]
@@ -0,0 +1,277 @@
+"""
+bm25.py
+=======
+
+Local lexical retrieval over the GEO Help Guide.
+
+The inverted index is stored as flat numpy arrays (CSR layout):
+
+* ``offsets[t] : offsets[t + 1]`` – slice of the postings for term id *t*
+* ``doc_ids``  – int32 document ids, sorted within each term
+* ``tfs``      – uint16 term frequencies aligned with ``doc_ids``
+
+BM25 weights for every posting are precomputed on load, so a query is a few
+array slices plus one scatter-add into a dense score vector.  That takes
+well under a millisecond for a corpus of this size.  Tokens keep
+identifiers intact (``gr_1``, ``0x0``, ``3.5``) and also index their parts,
+so exact mnemonics, extensions such as ODF/ODT/OIF, and numeric limits all
+match.
+
+Documents come either from the parsed corpus (``Output/corpus``) or from the
+RoboHelp search data that ships in ``Data/whxdata``: per-topic text in
+``text/N.js`` and titles/URLs in ``search_topics.js``.
+
+    python -m src.data_processing.search.bm25 --source whxdata --query "ODF tracks"
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_WHXDATA_DIR = PROJECT_ROOT / "Data" / "whxdata"
+DEFAULT_INDEX_DIR = PROJECT_ROOT / "Output" / "search" / "bm25"
+
+SCHEMA_VERSION = 1
+
+# RoboHelp's list from search_auto_index.js is used when available
+DEFAULT_STOPWORDS = frozenset(
+    "a an the to of is for and or do be by on in at it are as but its than that then "
+    "they this we were which with you into about from has have can was when where how what".split()
+)
+
+# Navigation strings RoboHelp indexes on every topic
+_BOILERPLATE = {"*Maximize screen to view table of contents*", "Back", "Forward"}
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[._][a-z0-9]+)*")
+
+
+def tokenize(text: str, stopwords: frozenset = DEFAULT_STOPWORDS) -> List[str]:
+    """Lower-cased tokens; ``gamma_ray`` yields ``gamma_ray``, ``gamma`` and ``ray``."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in stopwords:
+            continue
+        tokens.append(token)
+        if "_" in token or ("." in token and not token.replace(".", "").isdigit()):
+            tokens.extend(p for p in re.split(r"[._]", token) if p and p not in stopwords)
+    return tokens
+
+
+# ─────────────────────────────── sources ──────────────────────────────────
+def _rh_exports(path: Path):
+    """Payload of a RoboHelp ``rh._.exports(...)`` data file."""
+    text = path.read_text(encoding="utf-8")
+    return json.loads(text[text.index("(") + 1:text.rindex(")")])
+
+
+def whxdata_stopwords(whxdata_dir: Path = DEFAULT_WHXDATA_DIR) -> frozenset:
+    path = Path(whxdata_dir) / "search_auto_index.js"
+    if not path.exists():
+        return DEFAULT_STOPWORDS
+    return frozenset(_rh_exports(path).get("stopWords", [])) or DEFAULT_STOPWORDS
+
+
+def documents_from_whxdata(whxdata_dir: Path = DEFAULT_WHXDATA_DIR) -> Iterator[Dict]:
+    """
+    Yields ``{"id", "title", "url", "text"}`` per help topic from the
+    RoboHelp search data.
+    """
+    whxdata_dir = Path(whxdata_dir)
+    topics_path = whxdata_dir / "search_topics.js"
+    metadata = {}
+    if topics_path.exists():
+        topics = _rh_exports(topics_path)
+        metadata = (json.loads(topics) if isinstance(topics, str) else topics).get("metadata", {})
+
+    for path in sorted((whxdata_dir / "text").glob("*.js"), key=lambda p: int(p.stem)):
+        fields = _rh_exports(path)
+        topic = metadata.get(fields.get("id", path.stem), {})
+
+        def segments(key):
+            return [s.strip() for group in fields.get(key, []) for s in group
+                    if s.strip() and s.strip() not in _BOILERPLATE]
+
+        title = topic.get("title") or " ".join(segments("0"))
+        yield {
+            "id": topic.get("relUrl") or f"topic:{path.stem}",
+            "title": title,
+            "url": topic.get("relUrl", ""),
+            "text": " ".join(segments("1")),
+        }
+
+
+def documents_from_corpus(output_dir: Optional[Path] = None) -> Iterator[Dict]:
+    """Yields one document per page of the parsed corpus (see ``corpus.ingest_corpus``)."""
+    from ..file_io.corpus import DEFAULT_OUTPUT_DIR, iter_pages
+    for page in iter_pages(output_dir or DEFAULT_OUTPUT_DIR, columns=["path", "title", "text"]):
+        yield {"id": page["path"], "title": page["title"], "url": page["path"], "text": page["text"]}
+
+
+# ──────────────────────────────── index ───────────────────────────────────
+class BM25Index:
+    """
+    Args:
+        k1 (float): Term-frequency saturation.
+        b (float): Length normalisation.
+        title_weight (int): How many times title tokens are counted.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, title_weight: int = 2,
+                 stopwords: frozenset = DEFAULT_STOPWORDS):
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.stopwords = stopwords
+        self.terms: Dict[str, int] = {}
+        self.docs: List[Dict] = []
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.tfs = np.zeros(0, dtype=np.uint16)
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self._weights = np.zeros(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.docs)
+
+    # ── build ──
+    @classmethod
+    def build(cls, documents: Iterable[Dict], **kwargs) -> "BM25Index":
+        """Indexes ``{"id", "title", "text", ...}`` dicts; extra keys are kept as metadata."""
+        index = cls(**kwargs)
+        postings: Dict[str, Dict[int, int]] = {}
+        lengths = []
+        for doc_id, doc in enumerate(documents):
+            tokens = tokenize(doc.get("title", ""), index.stopwords) * index.title_weight
+            tokens += tokenize(doc.get("text", ""), index.stopwords)
+            lengths.append(len(tokens))
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+            index.docs.append({k: v for k, v in doc.items() if k != "text"}
+                              | {"snippet": doc.get("text", "")[:300]})
+
+        vocabulary = sorted(postings)
+        index.terms = {term: i for i, term in enumerate(vocabulary)}
+        sizes = np.array([len(postings[t]) for t in vocabulary], dtype=np.int64)
+        index.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        index.doc_ids = np.fromiter((d for t in vocabulary for d in sorted(postings[t])),
+                                    dtype=np.int32, count=int(sizes.sum()))
+        index.tfs = np.fromiter((min(postings[t][d], 65535) for t in vocabulary for d in sorted(postings[t])),
+                                dtype=np.uint16, count=int(sizes.sum()))
+        index.doc_len = np.array(lengths, dtype=np.float32)
+        index._prepare()
+        return index
+
+    def _prepare(self) -> None:
+        """Precomputes the BM25 weight of every posting."""
+        n_docs = max(len(self.docs), 1)
+        df = np.diff(self.offsets).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        avgdl = float(self.doc_len.mean()) if len(self.doc_len) else 1.0
+        term_of_posting = np.repeat(np.arange(len(df)), np.diff(self.offsets))
+        tf = self.tfs.astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len[self.doc_ids] / max(avgdl, 1e-9))
+        self._weights = (idf[term_of_posting] * tf * (self.k1 + 1) / (tf + norm)).astype(np.float32)
+
+    # ── query ──
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        for token in set(tokenize(query, self.stopwords)):
+            term = self.terms.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            # doc ids are unique within a term, so fancy-index += is safe
+            scores[self.doc_ids[start:end]] += self._weights[start:end]
+        return scores
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[Dict, float]]:
+        """Top-*k* ``(document metadata, score)`` pairs, best first."""
+        scores = self.scores(query)
+        hits = np.flatnonzero(scores)
+        if not len(hits):
+            return []
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self.docs[i], float(scores[i])) for i in hits]
+
+    # ── persistence ──
+    def save(self, directory: Path) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ("offsets", "doc_ids", "tfs", "doc_len"):
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        meta = {"schema_version": SCHEMA_VERSION, "k1": self.k1, "b": self.b,
+                "title_weight": self.title_weight, "stopwords": sorted(self.stopwords),
+                "terms": sorted(self.terms, key=self.terms.get), "docs": self.docs}
+        tmp = directory / "meta.tmp.json"
+        tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(directory / "meta.json")
+
+    @classmethod
+    def load(cls, directory: Path) -> "BM25Index":
+        """Opens a saved index with the postings memory-mapped."""
+        directory = Path(directory)
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("schema_version") != SCHEMA_VERSION:
+            raise ValueError(f"{directory} was built with schema {meta.get('schema_version')}, "
+                             f"expected {SCHEMA_VERSION}; rebuild it")
+        index = cls(meta["k1"], meta["b"], meta["title_weight"], frozenset(meta["stopwords"]))
+        index.terms = {term: i for i, term in enumerate(meta["terms"])}
+        index.docs = meta["docs"]
+        for name in ("offsets", "doc_ids", "tfs", "doc_len"):
+            setattr(index, name, np.load(directory / f"{name}.npy", mmap_mode="r"))
+        index._prepare()
+        return index
+
+
+def build_index(source: str = "whxdata", index_dir: Path = DEFAULT_INDEX_DIR,
+                whxdata_dir: Path = DEFAULT_WHXDATA_DIR) -> BM25Index:
+    """Builds from ``whxdata`` or ``corpus`` and saves to *index_dir*."""
+    if source == "whxdata":
+        index = BM25Index.build(documents_from_whxdata(whxdata_dir),
+                                stopwords=whxdata_stopwords(whxdata_dir))
+    elif source == "corpus":
+        index = BM25Index.build(documents_from_corpus())
+    else:
+        raise ValueError(f"source must be 'whxdata' or 'corpus', got {source!r}")
+    index.save(index_dir)
+    return index
+
+
+def load_or_build(index_dir: Path = DEFAULT_INDEX_DIR, source: str = "whxdata") -> BM25Index:
+    if (Path(index_dir) / "meta.json").exists():
+        return BM25Index.load(index_dir)
+    return build_index(source, index_dir)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Build or query the BM25 help-guide index")
+    parser.add_argument("--source", choices=["whxdata", "corpus"], default="whxdata")
+    parser.add_argument("--index-dir", type=Path, default=DEFAULT_INDEX_DIR)
+    parser.add_argument("--query", action="append", default=[])
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = build_index(args.source, args.index_dir)
+    print(f"Indexed {len(index)} documents, {len(index.terms)} terms, "
+          f"{len(index.doc_ids)} postings in {time.perf_counter() - start:.2f}s → {args.index_dir}")
+    for query in args.query:
+        start = time.perf_counter()
+        hits = index.search(query, args.k)
+        print(f"\n{query!r} ({(time.perf_counter() - start) * 1e3:.3f} ms)")
+        for doc, score in hits:
+            print(f"  {score:6.2f}  {doc['title']}  [{doc['url']}]")
+
+
+if __name__ == "__main__":
+    main()
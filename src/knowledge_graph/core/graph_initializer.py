@@ -2,29 +2,26 @@ from neo4j import GraphDatabase
 from dotenv import load_dotenv
 import os
 
-# Load .env file
-load_dotenv()
+from ..loaders.migrations import CORE_SCRIPTS, apply_scripts
 
-# Load credentials securely
-uri = os.getenv("NEO4J_URI")
-user = os.getenv("NEO4J_USERNAME")
-password = os.getenv("NEO4J_PASSWORD")
 
-# Load Cypher script
-with open("./cypher/graph_setup.cypher", "r", encoding="utf-8") as f:
-    cypher_script = f.read()
+def main(script_path=None, force=False):
+    # Load .env file
+    load_dotenv()
 
-# Create driver
-driver = GraphDatabase.driver(uri, auth=(user, password))
+    # Load credentials securely
+    uri = os.getenv("NEO4J_URI")
+    user = os.getenv("NEO4J_USERNAME")
+    password = os.getenv("NEO4J_PASSWORD")
 
-def setup_graph(tx, script):
-    for statement in script.split(';'):
-        stmt = statement.strip()
-        if stmt:  # skip empty lines
-            tx.run(stmt)
+    # Applied scripts are skipped via the migration ledger
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    try:
+        report = apply_scripts(driver, [script_path] if script_path else CORE_SCRIPTS, force=force)
+        print(report)
+    finally:
+        driver.close()
 
-# Run transaction
-with driver.session() as session:
-    session.execute_write(setup_graph, cypher_script)
 
-driver.close()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+graph_layout.py
+===============
+
+Server-side pieces of the level-of-detail graph view, in plain numpy:
+
+* :func:`label_propagation`: communities used to collapse the graph
+* :func:`force_layout`: Fruchterman–Reingold positions for small graphs
+* :class:`GraphOverview`: the streamed graph with communities and a
+  precomputed position for every node, saved to and loaded from ``.npz``
+
+A community sits at its position in the community-level layout, and its
+members are laid out locally around that point.  Expanding a community in
+the browser therefore puts nodes where the full layout would have put them.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+LOCAL_LAYOUT_LIMIT = 300      # larger communities are laid out as a spiral
+FORCE_LAYOUT_LIMIT = 2000     # dense O(n²) layout above this many communities is too slow
+LAYOUT_SCALE = 1000.0         # vis.js canvas units
+
+
+def _undirected(src: np.ndarray, dst: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    keep = src != dst
+    return np.concatenate([src[keep], dst[keep]]), np.concatenate([dst[keep], src[keep]])
+
+
+def label_propagation(n: int, src: np.ndarray, dst: np.ndarray, iterations: int = 20) -> np.ndarray:
+    """
+    Community id (``0..k-1``, largest first) per node.  Synchronous label
+    propagation; each node also counts its own label once, which stops the
+    two-colouring oscillation on bipartite parts.  Ties go to the smaller
+    label, so the result is deterministic.
+    """
+    labels = np.arange(n, dtype=np.int64)
+    u, v = _undirected(src.astype(np.int64), dst.astype(np.int64))
+    u, v = np.concatenate([u, labels]), np.concatenate([v, labels])
+    for _ in range(iterations):
+        pairs, counts = np.unique(u * n + labels[v], return_counts=True)
+        nodes, candidates = pairs // n, pairs % n
+        order = np.lexsort((candidates, -counts, nodes))
+        nodes, candidates = nodes[order], candidates[order]
+        first = np.ones(len(nodes), dtype=bool)
+        first[1:] = nodes[1:] != nodes[:-1]
+        updated = labels.copy()
+        updated[nodes[first]] = candidates[first]
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    _, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(sizes), dtype=np.int64)
+    rank[np.argsort(-sizes, kind="stable")] = np.arange(len(sizes))
+    return rank[inverse].astype(np.int32)
+
+
+def force_layout(n: int, src: np.ndarray, dst: np.ndarray, weights: Optional[np.ndarray] = None,
+                 iterations: int = 100, seed: int = 0) -> np.ndarray:
+    """Fruchterman–Reingold positions in ``[-1, 1]²``; dense O(n²), meant for n ≲ 2000."""
+    if n == 0:
+        return np.zeros((0, 2), dtype=np.float32)
+    if n == 1:
+        return np.zeros((1, 2), dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(-1, 1, size=(n, 2))
+    weights = np.ones(len(src)) if weights is None else np.log1p(np.asarray(weights, dtype=float))
+    k = np.sqrt(4.0 / n)
+    temperature = 0.2
+    for _ in range(iterations):
+        delta = pos[:, None, :] - pos[None, :, :]
+        distance = np.maximum(np.sqrt((delta * delta).sum(axis=-1)), 1e-3)
+        force = (delta * (k * k / distance ** 2)[..., None]).sum(axis=1)
+        pull = pos[src] - pos[dst]
+        length = np.maximum(np.sqrt((pull * pull).sum(axis=-1)), 1e-3)
+        attraction = pull * (length * weights / k)[:, None]
+        np.add.at(force, src, -attraction)
+        np.add.at(force, dst, attraction)
+        step = np.maximum(np.sqrt((force * force).sum(axis=-1)), 1e-9)
+        pos += force / step[:, None] * np.minimum(step, temperature)[:, None]
+        temperature *= 0.95
+    pos -= pos.mean(axis=0)
+    return (pos / max(np.abs(pos).max(), 1e-9)).astype(np.float32)
+
+
+def spiral_layout(n: int) -> np.ndarray:
+    """Sunflower spiral in the unit disc; the first nodes sit in the centre."""
+    i = np.arange(n) + 0.5
+    radius, angle = np.sqrt(i / max(n, 1)), i * np.pi * (3 - np.sqrt(5))
+    return np.stack([radius * np.cos(angle), radius * np.sin(angle)], axis=1).astype(np.float32)
+
+
+class GraphOverview:
+    """
+    Args:
+        ids (list[str]): Stable element ids, one per node.
+        names (list[str]): Display names.
+        labels (list[str]): Primary label per node.
+        src (np.ndarray): Edge start node indexes.
+        dst (np.ndarray): Edge end node indexes.
+        types (list[str]): Relationship type per edge.
+        edge_ids (list[str]): Stable relationship element ids.
+        version (int): Graph version the overview was built from.
+    """
+
+    def __init__(self, ids: List[str], names: List[str], labels: List[str], src: np.ndarray,
+                 dst: np.ndarray, types: List[str], edge_ids: List[str], version: int = 0,
+                 community: Optional[np.ndarray] = None, positions: Optional[np.ndarray] = None,
+                 community_positions: Optional[np.ndarray] = None):
+        self.ids, self.names, self.labels = list(ids), list(names), list(labels)
+        self.src, self.dst = np.asarray(src, dtype=np.int32), np.asarray(dst, dtype=np.int32)
+        self.types, self.edge_ids = list(types), list(edge_ids)
+        self.version = version
+        self.index: Dict[str, int] = {node_id: i for i, node_id in enumerate(self.ids)}
+        self.degree = (np.bincount(self.src, minlength=len(self.ids))
+                       + np.bincount(self.dst, minlength=len(self.ids)))
+        if community is None:
+            community = label_propagation(len(self.ids), self.src, self.dst)
+        self.community = np.asarray(community, dtype=np.int32)
+        self.community_sizes = np.bincount(self.community) if len(self.community) else np.zeros(0, dtype=np.int64)
+        if positions is None or community_positions is None:
+            community_positions, positions = self._layout()
+        self.community_positions = np.asarray(community_positions, dtype=np.float32)
+        self.positions = np.asarray(positions, dtype=np.float32)
+
+    @classmethod
+    def from_stream(cls, nodes: Iterable[Dict], edges: Iterable[Dict], version: int = 0) -> "GraphOverview":
+        """From keyset pages of ``{id, labels, name}`` nodes and ``{id, type, source, target}`` edges."""
+        ids, names, labels = [], [], []
+        for node in nodes:
+            ids.append(node["id"])
+            names.append(str(node.get("name") or (node.get("labels") or ["Node"])[0]))
+            labels.append((node.get("labels") or ["Node"])[0])
+        index = {node_id: i for i, node_id in enumerate(ids)}
+        src, dst, types, edge_ids = [], [], [], []
+        for edge in edges:
+            a, b = index.get(edge["source"]), index.get(edge["target"])
+            if a is None or b is None:
+                continue
+            src.append(a)
+            dst.append(b)
+            types.append(edge["type"])
+            edge_ids.append(edge["id"])
+        return cls(ids, names, labels, np.array(src, dtype=np.int32), np.array(dst, dtype=np.int32),
+                   types, edge_ids, version)
+
+    # ── collapsed view ──
+    def community_edges(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``(source community, target community, relationship count)`` between communities."""
+        k = max(len(self.community_sizes), 1)
+        a, b = self.community[self.src].astype(np.int64), self.community[self.dst].astype(np.int64)
+        keep = a != b
+        pairs, weights = np.unique(a[keep] * k + b[keep], return_counts=True)
+        return pairs // k, pairs % k, weights
+
+    def community_name(self, community: int) -> str:
+        """Name of the member with the highest degree, plus the member count."""
+        members = self.members(community, limit=1)
+        return f"{self.names[members[0]]} (+{self.community_sizes[community] - 1})"
+
+    def members(self, community: int, limit: Optional[int] = None) -> np.ndarray:
+        """Member node indexes, highest degree first."""
+        members = np.flatnonzero(self.community == community)
+        members = members[np.argsort(-self.degree[members], kind="stable")]
+        return members if limit is None else members[:limit]
+
+    def _layout(self) -> Tuple[np.ndarray, np.ndarray]:
+        k = len(self.community_sizes)
+        a, b, weights = self.community_edges()
+        # communities are ranked by size, so the spiral puts the largest in the middle
+        centres = (force_layout(k, a, b, weights) if k <= FORCE_LAYOUT_LIMIT else spiral_layout(k)) * LAYOUT_SCALE
+        positions = np.zeros((len(self.ids), 2), dtype=np.float32)
+        by_community = np.lexsort((-self.degree, self.community))
+        bounds = np.concatenate([[0], np.cumsum(self.community_sizes)])
+        for community in range(k):
+            members = by_community[bounds[community]:bounds[community + 1]]
+            if len(members) <= LOCAL_LAYOUT_LIMIT:
+                local = np.full(len(self.ids), -1, dtype=np.int64)
+                local[members] = np.arange(len(members))
+                inside = (local[self.src] >= 0) & (local[self.dst] >= 0)
+                offsets = force_layout(len(members), local[self.src[inside]], local[self.dst[inside]],
+                                       iterations=30, seed=community)
+            else:
+                offsets = spiral_layout(len(members))
+            radius = 20.0 * np.sqrt(len(members))
+            positions[members] = centres[community] + offsets * radius
+        return centres, positions
+
+    # ── persistence ──
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez_compressed(
+            tmp, ids=np.array(self.ids, dtype=str), names=np.array(self.names, dtype=str),
+            labels=np.array(self.labels, dtype=str), src=self.src, dst=self.dst,
+            types=np.array(self.types, dtype=str), edge_ids=np.array(self.edge_ids, dtype=str),
+            version=np.array(self.version), community=self.community, positions=self.positions,
+            community_positions=self.community_positions)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "GraphOverview":
+        with np.load(path) as data:
+            return cls(data["ids"].tolist(), data["names"].tolist(), data["labels"].tolist(), data["src"],
+                       data["dst"], data["types"].tolist(), data["edge_ids"].tolist(), int(data["version"]),
+                       community=data["community"], positions=data["positions"],
+                       community_positions=data["community_positions"])
@@ -1,22 +1,105 @@
-from pyvis.network import Network
-import sys
+"""
+graph_visualizer.py
+===================
+
+PyVis views of the GEO graph.
+
+``visualize_subgraph`` renders the result of one Cypher query, which suits
+small subgraphs.  For the whole graph the level-of-detail view is used
+instead:
+
+1. nodes and relationships are streamed in keyset pages with their
+   ``elementId`` (stable across runs, unlike ``hash(str(node))``);
+2. communities (or labels) are collapsed server-side and a layout for
+   every node is computed once per graph version and cached under
+   ``Output/Neo4j_Graph/layout/``;
+3. the page shows the collapsed graph with physics off, and a click on a
+   node loads its members or neighbourhood from the local endpoint
+   started by :meth:`GraphVisualizer.serve`.
+
+    python -m src.knowledge_graph.core.graph_visualizer --serve 8765
+    python -m src.knowledge_graph.core.graph_visualizer --query "MATCH (n)-[r]->(m) RETURN n, r, m LIMIT 100"
+"""
+import argparse
+import hashlib
+import json
+import threading
 from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))  # Adds src/ to path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
 
-# Create output directory path relative to project root
+from .graph_layout import GraphOverview
+from ...qa_bot.core.graph import get_graph
+from ...qa_bot.core.graph_version import read_version
+
+# Output directory path relative to project root
 output_dir = Path(__file__).resolve().parents[3] / "Output" / "Neo4j_Graph"
-output_dir.mkdir(parents=True, exist_ok=True)
+LAYOUT_DIR = output_dir / "layout"
+
+PAGE_SIZE = 5000
+MAX_GROUPS = 300              # collapsed nodes drawn on the first screen
+EXPAND_LIMIT = 200            # nodes added per click
+
+NODE_PAGE_QUERY = """
+MATCH (n) WHERE elementId(n) > $after AND NOT n:GraphMeta
+RETURN elementId(n) AS id, labels(n) AS labels, coalesce(n.name, n.fullName, n.id) AS name
+ORDER BY id LIMIT $limit
+"""
+
+EDGE_PAGE_QUERY = """
+MATCH (a)-[r]->(b) WHERE elementId(r) > $after
+RETURN elementId(r) AS id, type(r) AS type, elementId(a) AS source, elementId(b) AS target
+ORDER BY id LIMIT $limit
+"""
+
+NEIGHBOURHOOD_QUERY = """
+MATCH (n)-[r]-(m) WHERE elementId(n) = $id
+RETURN elementId(r) AS rel_id, type(r) AS type, elementId(startNode(r)) AS source,
+       elementId(endNode(r)) AS target, elementId(m) AS id, labels(m) AS labels,
+       coalesce(m.name, m.fullName, m.id) AS name
+LIMIT $limit
+"""
 
-from qa_bot.core.graph import graph
-from neo4j.graph import Node, Relationship
+# Appended to the PyVis page: clicking a node merges its expansion into the
+# vis.js DataSets that the PyVis template keeps in the globals nodes/edges.
+EXPAND_SCRIPT = """
+<script type="text/javascript">
+(function () {
+  var endpoint = %(endpoint)s, expanded = {};
+  network.on("click", function (params) {
+    if (!params.nodes.length || expanded[params.nodes[0]]) return;
+    var id = params.nodes[0];
+    expanded[id] = true;
+    fetch(endpoint + "expand?id=" + encodeURIComponent(id))
+      .then(function (response) { return response.json(); })
+      .then(function (data) { nodes.update(data.nodes); edges.update(data.edges); })
+      .catch(function () { expanded[id] = false; });
+  });
+})();
+</script>
+"""
+
+
+def stable_id(node):
+    """``elementId`` when the row has one, else a digest of the properties (same in every run)."""
+    if isinstance(node, dict) and node.get("elementId"):
+        return node["elementId"]
+    text = json.dumps(node, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
 
 
 class GraphVisualizer:
-    def __init__(self, neo4j_graph=None):
-        self.graph = neo4j_graph or graph
+    def __init__(self, neo4j_graph=None, cache_dir=LAYOUT_DIR, page_size=PAGE_SIZE):
+        self.graph = neo4j_graph or get_graph()
+        self.cache_dir = Path(cache_dir)
+        self.page_size = page_size
+        self._overview = None
+        self._lock = threading.Lock()
 
     def visualize_subgraph(self, query, output_file):
         """Visualize a subgraph using PyVis"""
+        from pyvis.network import Network
         query = query or """
         MATCH (n)-[r]->(m)
         RETURN n, r, m
@@ -32,14 +115,13 @@ class GraphVisualizer:
             node2 = record["m"]
             rel = record["r"]
 
-            # Fallback: use elementId or hash as ID since 'id' may not be present
-            node1_id = node1.get("elementId") or str(hash(str(node1)))
+            node1_id = stable_id(node1)
             if node1_id not in seen_nodes:
                 label1 = node1.get("name") or "Node"
                 net.add_node(node1_id, label=label1, title=str(node1), shape="dot")
                 seen_nodes.add(node1_id)
 
-            node2_id = node2.get("elementId") or str(hash(str(node2)))
+            node2_id = stable_id(node2)
             if node2_id not in seen_nodes:
                 label2 = node2.get("name") or "Node"
                 net.add_node(node2_id, label=label2, title=str(node2), shape="dot")
@@ -47,7 +129,10 @@ class GraphVisualizer:
 
             # Add edge
             try:
-                rel_label = rel.get("type", "REL") if isinstance(rel, dict) else getattr(rel, "type", "REL")
+                if isinstance(rel, tuple):          # Neo4jGraph returns (start, type, end)
+                    rel_label = rel[1]
+                else:
+                    rel_label = rel.get("type", "REL") if isinstance(rel, dict) else getattr(rel, "type", "REL")
                 net.add_edge(node1_id, node2_id, label=rel_label, title=str(rel))
             except Exception as e:
                 print(f"Error adding edge: {e}")
@@ -56,12 +141,216 @@ class GraphVisualizer:
         print(f"Graph saved to {output_file}")
         return net
 
+    # ── streamed fetches ──
+    def _iter_pages(self, query, page_size=None):
+        page_size = page_size or self.page_size
+        after = ""
+        while True:
+            page = self.graph.query(query, {"after": after, "limit": page_size})
+            yield from page
+            if len(page) < page_size:
+                return
+            after = page[-1]["id"]
 
-if __name__ == "__main__":
+    def iter_nodes(self, page_size=None):
+        """Lazily yields ``{id, labels, name}``, one keyset page in memory at a time."""
+        return self._iter_pages(NODE_PAGE_QUERY, page_size)
+
+    def iter_edges(self, page_size=None):
+        """Lazily yields ``{id, type, source, target}``, one keyset page in memory at a time."""
+        return self._iter_pages(EDGE_PAGE_QUERY, page_size)
+
+    def page(self, kind, after="", limit=None):
+        """One keyset page of ``nodes`` or ``edges`` (what ``GET /page`` serves)."""
+        query = NODE_PAGE_QUERY if kind == "nodes" else EDGE_PAGE_QUERY
+        rows = self.graph.query(query, {"after": after, "limit": limit or self.page_size})
+        return {"rows": rows, "next": rows[-1]["id"] if rows else None}
+
+    # ── level of detail ──
+    def overview(self):
+        """The communities and layout for the current graph version, from disk when cached."""
+        version = read_version(self.graph)
+        with self._lock:
+            if self._overview is not None and self._overview.version == version:
+                return self._overview
+            path = self.cache_dir / f"overview_v{version}.npz"
+            if path.exists():
+                self._overview = GraphOverview.load(path)
+            else:
+                self._overview = GraphOverview.from_stream(self.iter_nodes(), self.iter_edges(), version)
+                for stale in self.cache_dir.glob("overview_v*.npz"):
+                    stale.unlink()
+                self._overview.save(path)
+            return self._overview
+
+    def _groups(self, level):
+        overview = self.overview()
+        if level == "label":
+            names, group = np.unique(np.array(overview.labels, dtype=str), return_inverse=True)
+            return overview, group, [f"label:{n}" for n in names], [str(n) for n in names]
+        if level != "community":
+            raise ValueError(f"Unknown level {level!r}; expected 'community' or 'label'")
+        k = len(overview.community_sizes)
+        return (overview, overview.community, [f"community:{c}" for c in range(k)],
+                [overview.community_name(c) for c in range(k)])
+
+    def collapsed(self, level="community", max_groups=MAX_GROUPS):
+        """vis.js ``{nodes, edges}`` with one node per group (largest *max_groups*)."""
+        overview, group, ids, names = self._groups(level)
+        sizes = np.bincount(group, minlength=len(ids))
+        shown = np.argsort(-sizes, kind="stable")[:max_groups]
+        visible = np.zeros(len(ids), dtype=bool)
+        visible[shown] = True
+        nodes = []
+        for g in shown:
+            members = group == g
+            x, y = overview.positions[members].mean(axis=0)
+            nodes.append({"id": ids[g], "label": names[g], "title": f"{sizes[g]} nodes – click to expand",
+                          "x": float(x), "y": float(y), "value": int(sizes[g]), "group": level,
+                          "physics": False})
+        a, b = group[overview.src].astype(np.int64), group[overview.dst].astype(np.int64)
+        keep = (a != b) & visible[a] & visible[b]
+        pairs, weights = np.unique(a[keep] * len(ids) + b[keep], return_counts=True)
+        edges = [{"id": f"{ids[p // len(ids)]}->{ids[p % len(ids)]}", "from": ids[p // len(ids)],
+                  "to": ids[p % len(ids)], "value": int(w), "title": f"{w} relationships"}
+                 for p, w in zip(pairs.tolist(), weights.tolist())]
+        return {"nodes": nodes, "edges": edges}
+
+    def _node(self, overview, i):
+        x, y = overview.positions[i]
+        return {"id": overview.ids[i], "label": overview.names[i], "title": overview.labels[i],
+                "x": float(x), "y": float(y), "group": overview.labels[i], "physics": False}
+
+    def expand(self, node_id, limit=EXPAND_LIMIT):
+        """Members of a collapsed group, or the live neighbourhood of a node, as vis.js ``{nodes, edges}``."""
+        overview = self.overview()
+        if node_id.startswith(("community:", "label:")):
+            kind, _, key = node_id.partition(":")
+            if kind == "community":
+                members = overview.members(int(key), limit)
+            else:
+                members = np.flatnonzero(np.array(overview.labels, dtype=str) == key)
+                members = members[np.argsort(-overview.degree[members], kind="stable")][:limit]
+            inside = np.zeros(len(overview.ids), dtype=bool)
+            inside[members] = True
+            rels = np.flatnonzero(inside[overview.src] & inside[overview.dst])[:4 * limit]
+            return {"nodes": [self._node(overview, i) for i in members.tolist()],
+                    "edges": [{"id": overview.edge_ids[e], "from": overview.ids[overview.src[e]],
+                               "to": overview.ids[overview.dst[e]], "label": overview.types[e]}
+                              for e in rels.tolist()]}
+
+        # a real node: fresh from the graph, placed by the cached layout when known
+        centre = overview.positions[overview.index[node_id]] if node_id in overview.index else np.zeros(2)
+        rows = self.graph.query(NEIGHBOURHOOD_QUERY, {"id": node_id, "limit": limit})
+        nodes, edges = {}, []
+        for n, row in enumerate(rows):
+            if row["id"] not in nodes:
+                if row["id"] in overview.index:
+                    nodes[row["id"]] = self._node(overview, overview.index[row["id"]])
+                else:
+                    angle = 2 * np.pi * n / max(len(rows), 1)
+                    nodes[row["id"]] = {"id": row["id"], "label": row["name"] or row["labels"][0],
+                                        "title": row["labels"][0], "group": row["labels"][0], "physics": False,
+                                        "x": float(centre[0] + 150 * np.cos(angle)),
+                                        "y": float(centre[1] + 150 * np.sin(angle))}
+            edges.append({"id": row["rel_id"], "from": row["source"], "to": row["target"], "label": row["type"]})
+        return {"nodes": list(nodes.values()), "edges": edges}
+
+    def overview_html(self, level="community", endpoint="", max_groups=MAX_GROUPS):
+        """The collapsed graph as a PyVis page whose clicks call ``<endpoint>expand``."""
+        from pyvis.network import Network
+        net = Network(height="900px", width="100%", notebook=False, directed=True, cdn_resources="remote")
+        net.toggle_physics(False)
+        view = self.collapsed(level, max_groups)
+        for node in view["nodes"]:
+            net.add_node(node.pop("id"), **node)
+        for edge in view["edges"]:
+            net.add_edge(edge.pop("from"), edge.pop("to"), **edge)
+        html = net.generate_html()
+        return html.replace("</body>", EXPAND_SCRIPT % {"endpoint": json.dumps(endpoint)} + "</body>")
+
+    def visualize_overview(self, output_file, level="community", endpoint="http://127.0.0.1:8765/"):
+        Path(output_file).write_text(self.overview_html(level, endpoint), encoding="utf-8")
+        print(f"Overview saved to {output_file} (expansion needs the endpoint at {endpoint})")
+
+    def serve(self, port=8765, host="127.0.0.1", level="community"):
+        """
+        Serves the overview page and its JSON endpoints from a daemon thread:
+        ``/`` (the page), ``/overview``, ``/expand?id=`` and
+        ``/page?kind=nodes|edges&after=&limit=``.  Returns the server.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        visualizer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, body, content_type):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                # The standalone overview.html is opened from file://, whose fetches
+                # carry `Origin: null`; other websites get no CORS grant to the graph
+                if self.headers.get("Origin") == "null":
+                    self.send_header("Access-Control-Allow-Origin", "null")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                try:
+                    limit = int(query["limit"]) if "limit" in query else None
+                    if url.path == "/":
+                        html = visualizer.overview_html(query.get("level", level))
+                        self._send(html.encode("utf-8"), "text/html; charset=utf-8")
+                        return
+                    if url.path == "/overview":
+                        data = visualizer.collapsed(query.get("level", level), limit or MAX_GROUPS)
+                    elif url.path == "/expand" and "id" in query:
+                        data = visualizer.expand(query["id"], limit or EXPAND_LIMIT)
+                    elif url.path == "/page":
+                        data = visualizer.page(query.get("kind", "nodes"), query.get("after", ""), limit)
+                    else:
+                        self.send_error(404)
+                        return
+                except (KeyError, ValueError) as e:
+                    self.send_error(400, str(e))
+                    return
+                self._send(json.dumps(data, default=str).encode("utf-8"), "application/json")
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True, name="graph-visualizer").start()
+        return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Level-of-detail views of the GEO graph")
+    parser.add_argument("--query", default=None, help="render this Cypher subgraph (n, r, m) instead")
+    parser.add_argument("--level", choices=("community", "label"), default="community")
+    parser.add_argument("--serve", type=int, default=None, metavar="PORT",
+                        help="serve the overview with expand-on-click")
+    args = parser.parse_args(argv)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
     viz = GraphVisualizer()
+    if args.query:
+        viz.visualize_subgraph(args.query, str(output_dir / "formats_graph.html"))
+        return
+    overview = viz.overview()
+    print(f"{len(overview.ids)} nodes, {len(overview.edge_ids)} relationships, "
+          f"{len(overview.community_sizes)} communities (graph v{overview.version})")
+    if args.serve is None:
+        viz.visualize_overview(str(output_dir / "overview.html"), args.level)
+        return
+    server = viz.serve(args.serve, level=args.level)
+    print(f"Serving http://127.0.0.1:{args.serve}/ – Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
 
-    # Visualize specific subgraph and save to that path
-    viz.visualize_subgraph("""
-        MATCH (n)-[r]->(m)
-        RETURN n, r, m
-    """, str(output_dir / "formats_graph.html"))
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
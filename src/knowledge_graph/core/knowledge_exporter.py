@@ -1,22 +1,116 @@
-from neo4j import GraphDatabase
+import argparse
+import json
 import os
+from urllib.parse import quote
 
-class CurveGraphLoader:
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+from ..loaders.curve_graph_loader import CurveGraphLoader as _CurveGraphLoader
 
-    def close(self):
-        self.driver.close()
+EXPORT_PAGE_SIZE = 1000
+
+RDF_BASE = "http://geologix.com/geo-kg/"
+RDF_TYPE = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+# Keyset pagination: each page resumes after the last element id seen, so
+# no page depends on SKIP over everything already exported.
+NODE_PAGE_QUERY = """
+MATCH (n) WHERE elementId(n) > $after
+RETURN elementId(n) AS id, labels(n) AS labels, properties(n) AS props
+ORDER BY id LIMIT $limit
+"""
+
+RELATIONSHIP_PAGE_QUERY = """
+MATCH (a)-[r]->(b) WHERE elementId(r) > $after
+RETURN elementId(r) AS id, type(r) AS rel_type, properties(r) AS props,
+       elementId(a) AS a_id, labels(a) AS a_labels, properties(a) AS a_props,
+       elementId(b) AS b_id, labels(b) AS b_labels, properties(b) AS b_props
+ORDER BY id LIMIT $limit
+"""
+
+
+# ───────────────────────────── formatters ─────────────────────────────────
+def _props_text(props):
+    return ', '.join(f"{k}: {v}" for k, v in props.items())
+
+
+def format_node_text(node):
+    return f"Node ({', '.join(node['labels'])}) with properties: {_props_text(node['props'])}"
+
+
+def format_relationship_text(rel):
+    return (
+        f"Relationship ({rel['rel_type']}) from ({', '.join(rel['a_labels'])} - {_props_text(rel['a_props'])}) "
+        f"to ({', '.join(rel['b_labels'])} - {_props_text(rel['b_props'])}) with properties: {_props_text(rel['props'])}"
+    )
+
+
+def format_text(nodes, relationships):
+    """The original plain-text dump, one line per node/relationship."""
+    for node in nodes:
+        yield format_node_text(node)
+    for rel in relationships:
+        yield format_relationship_text(rel)
+
+
+def format_jsonl(nodes, relationships):
+    for node in nodes:
+        yield json.dumps({"kind": "node", **node}, ensure_ascii=False, default=str)
+    for rel in relationships:
+        yield json.dumps({"kind": "relationship", **rel}, ensure_ascii=False, default=str)
+
+
+def _iri(kind, value):
+    return f"<{RDF_BASE}{kind}/{quote(str(value), safe='')}>"
+
+
+def _literal(value):
+    if isinstance(value, bool):
+        return f'"{str(value).lower()}"^^<{XSD}boolean>'
+    if isinstance(value, int):
+        return f'"{value}"^^<{XSD}integer>'
+    if isinstance(value, float):
+        return f'"{value!r}"^^<{XSD}double>'
+    text = str(value)
+    text = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+    return f'"{text}"'
 
-    def run_cypher_file(self, filepath):
-        with self.driver.session() as session:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                cypher_commands = f.read()
-                for query in cypher_commands.split(';'):
-                    query = query.strip()
-                    if query:
-                        session.run(query)
 
+def _node_triples(node_id, labels, props):
+    subject = _iri("node", node_id)
+    for label in labels:
+        yield f"{subject} {RDF_TYPE} {_iri('label', label)} ."
+    for key, value in props.items():
+        for item in value if isinstance(value, list) else [value]:
+            yield f"{subject} {_iri('property', key)} {_literal(item)} ."
+
+
+def format_ntriples(nodes, relationships):
+    """
+    N-Triples: each node becomes an IRI typed by its labels with one triple
+    per property; each relationship becomes a single subject–predicate–object
+    triple (relationship properties have no plain-triple equivalent and are
+    left out).
+    """
+    for node in nodes:
+        yield from _node_triples(node["id"], node["labels"], node["props"])
+    for rel in relationships:
+        yield f"{_iri('node', rel['a_id'])} {_iri('relationship', rel['rel_type'])} {_iri('node', rel['b_id'])} ."
+
+
+EXPORT_FORMATS = {
+    "text": format_text,
+    "jsonl": format_jsonl,
+    "nt": format_ntriples,
+}
+
+
+def format_for_path(path):
+    """Guesses the export format from the output file extension."""
+    ext = os.path.splitext(str(path))[1].lower()
+    return {".jsonl": "jsonl", ".nt": "nt"}.get(ext, "text")
+
+
+class CurveGraphLoader(_CurveGraphLoader):
     def extract_graph_data(self):
         with self.driver.session() as session:
             nodes = session.run("MATCH (n) RETURN labels(n) AS labels, properties(n) AS props")
@@ -32,33 +126,67 @@ class CurveGraphLoader:
             return node_list, rel_list
 
     def format_data_for_llm(self, node_list, rel_list):
-        docs = []
-
-        for node in node_list:
-            label = ', '.join(node["labels"])
-            props = ', '.join(f"{k}: {v}" for k, v in node["props"].items())
-            docs.append(f"Node ({label}) with properties: {props}")
-
-        for rel in rel_list:
-            a_label = ', '.join(rel["a_labels"])
-            b_label = ', '.join(rel["b_labels"])
-            a_props = ', '.join(f"{k}: {v}" for k, v in rel["a_props"].items())
-            b_props = ', '.join(f"{k}: {v}" for k, v in rel["b_props"].items())
-            r_type = rel["rel_type"]
-            r_props = ', '.join(f"{k}: {v}" for k, v in rel["props"].items())
-            docs.append(
-                f"Relationship ({r_type}) from ({a_label} - {a_props}) "
-                f"to ({b_label} - {b_props}) with properties: {r_props}"
-            )
-        return docs
+        return list(format_text(node_list, rel_list))
 
     def save_docs_to_file(self, docs, output_path="graph_knowledge.txt"):
         with open(output_path, 'w', encoding='utf-8') as f:
             for doc in docs:
                 f.write(doc + "\n")
 
+    # ── streaming export ──
+    def _iter_pages(self, query, page_size):
+        after = ""
+        with self.driver.session() as session:
+            while True:
+                page = session.execute_read(
+                    lambda tx: tx.run(query, after=after, limit=page_size).data()
+                )
+                yield from page
+                if len(page) < page_size:
+                    return
+                after = page[-1]["id"]
+
+    def iter_nodes(self, page_size=EXPORT_PAGE_SIZE):
+        """Lazily yields node dicts, one keyset page in memory at a time."""
+        return self._iter_pages(NODE_PAGE_QUERY, page_size)
+
+    def iter_relationships(self, page_size=EXPORT_PAGE_SIZE):
+        """Lazily yields relationship dicts, one keyset page in memory at a time."""
+        return self._iter_pages(RELATIONSHIP_PAGE_QUERY, page_size)
+
+    def stream_export(self, output_path, fmt=None, page_size=EXPORT_PAGE_SIZE):
+        """
+        Writes the whole graph to *output_path* without materialising it.
+
+        Args:
+            output_path (str): Destination file.
+            fmt (str | None): One of ``text``, ``jsonl`` or ``nt``; guessed
+                from the file extension when omitted.
+            page_size (int): Records fetched per round trip.
+
+        Returns:
+            int: Number of lines written.
+        """
+        fmt = fmt or format_for_path(output_path)
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}; expected one of {sorted(EXPORT_FORMATS)}")
+        lines = EXPORT_FORMATS[fmt](self.iter_nodes(page_size), self.iter_relationships(page_size))
+
+        count = 0
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for line in lines:
+                f.write(line + "\n")
+                count += 1
+        return count
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the GEO knowledge graph")
+    parser.add_argument("--output", default="./text_files/graph_knowledge.txt")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default=None)
+    parser.add_argument("--page-size", type=int, default=EXPORT_PAGE_SIZE)
+    args = parser.parse_args()
+
     # Configure Neo4j credentials from environment
     uri = os.getenv("NEO4J_URI")
     user = os.getenv("NEO4J_USERNAME")
@@ -72,10 +200,8 @@ if __name__ == "__main__":
     loader.run_cypher_file("./cypher/unique_curves/nodes.cypher")
     loader.run_cypher_file("./cypher/unique_curves/relationships.cypher")
 
-    # Extract and format knowledge
-    nodes, relationships = loader.extract_graph_data()
-    docs = loader.format_data_for_llm(nodes, relationships)
-    loader.save_docs_to_file(docs, "./text_files/graph_knowledge.txt")
+    # Stream knowledge straight to disk
+    written = loader.stream_export(args.output, args.format, args.page_size)
 
     loader.close()
-    print("Graph loaded and knowledge exported for LLM.")
+    print(f"Graph loaded and {written} lines exported to {args.output}.")
@@ -0,0 +1,267 @@
+"""
+bulk_loader.py
+==============
+
+Shared bulk-load engine for the GEO knowledge graph.
+
+Node and relationship records are grouped by shape (label/type and merge
+key) and written through parameterised ``UNWIND $rows`` statements, one
+explicit transaction per batch.  Transient failures are retried with
+exponential backoff and every call returns a :class:`LoadStats` summary.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+from .cypher_script import _SCHEMA, split_script
+from ...qa_bot.core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+
+
+# ───────────────────────────── records ────────────────────────────────────
+@dataclass
+class NodeRecord:
+    """A node to MERGE on ``key`` and then update with ``properties``."""
+    label: str
+    key: Dict[str, Any]
+    properties: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class RelationshipRecord:
+    """A relationship between two nodes identified by label and merge key."""
+    type: str
+    start_label: str
+    start_key: Dict[str, Any]
+    end_label: str
+    end_key: Dict[str, Any]
+    properties: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class LoadStats:
+    rows: int = 0
+    batches: int = 0
+    retries: int = 0
+    failures: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def merge(self, other: "LoadStats") -> "LoadStats":
+        self.rows += other.rows
+        self.batches += other.batches
+        self.retries += other.retries
+        self.failures += other.failures
+        self.seconds += other.seconds
+        self.errors.extend(other.errors)
+        return self
+
+    def __str__(self) -> str:
+        return (
+            f"{self.rows} rows in {self.batches} batches "
+            f"({self.retries} retries, {self.failures} failures) "
+            f"in {self.seconds:.2f}s – {self.rows_per_second:,.0f} rows/s"
+        )
+
+
+# ───────────────────────────── cypher helpers ─────────────────────────────
+def quote_identifier(name: str) -> str:
+    """Backtick-quotes a label, type or property name for safe interpolation."""
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _key_pattern(fields: Tuple[str, ...], source: str) -> str:
+    return "{" + ", ".join(f"{quote_identifier(f)}: {source}.{quote_identifier(f)}" for f in fields) + "}"
+
+
+def node_merge_query(label: str, key_fields: Tuple[str, ...], updates: Sequence[str] = ()) -> str:
+    """*updates* are extra clauses on ``n`` run after its properties are set."""
+    return "\n".join([
+        "UNWIND $rows AS row",
+        f"MERGE (n:{quote_identifier(label)} {_key_pattern(key_fields, 'row.key')})",
+        "SET n += row.props",
+        *updates,
+    ])
+
+
+def relationship_merge_query(
+    rel_type: str,
+    start_label: str,
+    start_fields: Tuple[str, ...],
+    end_label: str,
+    end_fields: Tuple[str, ...],
+) -> str:
+    return (
+        "UNWIND $rows AS row\n"
+        f"MATCH (a:{quote_identifier(start_label)} {_key_pattern(start_fields, 'row.start')})\n"
+        f"MATCH (b:{quote_identifier(end_label)} {_key_pattern(end_fields, 'row.end')})\n"
+        f"MERGE (a)-[r:{quote_identifier(rel_type)}]->(b)\n"
+        "SET r += row.props"
+    )
+
+
+def is_schema_statement(statement: str) -> bool:
+    """Index/constraint DDL, which cannot share a transaction with data writes."""
+    return bool(_SCHEMA.match(statement))
+
+
+def split_statements(script: str) -> List[str]:
+    """Statements of a Cypher script, tokenized so ``;`` in strings and comments is kept."""
+    return [statement.text for statement in split_script(script)]
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+# ───────────────────────────── loader ─────────────────────────────────────
+class BulkLoader:
+    """
+    Batched writer around a ``neo4j.Driver``.
+
+    Args:
+        driver: An open Neo4j driver (or anything with the same session API).
+        batch_size: Rows (or statements) per transaction.
+        max_retries: Retries per batch on transient errors.
+        backoff: Initial retry delay in seconds, doubled on every attempt.
+        database: Target database name; ``None`` uses the server default.
+        node_updates: Clauses on ``n`` appended to every node MERGE, e.g.
+            :data:`text_indexes.KEY_UPDATES` to keep derived keys current.
+    """
+
+    def __init__(self, driver, batch_size: int = 1000, max_retries: int = 3,
+                 backoff: float = 0.5, database: Optional[str] = None,
+                 node_updates: Sequence[str] = ()):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.driver = driver
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.database = database
+        self.node_updates = tuple(node_updates)
+
+    # ── public API ──
+    def load_nodes(self, records: Iterable[NodeRecord]) -> LoadStats:
+        groups: Dict[Tuple[str, Tuple[str, ...]], List[dict]] = {}
+        for rec in records:
+            shape = (rec.label, tuple(sorted(rec.key)))
+            groups.setdefault(shape, []).append({"key": rec.key, "props": rec.properties})
+
+        stats = LoadStats()
+        for (label, key_fields), rows in groups.items():
+            stats.merge(self.write_rows(node_merge_query(label, key_fields, self.node_updates), rows))
+        return stats
+
+    def load_relationships(self, records: Iterable[RelationshipRecord]) -> LoadStats:
+        groups: Dict[tuple, List[dict]] = {}
+        for rec in records:
+            shape = (rec.type, rec.start_label, tuple(sorted(rec.start_key)),
+                     rec.end_label, tuple(sorted(rec.end_key)))
+            groups.setdefault(shape, []).append(
+                {"start": rec.start_key, "end": rec.end_key, "props": rec.properties}
+            )
+
+        stats = LoadStats()
+        for shape, rows in groups.items():
+            stats.merge(self.write_rows(relationship_merge_query(*shape), rows))
+        return stats
+
+    def write_rows(self, query: str, rows: Iterable[dict]) -> LoadStats:
+        """Runs *query* once per batch with the batch bound to ``$rows``."""
+        stats = LoadStats()
+        start = time.perf_counter()
+        with span("loader.write_rows", cypher=query) as s:
+            for batch in _chunks(rows, self.batch_size):
+                self._run_batch([(query, {"rows": batch})], len(batch), stats)
+            stats.seconds = time.perf_counter() - start
+            s.set(rows=stats.rows, batches=stats.batches, retries=stats.retries, failures=stats.failures)
+        return stats
+
+    def run_statements(self, statements: Iterable[str],
+                       timings: Optional[List[Tuple[str, float]]] = None) -> LoadStats:
+        """
+        Runs literal Cypher statements, ``batch_size`` per explicit
+        transaction.  Schema statements get a transaction of their own.
+        ``(statement, seconds)`` of every committed statement is appended
+        to *timings* when given.
+        """
+        stats = LoadStats()
+        start = time.perf_counter()
+        pending: List[Tuple[str, dict]] = []
+        for statement in statements:
+            if is_schema_statement(statement):
+                if pending:
+                    self._run_batch(pending, len(pending), stats, timings)
+                    pending = []
+                self._run_batch([(statement, {})], 1, stats, timings)
+                continue
+            pending.append((statement, {}))
+            if len(pending) == self.batch_size:
+                self._run_batch(pending, len(pending), stats, timings)
+                pending = []
+        if pending:
+            self._run_batch(pending, len(pending), stats, timings)
+        stats.seconds = time.perf_counter() - start
+        return stats
+
+    def run_cypher_file(self, filepath) -> LoadStats:
+        with span("loader.cypher_file", path=str(filepath)) as s:
+            with open(filepath, "r", encoding="utf-8") as f:
+                stats = self.run_statements(split_statements(f.read()))
+            s.set(statements=stats.rows, batches=stats.batches, retries=stats.retries,
+                  failures=stats.failures)
+            return stats
+
+    # ── internals ──
+    def _run_batch(self, work: List[Tuple[str, dict]], rows: int, stats: LoadStats,
+                   timings: Optional[List[Tuple[str, float]]] = None) -> None:
+        with span("neo4j.batch", statements=len(work), rows=rows) as s:
+            retries, failures = stats.retries, stats.failures
+            self._run_batch_with_retries(work, rows, stats, timings)
+            s.set(retries=stats.retries - retries, failed=stats.failures > failures)
+
+    def _run_batch_with_retries(self, work: List[Tuple[str, dict]], rows: int, stats: LoadStats,
+                                timings: Optional[List[Tuple[str, float]]] = None) -> None:
+        for attempt in range(self.max_retries + 1):
+            attempt_timings = []
+            try:
+                with self.driver.session(database=self.database) as session:
+                    with session.begin_transaction() as tx:
+                        for query, params in work:
+                            start = time.perf_counter()
+                            tx.run(query, params).consume()
+                            attempt_timings.append((query, time.perf_counter() - start))
+                        tx.commit()
+            except RETRYABLE_ERRORS as exc:
+                if attempt < self.max_retries:
+                    stats.retries += 1
+                    delay = self.backoff * (2 ** attempt)
+                    logger.warning("Transient error on batch (attempt %d), retrying in %.1fs: %s",
+                                   attempt + 1, delay, exc)
+                    time.sleep(delay)
+                    continue
+                stats.failures += 1
+                stats.errors.append(str(exc))
+                logger.error("Batch of %d rows failed after %d retries: %s", rows, self.max_retries, exc)
+                return
+            stats.batches += 1
+            stats.rows += rows
+            if timings is not None:
+                timings.extend(attempt_timings)
+            return
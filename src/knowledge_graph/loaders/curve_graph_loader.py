@@ -1,22 +1,42 @@
 from neo4j import GraphDatabase
 import os
 
+from .bulk_loader import BulkLoader
+from .migrations import MigrationRunner
+from .text_indexes import KEY_UPDATES
+from ...qa_bot.core.graph_version import bump_version
+
 class CurveGraphLoader:
-    def __init__(self, uri, user, password):
+    def __init__(self, uri, user, password, batch_size=1000):
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.bulk = BulkLoader(self.driver, batch_size=batch_size, node_updates=KEY_UPDATES)
     
+    @classmethod
+    def from_driver(cls, driver, batch_size=1000):
+        """Wraps an existing driver (or a test double) instead of connecting."""
+        loader = cls.__new__(cls)
+        loader.driver = driver
+        loader.bulk = BulkLoader(driver, batch_size=batch_size, node_updates=KEY_UPDATES)
+        return loader
+
     def close(self):
         self.driver.close()
 
-    def run_cypher_file(self, filepath):
-        with self.driver.session() as session:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                cypher_commands = f.read()
-                # Run individual queries split by semicolon
-                for query in cypher_commands.split(';'):
-                    query = query.strip()
-                    if query:
-                        session.run(query)
+    def run_cypher_file(self, filepath, force=False):
+        # Skipped when the migration ledger has this version of the script;
+        # otherwise run phase by phase in batched transactions
+        report = MigrationRunner(self.driver, batch_size=self.bulk.batch_size).apply([filepath], force)
+        print(f"{filepath}: {report}")
+        if report.changed:
+            bump_version(self.driver)         # invalidates cached answers
+        return report.stats
+
+    def load_records(self, nodes=(), relationships=()):
+        """Bulk-loads NodeRecord/RelationshipRecord batches via UNWIND."""
+        stats = self.bulk.load_nodes(nodes)
+        stats = stats.merge(self.bulk.load_relationships(relationships))
+        bump_version(self.driver)
+        return stats
 
 if __name__ == "__main__":
     # Configure connection details
@@ -0,0 +1,166 @@
+"""
+cypher_script.py
+================
+
+Statement-level parsing of ``.cypher`` files.
+
+:func:`split_script` tokenizes a script instead of splitting on every
+``;``.  Semicolons inside string literals, backtick identifiers and
+comments are left alone, and comments are dropped.  Each statement carries
+its starting line, its phase and the labels and relationship types it
+touches.  The phase is one of:
+
+* ``schema``: index and constraint DDL; it cannot share a transaction with data
+* ``write``: anything that creates, merges, sets, removes or deletes
+* ``read``: everything else
+
+:func:`split_script` raises :class:`CypherScriptError` on an unterminated
+string or comment.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import FrozenSet, List
+
+SCHEMA, WRITE, READ = "schema", "write", "read"
+PHASES = (SCHEMA, WRITE, READ)
+
+# Index/constraint DDL, e.g. CREATE VECTOR INDEX x IF NOT EXISTS FOR ...
+_SCHEMA = re.compile(r"^\s*(CREATE|DROP)\b(\s+OR\s+REPLACE)?(\s+\w+)*?\s+(INDEX|CONSTRAINT)\b", re.IGNORECASE)
+_CREATE_SCHEMA = re.compile(
+    r"^(\s*CREATE(?:\s+OR\s+REPLACE)?(?:\s+(?!INDEX\b|CONSTRAINT\b)\w+)*?\s+(?:INDEX|CONSTRAINT))"
+    r"(\s+(?!IF\b|FOR\b|ON\b)(?:`[^`]+`|\w+))?(?!\s+IF\s+NOT\s+EXISTS)",
+    re.IGNORECASE)
+_WRITE = re.compile(r"\b(CREATE|MERGE|SET|DELETE|REMOVE|FOREACH|LOAD\s+CSV|CALL)\b", re.IGNORECASE)
+_CREATE_CLAUSE = re.compile(r"\b(ON\s+)?CREATE\b", re.IGNORECASE)       # ON CREATE SET belongs to a MERGE
+_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_MAP = re.compile(r"\{[^{}]*\}")
+_NODE = re.compile(r"\(\s*(\w*)\s*((?::\s*(?:`[^`]+`|\w+)\s*)*)[^()]*\)")
+_LABEL = re.compile(r"[:|]\s*(`[^`]+`|\w+)")
+
+
+class CypherScriptError(ValueError):
+    """A script that cannot be tokenized."""
+
+
+@dataclass(frozen=True)
+class Statement:
+    text: str
+    line: int
+    phase: str
+    footprint: FrozenSet[str] = field(default_factory=frozenset)
+    unbounded: bool = False       # touches nodes of any label, so conflicts with every write
+
+    @property
+    def summary(self) -> str:
+        return " ".join(self.text.split())[:80]
+
+
+def _code(text: str) -> str:
+    """*text* with string literals emptied and maps removed, for keyword and label scans."""
+    code = _LITERAL.sub("''", text)
+    while True:
+        reduced = _MAP.sub(" ", code)
+        if reduced == code:
+            return code
+        code = reduced
+
+
+def classify(text: str) -> str:
+    code = _code(text)
+    if _SCHEMA.match(code):
+        return SCHEMA
+    return WRITE if _WRITE.search(code) else READ
+
+
+def rerunnable(text: str) -> bool:
+    """False for a write with a bare ``CREATE`` clause, which adds duplicates when run again."""
+    if classify(text) != WRITE:
+        return True
+    return all(m.group(1) for m in _CREATE_CLAUSE.finditer(_code(text)))
+
+
+def footprint(text: str):
+    """``(labels and types named, True if some node pattern has no label)``."""
+    code = _code(text)
+    names = frozenset(name.strip("`") for name in _LABEL.findall(code))
+    labelled = {var for var, labels in _NODE.findall(code) if var and labels}
+    unbounded = any(not labels and (not var or var not in labelled) for var, labels in _NODE.findall(code))
+    return names, unbounded
+
+
+def idempotent_schema(text: str) -> str:
+    """Adds ``IF NOT EXISTS`` to index/constraint creation so a re-run does not fail."""
+    if "IF NOT EXISTS" in _code(text).upper():
+        return text
+    return _CREATE_SCHEMA.sub(lambda m: m.group(1) + (m.group(2) or "") + " IF NOT EXISTS", text, count=1)
+
+
+def _statement(text: str, line: int) -> Statement:
+    phase = classify(text)
+    if phase == SCHEMA:
+        text = idempotent_schema(text)
+    names, unbounded = footprint(text)
+    return Statement(text, line, phase, names, unbounded and phase == WRITE)
+
+
+def split_script(script: str) -> List[Statement]:
+    """Tokenizes *script* into statements; comments are dropped."""
+    statements: List[Statement] = []
+    buf: List[str] = []
+    line, start = 1, None
+    i, n = 0, len(script)
+
+    def emit():
+        text = "".join(buf).strip()
+        if text:
+            statements.append(_statement(text, start))
+        buf.clear()
+
+    while i < n:
+        c = script[i]
+        if c in "'\"`":
+            j = i + 1
+            while j < n and script[j] != c:
+                j += 2 if script[j] == "\\" and c != "`" else 1
+            if j >= n:
+                raise CypherScriptError(f"Unterminated {c} literal starting on line {line}")
+            chunk = script[i:j + 1]
+            start = start or line
+            buf.append(chunk)
+            line += chunk.count("\n")
+            i = j + 1
+        elif script.startswith("//", i):
+            j = script.find("\n", i)
+            i = n if j < 0 else j
+        elif script.startswith("/*", i):
+            j = script.find("*/", i + 2)
+            if j < 0:
+                raise CypherScriptError(f"Unterminated comment starting on line {line}")
+            line += script.count("\n", i, j)
+            buf.append(" ")
+            i = j + 2
+        elif c == ";":
+            emit()
+            start = None
+            i += 1
+        else:
+            if c == "\n":
+                line += 1
+            elif start is None and not c.isspace():
+                start = line
+            buf.append(c)
+            i += 1
+    emit()
+    return statements
+
+
+def checksum(statements: List[Statement]) -> str:
+    """Changes when a statement does; comments and blank lines do not count."""
+    digest = hashlib.sha256()
+    for statement in statements:
+        digest.update(statement.text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
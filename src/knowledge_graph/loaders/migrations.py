@@ -0,0 +1,257 @@
+"""
+migrations.py
+=============
+
+Runs ``.cypher`` scripts once.  After a script is applied, a ledger node
+``(:GraphMeta:Migration {key: 'migration:<script>'})`` stores its checksum.
+A later run skips every script whose checksum has not changed, so running
+setup against an up-to-date database costs one ledger read.
+
+Pending scripts run in three phases:
+
+1. ``schema``: DDL, one statement per transaction, made idempotent with
+   ``IF NOT EXISTS``
+2. ``write``: statements are grouped by the labels and relationship types
+   they touch.  Groups that share nothing run concurrently, and each group
+   runs in script order through :class:`BulkLoader`.
+3. ``read``: run last, for their timings only.
+
+A script whose statements all committed is recorded in the ledger.  A
+script that failed stays pending and is retried next time, from its first
+statement.  Only schema DDL is made idempotent; write statements must be
+safe to run again (``MERGE`` rather than ``CREATE``).  A changed or forced
+script that still has a bare ``CREATE`` runs anyway, with a warning in
+:attr:`MigrationReport.warnings`.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .bulk_loader import BulkLoader, LoadStats
+from .cypher_script import READ, SCHEMA, WRITE, Statement, checksum, rerunnable, split_script
+from ...qa_bot.core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+CORE_SCRIPTS = (
+    "cypher/core/00_graph_setup.cypher",
+    "cypher/core/01_create_vector_index.cypher",
+    "cypher/core/02_creating_settings.cypher",
+    "cypher/core/03_text_indexes.cypher",       # last: backfills the lookup keys of everything above
+)
+
+LEDGER_QUERY = """
+MATCH (m:Migration) RETURN m.script AS script, m.checksum AS checksum
+"""
+
+RECORD_QUERY = """
+MERGE (m:GraphMeta:Migration {key: 'migration:' + $script})
+SET m.script = $script, m.checksum = $checksum, m.statements = $statements,
+    m.seconds = $seconds, m.appliedAt = datetime()
+"""
+
+
+@dataclass
+class StatementTiming:
+    script: str
+    line: int
+    phase: str
+    seconds: float
+    summary: str
+
+
+@dataclass
+class MigrationReport:
+    applied: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    warnings: List[str] = field(default_factory=list)
+    timings: List[StatementTiming] = field(default_factory=list)
+    stats: LoadStats = field(default_factory=LoadStats)
+    seconds: float = 0.0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.applied)
+
+    def slowest(self, n: int = 5) -> List[StatementTiming]:
+        return sorted(self.timings, key=lambda t: t.seconds, reverse=True)[:n]
+
+    def __str__(self) -> str:
+        lines = [f"{len(self.applied)} applied, {len(self.skipped)} up to date, "
+                 f"{len(self.failed)} failed in {self.seconds:.2f}s"]
+        lines += [f"  {t.seconds * 1000:8.1f} ms  {t.phase:<6} {t.script}:{t.line}  {t.summary}"
+                  for t in self.slowest()]
+        lines += [f"  failed {script}: {error}" for script, error in self.failed.items()]
+        lines += [f"  warning: {warning}" for warning in self.warnings]
+        return "\n".join(lines)
+
+
+def script_name(path) -> str:
+    """Ledger key: the path relative to the project root when inside it."""
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def write_groups(statements: List[Tuple[str, Statement]]) -> List[List[Tuple[str, Statement]]]:
+    """
+    Splits write statements into groups that share no label or
+    relationship type (union–find over footprints), keeping each group in
+    its original order.  A statement with an unlabelled pattern joins
+    everything.
+    """
+    parent = list(range(len(statements)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner: Dict[str, int] = {}
+    for i, (_, statement) in enumerate(statements):
+        names = statement.footprint | ({"*"} if statement.unbounded else set())
+        for name in names:
+            if name in owner:
+                parent[find(i)] = find(owner[name])
+            else:
+                owner[name] = i
+    if any(statement.unbounded for _, statement in statements):
+        for i in range(len(statements)):
+            parent[find(i)] = find(0)
+
+    groups: Dict[int, List[Tuple[str, Statement]]] = {}
+    for i, item in enumerate(statements):
+        groups.setdefault(find(i), []).append(item)
+    return list(groups.values())
+
+
+class MigrationRunner:
+    """
+    Args:
+        driver: An open Neo4j driver (or :class:`~src.tests.fakes.FakeDriver`).
+        batch_size (int): Statements per write transaction.
+        workers (int): Write groups run at the same time.
+        database (str | None): Target database.
+    """
+
+    def __init__(self, driver, batch_size: int = 100, workers: int = 4, database: Optional[str] = None):
+        self.driver = driver
+        self.bulk = BulkLoader(driver, batch_size=batch_size, database=database)
+        self.workers = workers
+        self.database = database
+
+    def ledger(self) -> Dict[str, str]:
+        with self.driver.session(database=self.database) as session:
+            return {r["script"]: r["checksum"] for r in session.run(LEDGER_QUERY).data()}
+
+    def pending(self, paths: Iterable, force: bool = False):
+        """``(name, checksum, statements, ledger checksum or None)`` per script; none when forced."""
+        applied = {} if force else self.ledger()
+        out = []
+        for path in paths:
+            statements = split_script(Path(path).read_text(encoding="utf-8"))
+            name = script_name(path)
+            out.append((name, checksum(statements), statements, applied.get(name)))
+        return out
+
+    def apply(self, paths: Iterable, force: bool = False) -> MigrationReport:
+        """Runs the scripts in *paths* that changed since they were last applied."""
+        report = MigrationReport()
+        start = time.perf_counter()
+        with span("loader.migrations") as s:
+            scripts = self.pending(paths, force)
+            todo = []
+            for name, digest, statements, previous in scripts:
+                if previous == digest:
+                    report.skipped.append(name)
+                    continue
+                todo.append((name, digest, statements))
+                if force or previous is not None:
+                    for statement in statements:
+                        if not rerunnable(statement.text):
+                            warning = f"{name}:{statement.line} runs a bare CREATE again: {statement.summary}"
+                            report.warnings.append(warning)
+                            logger.warning(warning)
+
+            by_phase: Dict[str, List[Tuple[str, Statement]]] = {SCHEMA: [], WRITE: [], READ: []}
+            for name, _, statements in todo:
+                for statement in statements:
+                    by_phase[statement.phase].append((name, statement))
+
+            self._run_sequential(by_phase[SCHEMA], report)
+            groups = write_groups([(name, st) for name, st in by_phase[WRITE] if name not in report.failed])
+            with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(groups)))) as pool:
+                for future in [pool.submit(self._run_group, group) for group in groups]:
+                    timings, stats, failures = future.result()
+                    report.timings.extend(timings)
+                    report.stats.merge(stats)
+                    report.failed.update({k: v for k, v in failures.items() if k not in report.failed})
+            self._run_sequential(by_phase[READ], report)
+
+            for name, digest, statements in todo:
+                if name in report.failed:
+                    continue
+                seconds = sum(t.seconds for t in report.timings if t.script == name)
+                with self.driver.session(database=self.database) as session:
+                    session.run(RECORD_QUERY, {"script": name, "checksum": digest,
+                                               "statements": len(statements), "seconds": seconds}).consume()
+                report.applied.append(name)
+            report.seconds = time.perf_counter() - start
+            s.set(applied=len(report.applied), skipped=len(report.skipped), failed=len(report.failed),
+                  groups=len(groups), statements=len(report.timings))
+        return report
+
+    # ── internals ──
+    def _run_group(self, group: List[Tuple[str, Statement]]):
+        """Runs one write group in order; returns ``(timings, stats, failed scripts)``."""
+        raw: List[Tuple[str, float]] = []
+        failures: Dict[str, str] = {}
+        try:
+            stats = self.bulk.run_statements([statement.text for _, statement in group], raw)
+        except Exception as e:                  # e.g. a syntax error: the whole group stays pending
+            stats = LoadStats(failures=1, errors=[str(e)])
+        if stats.failures:
+            failures = {name: stats.errors[-1] if stats.errors else "failed" for name, _ in group}
+        return self._timings(group, raw), stats, failures
+
+    def _run_sequential(self, items: List[Tuple[str, Statement]], report: MigrationReport) -> None:
+        for name, statement in items:
+            if name in report.failed:
+                continue
+            timings, stats, failures = self._run_group([(name, statement)])
+            report.timings.extend(timings)
+            report.stats.merge(stats)
+            report.failed.update(failures)
+
+    @staticmethod
+    def _timings(group, raw: List[Tuple[str, float]]) -> List[StatementTiming]:
+        # raw follows the group's order, but only for committed batches
+        pending = {}
+        for name, statement in group:
+            pending.setdefault(statement.text, []).append((name, statement))
+        out = []
+        for text, seconds in raw:
+            name, statement = pending[text].pop(0)
+            out.append(StatementTiming(name, statement.line, statement.phase, seconds, statement.summary))
+        return out
+
+
+def apply_scripts(driver, paths: Iterable = CORE_SCRIPTS, force: bool = False, **kwargs) -> MigrationReport:
+    """Applies *paths* (relative to the project root) and bumps the graph version if anything ran."""
+    from ...qa_bot.core.graph_version import bump_version
+    resolved = [p if Path(p).is_absolute() else PROJECT_ROOT / p for p in paths]
+    report = MigrationRunner(driver, **kwargs).apply(resolved, force)
+    if report.changed:
+        bump_version(driver)                  # invalidates cached answers
+    return report
@@ -0,0 +1,92 @@
+"""
+text_indexes.py
+===============
+
+Generates ``cypher/core/03_text_indexes.cypher``, the setup script behind
+:mod:`src.qa_bot.core.index_rewrite`.  For every label in the schema it
+creates:
+
+* normalised keys: ``nameKey`` / ``fullNameKey`` = ``toLower(trim(...))``,
+  backfilled for existing nodes (a ``BulkLoader`` given ``KEY_UPDATES``
+  keeps them current);
+* a TEXT index per label and key, for equality and CONTAINS / STARTS WITH /
+  ENDS WITH on the key;
+* one full-text index over the descriptive properties of all labels, for
+  lookups whose variable has no label.
+
+Regenerate the script from the live schema after it gains labels; the
+migration ledger sees the new checksum and applies it on the next setup
+run.  The full-text index is dropped and recreated, since ``IF NOT EXISTS``
+would keep the old label list.  Until it covers every label that has named
+nodes, the rewriter does not seed queries from it.
+
+    python -m src.knowledge_graph.loaders.text_indexes                       # schema from Neo4j
+    python -m src.knowledge_graph.loaders.text_indexes --schema-dump src/tests/records.json
+"""
+from __future__ import annotations
+
+import argparse
+import re
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .bulk_loader import quote_identifier
+from .migrations import PROJECT_ROOT
+from ...qa_bot.core.index_rewrite import FULLTEXT_INDEX, FULLTEXT_PROPERTIES, TEXT_KEYS
+
+SCRIPT_PATH = PROJECT_ROOT / "cypher" / "core" / "03_text_indexes.cypher"
+
+# BulkLoader node_updates; a non-string value clears the key instead of failing the batch
+KEY_UPDATES = tuple(
+    f"SET n.{key} = CASE WHEN n.{prop} IS :: STRING THEN toLower(trim(n.{prop})) END"
+    for prop, key in TEXT_KEYS.items()
+)
+
+
+def _index_name(label: str, key: str) -> str:
+    snake = re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", f"{label}_{key}").lower()
+    return re.sub(r"\W+", "_", snake) + "_text"
+
+
+def index_script(structured: Dict[str, Any]) -> str:
+    """The setup script for a ``SchemaService.structured`` schema."""
+    node_props = structured["node_props"]
+    labels = sorted(node_props)
+    has = {label: {p["property"] for p in props} for label, props in node_props.items()}
+    lines: List[str] = [
+        "// Generated by python -m src.knowledge_graph.loaders.text_indexes; edit the generator, not this file.",
+        "",
+        "// Normalised lookup keys (index_rewrite turns '(?i)...' regexes into key lookups)",
+    ]
+    for prop, key in TEXT_KEYS.items():
+        lines.append(f"MATCH (n) WHERE n.{prop} IS NOT NULL SET n.{key} = toLower(trim(n.{prop}));")
+    lines += ["", "// Per-label TEXT indexes on the keys"]
+    for label in labels:
+        for prop, key in TEXT_KEYS.items():
+            if prop in has[label]:
+                lines.append(f"CREATE TEXT INDEX {_index_name(label, key)} IF NOT EXISTS "
+                             f"FOR (n:{quote_identifier(label)}) ON (n.{key});")
+    properties = [p for p in FULLTEXT_PROPERTIES if any(p in has[label] for label in labels)]
+    lines += ["", "// Full-text index for lookups without a label (recreated: its label list may have grown)",
+              f"DROP INDEX {FULLTEXT_INDEX} IF EXISTS;",
+              f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} IF NOT EXISTS",
+              f"FOR (n:{'|'.join(quote_identifier(label) for label in labels)})",
+              f"ON EACH [{', '.join(f'n.{p}' for p in properties)}];"]
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the text-index setup script from the schema")
+    parser.add_argument("--schema-dump", type=Path, default=None,
+                        help="records.json export to take the schema from instead of Neo4j")
+    parser.add_argument("--output", type=Path, default=SCRIPT_PATH)
+    args = parser.parse_args(argv)
+
+    from ...qa_bot.core.kg_schema import SchemaService, get_schema_service
+    schema = (SchemaService.from_dump(args.schema_dump) if args.schema_dump else get_schema_service()).structured
+    args.output.write_text(index_script(schema), encoding="utf-8")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,17 @@ kg_agent.py
 
 ReAct-style LangChain agent that answers questions about the GEO Help Guide.
 Importing this module is **side-effect-free**; the Neo4j connection and agent
-are built lazily when generate_response() is called the first time.
+are built lazily when generate_response() is called the first time, or up
+front via warm_up().
 """
 from __future__ import annotations
 
 import os
-from functools import lru_cache
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 from dotenv import load_dotenv
 
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain.tools import Tool
+from langchain_core.tools import Tool
 from langchain_core.prompts import PromptTemplate
 from langchain_core.prompts import (
     ChatPromptTemplate,
@@ -23,59 +22,66 @@ from langchain_core.prompts import (
     HumanMessagePromptTemplate,
 )
 
-from langchain_neo4j import Neo4jGraph
-from langchain_neo4j.chains.graph_qa.cypher import GraphCypherQAChain
-
-from .llm import llm
+from .answer_cache import AnswerCache
+from .embeddings import get_embeddings
+from .entity_linker import entity_hints
+from .graph import get_graph
+from .graph_snapshot import query_graph
+from .graph_version import VersionWatcher, read_version
+from .kg_schema import get_schema_service
+from .llm import get_llm
+from .resources import registry
+from .tracing import callbacks as tracing_callbacks, span
+from ..tools.cypher_cache import DEFAULT_PLAN_DIR, CachedCypherQA, validate_read_only
+
+if TYPE_CHECKING:                       # langchain.agents alone costs ~1.5s to import
+    from langchain.agents import AgentExecutor
 
 load_dotenv()                           # still safe at import time – just env
 
 # ────────────────────────── generic helpers ──────────────────────────────
-ALIASES = {"curve settings": "CurveSettings", "scales": "Scale", "scale type": "scale_type"}
-
-def resolve_aliases(q: str) -> str:
-    for k, v in ALIASES.items():
-        q = q.replace(k, v)
-    return q
-
 def format_results(rows, *, limit=20) -> str:
     if not rows:
         return "⟨no records⟩"
-    keys = rows[0].keys()
-    lines = [", ".join(f"{k}={row[k]}" for k in keys) for row in rows[:limit]]
-    if len(rows) > limit:
-        lines.append(f"... {len(rows)-limit} more")
-    return "\n".join(lines)
+    with span("agent.format_results", rows=len(rows)):
+        keys = rows[0].keys()
+        lines = [", ".join(f"{k}={row[k]}" for k in keys) for row in rows[:limit]]
+        if len(rows) > limit:
+            lines.append(f"... {len(rows)-limit} more")
+        return "\n".join(lines)
 
 # ───────────────────── lazy singletons (no side-effects) ─────────────────
-@lru_cache(maxsize=1)
-def _graph() -> Neo4jGraph:
-    return Neo4jGraph(
-        url=os.getenv("NEO4J_URI"),
-        username=os.getenv("NEO4J_USERNAME"),
-        password=os.getenv("NEO4J_PASSWORD"),
-    )
-
-@lru_cache(maxsize=1)
-def _graph_cypher_chain() -> GraphCypherQAChain:
-    return GraphCypherQAChain.from_llm(
-        llm,
-        graph=_graph(),
+def _build_graph_cypher_chain() -> CachedCypherQA:
+    from langchain_neo4j.chains.graph_qa.cypher import GraphCypherQAChain
+    get_schema_service()                  # installs the shared schema on the graph
+    chain = GraphCypherQAChain.from_llm(
+        get_llm(),
+        graph=get_graph(),
         verbose=True,
         validate_cypher=True,
+        # CachedCypherQA rejects writes up front and runs the rest in read sessions
         allow_dangerous_requests=True,
     )
+    # Linked entities steer generation to exact-name lookups instead of regex scans
+    return CachedCypherQA(chain, DEFAULT_PLAN_DIR / "kg_info.json", execute=query_graph, hints=entity_hints)
+
+registry.register("kg_cypher_chain", _build_graph_cypher_chain)
 
 def _kg_info(question: str) -> str:
-    try:
-        response = _graph_cypher_chain().invoke({"query": question})
-        return response["result"]
-    except Exception:
-        # fallback for raw Cypher input
-        if question.strip().lower().startswith("match"):
-            rows = _graph().query(question)
-            return format_results(rows)
-        raise
+    with span("agent.kg_info") as s:
+        try:
+            get_schema_service().current()    # rebuilds the chain if the schema moved
+            response = registry.get("kg_cypher_chain").invoke({"query": question})
+            return response["result"]
+        except Exception as e:
+            # fallback for raw Cypher input
+            if question.strip().lower().startswith("match"):
+                s.set(fallback=type(e).__name__)
+                with span("neo4j.query", cypher=question) as q:
+                    rows = query_graph(validate_read_only(question))
+                    q.set(rows=len(rows))
+                return format_results(rows)
+            raise
 
 # ───────────────────── prompt & agent construction ───────────────────────
 _system_instructions = """
@@ -144,9 +150,9 @@ New input: {input}
     .partial(system=_system_instructions)
 )
 
-@lru_cache(maxsize=1)
-def _agent_executor() -> AgentExecutor:
-    agent = create_react_agent(llm, tools, agent_prompt)
+def _build_agent_executor() -> AgentExecutor:
+    from langchain.agents import AgentExecutor, create_react_agent
+    agent = create_react_agent(get_llm(), tools, agent_prompt)
     return AgentExecutor(
         agent=agent,
         tools=tools,
@@ -155,13 +161,85 @@ def _agent_executor() -> AgentExecutor:
         max_iterations=3
     )
 
+registry.register("agent_executor", _build_agent_executor)
+
+def _agent_executor() -> AgentExecutor:
+    return registry.get("agent_executor")
+
+def warm_up() -> Dict[str, float]:
+    """
+    Connects to Neo4j and builds the LLM, Cypher chain and agent up front,
+    returning seconds spent per resource.
+    """
+    return registry.warm_up("graph", "schema", "llm", "kg_cypher_chain", "agent_executor")
+
+# ───────────────────────────── answer cache ───────────────────────────────
+# ANSWER_CACHE=0 disables it; the threshold trades recall for the risk of
+# answering a subtly different question with a cached reply.
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "1") != "0"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+
+def _build_answer_cache() -> AnswerCache:
+    return AnswerCache(
+        embed=lambda texts: get_embeddings().embed_documents(texts),
+        threshold=ANSWER_CACHE_THRESHOLD,
+        ttl=ANSWER_CACHE_TTL,
+    )
+
+registry.register("answer_cache", _build_answer_cache)
+registry.register("graph_version", lambda: VersionWatcher(lambda: read_version(get_graph())))
+
+def _answer_cache() -> AnswerCache:
+    cache: AnswerCache = registry.get("answer_cache")
+    try:
+        cache.sync_graph_version(registry.get("graph_version").current())
+    except Exception as e:
+        # A stale answer is better than no answer; retried next question
+        print(f"Graph version check failed: {e}")
+    return cache
+
+def answer_cache_stats() -> Dict[str, float]:
+    """Exact/semantic hit counts and hit rate since start-up."""
+    if not registry.is_loaded("answer_cache"):
+        return {}
+    return registry.get("answer_cache").stats()
+
 # ─────────────────────────── public API ───────────────────────────────────
-def generate_response(user_input: str) -> str:
+HISTORY_TURNS = 6                       # prior messages given to the agent
+
+def _with_history(user_input: str, history: List[Dict[str, str]]) -> str:
+    lines = [f"{m['role'].capitalize()}: {m['content']}" for m in history[-HISTORY_TURNS:]]
+    return "Conversation so far:\n" + "\n".join(lines) + f"\n\nNew question: {user_input}"
+
+def generate_response(user_input: str, history: Optional[List[Dict[str, str]]] = None,
+                      callbacks: Optional[list] = None) -> str:
     """
     The single entry-point exposed to the outside world.
-    """
-    result: Dict[str, Any] = _agent_executor().invoke({"input": user_input})
-    print(f"Logged result: {result["output"]}")
-    return result["output"]
 
-__all__ = ["generate_response"]
\ No newline at end of file
+    Args:
+        user_input (str): The question.
+        history (list | None): Earlier ``{"role", "content"}`` messages of
+            the same session; follow-ups bypass the answer cache.
+        callbacks (list | None): LangChain callback handlers, e.g. for
+            streaming tokens.
+    """
+    with span("qa.generate_response", history=len(history or [])) as s:
+        cache = _answer_cache() if ANSWER_CACHE_ENABLED and not history else None
+        if cache is not None:
+            cached = cache.lookup(user_input)
+            s.set(**{"cache.answer": "miss" if cached is None else "hit"})
+            if cached is not None:
+                return cached
+
+        prompt = _with_history(user_input, history) if history else user_input
+        result: Dict[str, Any] = _agent_executor().invoke(
+            {"input": prompt}, config={"callbacks": (callbacks or []) + tracing_callbacks()})
+        print(f"Logged result: {result['output']}")
+        s.set(answer_chars=len(result["output"]))
+        # Iteration-limit bail-outs are not answers worth repeating
+        if cache is not None and not result["output"].startswith("Agent stopped"):
+            cache.store(user_input, result["output"])
+        return result["output"]
+
+__all__ = ["generate_response", "warm_up", "answer_cache_stats"]
\ No newline at end of file
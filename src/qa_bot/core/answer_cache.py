@@ -0,0 +1,241 @@
+"""
+answer_cache.py
+===============
+
+Two-tier response cache in front of ``generate_response``.
+
+1. **Exact** – questions are normalised (case, punctuation, whitespace) and
+   looked up in a dict.
+2. **Semantic** – otherwise the question is embedded and compared by cosine
+   similarity against every cached question; the best match above
+   ``threshold`` is returned.
+
+Entries expire after ``ttl`` seconds, the least recently used are evicted
+beyond ``max_entries``, and the whole cache is dropped when the graph
+version changes.  State persists as ``answers.json`` plus a row-aligned
+``vectors.npy`` so hits survive restarts.  New answers and evictions are
+appended to ``journal.jsonl`` and folded into the snapshot once the journal
+outgrows it.  Questions are embedded outside the cache lock, so concurrent
+turns do not queue behind each other's model call.
+"""
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_CACHE_DIR = PROJECT_ROOT / "Output" / "answer_cache"
+
+Embed = Callable[[List[str]], np.ndarray]
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
+
+class AnswerCache:
+    """
+    Args:
+        directory (Path | None): Where to persist; ``None`` keeps it in memory.
+        embed (callable | None): ``texts -> (n, dim)`` array; without it only
+            the exact tier is used.
+        threshold (float): Minimum cosine similarity for a semantic hit.
+        ttl (float): Seconds an answer stays valid.
+        max_entries (int): LRU capacity.
+        clock (callable): Time source (injectable for tests).
+    """
+
+    def __init__(self, directory: Optional[Path] = DEFAULT_CACHE_DIR, embed: Optional[Embed] = None,
+                 threshold: float = 0.92, ttl: float = 7 * 24 * 3600, max_entries: int = 1000,
+                 clock: Callable[[], float] = time.time):
+        self.directory = Path(directory) if directory else None
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.graph_version: Optional[int] = None
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        # normalised question -> {"question", "answer", "created_at", "vector"}
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: List[str] = []
+        self._journaled = 0
+        self._lock = threading.RLock()
+        self._load()
+
+    # ── lookups ──
+    def lookup(self, question: str) -> Optional[str]:
+        key = normalize_question(question)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry["answer"]
+            semantic = self.embed is not None and bool(self._entries)
+
+        query = _unit(np.asarray(self.embed([question]), dtype=np.float32))[0] if semantic else None
+        with self._lock:
+            match = self._nearest(query) if query is not None else None
+            if match is not None:
+                self._entries.move_to_end(match)
+                self.semantic_hits += 1
+                return self._entries[match]["answer"]
+
+            self.misses += 1
+            return None
+
+    def _nearest(self, query: np.ndarray) -> Optional[str]:
+        matrix = self._vectors()
+        if matrix is None or not len(matrix):
+            return None
+        scores = matrix @ query
+        best = int(np.argmax(scores))
+        return self._keys[best] if scores[best] >= self.threshold else None
+
+    def _vectors(self) -> Optional[np.ndarray]:
+        if self._matrix is None:
+            keyed = [(k, e["vector"]) for k, e in self._entries.items() if e.get("vector") is not None]
+            self._keys = [k for k, _ in keyed]
+            self._matrix = _unit(np.array([v for _, v in keyed], dtype=np.float32)) if keyed else None
+        return self._matrix
+
+    # ── updates ──
+    def store(self, question: str, answer: str) -> None:
+        key = normalize_question(question)
+        vector = None
+        if self.embed is not None:
+            vector = np.asarray(self.embed([question]), dtype=np.float32)[0].tolist()
+        with self._lock:
+            entry = {"question": question, "answer": answer, "created_at": self.clock(), "vector": vector}
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            records = [{"op": "put", "key": key, **entry}]
+            while len(self._entries) > self.max_entries:
+                records.append({"op": "evict", "key": self._entries.popitem(last=False)[0]})
+            self._matrix = None
+            self._journal(records)
+
+    def invalidate(self) -> None:
+        """Drops every cached answer."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.save()
+
+    def sync_graph_version(self, version: int) -> bool:
+        """Invalidates if *version* differs from the one the answers came from."""
+        with self._lock:
+            if self.graph_version is not None and self.graph_version != version:
+                self.graph_version = version
+                self.invalidate()
+                return True
+            if self.graph_version != version:
+                self.graph_version = version
+                self.save()
+            return False
+
+    def _expire(self) -> None:
+        cutoff = self.clock() - self.ttl
+        stale = [k for k, e in self._entries.items() if e["created_at"] < cutoff]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._matrix = None
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    # ── persistence ──
+    @property
+    def _journal_path(self) -> Path:
+        return self.directory / "journal.jsonl"
+
+    def _journal(self, records: List[dict]) -> None:
+        """Appends *records*; rewrites the snapshot once the journal outgrows it."""
+        if self.directory is None:
+            return
+        if self._journaled >= max(64, len(self._entries)):
+            self.save()
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._journal_path.open("a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+        self._journaled += len(records)
+
+    def save(self) -> None:
+        """Writes the full snapshot and empties the journal."""
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entries = [{"key": k, **{f: e[f] for f in ("question", "answer", "created_at")}}
+                   for k, e in self._entries.items()]
+        vectors = [e["vector"] for e in self._entries.values()]
+        dim = next((len(v) for v in vectors if v is not None), 0)
+        matrix = np.array([v if v is not None else [np.nan] * dim for v in vectors], dtype=np.float32)
+        np.save(self.directory / "vectors.tmp.npy", matrix.reshape(len(vectors), dim))
+        (self.directory / "vectors.tmp.npy").replace(self.directory / "vectors.npy")
+        tmp = self.directory / "answers.tmp.json"
+        tmp.write_text(json.dumps({"graph_version": self.graph_version, "entries": entries},
+                                  ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.directory / "answers.json")
+        # replaying the journal over the new snapshot would be harmless, so order is not critical
+        self._journal_path.unlink(missing_ok=True)
+        self._journaled = 0
+
+    def _load(self) -> None:
+        if self.directory is None:
+            return
+        if (self.directory / "answers.json").exists():
+            data = json.loads((self.directory / "answers.json").read_text(encoding="utf-8"))
+            vectors_path = self.directory / "vectors.npy"
+            vectors = np.load(vectors_path) if vectors_path.exists() else None
+            if vectors is None or len(vectors) != len(data["entries"]):
+                vectors = None
+            self.graph_version = data.get("graph_version")
+            for row, entry in enumerate(data["entries"]):
+                vector = None
+                if vectors is not None and vectors.shape[1] and not np.isnan(vectors[row]).any():
+                    vector = vectors[row].tolist()
+                self._entries[entry.pop("key")] = {**entry, "vector": vector}
+        torn = False
+        if self._journal_path.exists():
+            for line in self._journal_path.read_text(encoding="utf-8").splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    torn = True                     # cut short by a crash
+                    break
+                key = record.pop("key")
+                if record.pop("op") == "put":
+                    self._entries[key] = record
+                    self._entries.move_to_end(key)
+                else:
+                    self._entries.pop(key, None)
+                self._journaled += 1
+        self._expire()
+        if torn:
+            self.save()                             # so the next append does not follow a partial line
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
@@ -0,0 +1,417 @@
+"""
+cassette.py
+===========
+
+Record/replay of everything the QA stack asks of outside services.  The
+recorded traffic is LLM completions, Cypher result sets and retrieved
+chunks.  Profiling prompt assembly, parsing, formatting and retrieval glue
+then needs no OpenAI, Ollama or Neo4j, and gives the same answers every
+run.
+
+Requests are keyed by a hash of their normalised form: whitespace is
+collapsed in prompts and Cypher, and params and options are part of the
+key.  A recording keeps each response and how long the live call took.
+On replay, :class:`Latency` turns that into a synthetic delay, or
+substitutes a fixed one.  The store is gzip-compressed JSON lines, one
+entry per line; a plain ``.json`` path keeps the older single-document
+format.
+
+Keys are one-way hashes, so a cassette is looked up with the scheme it was
+recorded under.  Benchmark cassettes from before the process-wide hooks
+(``.json`` files without a ``key_version``) use scheme 1: raw message
+content and only ``stop`` for LLM calls, the raw query for retrieval.
+``convert`` carries the scheme over to the new file.
+
+Set ``CASSETTE=record`` or ``CASSETTE=replay`` and the hooks go in where
+the traffic leaves the process:
+
+* the :class:`~src.qa_bot.core.llm_gateway.LLMGateway`, which every chat
+  model goes through;
+* the shared ``graph`` resource (replay never connects to Neo4j);
+* the chunk retriever of ``find_chunk`` and the RAG retriever of
+  ``builder.answer_question``.
+
+``CASSETTE_PATH`` picks the file (default ``Output/cassettes/default.jsonl.gz``).
+``CASSETTE_LATENCY`` is ``recorded`` (the default), ``recorded*0.5``, a
+fixed number of seconds, or ``0``.  A recording is saved when the process
+exits.
+
+    CASSETTE=record python -m src.benchmarks.qa_benchmark --backend live --workers 1
+    CASSETTE=replay CASSETTE_LATENCY=0 python -m src.benchmarks.qa_benchmark --backend live
+    python -m src.qa_bot.core.cassette stats
+    python -m src.qa_bot.core.cassette convert Output/benchmarks/cassette.json cassette.jsonl.gz
+
+The ``Cassette*`` wrappers record when given a live ``inner`` and replay
+when it is ``None``.  :mod:`src.benchmarks.backends` builds its ``replay``
+backend from them.
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.retrievers import BaseRetriever
+
+from .resources import registry
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_CASSETTE = PROJECT_ROOT / "Output" / "cassettes" / "default.jsonl.gz"
+
+MODES = ("record", "replay")
+KEY_VERSION = 2
+
+
+class CassetteMiss(LookupError):
+    """A replayed run asked for something that was never recorded."""
+
+
+# ─────────────────────────────── keys ────────────────────────────────────
+def request_key(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def llm_key(messages: List[Dict[str, str]], **options: Any) -> str:
+    """Key of a chat request: ``{"role", "content"}`` messages plus model and options."""
+    return request_key("llm", [(m["role"], normalize(m["content"])) for m in messages],
+                       {k: v for k, v in options.items() if v is not None})
+
+
+def graph_key(query: str, params: Optional[dict] = None) -> str:
+    return request_key("graph", normalize(query), params or {})
+
+
+def retrieval_key(query: str) -> str:
+    return request_key("retrieval", normalize(query))
+
+
+# Scheme 1 keyed LLM calls by LangChain message type rather than role
+_V1_TYPES = {"user": "human", "assistant": "ai"}
+
+
+def llm_key_v1(messages: List[Dict[str, str]], stop: Optional[List[str]] = None, **_options: Any) -> str:
+    return request_key("llm", [(_V1_TYPES.get(m["role"], m["role"]), m["content"]) for m in messages], stop)
+
+
+def retrieval_key_v1(query: str) -> str:
+    return request_key("retrieval", query)
+
+
+# ────────────────────────────── latency ──────────────────────────────────
+class Latency:
+    """
+    Replay delay from a spec: ``"recorded"`` (the live call's duration),
+    ``"recorded*0.5"`` (scaled), or a fixed number of seconds.
+    """
+
+    def __init__(self, spec: Union[str, float] = 0.0):
+        self.spec = str(spec)
+        m = re.fullmatch(r"\s*recorded\s*(?:\*\s*([\d.]+))?\s*", self.spec)
+        self.scale = float(m.group(1) or 1) if m else None
+        self.fixed = None if m else float(spec)
+
+    def __call__(self, recorded: Optional[float]) -> float:
+        if self.fixed is not None:
+            return self.fixed
+        return (recorded or 0.0) * self.scale
+
+
+# ─────────────────────────────── store ───────────────────────────────────
+class Cassette:
+    """
+    Recorded ``llm`` / ``graph`` / ``retrieval`` responses plus the schema
+    they were recorded against.
+
+    Args:
+        path (Path | None): ``.jsonl.gz`` store (or a legacy ``.json``).
+        mode (str): ``"record"`` or ``"replay"``; read by the process-wide
+            hooks, the wrappers go by whether they have an ``inner``.
+        latency (Latency | str | float): Delay added by :meth:`replay`.
+        sleep (callable): Injectable for tests.
+    """
+
+    KINDS = ("llm", "graph", "retrieval")
+
+    def __init__(self, path: Optional[Path] = None, mode: str = "replay",
+                 latency: Union[Latency, str, float] = 0.0, sleep: Callable[[float], None] = time.sleep):
+        if mode not in MODES:
+            raise ValueError(f"Cassette mode must be one of {MODES}, not {mode!r}")
+        self.path = Path(path) if path else None
+        self.mode = mode
+        self.latency = latency if isinstance(latency, Latency) else Latency(latency)
+        self.entries: Dict[str, Dict[str, Any]] = {kind: {} for kind in self.KINDS}
+        self.seconds: Dict[str, Dict[str, float]] = {kind: {} for kind in self.KINDS}
+        self.schema: Optional[Dict[str, Any]] = None
+        self.key_version = KEY_VERSION
+        self.hits = self.misses = 0
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        if self.path and self.path.exists():
+            self._load(self.path)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    # ── keys, in the scheme this cassette was recorded with ──
+    def llm_key(self, messages: List[Dict[str, str]], **options: Any) -> str:
+        return llm_key_v1(messages, **options) if self.key_version == 1 else llm_key(messages, **options)
+
+    def graph_key(self, query: str, params: Optional[dict] = None) -> str:
+        return graph_key(query, params)                  # unchanged since scheme 1
+
+    def retrieval_key(self, query: str) -> str:
+        return retrieval_key_v1(query) if self.key_version == 1 else retrieval_key(query)
+
+    def get(self, kind: str, key: str) -> Any:
+        try:
+            value = self.entries[kind][key]
+        except KeyError:
+            with self._lock:
+                self.misses += 1
+            raise CassetteMiss(f"No recorded {kind} response for request {key}") from None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def replay(self, kind: str, key: str) -> Any:
+        """Like :meth:`get`, after the configured synthetic latency."""
+        value = self.get(kind, key)
+        delay = self.latency(self.seconds[kind].get(key))
+        if delay > 0:
+            self._sleep(delay)
+        return value
+
+    def put(self, kind: str, key: str, value: Any, seconds: Optional[float] = None) -> None:
+        with self._lock:
+            self.entries[kind][key] = value
+            if seconds is not None:
+                self.seconds[kind][key] = round(seconds, 4)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**{kind: len(self.entries[kind]) for kind in self.KINDS}, "hits": self.hits, "misses": self.misses}
+
+    # ── persistence ──
+    def _load(self, path: Path) -> None:
+        if path.suffix != ".gz":
+            data = json.loads(path.read_text(encoding="utf-8"))
+            self.schema = data.get("schema")
+            self.key_version = data.get("key_version", 1)
+            for kind in self.KINDS:
+                self.entries[kind].update(data.get(kind, {}))
+            return
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["kind"] == "meta":
+                    self.key_version = entry["key_version"]
+                    continue
+                if entry["kind"] == "schema":
+                    self.schema = entry["value"]
+                    continue
+                self.entries[entry["kind"]][entry["key"]] = entry["value"]
+                if entry.get("seconds") is not None:
+                    self.seconds[entry["kind"]][entry["key"]] = entry["seconds"]
+
+    def save(self, path: Optional[Path] = None) -> None:
+        path = Path(path or self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            entries = {kind: dict(self.entries[kind]) for kind in self.KINDS}
+            seconds = {kind: dict(self.seconds[kind]) for kind in self.KINDS}
+        if path.suffix != ".gz":
+            path.write_text(json.dumps({"key_version": self.key_version, "schema": self.schema, **entries},
+                                       ensure_ascii=False, indent=1, default=str), encoding="utf-8")
+            return
+        tmp = path.with_name(path.name + ".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"kind": "meta", "key_version": self.key_version}) + "\n")
+            if self.schema is not None:
+                f.write(json.dumps({"kind": "schema", "value": self.schema}, default=str) + "\n")
+            for kind in self.KINDS:
+                for key in sorted(entries[kind]):
+                    f.write(json.dumps({"kind": kind, "key": key, "value": entries[kind][key],
+                                        "seconds": seconds[kind].get(key)},
+                                       ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+        tmp.replace(path)
+
+
+# ────────────────────────────── wrappers ─────────────────────────────────
+def recorded_text(value: Any) -> str:
+    """The text of a recorded completion (older cassettes stored a bare string)."""
+    return value if isinstance(value, str) else value["text"]
+
+
+class CassetteChatModel(BaseChatModel):
+    """Records ``inner``'s completions, or replays them when ``inner`` is ``None``."""
+
+    cassette: Any
+    inner: Optional[Any] = None
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = self.cassette.llm_key([{"role": m.type, "content": str(m.content)} for m in messages], stop=stop)
+        if self.inner is None:
+            text = recorded_text(self.cassette.replay("llm", key))
+            time.sleep(self.latency)
+        else:
+            start = time.perf_counter()
+            # No callbacks: the caller already times this call as one LLM run
+            text = self.inner.invoke(messages, stop=stop, config={"callbacks": []}).content
+            self.cassette.put("llm", key, {"text": text}, time.perf_counter() - start)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+class CassetteGraph:
+    """
+    ``GraphStore`` facade that records ``inner``'s result rows, or replays
+    them when ``inner`` is ``None``.  Holds the schema that
+    ``SchemaService.apply_to`` installs.
+    """
+
+    _enhanced_schema = False
+
+    def __init__(self, cassette: Cassette, inner=None, latency: float = 0.0):
+        self.cassette = cassette
+        self.inner = inner
+        self.latency = latency
+        self.structured_schema: Dict[str, Any] = getattr(inner, "structured_schema", {}) or {}
+        self.schema: str = getattr(inner, "schema", "") or ""
+
+    @property
+    def get_schema(self) -> str:
+        return self.schema
+
+    @property
+    def get_structured_schema(self) -> Dict[str, Any]:
+        return self.structured_schema
+
+    def refresh_schema(self) -> None:
+        pass
+
+    def query(self, query: str, params: Optional[dict] = None) -> List[Dict[str, Any]]:
+        return self._rows(query, params, lambda: self.inner.query(query, params or {}))
+
+    def read_query(self, query: str, params: Optional[dict] = None) -> List[Dict[str, Any]]:
+        """``graph.read_query`` on ``inner``; replays the same rows as :meth:`query`."""
+        from .graph import read_query
+        return self._rows(query, params, lambda: read_query(self.inner, query, params))
+
+    def _rows(self, query: str, params: Optional[dict], run) -> List[Dict[str, Any]]:
+        key = self.cassette.graph_key(query, params)
+        if self.inner is None:
+            rows = self.cassette.replay("graph", key)
+            time.sleep(self.latency)
+            return [dict(r) for r in rows]
+        start = time.perf_counter()
+        rows = run()
+        self.cassette.put("graph", key, rows, time.perf_counter() - start)
+        return rows
+
+    def __getattr__(self, name):
+        inner = self.__dict__.get("inner")
+        if inner is None:
+            raise AttributeError(name)
+        return getattr(inner, name)
+
+
+class CassetteRetriever(BaseRetriever):
+    """LangChain retriever that records ``inner``'s documents or replays them."""
+
+    cassette: Any
+    inner: Optional[Any] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        key = self.cassette.retrieval_key(query)
+        if self.inner is None:
+            return [Document(page_content=d["page_content"], metadata=d["metadata"])
+                    for d in self.cassette.replay("retrieval", key)]
+        start = time.perf_counter()
+        docs = self.inner.invoke(query, config={"callbacks": run_manager.get_child()})
+        self.cassette.put("retrieval", key, [{"page_content": d.page_content, "metadata": d.metadata}
+                                             for d in docs], time.perf_counter() - start)
+        return docs
+
+
+def cassette_retrieve(cassette: Cassette, inner: Optional[Callable[[str], List[str]]] = None
+                      ) -> Callable[[str], List[str]]:
+    """Same as :class:`CassetteRetriever` for a plain ``question -> chunks`` function."""
+    def retrieve(question: str) -> List[str]:
+        key = cassette.retrieval_key(question)
+        if inner is None:
+            return cassette.replay("retrieval", key)
+        start = time.perf_counter()
+        chunks = inner(question)
+        cassette.put("retrieval", key, chunks, time.perf_counter() - start)
+        return chunks
+    return retrieve
+
+
+# ───────────────────────── process-wide cassette ─────────────────────────
+def cassette_from_env() -> Optional[Cassette]:
+    """The cassette ``CASSETTE`` / ``CASSETTE_PATH`` / ``CASSETTE_LATENCY`` ask for, if any."""
+    mode = os.getenv("CASSETTE", "").strip().lower()
+    if not mode or mode == "off":
+        return None
+    path = Path(os.getenv("CASSETTE_PATH") or DEFAULT_CASSETTE)
+    cassette = Cassette(path, mode=mode, latency=os.getenv("CASSETTE_LATENCY", "recorded"))
+    if mode == "replay" and not path.exists():
+        print(f"Cassette {path} does not exist; every request will miss")
+    if mode == "record":
+        atexit.register(cassette.save)
+    return cassette
+
+
+registry.register("cassette", cassette_from_env)
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The process-wide cassette, or ``None`` when record/replay is off."""
+    return registry.get("cassette")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or convert LLM/graph cassettes")
+    sub = parser.add_subparsers(dest="command", required=True)
+    stats = sub.add_parser("stats")
+    stats.add_argument("path", type=Path, nargs="?", default=DEFAULT_CASSETTE)
+    convert = sub.add_parser("convert", help="rewrite a cassette in another format (by suffix)")
+    convert.add_argument("source", type=Path)
+    convert.add_argument("target", type=Path)
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        cassette = Cassette(args.path)
+        recorded = [s for kind in Cassette.KINDS for s in cassette.seconds[kind].values()]
+        print(f"{args.path} ({args.path.stat().st_size / 1024:.1f} KiB): {cassette.stats()}, "
+              f"recorded time {sum(recorded):.2f}s, key scheme {cassette.key_version}")
+    else:
+        Cassette(args.source).save(args.target)
+        print(f"{args.source} ({args.source.stat().st_size / 1024:.1f} KiB) -> "
+              f"{args.target} ({args.target.stat().st_size / 1024:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import os
+
+from .resources import registry
+
+
+def _build_embeddings():
+    from ...data_processing.embeddings.service import CachedEmbeddings
+    token = os.getenv("HUGGINGFACEHUB_API_TOKEN")
+    if token:
+        from huggingface_hub import login
+        login(token=token)
+    # Cached by text hash, so repeated texts skip the model entirely
+    return CachedEmbeddings()
+
+
+registry.register("embeddings", _build_embeddings)
+
+
+def get_embeddings():
+    """Shared MiniLM embeddings (LangChain interface), loaded on first use."""
+    return registry.get("embeddings")
@@ -0,0 +1,350 @@
+"""
+entity_linker.py
+================
+
+Tags the graph entities a question names, in one pass over the question.
+
+Every node's ``name`` and ``fullName`` is compiled into an Aho-Corasick
+automaton, along with these variants:
+
+* case- and punctuation-folded forms, with ``CamelCase`` / ``snake_case``
+  split into words (``CurveSettings`` -> ``curve settings``);
+* the plural or singular of the last word (``scales`` / ``scale``);
+* the acronym of a multi-word ``fullName`` (``Output Database File`` -> ``odf``);
+* :data:`SYNONYMS` and any ``synonyms`` list property on the node.
+
+:meth:`EntityLinker.link` returns the leftmost-longest whole-word matches
+with the node ids each one may refer to.  The agent turns them into hints
+for Cypher generation, so the generated query matches ``{name: ...}``
+exactly (an index lookup) instead of regex-scanning a whole label.
+
+Nodes are read from the graph snapshot when it is fresh, and from Neo4j
+otherwise.  When the graph version moves, :func:`get_entity_linker` reloads
+the rows, but only nodes whose surface forms changed are re-inserted into
+the automaton.
+
+    python -m src.qa_bot.core.entity_linker "How is an output database file segmented?"
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from .resources import registry
+from .tracing import span
+
+# Extra surface forms -> node name
+SYNONYMS: Dict[str, List[str]] = {
+    "Settings": ["curve settings"],
+    "Scales": ["scale type"],
+}
+
+ENTITY_QUERY = """
+MATCH (n) WHERE n.name IS NOT NULL AND NOT n:GraphMeta
+RETURN elementId(n) AS id, labels(n) AS labels, n.name AS name,
+       n.fullName AS fullName, n.synonyms AS synonyms
+"""
+
+MIN_SURFACE_CHARS = 2
+
+
+@dataclass(frozen=True)
+class Entity:
+    id: str
+    label: str
+    name: str
+
+
+@dataclass
+class Mention:
+    start: int                      # character offsets into the original text
+    end: int
+    text: str
+    entities: Tuple[Entity, ...]
+
+
+# ───────────────────────────── surface forms ──────────────────────────────
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_NON_WORD.split(text.casefold())).strip()
+
+
+def _inflections(form: str) -> Set[str]:
+    head, _, last = form.rpartition(" ")
+    head = f"{head} " if head else ""
+    if not last.isalpha() or len(last) < 3:
+        return set()
+    if last.endswith("ies"):
+        return {head + last[:-3] + "y"}
+    if last.endswith(("ses", "xes", "ches", "shes")):
+        return {head + last[:-2]}
+    if last.endswith("s") and not last.endswith("ss"):
+        return {head + last[:-1]}
+    if last.endswith("y") and last[-2] not in "aeiou":
+        return {head + last[:-1] + "ies"}
+    if last.endswith(("s", "x", "ch", "sh")):
+        return {head + last + "es"}
+    return {head + last + "s"}
+
+
+def surface_forms(name: str, full_name: Optional[str] = None, synonyms: Iterable[str] = ()) -> Set[str]:
+    """Normalised strings that refer to a node."""
+    forms: Set[str] = set()
+    for text in [name, full_name, *synonyms]:
+        if not isinstance(text, str):
+            continue
+        for variant in {normalize(text), normalize(_CAMEL.sub(" ", text.replace("_", " ")))}:
+            if variant:
+                forms.add(variant)
+                forms |= _inflections(variant)
+    if isinstance(full_name, str):
+        words = normalize(full_name).split()
+        if len(words) >= 2:
+            acronym = "".join(w[0] for w in words)
+            if len(acronym) >= 3:
+                forms.add(acronym)
+    return {f for f in forms if len(f) >= MIN_SURFACE_CHARS}
+
+
+# ───────────────────────────── automaton ──────────────────────────────────
+class _Automaton:
+    """Character trie with Aho-Corasick failure and output links; links are rebuilt lazily after edits."""
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.depth: List[int] = [0]
+        self.terminal: List[bool] = [False]
+        self.fail: List[int] = [0]
+        self.output: List[int] = [-1]          # nearest terminal state along the failure chain
+        self.dirty = False
+
+    def _walk(self, word: str, create: bool) -> Optional[int]:
+        state = 0
+        for ch in word:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                if not create:
+                    return None
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.depth.append(self.depth[state] + 1)
+                self.terminal.append(False)
+                self.fail.append(0)
+                self.output.append(-1)
+            state = nxt
+        return state
+
+    def add(self, word: str) -> None:
+        self.terminal[self._walk(word, create=True)] = True
+        self.dirty = True
+
+    def remove(self, word: str) -> None:
+        state = self._walk(word, create=False)
+        if state is not None and self.terminal[state]:
+            self.terminal[state] = False       # the states stay; unused ones are harmless
+            self.dirty = True
+
+    def _link(self) -> None:
+        queue = deque()
+        for state in self.goto[0].values():
+            self.fail[state], self.output[state] = 0, -1
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.output[nxt] = target if self.terminal[self.fail[nxt]] else self.output[self.fail[nxt]]
+                queue.append(nxt)
+        self.dirty = False
+
+    def matches(self, text: str) -> List[Tuple[int, int]]:
+        """``(start, end)`` of every occurrence of every word in *text*."""
+        if self.dirty:
+            self._link()
+        found = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            hit = state if self.terminal[state] else self.output[state]
+            while hit > 0:
+                found.append((i + 1 - self.depth[hit], i + 1))
+                hit = self.output[hit]
+        return found
+
+
+# ───────────────────────────── linker ─────────────────────────────────────
+class EntityLinker:
+    """
+    Args:
+        synonyms (dict): ``node name -> extra surface forms``.
+    """
+
+    def __init__(self, synonyms: Optional[Dict[str, List[str]]] = None):
+        self.synonyms = SYNONYMS if synonyms is None else synonyms
+        self.version: Optional[int] = None
+        self._automaton = _Automaton()
+        self._entities: Dict[str, Entity] = {}
+        self._forms: Dict[str, FrozenSet[str]] = {}           # node id -> its surface forms
+        self._by_surface: Dict[str, Set[str]] = {}            # surface form -> node ids
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def update(self, rows: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Makes the linker reflect exactly *rows* (``id``, ``labels``, ``name``,
+        ``fullName``, ``synonyms``).  Only nodes whose forms changed are touched.
+
+        Returns:
+            tuple: ``(nodes added or changed, nodes removed)``.
+        """
+        seen, changed = set(), 0
+        with self._lock:
+            for row in rows:
+                node_id, name = row.get("id"), row.get("name")
+                if node_id is None or not isinstance(name, str):
+                    continue
+                seen.add(node_id)
+                labels = row.get("labels") or [""]
+                entity = Entity(node_id, labels[0] if isinstance(labels, list) else labels, name)
+                forms = frozenset(surface_forms(name, row.get("fullName"),
+                                                [*(row.get("synonyms") or []), *self.synonyms.get(name, [])]))
+                if self._forms.get(node_id) == forms and self._entities.get(node_id) == entity:
+                    continue
+                self._drop(node_id)
+                self._entities[node_id], self._forms[node_id] = entity, forms
+                for form in forms:
+                    ids = self._by_surface.setdefault(form, set())
+                    if not ids:
+                        self._automaton.add(form)
+                    ids.add(node_id)
+                changed += 1
+            removed = [node_id for node_id in self._entities if node_id not in seen]
+            for node_id in removed:
+                self._drop(node_id)
+        return changed, len(removed)
+
+    def _drop(self, node_id: str) -> None:
+        for form in self._forms.pop(node_id, ()):
+            ids = self._by_surface[form]
+            ids.discard(node_id)
+            if not ids:
+                del self._by_surface[form]
+                self._automaton.remove(form)
+        self._entities.pop(node_id, None)
+
+    def link(self, text: str) -> List[Mention]:
+        """Leftmost-longest, non-overlapping whole-word entity mentions in *text*."""
+        # Normalise like surface_forms(), remembering where each character came from
+        chars, offsets = [], []
+        for i, ch in enumerate(text.casefold()):
+            if ch.isascii() and ch.isalnum():
+                chars.append(ch)
+                offsets.append(i)
+            elif chars and chars[-1] != " ":
+                chars.append(" ")
+                offsets.append(i)
+        folded = "".join(chars)
+        with self._lock:
+            found = sorted(self._automaton.matches(folded), key=lambda m: (m[0], -m[1]))
+            mentions, end = [], 0
+            for start, stop in found:
+                if start < end:
+                    continue
+                if (start and folded[start - 1] != " ") or (stop < len(folded) and folded[stop] != " "):
+                    continue
+                ids = self._by_surface.get(folded[start:stop])
+                if not ids:
+                    continue
+                lo, hi = offsets[start], offsets[stop - 1] + 1
+                entities = tuple(sorted((self._entities[i] for i in ids), key=lambda e: (e.label, e.name)))
+                mentions.append(Mention(lo, hi, text[lo:hi], entities))
+                end = stop
+        return mentions
+
+    @staticmethod
+    def hints(mentions: List[Mention]) -> str:
+        """Prompt lines mapping each mention to the node(s) it names."""
+        if not mentions:
+            return ""
+        lines = ["Graph entities in the question (match them by exact name, not regex):"]
+        for m in mentions:
+            nodes = " or ".join(f"(:{e.label} {{name: {e.name!r}}})" for e in m.entities)
+            lines.append(f'- "{m.text}" = {nodes}')
+        return "\n".join(lines)
+
+
+# ───────────────────────────── loading ────────────────────────────────────
+def entity_rows_from_snapshot(snapshot) -> List[Dict[str, Any]]:
+    rows = []
+    for node in range(snapshot.node_count):
+        name = snapshot.prop(node, "name")
+        if isinstance(name, str):
+            rows.append({"id": snapshot.element_id(node), "labels": snapshot.node_labels(node), "name": name,
+                         "fullName": snapshot.prop(node, "fullName"), "synonyms": snapshot.prop(node, "synonyms")})
+    return rows
+
+
+def load_entity_rows() -> List[Dict[str, Any]]:
+    """Entity rows from the fresh snapshot, or from Neo4j."""
+    from .graph import get_graph
+    from .graph_snapshot import fresh_snapshot
+    snapshot = fresh_snapshot()
+    if snapshot is not None:
+        return entity_rows_from_snapshot(snapshot)
+    return get_graph().query(ENTITY_QUERY)
+
+
+registry.register("entity_linker", EntityLinker)
+
+
+def get_entity_linker() -> EntityLinker:
+    """The shared linker, brought up to date with the graph version first."""
+    linker: EntityLinker = registry.get("entity_linker")
+    version = registry.get("graph_version").current()
+    if linker.version != version:
+        with span("entity_linker.update", version=version) as s:
+            changed, removed = linker.update(load_entity_rows())
+            linker.version = version
+            s.set(changed=changed, removed=removed, entities=len(linker))
+    return linker
+
+
+def entity_hints(question: str) -> str:
+    """Cypher-generation hints for the entities *question* names ('' if none or the graph is unreachable)."""
+    try:
+        linker = get_entity_linker()
+    except Exception as e:
+        print(f"Entity linking skipped: {e}")
+        return ""
+    with span("entity_linker.link") as s:
+        mentions = linker.link(question)
+        s.set(mentions=len(mentions))
+    return linker.hints(mentions)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tag the graph entities a question mentions")
+    parser.add_argument("question")
+    args = parser.parse_args(argv)
+    for m in get_entity_linker().link(args.question):
+        print(f"{m.start:>4}-{m.end:<4} {m.text!r}: " + ", ".join(f"{e.label}:{e.name} ({e.id})" for e in m.entities))
+
+
+if __name__ == "__main__":
+    main()
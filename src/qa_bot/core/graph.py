@@ -2,10 +2,52 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
-from langchain_neo4j import Neo4jGraph
+from .cassette import CassetteGraph, get_cassette
+from .resources import registry
 
-graph = Neo4jGraph(
-    url=os.getenv('NEO4J_URI'),
-    username=os.getenv('NEO4J_USERNAME'),
-    password=os.getenv('NEO4J_PASSWORD')
-)
\ No newline at end of file
+
+def _connect():
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying:
+        return CassetteGraph(cassette)          # no Neo4j needed
+    from langchain_neo4j import Neo4jGraph
+    graph = Neo4jGraph(
+        url=os.getenv('NEO4J_URI'),
+        username=os.getenv('NEO4J_USERNAME'),
+        password=os.getenv('NEO4J_PASSWORD'),
+        # The schema comes from kg_schema.SchemaService (snapshot + fingerprint)
+        # instead of LangChain's sampling introspection on every connect
+        refresh_schema=False,
+    )
+    return graph if cassette is None else CassetteGraph(cassette, graph)
+
+
+registry.register("graph", _connect)
+
+# Sessions for generated Cypher: Neo4j rejects any write in them, whatever
+# got past the validate_read_only pre-check
+READ_SESSION = {"default_access_mode": "READ"}
+
+
+def get_graph():
+    """The shared Neo4jGraph, connected on first use."""
+    return registry.get("graph")
+
+
+def read_query(graph, cypher, params=None):
+    """
+    Runs *cypher* on *graph* in a read-access session.  Stand-ins without a
+    driver (benchmark stubs) are queried as they are.
+    """
+    if isinstance(graph, CassetteGraph):
+        return graph.read_query(cypher, params)
+    if hasattr(graph, "_driver"):                # Neo4jGraph
+        return graph.query(cypher, params or {}, session_params=dict(READ_SESSION))
+    return graph.query(cypher, params or {})
+
+
+def __getattr__(name):
+    # Backwards-compatible `graph` attribute; resolving it opens the connection
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,62 @@
+"""
+graph_version.py
+================
+
+A monotonically increasing version number stored in the graph itself on a
+single ``(:GraphMeta {key: 'version'})`` node.  Loaders bump it after every
+write so anything derived from the graph (cached answers, schema snapshots)
+can tell when it has gone stale, even across processes.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Optional
+
+READ_GRAPH_VERSION = """
+MATCH (m:GraphMeta {key: 'version'})
+RETURN m.version AS version
+"""
+
+BUMP_GRAPH_VERSION = """
+MERGE (m:GraphMeta {key: 'version'})
+SET m.version = coalesce(m.version, 0) + 1, m.updatedAt = datetime()
+RETURN m.version AS version
+"""
+
+
+def read_version(graph) -> int:
+    """Current version via a LangChain ``Neo4jGraph``; 0 if never bumped."""
+    rows = graph.query(READ_GRAPH_VERSION)
+    return int(rows[0]["version"]) if rows else 0
+
+
+def bump_version(driver, database: Optional[str] = None) -> int:
+    """Increments the version through a ``neo4j.Driver`` and returns it."""
+    with driver.session(database=database) as session:
+        record = session.run(BUMP_GRAPH_VERSION).single()
+        return int(record["version"]) if record else 0
+
+
+class VersionWatcher:
+    """
+    Memoises :func:`read_version` for *interval* seconds so per-question
+    staleness checks cost at most one round trip per interval.
+    """
+
+    def __init__(self, read: Callable[[], int], interval: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self._read = read
+        self.interval = interval
+        self._clock = clock
+        self._version: Optional[int] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        with self._lock:
+            now = self._clock()
+            if self._version is None or now - self._checked_at >= self.interval:
+                self._version = self._read()
+                self._checked_at = now
+            return self._version
@@ -0,0 +1,258 @@
+"""
+index_rewrite.py
+================
+
+Rewrites the case-insensitive string predicates that LLM-written Cypher
+uses into lookups Neo4j can answer from an index.  The Cypher prompts ask
+for ``=~ '(?i)…'``, and no index can serve that, so each such query scans
+every node of its label.
+
+The setup script ``cypher/core/03_text_indexes.cypher`` (generated by
+:mod:`src.knowledge_graph.loaders.text_indexes`) stores normalised keys
+(``nameKey = toLower(trim(name))``, same for ``fullName``).  It puts a TEXT
+index on each key for every label, and one full-text index
+(:data:`FULLTEXT_INDEX`) over the descriptive properties of every label.
+
+===========================================  ==========================================
+generated predicate                          rewritten to
+===========================================  ==========================================
+``n.name =~ '(?i)odf'``                      ``n.nameKey = 'odf'``
+``n.name =~ '(?i).*odf.*'`` (``odf.*``, …)   ``n.nameKey CONTAINS 'odf'`` (STARTS / ENDS WITH)
+``n.name =~ '(?i)' + $e0``                   ``n.nameKey = toLower($e0)``
+``toLower(n.name) = toLower($e0)``           ``n.nameKey = toLower($e0)``
+===========================================  ==========================================
+
+A regex with real metacharacters is left alone.  When the variable has no
+label, a TEXT index cannot help.  For a simple ``MATCH … WHERE … RETURN``
+whose WHERE is a plain conjunction, the match is seeded from the full-text
+index instead:
+
+    CALL db.index.fulltext.queryNodes('entity_text', 'name:"odf"') YIELD node AS n
+    MATCH (n)-[:HAS_ATTRIBUTE]->(a) WHERE n.nameKey = 'odf' RETURN a.name
+
+The rewrite is only correct when every named node has its keys, and the
+seed only when the full-text index is online and covers every label that
+has named nodes.  :class:`IndexRewriter` checks both once per graph
+version: without the keys queries pass through unchanged, and without
+full coverage they are rewritten but not seeded.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .resources import registry
+from .tracing import current_span
+
+# Property -> its normalised key
+TEXT_KEYS = {"name": "nameKey", "fullName": "fullNameKey"}
+FULLTEXT_INDEX = "entity_text"
+FULLTEXT_PROPERTIES = ("name", "fullName", "description", "details")
+
+MISSING_KEYS_QUERY = """
+MATCH (n)
+WHERE (n.name IS NOT NULL AND n.nameKey IS NULL) OR (n.fullName IS NOT NULL AND n.fullNameKey IS NULL)
+RETURN 1 AS missing LIMIT 1
+"""
+INDEX_STATE_QUERY = ("SHOW INDEXES YIELD name, state, labelsOrTypes WHERE name = $name "
+                     "RETURN state, labelsOrTypes AS labels")
+UNCOVERED_QUERY = """
+MATCH (n)
+WHERE (n.name IS NOT NULL OR n.fullName IS NOT NULL) AND none(label IN labels(n) WHERE label IN $labels)
+RETURN 1 AS uncovered LIMIT 1
+"""
+
+INDEX_REWRITE_ENABLED = os.getenv("INDEX_REWRITE", "1") != "0"
+
+_STR = r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\""
+_PROP = r"(?P<{0}var>[A-Za-z_]\w*)\.(?P<{0}prop>" + "|".join(TEXT_KEYS) + r")\b"
+_PREDICATE = re.compile(
+    # n.name =~ '(?i)' + $p [+ '.*']
+    rf"\b{_PROP.format('b')}\s*=~\s*(?P<bpre>'\(\?i\)(?:\.\*)?')\s*\+\s*(?P<bparam>\$\w+)(?:\s*\+\s*(?P<bpost>'\.\*'))?"
+    # n.name =~ '(?i)...'
+    rf"|\b{_PROP.format('a')}\s*=~\s*(?P<alit>{_STR})"
+    # toLower(n.name) = toLower($p) / 'literal'
+    rf"|\btoLower\(\s*{_PROP.format('c')}\s*\)\s*(?P<cop>=|CONTAINS|STARTS\s+WITH|ENDS\s+WITH)\s*"
+    rf"(?P<crhs>toLower\(\s*(?:\$\w+|{_STR})\s*\)|{_STR}|\$\w+)"
+    # strings and comments are copied as they are
+    rf"|(?P<skip>{_STR}|//[^\n]*)",
+    re.IGNORECASE)
+_REGEX_META = set(".^$*+?()[]{}|")
+_CLAUSE = re.compile(r"\b(OPTIONAL|WITH|UNION|CALL|UNWIND|MATCH)\b|\b(OR|XOR|NOT)\b", re.IGNORECASE)
+
+
+def _decode(literal: str) -> str:
+    return re.sub(r"\\(.)", lambda m: {"n": "\n", "t": "\t"}.get(m.group(1), m.group(1)), literal[1:-1])
+
+
+def _quote(text: str) -> str:
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _op(leading: bool, trailing: bool) -> str:
+    return {(False, False): "=", (True, True): "CONTAINS", (True, False): "ENDS WITH",
+            (False, True): "STARTS WITH"}[(leading, trailing)]
+
+
+def regex_as_text(pattern: str) -> Optional[Tuple[str, str]]:
+    """``(operator, lower-case text)`` equivalent to a ``(?i)`` regex, or ``None`` if it is a real regex."""
+    if not pattern.startswith("(?i)"):
+        return None
+    body = pattern[4:]
+    leading = body.startswith(".*")
+    trailing = body.endswith(".*") and not body.endswith("\\.*") and len(body) > 2 * leading + 1
+    body = body[2 if leading else 0: len(body) - 2 if trailing else None]
+    text, i = [], 0
+    while i < len(body):
+        ch = body[i]
+        if ch == "\\" and i + 1 < len(body) and not body[i + 1].isalnum():
+            text.append(body[i + 1])
+            i += 2
+            continue
+        if ch in _REGEX_META or ch == "\\":
+            return None
+        text.append(ch)
+        i += 1
+    if not text:
+        return None
+    return _op(leading, trailing), "".join(text).lower()
+
+
+@dataclass
+class Rewrite:
+    cypher: str
+    changes: List[str] = field(default_factory=list)
+    fulltext: Optional[str] = None          # variable seeded from the full-text index
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.changes)
+
+
+def rewrite(cypher: str, fulltext: bool = True) -> Rewrite:
+    """
+    Index-friendly form of *cypher* (unchanged when nothing applies).
+    *fulltext* allows seeding unlabelled variables from :data:`FULLTEXT_INDEX`.
+    """
+    found: List[Tuple[str, str, str, Optional[str]]] = []    # (var, prop, op, lucene query)
+
+    def replace(m: re.Match) -> str:
+        if m.group("skip"):
+            return m.group(0)
+        if m.group("avar"):
+            var, prop = m.group("avar"), m.group("aprop")
+            parsed = regex_as_text(_decode(m.group("alit")))
+            if parsed is None:
+                return m.group(0)
+            op, text = parsed
+            value, lucene = _quote(text), _quote(f'{prop}:"{_lucene(text)}"')
+        elif m.group("bvar"):
+            var, prop, param = m.group("bvar"), m.group("bprop"), m.group("bparam")
+            op = _op(".*" in m.group("bpre"), bool(m.group("bpost")))
+            value, lucene = f"toLower({param})", f"'{prop}:\"' + {param} + '\"'"
+        else:
+            var, prop, rhs = m.group("cvar"), m.group("cprop"), m.group("crhs")
+            op = " ".join(m.group("cop").upper().split())
+            value = rhs                         # the key is lower-case, as toLower(n.name) was
+            inner = re.sub(r"^toLower\(\s*(.*?)\s*\)$", r"\1", rhs, flags=re.IGNORECASE)
+            lucene = (f"'{prop}:\"' + {inner} + '\"'" if inner.startswith("$")
+                      else _quote(f'{prop}:"{_lucene(_decode(inner))}"'))
+        found.append((var, prop, op, lucene if op == "=" else None))
+        return f"{var}.{TEXT_KEYS[prop]} {op} {value}"
+
+    text = _PREDICATE.sub(replace, cypher)
+    result = Rewrite(text, [f"{v}.{p} -> {v}.{TEXT_KEYS[p]} {op}" for v, p, op, _ in found])
+    if found and fulltext:
+        seed = _fulltext_seed(cypher, found)
+        if seed is not None:
+            var, lucene = seed
+            result.cypher = (f"CALL db.index.fulltext.queryNodes('{FULLTEXT_INDEX}', {lucene}) "
+                             f"YIELD node AS {var}\n{text.lstrip()}")
+            result.fulltext = var
+    return result
+
+
+def _lucene(text: str) -> str:
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _fulltext_seed(cypher: str, found) -> Optional[Tuple[str, str]]:
+    """``(variable, query)`` when an unlabelled variable can safely be seeded from the full-text index."""
+    if not cypher.lstrip()[:5].upper() == "MATCH":
+        return None
+    code = re.sub(_STR, "''", cypher)
+    keywords = [m.group(0).upper() for m in _CLAUSE.finditer(code)]
+    if keywords != ["MATCH"]:                    # one MATCH, and a WHERE that is a plain conjunction
+        return None
+    for var, _prop, op, lucene in found:
+        if lucene is None or re.search(rf"\(\s*{re.escape(var)}\s*:", code):
+            continue
+        if sum(1 for v, *_ in found if v == var) == 1:
+            return var, lucene
+    return None
+
+
+# ───────────────────────────── gate ───────────────────────────────────────
+class IndexRewriter:
+    """
+    Applies :func:`rewrite` once the graph has its keys, and seeds from the
+    full-text index only while it covers every named node's labels.
+
+    Args:
+        query (callable): ``(cypher, params) -> rows`` on Neo4j.
+        version (callable): Current graph version; readiness is rechecked when it moves.
+    """
+
+    def __init__(self, query: Callable[..., List[Dict[str, Any]]], version: Callable[[], int]):
+        self._query = query
+        self._version = version
+        self._ready: Optional[Tuple[int, bool, bool]] = None
+        self._lock = threading.Lock()
+
+    def readiness(self) -> Tuple[bool, bool]:
+        """``(keys backfilled, full-text index online and covering)`` for the current graph version."""
+        try:
+            version = self._version()
+        except Exception:
+            return False, False
+        with self._lock:
+            if self._ready is None or self._ready[0] != version:
+                keyed = covered = False
+                try:
+                    keyed = not self._query(MISSING_KEYS_QUERY, {})
+                    state = self._query(INDEX_STATE_QUERY, {"name": FULLTEXT_INDEX})
+                    if keyed and state and state[0].get("state") == "ONLINE":
+                        covered = not self._query(UNCOVERED_QUERY, {"labels": state[0].get("labels") or []})
+                except Exception as e:
+                    print(f"Index rewrite check failed: {e}")
+                self._ready = (version, keyed, covered)
+            return self._ready[1], self._ready[2]
+
+    def ready(self) -> bool:
+        return self.readiness()[0]
+
+    def apply(self, cypher: str) -> str:
+        if not INDEX_REWRITE_ENABLED:
+            return cypher
+        keyed, covered = self.readiness()
+        if not keyed:
+            return cypher
+        result = rewrite(cypher, fulltext=covered)
+        if result.changed:
+            current_span().set(index_rewrite=len(result.changes), fulltext=bool(result.fulltext))
+        return result.cypher
+
+
+def _build_index_rewriter() -> IndexRewriter:
+    from .graph import get_graph
+    return IndexRewriter(lambda q, p: get_graph().query(q, p), lambda: registry.get("graph_version").current())
+
+
+registry.register("index_rewriter", _build_index_rewriter)
+
+
+def get_index_rewriter() -> IndexRewriter:
+    return registry.get("index_rewriter")
@@ -5,44 +5,274 @@ kg_schema.py
 Utility helpers that *only* deal with reading Neo4j’s live schema and turning
 it into something an LLM can consume.  No LangChain imports, no prompts, no
 side-effects.
+
+:class:`SchemaService` is the single source of the schema for every chain.
+It fetches labels, relationship patterns and property types from the
+``db.schema.*`` procedures, which read the schema without sampling nodes.
+The result is written to a snapshot so a restart does not fetch again.  It
+is refreshed only when the graph fingerprint changes: the loader-bumped
+graph version plus node/relationship counts, read in one cheap query.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .graph import get_graph
+from .resources import registry
+from .tracing import span
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_SNAPSHOT = PROJECT_ROOT / "Output" / "schema" / "snapshot.json"
+
+# Chains that bake the schema into their prompt and must be rebuilt on change
+SCHEMA_DEPENDENTS = ("kg_cypher_chain", "cypher_chain")
+
+# Bookkeeping labels that should never be offered to the LLM
+EXCLUDED_LABELS = {"GraphMeta", "Migration", "_Bloom_Perspective_", "_Bloom_Scene_"}
+
+FINGERPRINT_QUERY = """
+OPTIONAL MATCH (m:GraphMeta {key: 'version'})
+WITH coalesce(m.version, 0) AS version
+CALL { MATCH (n) RETURN count(n) AS nodes }
+CALL { MATCH ()-[r]->() RETURN count(r) AS rels }
+RETURN version, nodes, rels
+"""
+
+NODE_PROPERTIES_QUERY = """
+CALL db.schema.nodeTypeProperties()
+YIELD nodeLabels, propertyName, propertyTypes
+RETURN nodeLabels, propertyName, propertyTypes
+"""
+
+REL_PROPERTIES_QUERY = """
+CALL db.schema.relTypeProperties()
+YIELD relType, propertyName, propertyTypes
+RETURN relType, propertyName, propertyTypes
 """
-from functools import lru_cache
-from typing import Dict, List
-from langchain_neo4j import Neo4jGraph
 
+RELATIONSHIPS_QUERY = """
+CALL db.schema.visualization() YIELD relationships
+UNWIND relationships AS r
+RETURN r.startNodeName AS src, r.type AS rel, r.endNodeName AS dst
+"""
+
+# db.schema.*TypeProperties type names -> the names LangChain prompts use
+_NEO4J_TYPES = {"String": "STRING", "Long": "INTEGER", "Integer": "INTEGER", "Double": "FLOAT",
+                "Float": "FLOAT", "Boolean": "BOOLEAN", "Date": "DATE", "DateTime": "DATE_TIME",
+                "LocalDateTime": "LOCAL_DATE_TIME", "Point": "POINT", "Duration": "DURATION"}
+_PYTHON_TYPES = {str: "STRING", int: "INTEGER", float: "FLOAT", bool: "BOOLEAN", list: "LIST"}
+
+Query = Callable[..., List[Dict[str, Any]]]
+
+
+def _property_type(types: Optional[List[str]]) -> str:
+    name = (types or ["String"])[0]
+    if name.endswith("Array"):
+        return "LIST"
+    return _NEO4J_TYPES.get(name, name.upper())
+
+
+def _empty_schema() -> Dict[str, Any]:
+    return {"node_props": {}, "rel_props": {}, "relationships": [],
+            "metadata": {"constraint": [], "index": []}}
+
+
+def format_schema(structured: Dict[str, Any]) -> str:
+    """Same layout as LangChain's ``Neo4jGraph.schema`` so prompts are unchanged."""
+    def props(mapping):
+        lines = []
+        for name, items in sorted(mapping.items()):
+            if items:
+                fields = ", ".join(f"{p['property']}: {p['type']}" for p in items)
+                lines.append(f"{name} {{{fields}}}")
+        return lines
+
+    rels = [f"(:{r['start']})-[:{r['type']}]->(:{r['end']})" for r in structured["relationships"]]
+    return "\n".join(["Node properties:", "\n".join(props(structured["node_props"])),
+                      "Relationship properties:", "\n".join(props(structured["rel_props"])),
+                      "The relationships:", "\n".join(rels)])
+
+
+class SchemaService:
+    """
+    Args:
+        query (callable | None): ``(cypher, params) -> rows``; ``None`` runs
+            purely from the snapshot.
+        snapshot_path (Path | None): Where the schema is persisted.
+        interval (float): Seconds between fingerprint checks.
+    """
+
+    def __init__(self, query: Optional[Query] = None, snapshot_path: Optional[Path] = DEFAULT_SNAPSHOT,
+                 interval: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self._query = query
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.interval = interval
+        self._clock = clock
+        self._checked_at = float("-inf")
+        self._listeners: List[Callable[["SchemaService"], None]] = []
+        self._lock = threading.RLock()
+        self.fetches = 0
+        self.fingerprint: Optional[str] = None
+        self.structured: Dict[str, Any] = _empty_schema()
+        self._load_snapshot()
+
+    @classmethod
+    def from_dump(cls, path: Path) -> "SchemaService":
+        """
+        Builds an offline service from a Neo4j Browser export of
+        ``(src)-[rel]->(dst)`` records such as ``src/tests/records.json``.
+        Property types are inferred from the exported values.
+        """
+        raw = Path(path).read_bytes()
+        records = json.loads(raw.decode("utf-8-sig"))
+        node_props: Dict[str, Dict[str, str]] = defaultdict(dict)
+        rel_props: Dict[str, Dict[str, str]] = defaultdict(dict)
+        patterns = set()
+        for rec in records:
+            for node in (rec["src"], rec["dst"]):
+                for key, value in node["properties"].items():
+                    node_props[node["labels"][0]].setdefault(key, _PYTHON_TYPES.get(type(value), "STRING"))
+            for key, value in rec["rel"]["properties"].items():
+                rel_props[rec["rel"]["type"]].setdefault(key, _PYTHON_TYPES.get(type(value), "STRING"))
+            patterns.add((rec["src"]["labels"][0], rec["rel"]["type"], rec["dst"]["labels"][0]))
+
+        service = cls(query=None, snapshot_path=None)
+        service.structured = {
+            "node_props": {label: [{"property": k, "type": t} for k, t in sorted(props.items())]
+                           for label, props in sorted(node_props.items())},
+            "rel_props": {rel: [{"property": k, "type": t} for k, t in sorted(props.items())]
+                          for rel, props in sorted(rel_props.items())},
+            "relationships": [{"start": s, "type": r, "end": e} for s, r, e in sorted(patterns)],
+            "metadata": {"constraint": [], "index": []},
+        }
+        service.fingerprint = "dump:" + hashlib.blake2b(raw, digest_size=8).hexdigest()
+        return service
+
+    # ── freshness ──
+    def read_fingerprint(self) -> str:
+        row = self._query(FINGERPRINT_QUERY)[0]
+        return f"{row['version']}:{row['nodes']}:{row['rels']}"
+
+    def current(self) -> Dict[str, Any]:
+        """The structured schema, refreshed if the fingerprint moved."""
+        with self._lock:
+            now = self._clock()
+            if self._query is not None and now - self._checked_at >= self.interval:
+                self._checked_at = now
+                try:
+                    fingerprint = self.read_fingerprint()
+                except Exception as e:
+                    if self.fingerprint is None:
+                        raise
+                    print(f"Schema fingerprint check failed, using snapshot: {e}")
+                else:
+                    if fingerprint != self.fingerprint:
+                        self.refresh(fingerprint)
+            return self.structured
+
+    def refresh(self, fingerprint: Optional[str] = None) -> Dict[str, Any]:
+        """Fetches the schema now, persists it and notifies subscribers."""
+        with self._lock, span("schema.refresh"):
+            fingerprint = fingerprint or self.read_fingerprint()
+            self.structured = self._fetch()
+            self.fingerprint = fingerprint
+            self.fetches += 1
+            self._save_snapshot()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(self)
+        return self.structured
+
+    def subscribe(self, listener: Callable[["SchemaService"], None]) -> None:
+        """*listener(service)* is called after every refresh."""
+        self._listeners.append(listener)
+
+    def _fetch(self) -> Dict[str, Any]:
+        schema = _empty_schema()
+        node_props: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+        for row in self._query(NODE_PROPERTIES_QUERY):
+            for label in row["nodeLabels"]:
+                if label not in EXCLUDED_LABELS and row["propertyName"]:
+                    node_props[label].append({"property": row["propertyName"],
+                                              "type": _property_type(row["propertyTypes"])})
+        rel_props: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+        for row in self._query(REL_PROPERTIES_QUERY):
+            if row["propertyName"]:
+                rel_type = row["relType"].lstrip(":").strip("`")
+                rel_props[rel_type].append({"property": row["propertyName"],
+                                            "type": _property_type(row["propertyTypes"])})
+        patterns = {(row["src"], row["rel"], row["dst"]) for row in self._query(RELATIONSHIPS_QUERY)
+                    if row["src"] not in EXCLUDED_LABELS and row["dst"] not in EXCLUDED_LABELS}
+
+        schema["node_props"] = {k: sorted(v, key=lambda p: p["property"]) for k, v in sorted(node_props.items())}
+        schema["rel_props"] = {k: sorted(v, key=lambda p: p["property"]) for k, v in sorted(rel_props.items())}
+        schema["relationships"] = [{"start": s, "type": r, "end": e} for s, r, e in sorted(patterns)]
+        return schema
+
+    # ── views ──
+    def relationship_map(self) -> Dict[str, Dict[str, List[str]]]:
+        """ ``{src: {rel: [dst, ...]}}`` with sorted, de-duplicated targets. """
+        out: Dict[str, Dict[str, set]] = defaultdict(lambda: defaultdict(set))
+        for rel in self.current()["relationships"]:
+            out[rel["start"]][rel["type"]].add(rel["end"])
+        return {src: {rel: sorted(dsts) for rel, dsts in rels.items()} for src, rels in out.items()}
 
-def _get_graph() -> Neo4jGraph:           # used only inside this module
-    import os
-    return Neo4jGraph(
-        url=os.getenv("NEO4J_URI"),
-        username=os.getenv("NEO4J_USERNAME"),
-        password=os.getenv("NEO4J_PASSWORD"),
-    )
+    def text(self) -> str:
+        return format_schema(self.current())
+
+    def apply_to(self, graph) -> None:
+        """Installs the schema on a LangChain ``Neo4jGraph`` built with ``refresh_schema=False``."""
+        graph.structured_schema = self.structured
+        graph.schema = format_schema(self.structured)
+
+    # ── persistence ──
+    def _save_snapshot(self) -> None:
+        if self.snapshot_path is None:
+            return
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.snapshot_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"fingerprint": self.fingerprint, "schema": self.structured},
+                                  indent=2), encoding="utf-8")
+        tmp.replace(self.snapshot_path)
+
+    def _load_snapshot(self) -> None:
+        if self.snapshot_path is None or not self.snapshot_path.exists():
+            return
+        data = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+        self.fingerprint = data["fingerprint"]
+        self.structured = data["schema"]
+
+
+def _build_schema_service() -> SchemaService:
+    graph = get_graph()
+    service = SchemaService(lambda cypher, params=None: graph.query(cypher, params or {}))
+    service.subscribe(lambda s: s.apply_to(graph))
+    service.subscribe(lambda s: registry.reset(*SCHEMA_DEPENDENTS))
+    service.current()
+    service.apply_to(graph)                 # also when served from the snapshot
+    return service
+
+
+registry.register("schema", _build_schema_service)
+
+
+def get_schema_service() -> SchemaService:
+    """The shared schema service, loaded on first use."""
+    return registry.get("schema")
 
 
-@lru_cache(maxsize=1)
 def schema_dict() -> Dict[str, Dict[str, List[str]]]:
     """
     Returns
         { 'System': { 'HAS_TOPIC': ['Concept', ...], ... }, ... }
     """
-    graph = _get_graph()
-    cypher = """
-    CALL db.schema.visualization() YIELD relationships
-    UNWIND relationships AS r
-    RETURN r.startNodeName AS src, r.type AS rel, r.endNodeName AS dst
-    """
-    rows = graph.query(cypher)
-
-    out: Dict[str, Dict[str, List[str]]] = {}
-    for row in rows:
-        out.setdefault(row["src"], {}).setdefault(row["rel"], []).append(row["dst"])
-
-    # dedupe & sort for determinism
-    for src in out:
-        for rel in out[src]:
-            out[src][rel] = sorted(set(out[src][rel]))
-    return out
+    return get_schema_service().relationship_map()
 
 
 def schema_text() -> str:
@@ -52,4 +282,4 @@ def schema_text() -> str:
         for typ, dsts in sorted(rels.items()):
             for dst in dsts:
                 lines.append(f"({src})-[:{typ}]->({dst})")
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(lines)
@@ -1,12 +1,32 @@
 # llm.py
-from langchain_openai import ChatOpenAI
-import os
 from dotenv import load_dotenv
 
+from .resources import registry
+
 load_dotenv()
 
-llm = ChatOpenAI(
-    model_name="gpt-3.5-turbo",  # or "gpt-4"
-    temperature=0.2,
-    api_key=os.getenv("OPENAI_API_KEY"),
-)
\ No newline at end of file
+
+def _build_llm():
+    from .llm_gateway import GatewayChatModel
+    # Pooled, rate-limited and retried by the gateway (OPENAI_API_KEY is read there)
+    return GatewayChatModel(
+        backend="openai",
+        model="gpt-3.5-turbo",       # or "gpt-4"
+        temperature=0.2,
+        streaming=True,              # token callbacks for the chat service
+    )
+
+
+registry.register("llm", _build_llm)
+
+
+def get_llm():
+    """The shared chat model, created on first use."""
+    return registry.get("llm")
+
+
+def __getattr__(name):
+    # Backwards-compatible `llm` attribute; resolving it builds the client
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
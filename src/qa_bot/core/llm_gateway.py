@@ -0,0 +1,606 @@
+"""
+llm_gateway.py
+==============
+
+One client layer for every chat model the project calls: the OpenAI model
+behind the agent and the local Ollama model behind RAG, chunk QA and graph
+extraction.
+
+* **Pooling** – one keep-alive ``httpx.Client`` per backend, shared by all
+  threads.  The pool size matches the backend's concurrency.
+* **Coalescing** – identical concurrent requests (same backend, model,
+  messages and options) share one upstream call.
+* **Budgets** – per backend, a semaphore caps calls in flight (Ollama
+  queues anything beyond ``OLLAMA_NUM_PARALLEL`` anyway) and an optional
+  token bucket caps tokens per minute.
+* **Retries** – timeouts, connection errors, 408/429/5xx are retried with
+  jittered exponential backoff (``Retry-After`` wins when sent).
+* **Streaming** – :meth:`LLMGateway.stream` yields text as it arrives; a
+  stream is retried only until its first token.
+* **Record/replay** – with a :class:`~src.qa_bot.core.cassette.Cassette`
+  (``CASSETTE=record|replay``), upstream calls are recorded, or answered
+  from the recording after a synthetic delay.  Admission, spans and
+  metrics still apply.
+* **Metrics** – each upstream call is a ``llm.<backend>`` span (latency
+  histogram), coalescing feeds ``cache.coalesce``, and queue depth / calls
+  in flight are Prometheus gauges.  :meth:`LLMGateway.stats` has the same
+  numbers for the CLIs.
+
+:class:`GatewayChatModel` puts this behind the LangChain chat-model
+interface, so chains and agents use it like ``ChatOpenAI``.
+
+    llm = GatewayChatModel(backend="ollama", model="llama3.2:1b")
+    python -m src.qa_bot.core.llm_gateway "What is an ODF?" --backend ollama --stream
+
+Backends come from the environment:
+
+* ``OLLAMA_HOST`` (default ``http://localhost:11434``),
+  ``OLLAMA_NUM_PARALLEL`` (default 2)
+* ``OPENAI_BASE_URL`` (default ``https://api.openai.com/v1``),
+  ``OPENAI_API_KEY``
+* ``LLM_<BACKEND>_CONCURRENCY`` / ``LLM_<BACKEND>_TPM`` override either
+  backend's call and tokens-per-minute budgets.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.chat_models import generate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+from .cassette import Cassette, get_cassette, recorded_text
+from .resources import registry
+from .tracing import span, tracer
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+DEFAULT_MAX_TOKENS = 256          # token-budget estimate when a request sets no limit
+
+
+class GatewayError(RuntimeError):
+    """An LLM call failed for good (non-retryable status, or retries exhausted)."""
+
+
+# ───────────────────────────── configuration ──────────────────────────────
+@dataclass
+class Backend:
+    """
+    Args:
+        name (str): Registry key, e.g. ``"ollama"``.
+        protocol (str): ``"ollama"`` (``/api/chat``) or ``"openai"`` (``/chat/completions``).
+        base_url (str): Server URL; for OpenAI it includes ``/v1``.
+        api_key (str | None): Bearer token.
+        max_concurrency (int): Calls in flight; also the connection pool size.
+        tokens_per_minute (int | None): Token budget; ``None`` is unlimited.
+        timeout (float): Seconds per call (streams: between chunks).
+        max_retries (int): Retries after the first attempt.
+        backoff (float): First retry delay; doubled per retry, capped at ``max_backoff``.
+    """
+
+    name: str
+    protocol: str
+    base_url: str
+    api_key: Optional[str] = None
+    max_concurrency: int = 4
+    tokens_per_minute: Optional[int] = None
+    timeout: float = 120.0
+    max_retries: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 8.0
+
+
+def backends_from_env() -> List[Backend]:
+    def budget(name: str, var: str, default: Optional[int]) -> Optional[int]:
+        value = os.getenv(f"LLM_{name.upper()}_{var}")
+        return int(value) if value else default
+
+    host = os.getenv("OLLAMA_HOST", "localhost:11434")
+    if "://" not in host:
+        host = f"http://{host}"
+    parallel = int(os.getenv("OLLAMA_NUM_PARALLEL") or 2)
+    return [
+        Backend("ollama", "ollama", host,
+                max_concurrency=budget("ollama", "CONCURRENCY", parallel),
+                tokens_per_minute=budget("ollama", "TPM", None)),
+        Backend("openai", "openai", os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+                api_key=os.getenv("OPENAI_API_KEY"), timeout=60.0,
+                max_concurrency=budget("openai", "CONCURRENCY", 8),
+                tokens_per_minute=budget("openai", "TPM", 60_000)),
+    ]
+
+
+# ───────────────────────────── token budget ───────────────────────────────
+class TokenBucket:
+    """
+    Tokens-per-minute budget.  A request takes its estimate up front and
+    settles the difference once the real usage is known, so the bucket may
+    run into debt that later requests wait out.
+    """
+
+    def __init__(self, tokens_per_minute: int, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = tokens_per_minute / 60.0
+        self.capacity = float(tokens_per_minute)
+        self.tokens = self.capacity
+        self._clock, self._sleep = clock, sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: int) -> float:
+        """Blocks until *tokens* fit in the budget; returns the seconds waited."""
+        waited = 0.0
+        need = min(tokens, self.capacity)            # an oversized request waits for a full bucket
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= need:
+                    self.tokens -= tokens
+                    return waited
+                delay = (need - self.tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+    def settle(self, estimated: int, actual: int) -> None:
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + estimated - actual)
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int]) -> int:
+    return sum(len(m["content"]) for m in messages) // 4 + (max_tokens or DEFAULT_MAX_TOKENS)
+
+
+# ───────────────────────────── wire protocols ─────────────────────────────
+@dataclass
+class Completion:
+    text: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    seconds: float = 0.0
+    attempts: int = 1
+
+
+class _Ollama:
+    path = "/api/chat"
+
+    @staticmethod
+    def body(model: str, messages: List[Dict], options: Dict, stream: bool) -> Dict:
+        body = {"model": model, "messages": messages, "stream": stream,
+                "options": {k: v for k, v in (("temperature", options.get("temperature")),
+                                              ("num_predict", options.get("max_tokens")),
+                                              ("stop", options.get("stop"))) if v is not None}}
+        if options.get("format"):
+            body["format"] = options["format"]
+        return body
+
+    @staticmethod
+    def parse(data: Dict) -> Completion:
+        return Completion(data.get("message", {}).get("content", ""),
+                          data.get("prompt_eval_count", 0), data.get("eval_count", 0))
+
+    @staticmethod
+    def chunks(lines: Iterator[str]) -> Iterator[Tuple[str, Optional[Tuple[int, int]]]]:
+        for line in lines:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if "error" in data:
+                raise GatewayError(f"ollama: {data['error']}")
+            usage = (data.get("prompt_eval_count", 0), data.get("eval_count", 0)) if data.get("done") else None
+            yield data.get("message", {}).get("content", ""), usage
+
+
+class _OpenAI:
+    path = "/chat/completions"
+
+    @staticmethod
+    def body(model: str, messages: List[Dict], options: Dict, stream: bool) -> Dict:
+        body = {"model": model, "messages": messages, "stream": stream}
+        for key in ("temperature", "max_tokens", "stop"):
+            if options.get(key) is not None:
+                body[key] = options[key]
+        if options.get("format") == "json":
+            body["response_format"] = {"type": "json_object"}
+        if stream:
+            body["stream_options"] = {"include_usage": True}
+        return body
+
+    @staticmethod
+    def parse(data: Dict) -> Completion:
+        usage = data.get("usage") or {}
+        return Completion(data["choices"][0]["message"].get("content") or "",
+                          usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+
+    @staticmethod
+    def chunks(lines: Iterator[str]) -> Iterator[Tuple[str, Optional[Tuple[int, int]]]]:
+        for line in lines:
+            if not line.startswith("data:"):
+                continue
+            payload = line[5:].strip()
+            if payload == "[DONE]":
+                return
+            data = json.loads(payload)
+            text = "".join((c.get("delta") or {}).get("content") or "" for c in data.get("choices") or [])
+            usage = data.get("usage")
+            yield text, (usage["prompt_tokens"], usage["completion_tokens"]) if usage else None
+
+
+PROTOCOLS = {"ollama": _Ollama, "openai": _OpenAI}
+
+
+# ───────────────────────────── gateway ────────────────────────────────────
+class _Lane:
+    """Per-backend client, budgets and counters."""
+
+    def __init__(self, backend: Backend):
+        self.backend = backend
+        self.protocol = PROTOCOLS[backend.protocol]
+        headers = {"Authorization": f"Bearer {backend.api_key}"} if backend.api_key else {}
+        self.client = httpx.Client(
+            base_url=backend.base_url, headers=headers, timeout=backend.timeout,
+            limits=httpx.Limits(max_connections=backend.max_concurrency,
+                                max_keepalive_connections=backend.max_concurrency))
+        self.slots = threading.BoundedSemaphore(backend.max_concurrency)
+        self.bucket = TokenBucket(backend.tokens_per_minute) if backend.tokens_per_minute else None
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.active = 0
+        self.counts = {"requests": 0, "coalesced": 0, "retries": 0, "errors": 0}
+        self.latencies: Deque[float] = deque(maxlen=1024)
+
+    def add(self, key: str, amount: int = 1) -> None:
+        with self.lock:
+            self.counts[key] += amount
+
+
+class LLMGateway:
+    """
+    Args:
+        backends (list[Backend]): Defaults to :func:`backends_from_env`.
+        sleep (callable): Used for retry backoff (tests pass a no-op).
+        cassette (Cassette | None): Records upstream calls, or replays them.
+    """
+
+    def __init__(self, backends: Optional[List[Backend]] = None, sleep: Callable[[float], None] = time.sleep,
+                 cassette: Optional[Cassette] = None):
+        self.cassette = cassette
+        self._lanes = {b.name: _Lane(b) for b in (backends if backends is not None else backends_from_env())}
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._sleep = sleep
+        metrics = tracer.metrics()
+        if metrics is not None:
+            for name, lane in self._lanes.items():
+                label = re.sub(r"\W", "_", name)
+                metrics.gauges[f"qa_llm_queue_depth_{label}"] = lambda lane=lane: lane.waiting
+                metrics.gauges[f"qa_llm_in_flight_{label}"] = lambda lane=lane: lane.active
+
+    def close(self) -> None:
+        for lane in self._lanes.values():
+            lane.client.close()
+
+    def _lane(self, backend: str) -> _Lane:
+        try:
+            return self._lanes[backend]
+        except KeyError:
+            raise GatewayError(f"Unknown LLM backend {backend!r}") from None
+
+    # ── budgets ──
+    def _admit(self, lane: _Lane, estimate: int) -> None:
+        with lane.lock:
+            lane.waiting += 1
+        try:
+            if lane.bucket is not None:
+                lane.bucket.acquire(estimate)
+            lane.slots.acquire()
+        finally:
+            with lane.lock:
+                lane.waiting -= 1
+                lane.active += 1
+                lane.counts["requests"] += 1
+
+    def _release(self, lane: _Lane, estimate: int, used: Optional[int], seconds: float) -> None:
+        lane.slots.release()
+        with lane.lock:
+            lane.active -= 1
+            lane.latencies.append(seconds)
+        if lane.bucket is not None:
+            lane.bucket.settle(estimate, estimate if used is None else used)
+
+    def _backoff(self, lane: _Lane, attempt: int, error: Exception) -> None:
+        retry_after = None
+        if isinstance(error, httpx.HTTPStatusError):
+            try:
+                retry_after = float(error.response.headers.get("Retry-After", ""))
+            except ValueError:
+                pass
+        delay = retry_after if retry_after is not None else min(
+            lane.backend.max_backoff, lane.backend.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+        lane.add("retries")
+        self._sleep(delay)
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRY_STATUSES
+        return isinstance(error, httpx.TransportError)
+
+    # ── calls ──
+    def complete(self, backend: str, model: str, messages: List[Dict[str, str]], coalesce: bool = True,
+                 **options) -> Completion:
+        """
+        One chat completion.
+
+        Args:
+            backend (str): Backend name.
+            model (str): Model name on that backend.
+            messages (list[dict]): ``{"role", "content"}`` dicts.
+            coalesce (bool): Share the call with identical ones in flight.
+            **options: ``temperature``, ``max_tokens``, ``stop``, ``format`` (``"json"``).
+        """
+        lane = self._lane(backend)
+        if not coalesce:
+            return self._complete(lane, model, messages, options)
+        key = hashlib.sha256(json.dumps([backend, model, messages, options], sort_keys=True,
+                                        default=str).encode("utf-8")).hexdigest()
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            lane.add("coalesced")
+            with span("llm.coalesced", backend=backend, model=model, **{"cache.coalesce": "hit"}):
+                return future.result()
+        try:
+            result = self._complete(lane, model, messages, options)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    # ── cassette ──
+    def _cassette_key(self, model: str, messages: List[Dict], options: Dict) -> Optional[str]:
+        return None if self.cassette is None else self.cassette.llm_key(messages, model=model, **options)
+
+    def _replayed(self, key: str) -> Completion:
+        value = self.cassette.replay("llm", key)
+        usage = value.get("usage") if isinstance(value, dict) else None
+        prompt_tokens, completion_tokens = usage or (0, 0)
+        return Completion(recorded_text(value), prompt_tokens, completion_tokens)
+
+    def _record(self, key: Optional[str], result: Completion) -> None:
+        if key is not None:
+            self.cassette.put("llm", key, {"text": result.text,
+                                           "usage": [result.prompt_tokens, result.completion_tokens]},
+                              result.seconds)
+
+    def _complete(self, lane: _Lane, model: str, messages: List[Dict], options: Dict) -> Completion:
+        estimate = estimate_tokens(messages, options.get("max_tokens"))
+        body = lane.protocol.body(model, messages, options, stream=False)
+        key = self._cassette_key(model, messages, options)
+        self._admit(lane, estimate)
+        start, used = time.perf_counter(), None
+        try:
+            with span(f"llm.{lane.backend.name}", model=model, **{"cache.coalesce": "miss"}) as s:
+                if key is not None and self.cassette.replaying:
+                    result = self._replayed(key)
+                    result.seconds = time.perf_counter() - start
+                    s.set(replayed=True, prompt_tokens=result.prompt_tokens,
+                          completion_tokens=result.completion_tokens)
+                    return result
+                for attempt in range(lane.backend.max_retries + 1):
+                    try:
+                        response = lane.client.post(lane.protocol.path, json=body)
+                        response.raise_for_status()
+                        result = lane.protocol.parse(response.json())
+                        break
+                    except (httpx.HTTPError, ValueError, KeyError) as e:
+                        if attempt == lane.backend.max_retries or not self._retryable(e):
+                            lane.add("errors")
+                            raise GatewayError(f"{lane.backend.name}: {e}") from e
+                        self._backoff(lane, attempt, e)
+                result.attempts, result.seconds = attempt + 1, time.perf_counter() - start
+                self._record(key, result)
+                used = result.prompt_tokens + result.completion_tokens
+                s.set(attempts=result.attempts, prompt_tokens=result.prompt_tokens,
+                      completion_tokens=result.completion_tokens)
+                return result
+        finally:
+            self._release(lane, estimate, used, time.perf_counter() - start)
+
+    def stream(self, backend: str, model: str, messages: List[Dict[str, str]], **options) -> "TokenStream":
+        """Like :meth:`complete` but yields text as it arrives (never coalesced)."""
+        return TokenStream(self, self._lane(backend), model, messages, options)
+
+    # ── metrics ──
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for name, lane in self._lanes.items():
+            with lane.lock:
+                latencies = sorted(lane.latencies)
+                out[name] = {**lane.counts, "queue_depth": lane.waiting, "in_flight": lane.active}
+            if latencies:
+                out[name]["p50_ms"] = latencies[len(latencies) // 2] * 1e3
+                out[name]["p95_ms"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1e3
+        return out
+
+
+class TokenStream:
+    """Iterates text chunks; :attr:`completion` holds the totals once exhausted."""
+
+    def __init__(self, gateway: LLMGateway, lane: _Lane, model: str, messages: List[Dict], options: Dict):
+        self._gateway, self._lane = gateway, lane
+        self._model, self._messages, self._options = model, messages, options
+        self.completion: Optional[Completion] = None
+
+    def __iter__(self) -> Iterator[str]:
+        gateway, lane = self._gateway, self._lane
+        estimate = estimate_tokens(self._messages, self._options.get("max_tokens"))
+        body = lane.protocol.body(self._model, self._messages, self._options, stream=True)
+        key = gateway._cassette_key(self._model, self._messages, self._options)
+        gateway._admit(lane, estimate)
+        start, used, error = time.perf_counter(), None, None
+        # Not the current span: the consumer may resume this generator anywhere
+        s = tracer.start_span(f"llm.{lane.backend.name}", model=self._model, stream=True)
+        try:
+            if key is not None and gateway.cassette.replaying:
+                self.completion = gateway._replayed(key)
+                s.set(replayed=True)
+                yield from re.findall(r"\S+\s*|\s+", self.completion.text)
+                return
+            for attempt in range(lane.backend.max_retries + 1):
+                parts, usage = [], None
+                try:
+                    with lane.client.stream("POST", lane.protocol.path, json=body) as response:
+                        response.raise_for_status()
+                        for text, chunk_usage in lane.protocol.chunks(response.iter_lines()):
+                            usage = chunk_usage or usage
+                            if text:
+                                parts.append(text)
+                                yield text
+                    break
+                except (httpx.HTTPError, ValueError) as e:
+                    # Once text went out the caller has seen it: no silent restart
+                    if parts or attempt == lane.backend.max_retries or not gateway._retryable(e):
+                        lane.add("errors")
+                        raise GatewayError(f"{lane.backend.name}: {e}") from e
+                    gateway._backoff(lane, attempt, e)
+            prompt_tokens, completion_tokens = usage or (0, 0)
+            self.completion = Completion("".join(parts), prompt_tokens, completion_tokens,
+                                         time.perf_counter() - start, attempt + 1)
+            gateway._record(key, self.completion)
+            used = prompt_tokens + completion_tokens if usage else None
+            s.set(attempts=attempt + 1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            s.end(error)
+            gateway._release(lane, estimate, used, time.perf_counter() - start)
+
+
+def _build_gateway():
+    return LLMGateway(cassette=get_cassette())
+
+
+registry.register("llm_gateway", _build_gateway)
+
+
+def get_gateway() -> LLMGateway:
+    return registry.get("llm_gateway")
+
+
+# ───────────────────────────── LangChain adapter ──────────────────────────
+_ROLES = {"human": "user", "ai": "assistant", "system": "system", "tool": "tool", "function": "function"}
+
+
+def to_messages(messages: List[BaseMessage]) -> List[Dict[str, str]]:
+    return [{"role": _ROLES.get(m.type, "user"),
+             "content": m.content if isinstance(m.content, str) else json.dumps(m.content)} for m in messages]
+
+
+class GatewayChatModel(BaseChatModel):
+    """
+    LangChain chat model that sends every call through the :class:`LLMGateway`.
+
+    ``streaming=True`` makes ``invoke`` stream as well, so token callbacks
+    (the chat service's answer stream) fire per chunk.
+    """
+
+    backend: str
+    model: str
+    temperature: float = 0.0
+    max_tokens: Optional[int] = None
+    format: Optional[str] = None
+    streaming: bool = False
+    gateway: Optional[Any] = Field(default=None, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"gateway-{self.backend}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "model": self.model, "temperature": self.temperature}
+
+    def _gateway(self) -> LLMGateway:
+        return self.gateway or get_gateway()
+
+    def _options(self, stop) -> Dict[str, Any]:
+        return {"temperature": self.temperature, "max_tokens": self.max_tokens, "stop": stop, "format": self.format}
+
+    @staticmethod
+    def _usage(completion: Completion) -> Dict[str, int]:
+        return {"input_tokens": completion.prompt_tokens, "output_tokens": completion.completion_tokens,
+                "total_tokens": completion.prompt_tokens + completion.completion_tokens}
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.streaming:
+            # LangChain only streams ``invoke`` for streaming handlers; plain ones get tokens here
+            return generate_from_stream(self._stream_with_callbacks(messages, stop, run_manager))
+        completion = self._gateway().complete(self.backend, self.model, to_messages(messages), **self._options(stop))
+        message = AIMessage(content=completion.text, usage_metadata=self._usage(completion))
+        return ChatResult(generations=[ChatGeneration(message=message)],
+                          llm_output={"model_name": self.model, "token_usage": {
+                              "prompt_tokens": completion.prompt_tokens,
+                              "completion_tokens": completion.completion_tokens}})
+
+    def _stream_with_callbacks(self, messages, stop, run_manager) -> Iterator[ChatGenerationChunk]:
+        for chunk in self._stream(messages, stop=stop):
+            if run_manager and chunk.text:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        tokens = self._gateway().stream(self.backend, self.model, to_messages(messages), **self._options(stop))
+        for text in tokens:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+        if tokens.completion is not None:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(tokens.completion)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send one prompt through the LLM gateway")
+    parser.add_argument("prompt")
+    parser.add_argument("--backend", default="ollama")
+    parser.add_argument("--model", default="llama3.2:1b")
+    parser.add_argument("--stream", action="store_true")
+    args = parser.parse_args(argv)
+
+    gateway = get_gateway()
+    messages = [{"role": "user", "content": args.prompt}]
+    if args.stream:
+        tokens = gateway.stream(args.backend, args.model, messages)
+        for text in tokens:
+            print(text, end="", flush=True)
+        print()
+    else:
+        print(gateway.complete(args.backend, args.model, messages).text)
+    print(json.dumps(gateway.stats(), indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+resources.py
+============
+
+Lazy registry for every heavy resource the QA bot touches (Neo4j graph,
+LLM clients, embedder, vector index, chains).
+
+Modules *register* a zero-argument factory at import time, which costs
+nothing; the resource is only built on the first :meth:`ResourceRegistry.get`
+or an explicit :meth:`ResourceRegistry.warm_up`.  Tests swap real resources
+for stubs with :meth:`ResourceRegistry.override`.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict
+
+
+class ResourceRegistry:
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """Declares how to build *name*; re-registering drops any built instance."""
+        with self._guard:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+        if name not in self._factories:
+            raise KeyError(f"No resource registered under {name!r}")
+        # One lock per resource, so a slow model load never blocks the graph.
+        with self._locks[name]:
+            if name not in self._instances:
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def override(self, name: str, instance: Any) -> None:
+        """Installs a ready-made instance (stub, replay wrapper, ...)."""
+        with self._guard:
+            self._locks.setdefault(name, threading.Lock())
+            self._instances[name] = instance
+
+    def reset(self, *names: str) -> None:
+        """Forgets built instances so the next get() rebuilds them (all if no names)."""
+        with self._guard:
+            for name in names or list(self._instances):
+                self._instances.pop(name, None)
+
+    def warm_up(self, *names: str) -> Dict[str, float]:
+        """Builds the named resources (all registered if none) and returns seconds per resource."""
+        timings = {}
+        for name in names or list(self._factories):
+            start = time.perf_counter()
+            self.get(name)
+            timings[name] = time.perf_counter() - start
+        return timings
+
+
+registry = ResourceRegistry()
@@ -0,0 +1,676 @@
+"""
+snapshot_cypher.py
+==================
+
+Evaluates the read-only Cypher the agent generates against a
+:class:`~graph_snapshot.GraphSnapshot`.
+
+Supported:
+
+* one or more ``MATCH`` clauses, each with comma-separated path patterns of
+  up to three relationships (``-[:A|B]->``, ``<-[r]-``, ``-[*1..3]-``);
+  node patterns carry labels and inline ``{key: value}`` maps
+* ``WHERE`` with ``AND`` / ``OR`` / ``NOT``, comparisons, ``=~``,
+  ``CONTAINS`` / ``STARTS WITH`` / ``ENDS WITH``, ``IN`` and ``IS [NOT] NULL``
+* expressions: properties, ``$params``, literals, lists, ``+``, and
+  ``toLower`` / ``toUpper`` / ``trim`` / ``toString`` / ``labels`` /
+  ``type`` / ``elementId`` (of nodes) / ``coalesce`` / ``size``
+* ``RETURN [DISTINCT]`` with aliases, ``count`` / ``collect`` aggregation,
+  ``ORDER BY`` a returned column, ``SKIP`` and ``LIMIT``
+
+Rows come back as ``Neo4jGraph.query`` returns them: nodes as property
+dicts, relationships as ``(start props, type, end props)``.  Anything else
+(writes, ``OPTIONAL MATCH``, ``WITH``, procedures, ...) raises
+:class:`UnsupportedQuery`, and the caller falls back to Neo4j.  So does a
+type error while evaluating: Neo4j decides what such a query means.
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+__all__ = ["UnsupportedQuery", "run_cypher"]
+
+MAX_HOPS = 3
+
+
+class UnsupportedQuery(ValueError):
+    """The query is outside the subset the snapshot can answer."""
+
+
+# ─────────────────────────────── lexer ───────────────────────────────────
+_TOKEN = re.compile(r"""
+    \s+ | //[^\n]* |
+    (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*") |
+    (?P<number>\d+\.\d+|\d+) |
+    (?P<param>\$\w+) |
+    (?P<name>[A-Za-z_]\w*|`[^`]+`) |
+    (?P<op>\.\.|=~|<>|!=|<=|>=|->|<-|[-()\[\]{}:,.<>=*+|/%])
+""", re.VERBOSE)
+
+_ESCAPES = {"n": "\n", "t": "\t", "\\": "\\", "'": "'", '"': '"'}
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens, pos = [], 0
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m:
+            raise UnsupportedQuery(f"Unexpected character {text[pos]!r}")
+        pos = m.end()
+        kind = m.lastgroup
+        if kind is None:
+            continue
+        value = m.group(kind)
+        if kind == "string":
+            value = re.sub(r"\\(.)", lambda e: _ESCAPES.get(e.group(1), "\\" + e.group(1)), value[1:-1])
+        elif kind == "name" and value.startswith("`"):
+            value = value[1:-1]
+        tokens.append((kind, value))
+    tokens.append(("end", ""))
+    return tokens
+
+
+# ─────────────────────────────── parser ──────────────────────────────────
+class _Parser:
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.i = 0
+
+    def peek(self, offset: int = 0) -> Tuple[str, str]:
+        return self.tokens[min(self.i + offset, len(self.tokens) - 1)]
+
+    def keyword(self, *words: str) -> bool:
+        """Consumes *words* if they are next (case-insensitive)."""
+        for n, word in enumerate(words):
+            kind, value = self.peek(n)
+            if kind != "name" or value.upper() != word:
+                return False
+        self.i += len(words)
+        return True
+
+    def op(self, symbol: str) -> bool:
+        if self.peek() == ("op", symbol):
+            self.i += 1
+            return True
+        return False
+
+    def expect(self, symbol: str) -> None:
+        if not self.op(symbol):
+            raise UnsupportedQuery(f"Expected {symbol!r} near {self.peek()[1]!r}")
+
+    def name(self) -> str:
+        kind, value = self.peek()
+        if kind != "name":
+            raise UnsupportedQuery(f"Expected a name near {value!r}")
+        self.i += 1
+        return value
+
+    # ── clauses ──
+    def query(self) -> Dict[str, Any]:
+        matches, where = [], []
+        while self.keyword("MATCH"):
+            patterns = [self.path()]
+            while self.op(","):
+                patterns.append(self.path())
+            matches.append(patterns)
+            if self.keyword("WHERE"):
+                where.append(self.expr())
+        if not matches:
+            raise UnsupportedQuery("Only MATCH ... RETURN queries are supported")
+        if not self.keyword("RETURN"):
+            raise UnsupportedQuery(f"Unsupported clause {self.peek()[1]!r}")
+        distinct = self.keyword("DISTINCT")
+        items = [self.return_item()]
+        while self.op(","):
+            items.append(self.return_item())
+        order = []
+        if self.keyword("ORDER", "BY"):
+            while True:
+                start = self.i
+                self.expr()
+                column = self.source(start)
+                descending = self.keyword("DESC") or self.keyword("DESCENDING")
+                if not descending:
+                    self.keyword("ASC") or self.keyword("ASCENDING")
+                order.append((column, descending))
+                if not self.op(","):
+                    break
+        skip = self.expr() if self.keyword("SKIP") else None
+        limit = self.expr() if self.keyword("LIMIT") else None
+        self.op(";")
+        if self.peek()[0] != "end":
+            raise UnsupportedQuery(f"Unsupported clause {self.peek()[1]!r}")
+        return {"matches": matches, "where": where, "distinct": distinct, "items": items,
+                "order": order, "skip": skip, "limit": limit}
+
+    def source(self, start: int) -> str:
+        """Reconstructs the column name Neo4j would give tokens[start:self.i]."""
+        parts = []
+        for kind, value in self.tokens[start:self.i]:
+            parts.append(repr(value) if kind == "string" else value)
+        text = ""
+        for part in parts:
+            glue = "" if not text or part in ".()[]," or text[-1] in ".([" else " "
+            text += glue + part
+        return text.replace(",", ", ")
+
+    def return_item(self) -> Tuple[str, Any]:
+        start = self.i
+        expr = self.expr()
+        column = self.source(start)
+        if self.keyword("AS"):
+            column = self.name()
+        return column, expr
+
+    # ── patterns ──
+    def path(self) -> Tuple[List[Dict], List[Dict]]:
+        nodes, rels = [self.node()], []
+        while self.peek() in (("op", "-"), ("op", "<-")):
+            rels.append(self.rel())
+            nodes.append(self.node())
+        if len(rels) > MAX_HOPS:
+            raise UnsupportedQuery(f"Paths longer than {MAX_HOPS} relationships")
+        return nodes, rels
+
+    def node(self) -> Dict[str, Any]:
+        self.expect("(")
+        var = self.name() if self.peek()[0] == "name" else None
+        labels = []
+        while self.op(":"):
+            labels.append(self.name())
+        props = self.map() if self.peek() == ("op", "{") else {}
+        self.expect(")")
+        return {"var": var, "labels": labels, "props": props}
+
+    def rel(self) -> Dict[str, Any]:
+        incoming = self.op("<-")
+        if not incoming:
+            self.expect("-")
+        var, types, hops, props = None, [], (1, 1), {}
+        if self.op("["):
+            var = self.name() if self.peek()[0] == "name" else None
+            if self.op(":"):
+                types.append(self.name())
+                while self.op("|"):
+                    self.op(":")
+                    types.append(self.name())
+            if self.op("*"):
+                low = int(self.peek()[1]) if self.peek()[0] == "number" else 1
+                if self.peek()[0] == "number":
+                    self.i += 1
+                high = low
+                if self.op(".."):
+                    high = MAX_HOPS + 1
+                    if self.peek()[0] == "number":
+                        high = int(self.peek()[1])
+                        self.i += 1
+                elif low == 1 and self.tokens[self.i - 1] == ("op", "*"):
+                    high = MAX_HOPS + 1
+                if high > MAX_HOPS:
+                    raise UnsupportedQuery("Unbounded or long variable-length relationships")
+                hops = (low, high)
+            if self.peek() == ("op", "{"):
+                props = self.map()
+            self.expect("]")
+        outgoing = self.op("->")
+        if not outgoing:
+            self.expect("-")
+        if incoming and outgoing:
+            raise UnsupportedQuery("Relationship with two directions")
+        direction = "out" if outgoing else "in" if incoming else "both"
+        if hops != (1, 1) and (var or props):
+            raise UnsupportedQuery("Bound variable-length relationships")
+        return {"var": var, "types": types, "hops": hops, "direction": direction, "props": props}
+
+    def map(self) -> Dict[str, Any]:
+        self.expect("{")
+        entries = {}
+        while not self.op("}"):
+            key = self.name()
+            self.expect(":")
+            entries[key] = self.expr()
+            self.op(",")
+        return entries
+
+    # ── expressions (tuples: (kind, ...)) ──
+    def expr(self):
+        left = self.conjunction()
+        while self.keyword("OR"):
+            left = ("or", left, self.conjunction())
+        return left
+
+    def conjunction(self):
+        left = self.negation()
+        while self.keyword("AND"):
+            left = ("and", left, self.negation())
+        return left
+
+    def negation(self):
+        if self.keyword("NOT"):
+            return ("not", self.negation())
+        return self.comparison()
+
+    def comparison(self):
+        left = self.additive()
+        kind, value = self.peek()
+        if kind == "op" and value in ("=", "<>", "!=", "<", ">", "<=", ">=", "=~"):
+            self.i += 1
+            return ("cmp", value, left, self.additive())
+        for words, name in ((("STARTS", "WITH"), "starts"), (("ENDS", "WITH"), "ends"),
+                            (("CONTAINS",), "contains"), (("IN",), "in")):
+            if self.keyword(*words):
+                return ("cmp", name, left, self.additive())
+        if self.keyword("IS", "NOT", "NULL"):
+            return ("notnull", left)
+        if self.keyword("IS", "NULL"):
+            return ("not", ("notnull", left))
+        return left
+
+    def additive(self):
+        left = self.primary()
+        while self.op("+"):
+            left = ("add", left, self.primary())
+        return left
+
+    def primary(self):
+        kind, value = self.peek()
+        if kind == "string":
+            self.i += 1
+            return ("lit", value)
+        if kind == "number":
+            self.i += 1
+            return ("lit", float(value) if "." in value else int(value))
+        if kind == "param":
+            self.i += 1
+            return ("param", value[1:])
+        if self.op("("):
+            inner = self.expr()
+            self.expect(")")
+            return inner
+        if self.op("["):
+            values = []
+            while not self.op("]"):
+                values.append(self.expr())
+                self.op(",")
+            return ("list", values)
+        if self.op("-"):
+            return ("neg", self.primary())
+        if kind != "name":
+            raise UnsupportedQuery(f"Unexpected {value!r}")
+        self.i += 1
+        upper = value.upper()
+        if upper in ("TRUE", "FALSE", "NULL"):
+            return ("lit", {"TRUE": True, "FALSE": False, "NULL": None}[upper])
+        if self.op("("):
+            distinct = self.keyword("DISTINCT")
+            args = []
+            if self.op("*"):
+                args.append(("star",))
+            while not self.op(")"):
+                args.append(self.expr())
+                self.op(",")
+            return ("call", value.lower(), distinct, args)
+        node = ("var", value)
+        while self.op("."):
+            node = ("prop", node, self.name())
+        return node
+
+
+@lru_cache(maxsize=512)
+def _parse(cypher: str) -> Dict[str, Any]:
+    return _Parser(cypher).query()
+
+
+# ─────────────────────────────── values ──────────────────────────────────
+class _Node(int):
+    """Node id bound to a variable."""
+
+
+class _Rel(int):
+    """Relationship id bound to a variable."""
+
+
+# Row key (not a valid variable name) holding the edges the current MATCH
+# clause has used: Neo4j never binds one relationship twice within a clause
+_USED = " used"
+
+
+AGGREGATES = ("count", "collect")
+
+
+def _contains_aggregate(expr) -> bool:
+    if isinstance(expr, list):
+        return any(_contains_aggregate(part) for part in expr)
+    if not isinstance(expr, tuple):
+        return False
+    if expr[0] == "call" and expr[1] in AGGREGATES:
+        return True
+    return any(_contains_aggregate(part) for part in expr[1:] if isinstance(part, (tuple, list)))
+
+
+@lru_cache(maxsize=256)
+def _regex(pattern: str):
+    return re.compile(pattern)
+
+
+class _Evaluator:
+    def __init__(self, snapshot, params: Dict[str, Any]):
+        self.g = snapshot
+        self.params = params
+
+    # ── expressions ──
+    def value(self, expr, row: Dict[str, Any]):
+        kind = expr[0]
+        if kind == "lit":
+            return expr[1]
+        if kind == "param":
+            if expr[1] not in self.params:
+                raise UnsupportedQuery(f"Missing parameter ${expr[1]}")
+            return self.params[expr[1]]
+        if kind == "var":
+            if expr[1] not in row:
+                raise UnsupportedQuery(f"Unknown variable {expr[1]}")
+            return row[expr[1]]
+        if kind == "prop":
+            owner = self.value(expr[1], row)
+            if isinstance(owner, _Rel):
+                return self.g.rel_props(owner).get(expr[2])
+            if isinstance(owner, _Node):
+                return self.g.prop(owner, expr[2])
+            return owner.get(expr[2]) if isinstance(owner, dict) else None
+        if kind == "list":
+            return [self.value(e, row) for e in expr[1]]
+        if kind == "neg":
+            value = self.value(expr[1], row)
+            return None if value is None else -value
+        if kind == "add":
+            left, right = self.value(expr[1], row), self.value(expr[2], row)
+            if left is None or right is None:
+                return None
+            if isinstance(left, str) or isinstance(right, str):
+                return f"{left}{right}"
+            return left + right
+        if kind in ("and", "or"):
+            left, right = self.logical(expr[1], row), self.logical(expr[2], row)
+            decisive = kind == "or"                     # True decides OR, False decides AND
+            if decisive in (left, right):
+                return decisive
+            return None if None in (left, right) else not decisive
+        if kind == "not":
+            value = self.logical(expr[1], row)
+            return None if value is None else not value
+        if kind == "notnull":
+            return self.value(expr[1], row) is not None
+        if kind == "cmp":
+            return self.compare(expr[1], self.value(expr[2], row), self.value(expr[3], row))
+        if kind == "call":
+            return self.call(expr[1], [self.value(a, row) for a in expr[3]])
+        raise UnsupportedQuery(f"Unsupported expression {kind}")
+
+    def logical(self, expr, row) -> Optional[bool]:
+        """Cypher's three-valued truth: ``True``, ``False`` or ``None`` (null)."""
+        value = self.value(expr, row)
+        return None if value is None else bool(value)
+
+    def truth(self, expr, row) -> bool:
+        """``WHERE`` keeps a row only when its condition is true, not null."""
+        return self.logical(expr, row) is True
+
+    @staticmethod
+    def compare(op: str, left, right) -> Optional[bool]:
+        if op == "in":
+            if right is None:
+                return None
+            if not isinstance(right, list):
+                raise UnsupportedQuery("IN needs a list")
+            if left in right:
+                return True
+            return None if left is None and right or None in right else False
+        if left is None or right is None:
+            return None
+        if op == "=":
+            return left == right
+        if op in ("<>", "!="):
+            return left != right
+        if op in ("=~", "starts", "ends", "contains") and not (isinstance(left, str) and isinstance(right, str)):
+            return None
+        if op == "=~":
+            try:
+                return _regex(right).fullmatch(left) is not None
+            except re.error as e:
+                raise UnsupportedQuery(f"Regex {right!r}: {e}")
+        if op == "starts":
+            return left.startswith(right)
+        if op == "ends":
+            return left.endswith(right)
+        if op == "contains":
+            return right in left
+        try:
+            return {"<": left < right, ">": left > right, "<=": left <= right, ">=": left >= right}[op]
+        except TypeError:
+            return None
+
+    def call(self, name: str, args: List[Any]):
+        if name == "coalesce":
+            return next((a for a in args if a is not None), None)
+        arg = args[0] if args else None
+        if name == "labels":
+            return self.g.node_labels(arg)
+        if name == "type":
+            return self.g.types[int(self.g.arrays["out_types"][arg])]
+        if name == "id":
+            # only element ids are exported; snapshot positions mean nothing to Neo4j
+            raise UnsupportedQuery("id() is not in the snapshot")
+        if name == "elementid":
+            if not isinstance(arg, _Node):
+                raise UnsupportedQuery("Relationship element ids are not in the snapshot")
+            return self.g.element_id(arg)
+        if name == "keys":
+            return list(self.output(arg).keys()) if isinstance(arg, _Node) else list(arg or {})
+        if name == "properties":
+            return self.output(arg)
+        if arg is None:
+            return None
+        simple = {"tolower": str.lower, "toupper": str.upper, "trim": str.strip,
+                  "tostring": str, "size": len}
+        if name in simple:
+            return simple[name](arg if name in ("tostring", "size") else str(arg))
+        raise UnsupportedQuery(f"Unsupported function {name}()")
+
+    def output(self, value):
+        """Converts bound ids to what ``Neo4jGraph.query`` returns."""
+        if isinstance(value, _Node):
+            return self.g.props(value)
+        if isinstance(value, _Rel):
+            start, end = self.g.edge_endpoints(value)
+            return (self.g.props(start), self.call("type", [value]), self.g.props(end))
+        if isinstance(value, list):
+            return [self.output(v) for v in value]
+        return value
+
+    # ── patterns ──
+    def candidates(self, pattern: Dict[str, Any], row: Dict[str, Any]) -> List[int]:
+        bound = row.get(pattern["var"]) if pattern["var"] else None
+        if bound is not None:
+            if not isinstance(bound, _Node):
+                raise UnsupportedQuery(f"{pattern['var']} is not a node")
+            return [bound] if self.node_ok(bound, pattern, row) else []
+        labels = pattern["labels"]
+        name_key = next((k for k in ("name", "fullName", "id") if k in pattern["props"]), None)
+        if name_key is not None:
+            wanted = self.value(pattern["props"][name_key], row)
+            pool = self.g.find(wanted, labels[0] if labels else None) if isinstance(wanted, str) else []
+        else:
+            pool = self.g.nodes_with_label(labels[0] if labels else None)
+        return [int(n) for n in pool if self.node_ok(int(n), pattern, row)]
+
+    def node_ok(self, node: int, pattern: Dict[str, Any], row: Dict[str, Any]) -> bool:
+        if not all(self.g.has_label(node, l) for l in pattern["labels"]):
+            return False
+        for key, expected in pattern["props"].items():
+            value = self.value(expected, row)
+            if value is None or self.g.prop(node, key) != value:
+                return False
+        return True
+
+    def steps(self, node: int, rel: Dict[str, Any], row: Dict[str, Any], reverse: bool):
+        """
+        Yields ``(edge id or None, edges used, node)`` for every path through
+        *rel* from *node*.  A variable-length pattern yields each path, not
+        each end node, as Neo4j does.
+        """
+        direction = rel["direction"]
+        if reverse and direction != "both":
+            direction = "in" if direction == "out" else "out"
+        types = rel["types"] or None
+        low, high = rel["hops"]
+        if (low, high) == (1, 1):
+            for edge, _, other in self.g.neighbours(node, types, direction):
+                if all(self.g.rel_props(edge).get(k) == self.value(v, row) for k, v in rel["props"].items()):
+                    yield edge, frozenset((edge,)), other
+            return
+        if low == 0:
+            yield None, frozenset(), node
+        frontier = [(node, frozenset())]
+        for depth in range(1, high + 1):
+            next_frontier = []
+            for current, used in frontier:
+                for edge, _, other in self.g.neighbours(current, types, direction):
+                    if edge in used:
+                        continue
+                    next_frontier.append((other, used | {edge}))
+                    if depth >= low:
+                        yield None, used | {edge}, other
+            frontier = next_frontier
+
+    def match(self, pattern, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        nodes, rels = pattern
+        out = []
+        for row in rows:
+            # anchor on a bound variable, else on the more selective end
+            anchor = next((i for i, n in enumerate(nodes) if n["var"] in row), None)
+            if anchor is None:
+                first, last = self.candidates(nodes[0], row), self.candidates(nodes[-1], row)
+                anchor, starts = (0, first) if len(first) <= len(last) else (len(nodes) - 1, last)
+            else:
+                starts = self.candidates(nodes[anchor], row)
+            for start in starts:
+                out.extend(self.extend(nodes, rels, anchor, start, row))
+        return out
+
+    def extend(self, nodes, rels, anchor: int, start: int, row: Dict[str, Any]):
+        def bind(binding, index, node):
+            var = nodes[index]["var"]
+            if var:
+                binding = {**binding, var: _Node(node)}
+            return binding
+
+        partial = [(bind(row, anchor, start), start, start, row.get(_USED, frozenset()))]
+        # rightwards from the anchor, then leftwards
+        for lo_index, step in [(i, +1) for i in range(anchor, len(rels))] + [(i, -1) for i in range(anchor, 0, -1)]:
+            grown = []
+            rel_index = lo_index if step > 0 else lo_index - 1
+            rel = rels[rel_index]
+            target = lo_index + 1 if step > 0 else lo_index - 1
+            for binding, left_end, right_end, edges in partial:
+                current = right_end if step > 0 else left_end
+                for edge, path, other in self.steps(current, rel, binding, reverse=step < 0):
+                    if edges & path:
+                        continue
+                    if other not in self.candidates_for(nodes[target], binding, other):
+                        continue
+                    extended = bind(binding, target, other)
+                    if rel["var"]:
+                        if rel["var"] in extended and extended[rel["var"]] != edge:
+                            continue
+                        extended = {**extended, rel["var"]: _Rel(edge)}
+                    grown.append((extended, left_end if step > 0 else other,
+                                  other if step > 0 else right_end, edges | path))
+            partial = grown
+        return [{**binding, _USED: edges} for binding, _, _, edges in partial]
+
+    def candidates_for(self, pattern, binding, node: int) -> Tuple[int, ...]:
+        bound = binding.get(pattern["var"]) if pattern["var"] else None
+        if bound is not None and bound != node:
+            return ()
+        return (node,) if self.node_ok(node, pattern, binding) else ()
+
+    # ── projection ──
+    def project(self, plan: Dict[str, Any], rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        items = plan["items"]
+        aggregated = [_contains_aggregate(expr) for _, expr in items]
+        if not any(aggregated):
+            result = [{column: self.output(self.value(expr, row)) for column, expr in items} for row in rows]
+        else:
+            groups: Dict[Any, Tuple[Dict[str, Any], List[Dict[str, Any]]]] = {}
+            for row in rows:
+                keys = {column: self.output(self.value(expr, row))
+                        for (column, expr), agg in zip(items, aggregated) if not agg}
+                group = groups.setdefault(repr(sorted(keys.items(), key=lambda kv: kv[0])), (keys, []))
+                group[1].append(row)
+            if not groups and not any(not agg for agg in aggregated):
+                groups[""] = ({}, [])
+            result = []
+            for keys, members in groups.values():
+                out = dict(keys)
+                for (column, expr), agg in zip(items, aggregated):
+                    if agg:
+                        out[column] = self.aggregate(expr, members)
+                result.append({column: out[column] for column, _ in items})
+        if plan["distinct"]:
+            seen, unique = set(), []
+            for row in result:
+                key = repr(row)
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(row)
+            result = unique
+        for column, descending in reversed(plan["order"]):
+            if result and column not in result[0]:
+                raise UnsupportedQuery(f"ORDER BY {column} is not a returned column")
+            result.sort(key=lambda r: (r[column] is None, r[column] if r[column] is not None else 0),
+                        reverse=descending)
+        skip = int(self.value(plan["skip"], {})) if plan["skip"] else 0
+        limit = int(self.value(plan["limit"], {})) if plan["limit"] else None
+        return result[skip:None if limit is None else skip + limit]
+
+    def aggregate(self, expr, rows: List[Dict[str, Any]]):
+        if expr[0] != "call" or expr[1] not in AGGREGATES:
+            raise UnsupportedQuery("Aggregates must be top-level count()/collect()")
+        _, name, distinct, args = expr
+        if args and args[0] == ("star",):
+            return len(rows)
+        values = [self.output(self.value(args[0], row)) for row in rows]
+        values = [v for v in values if v is not None]
+        if distinct:
+            seen, unique = set(), []
+            for v in values:
+                if repr(v) not in seen:
+                    seen.add(repr(v))
+                    unique.append(v)
+            values = unique
+        return len(values) if name == "count" else values
+
+
+def run_cypher(snapshot, cypher: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Answers *cypher* from *snapshot*; raises :class:`UnsupportedQuery` if it cannot."""
+    try:
+        plan = _parse(cypher.strip())
+        evaluator = _Evaluator(snapshot, dict(params or {}))
+        rows: List[Dict[str, Any]] = [{}]
+        for patterns in plan["matches"]:
+            for pattern in patterns:
+                rows = evaluator.match(pattern, rows)
+            for row in rows:
+                row.pop(_USED, None)            # the next MATCH may reuse relationships
+        for condition in plan["where"]:
+            rows = [row for row in rows if evaluator.truth(condition, row)]
+        return evaluator.project(plan, rows)
+    except UnsupportedQuery:
+        raise
+    except (TypeError, ValueError, AttributeError, IndexError, KeyError) as e:
+        # Neo4j would raise a type error or answer differently: let it decide
+        raise UnsupportedQuery(f"{type(e).__name__}: {e}") from e
@@ -0,0 +1,331 @@
+"""
+tracing.py
+==========
+
+Span-based instrumentation for the QA bot and the graph loaders.
+
+    with span("cypher.plan", question=q) as s:
+        ...
+        s.set(cypher=query, rows=len(rows), **{"cache.plan": "hit"})
+
+A span records its name, parent, wall time, error and free-form
+attributes.  A few attribute names also feed the metrics:
+
+* ``tokens.prompt`` / ``tokens.completion`` – LLM token counts
+* ``rows`` – result rows of a Neo4j query or load
+* ``cache.<name>`` – ``"hit"`` / ``"miss"`` of a cache lookup
+
+Finished spans go to the configured exporters: :class:`JsonlExporter`
+(one JSON object per line) and :class:`Metrics`, which keeps Prometheus
+histograms and counters.  The service serves those at ``GET /metrics``, and
+:func:`serve_metrics` exposes them from the CLIs.
+
+Tracing is off unless ``QA_TRACE`` is set.  While it is off, :func:`span`
+returns a shared no-op object, so instrumented code costs one attribute
+check per span.
+
+``QA_TRACE=1`` writes JSONL to ``Output/traces/`` (or ``QA_TRACE_FILE``)
+and keeps metrics.  ``QA_TRACE=metrics`` keeps metrics only.
+"""
+from __future__ import annotations
+
+import atexit
+import bisect
+import contextvars
+import functools
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_TRACE_DIR = PROJECT_ROOT / "Output" / "traces"
+
+_CURRENT: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("qa_span", default=None)
+# Span ids only need to be unique within a trace file: a per-process
+# random prefix plus a counter is much cheaper than uuid4()
+_PROCESS_ID = f"{random.getrandbits(32):08x}"
+_next_id = itertools.count(1).__next__
+
+
+# ─────────────────────────────── spans ───────────────────────────────────
+class Span:
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "start", "duration",
+                 "attrs", "error", "_t0", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = f"{_PROCESS_ID}{_next_id():08x}"
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.attrs = attrs
+        self.error: Optional[str] = None
+        self._t0 = time.perf_counter()
+        self._token = None
+
+    def set(self, **attrs) -> "Span":
+        self.attrs.update(attrs)
+        return self
+
+    def add(self, key: str, amount: float = 1) -> "Span":
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+        return self
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._t0
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.tracer.export(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _CURRENT.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _CURRENT.reset(self._token)
+        self.end(exc)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "name": self.name, "start": self.start, "duration_ms": (self.duration or 0.0) * 1e3,
+                "error": self.error, "attrs": self.attrs}
+
+
+class _NoopSpan:
+    """Stands in for every span while tracing is off."""
+
+    __slots__ = ()
+
+    def set(self, **attrs) -> "_NoopSpan":
+        return self
+
+    def add(self, key: str, amount: float = 1) -> "_NoopSpan":
+        return self
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Creates spans and hands finished ones to its exporters (none: disabled)."""
+
+    def __init__(self, exporters: Iterable[Any] = ()):
+        self.exporters: List[Any] = []
+        self.enabled = False
+        self.configure(exporters)
+
+    def configure(self, exporters: Iterable[Any]) -> None:
+        self.exporters = list(exporters)
+        self.enabled = bool(self.exporters)
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, _CURRENT.get(), attrs)
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attrs):
+        """A span ended explicitly with :meth:`Span.end` (for callbacks); not made current."""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, parent or _CURRENT.get(), attrs)
+
+    def export(self, span: Span) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:          # tracing must never break a request
+                print(f"Span export to {type(exporter).__name__} failed: {e}")
+
+    def metrics(self) -> Optional["Metrics"]:
+        return next((e for e in self.exporters if isinstance(e, Metrics)), None)
+
+
+def current_span():
+    return _CURRENT.get() or NOOP_SPAN
+
+
+def traced(name: Optional[str] = None):
+    """Decorator form of :func:`span`; the span is named after the function by default."""
+    def decorate(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with tracer.span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ───────────────────────────── exporters ─────────────────────────────────
+class JsonlExporter:
+    """Appends one JSON line per span; the file is opened on the first span."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fh = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._fh is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fh = open(self.path, "a", encoding="utf-8")
+                atexit.register(self.close)
+            self._fh.write(line)
+            self._fh.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+class Metrics:
+    """
+    Prometheus-style aggregates of finished spans: a duration histogram
+    and error count per span name, LLM tokens, result rows and cache hits.
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, List[float]] = {}     # name -> per-bucket counts + [+Inf, sum]
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._tokens: Dict[str, int] = defaultdict(int)
+        self._rows: Dict[str, int] = defaultdict(int)
+        self._cache: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.gauges: Dict[str, Callable[[], float]] = {}
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            hist = self._histograms.setdefault(span.name, [0.0] * (len(self.BUCKETS) + 2))
+            hist[bisect.bisect_left(self.BUCKETS, span.duration)] += 1
+            hist[-1] += span.duration
+            if span.error:
+                self._errors[span.name] += 1
+            for key, value in span.attrs.items():
+                if key.startswith("tokens.") and isinstance(value, (int, float)):
+                    self._tokens[key[7:]] += value
+                elif key == "rows" and isinstance(value, (int, float)):
+                    self._rows[span.name] += value
+                elif key.startswith("cache.") and isinstance(value, str):
+                    self._cache[(key[6:], value)] += 1
+
+    def render(self) -> str:
+        """The metrics in Prometheus text exposition format."""
+        lines = ["# TYPE qa_span_seconds histogram"]
+        with self._lock:
+            for name, hist in sorted(self._histograms.items()):
+                cumulative = list(itertools.accumulate(hist[:-1]))
+                for bound, count in zip(self.BUCKETS, cumulative):
+                    lines.append(f'qa_span_seconds_bucket{{span="{name}",le="{bound}"}} {count:g}')
+                lines.append(f'qa_span_seconds_bucket{{span="{name}",le="+Inf"}} {cumulative[-1]:g}')
+                lines.append(f'qa_span_seconds_count{{span="{name}"}} {cumulative[-1]:g}')
+                lines.append(f'qa_span_seconds_sum{{span="{name}"}} {hist[-1]:.6f}')
+            lines.append("# TYPE qa_span_errors_total counter")
+            lines += [f'qa_span_errors_total{{span="{n}"}} {c}' for n, c in sorted(self._errors.items())]
+            lines.append("# TYPE qa_llm_tokens_total counter")
+            lines += [f'qa_llm_tokens_total{{kind="{k}"}} {c:g}' for k, c in sorted(self._tokens.items())]
+            lines.append("# TYPE qa_rows_total counter")
+            lines += [f'qa_rows_total{{span="{n}"}} {c:g}' for n, c in sorted(self._rows.items())]
+            lines.append("# TYPE qa_cache_lookups_total counter")
+            lines += [f'qa_cache_lookups_total{{cache="{c}",result="{r}"}} {n}'
+                      for (c, r), n in sorted(self._cache.items())]
+        for name, read in sorted(self.gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {read():g}")
+        return "\n".join(lines) + "\n"
+
+
+# ─────────────────────────── configuration ───────────────────────────────
+tracer = Tracer()
+
+
+def span(name: str, **attrs):
+    """A span under the current one; use as a context manager."""
+    return tracer.span(name, **attrs) if tracer.enabled else NOOP_SPAN
+
+
+def configure(mode: Optional[str] = None, path: Optional[Path] = None) -> Tracer:
+    """
+    Args:
+        mode (str | None): ``"0"``/``""`` off, ``"metrics"`` metrics only,
+            anything else JSONL plus metrics.  Defaults to ``$QA_TRACE``.
+        path (Path | None): JSONL file; defaults to ``$QA_TRACE_FILE`` or
+            a per-process file under ``Output/traces``.
+    """
+    mode = os.getenv("QA_TRACE", "") if mode is None else mode
+    exporters: List[Any] = []
+    if mode not in ("", "0", "off"):
+        exporters.append(tracer.metrics() or Metrics())
+        if mode != "metrics":
+            path = path or os.getenv("QA_TRACE_FILE") or (
+                DEFAULT_TRACE_DIR / f"spans-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl")
+            exporters.append(JsonlExporter(Path(path)))
+    tracer.configure(exporters)
+    return tracer
+
+
+def render_metrics() -> str:
+    metrics = tracer.metrics()
+    return metrics.render() if metrics else "# tracing disabled (set QA_TRACE)\n"
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1"):
+    """Serves ``GET /metrics`` from a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server
+
+
+def callbacks() -> list:
+    """LangChain callback handlers that trace LLM and tool runs (none while disabled)."""
+    if not tracer.enabled:
+        return []
+    from .tracing_callbacks import TracingCallbackHandler
+    return [TracingCallbackHandler(tracer)]
+
+
+configure()
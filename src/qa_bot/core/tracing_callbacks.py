@@ -0,0 +1,77 @@
+"""
+tracing_callbacks.py
+====================
+
+LangChain callback handler that turns chat-model and tool runs into
+:mod:`tracing` spans.  Kept apart from ``tracing`` so the loaders can trace
+without importing LangChain.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .tracing import Tracer
+
+
+def _model(kwargs: Dict[str, Any]) -> str:
+    params = kwargs.get("invocation_params") or {}
+    return params.get("model_name") or params.get("model") or params.get("_type", "")
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """One span per LLM call (model, tokens) and per tool call (name, input)."""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self._spans: Dict[UUID, Any] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, name: str, **attrs) -> None:
+        span = self.tracer.start_span(name, **attrs)
+        with self._lock:
+            self._spans[run_id] = span
+
+    def _end(self, run_id: UUID, error: BaseException = None, **attrs) -> None:
+        with self._lock:
+            span = self._spans.pop(run_id, None)
+        if span is not None:
+            span.set(**attrs).end(error)
+
+    # ── LLM runs ──
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm", model=_model(kwargs), messages=sum(len(batch) for batch in messages))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm", model=_model(kwargs))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = dict((response.llm_output or {}).get("token_usage") or {})
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if metadata:
+                    usage.setdefault("prompt_tokens", metadata.get("input_tokens"))
+                    usage.setdefault("completion_tokens", metadata.get("output_tokens"))
+        attrs = {}
+        if usage.get("prompt_tokens") is not None:
+            attrs["tokens.prompt"] = usage["prompt_tokens"]
+        if usage.get("completion_tokens") is not None:
+            attrs["tokens.completion"] = usage["completion_tokens"]
+        self._end(run_id, **attrs)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # ── tools ──
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, f"tool.{(serialized or {}).get('name', 'unknown')}", input=input_str[:500])
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id, output_chars=len(str(output)))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
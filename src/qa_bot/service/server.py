@@ -0,0 +1,281 @@
+"""
+server.py
+=========
+
+asyncio HTTP/WebSocket chat service around the QA agent.
+
+* ``POST /chat``            – ``{"message", "session_id"?}`` → full answer
+* ``GET  /ws``              – WebSocket; send the same JSON, receive
+  ``token`` frames followed by one ``answer`` frame
+* ``GET  /sessions/{id}``   – the session's message history
+* ``GET  /health``          – queue and concurrency counters
+* ``GET  /metrics``         – Prometheus metrics from :mod:`..core.tracing`
+  plus the same counters
+
+The agent is synchronous, so each turn runs on a worker thread.  At most
+``max_concurrency`` turns run at once.  That also bounds the LLM and Neo4j
+calls, because every turn makes them sequentially.  Up to ``max_queue``
+more turns wait their turn.  Anything beyond that is refused straight away
+with HTTP 503 and ``Retry-After`` rather than piling up.  Turns within one
+session are serialised so the history stays in order.
+
+    python -m src.qa_bot.service.server --port 8080 --concurrency 4
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import WSMsgType, web
+
+from ..core.tracing import render_metrics
+from .sessions import SessionStore
+
+# (message, history, on_token) -> answer; called on a worker thread
+Responder = Callable[[str, List[Dict[str, str]], Callable[[str], None]], str]
+
+
+def agent_responder(message: str, history: List[Dict[str, str]],
+                    on_token: Callable[[str], None]) -> str:
+    from ..core.agent import generate_response
+    from .streaming import FinalAnswerStream
+    return generate_response(message, history, callbacks=[FinalAnswerStream(on_token)])
+
+
+class ServiceOverloaded(Exception):
+    """The queue is full; the client should retry later."""
+
+
+class ChatService:
+    """
+    Args:
+        respond (callable): See :data:`Responder`.
+        sessions (SessionStore | None): Per-session memory.
+        max_concurrency (int): Turns processed simultaneously.
+        max_queue (int): Turns allowed to wait for a free slot.
+    """
+
+    def __init__(self, respond: Responder = agent_responder, sessions: Optional[SessionStore] = None,
+                 max_concurrency: int = 4, max_queue: int = 32):
+        self.respond = respond
+        self.sessions = sessions or SessionStore()
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._pool = ThreadPoolExecutor(max_concurrency, thread_name_prefix="chat-agent")
+        # session -> (lock, turns holding or waiting for it); dropped when idle
+        self._session_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def _session_turn(self, session_id: str) -> AsyncIterator[None]:
+        lock, users = self._session_locks.get(session_id, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._session_locks[session_id] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._session_locks[session_id]
+            if users == 1:
+                del self._session_locks[session_id]
+            else:
+                self._session_locks[session_id] = (lock, users - 1)
+
+    async def ask(self, session_id: str, message: str,
+                  on_token: Optional[Callable[[str], None]] = None) -> Dict[str, object]:
+        """
+        Answers *message* within *session_id*.
+
+        Raises:
+            ServiceOverloaded: If ``max_concurrency + max_queue`` turns are
+                already in flight.
+            KeyError: For an unknown session.
+        """
+        if self.active + self.waiting >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise ServiceOverloaded(f"{self.active} active, {self.waiting} queued")
+        self.sessions.history(session_id)                  # KeyError before queuing
+
+        loop = asyncio.get_running_loop()
+        emit = (lambda token: loop.call_soon_threadsafe(on_token, token)) if on_token else (lambda token: None)
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        admitted = False
+        try:
+            async with self._session_turn(session_id), self._slots:
+                self.waiting -= 1
+                admitted = True
+                self.active += 1
+                started_at = time.perf_counter()
+                try:
+                    # Read after the session lock so the previous turn is included
+                    history = self.sessions.history(session_id)
+                    answer = await loop.run_in_executor(
+                        self._pool, partial(self.respond, message, history, emit))
+                    self.sessions.append(session_id, message, answer,
+                                         response_time=time.perf_counter() - started_at)
+                except Exception:
+                    self.failed += 1
+                    raise
+                finally:
+                    self.active -= 1
+        finally:
+            if not admitted:                                # cancelled while queued
+                self.waiting -= 1
+        self.completed += 1
+        return {"session_id": session_id, "answer": answer,
+                "queued_seconds": round(started_at - queued_at, 4),
+                "seconds": round(time.perf_counter() - started_at, 4)}
+
+    def stats(self) -> Dict[str, int]:
+        return {"active": self.active, "waiting": self.waiting, "completed": self.completed,
+                "failed": self.failed, "rejected": self.rejected,
+                "max_concurrency": self.max_concurrency, "max_queue": self.max_queue}
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.sessions.close()
+
+
+# ─────────────────────────────── handlers ─────────────────────────────────
+SERVICE = web.AppKey("service", ChatService)
+
+def _session_for(service: ChatService, body: dict) -> str:
+    session_id = body.get("session_id")
+    if not session_id:
+        return service.sessions.create()
+    if not service.sessions.exists(session_id):
+        raise web.HTTPNotFound(text=f"unknown session {session_id}")
+    return session_id
+
+
+def _overloaded() -> web.HTTPServiceUnavailable:
+    return web.HTTPServiceUnavailable(
+        text="chat service is at capacity, retry shortly",
+        headers={"Retry-After": "2"},
+    )
+
+
+async def chat(request: web.Request) -> web.Response:
+    service: ChatService = request.app[SERVICE]
+    body = await request.json()
+    message = (body.get("message") or "").strip()
+    if not message:
+        raise web.HTTPBadRequest(text="'message' is required")
+    session_id = _session_for(service, body)
+    try:
+        return web.json_response(await service.ask(session_id, message))
+    except ServiceOverloaded:
+        raise _overloaded()
+
+
+async def chat_ws(request: web.Request) -> web.WebSocketResponse:
+    service: ChatService = request.app[SERVICE]
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+
+    async for frame in ws:
+        if frame.type != WSMsgType.TEXT:
+            continue
+        body = frame.json()
+        message = (body.get("message") or "").strip()
+        if not message:
+            await ws.send_json({"type": "error", "status": 400, "error": "'message' is required"})
+            continue
+        try:
+            session_id = _session_for(service, body)
+        except web.HTTPNotFound as e:
+            await ws.send_json({"type": "error", "status": 404, "error": e.text})
+            continue
+
+        tokens: asyncio.Queue = asyncio.Queue()
+        turn = asyncio.ensure_future(service.ask(session_id, message, tokens.put_nowait))
+        while not turn.done():
+            getter = asyncio.ensure_future(tokens.get())
+            await asyncio.wait({getter, turn}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                await ws.send_json({"type": "token", "text": getter.result()})
+            else:
+                getter.cancel()
+        while not tokens.empty():
+            await ws.send_json({"type": "token", "text": tokens.get_nowait()})
+
+        try:
+            await ws.send_json({"type": "answer", **turn.result()})
+        except ServiceOverloaded:
+            await ws.send_json({"type": "error", "status": 503, "session_id": session_id,
+                                "error": "chat service is at capacity, retry shortly"})
+        except Exception as e:
+            await ws.send_json({"type": "error", "status": 500, "session_id": session_id,
+                                "error": str(e)})
+    return ws
+
+
+async def session_history(request: web.Request) -> web.Response:
+    service: ChatService = request.app[SERVICE]
+    try:
+        return web.json_response(service.sessions.history(request.match_info["session_id"]))
+    except KeyError:
+        raise web.HTTPNotFound(text="unknown session")
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response(request.app[SERVICE].stats())
+
+
+async def metrics(request: web.Request) -> web.Response:
+    lines = [render_metrics()]
+    for name, value in request.app[SERVICE].stats().items():
+        if isinstance(value, (int, float)):
+            lines.append(f"# TYPE qa_service_{name} gauge\nqa_service_{name} {value:g}\n")
+    return web.Response(text="".join(lines), content_type="text/plain")
+
+
+def make_app(service: ChatService) -> web.Application:
+    app = web.Application()
+    app[SERVICE] = service
+    app.router.add_post("/chat", chat)
+    app.router.add_get("/ws", chat_ws)
+    app.router.add_get("/sessions/{session_id}", session_history)
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics)
+    app.on_cleanup.append(_close_service)
+    return app
+
+
+async def _close_service(app: web.Application) -> None:
+    app[SERVICE].close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the GEO Help Guide chatbot over HTTP/WebSocket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=4, help="turns processed at once")
+    parser.add_argument("--queue", type=int, default=32, help="turns allowed to wait before 503")
+    parser.add_argument("--no-warm-up", action="store_true")
+    args = parser.parse_args(argv)
+
+    if not args.no_warm_up:
+        from ..core.agent import warm_up
+        timings = warm_up()
+        print("Ready (" + ", ".join(f"{k} {v:.1f}s" for k, v in timings.items()) + ")")
+
+    async def build():
+        return make_app(ChatService(max_concurrency=args.concurrency, max_queue=args.queue))
+
+    web.run_app(build(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
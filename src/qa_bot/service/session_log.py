@@ -0,0 +1,465 @@
+"""
+session_log.py
+==============
+
+Append-only storage for chat sessions.  It replaces one JSON file per
+session, where every turn rewrote the whole file.
+
+* **Segments** – ``NNNNNN.log`` files of length-prefixed records:
+  ``<u4 length><u4 crc32><JSON payload>``.  Only the last segment is
+  appended to.  Once it passes ``segment_bytes`` it is sealed and a new one
+  starts.
+* **Index** – each segment has a sidecar ``NNNNNN.idx`` with one fixed-width
+  row per record: time, offset, length, kind, response time and a 64-bit
+  hash of the session id.  Lookups by session or time window filter the
+  index with numpy and only read the records they need.  Response-time
+  statistics never open a segment at all.
+* **Manifest** – ``manifest.json`` lists the live segments.  It is swapped
+  atomically, so a crash during compaction leaves the old segments in place.
+* **Compaction** – once there are ``compact_after`` sealed segments and they
+  hold deleted sessions or superseded titles, they are merged without them.
+
+Three kinds of record are stored: a turn (question, answer, timestamp and
+optional response time), a session title, and a deletion marker.  Queries
+stream one segment at a time:
+
+    python -m src.qa_bot.service.session_log import            # Data/ChatSessions, titles, timings
+    python -m src.qa_bot.service.session_log questions --since 2025-03-17 --until 2025-03-18
+    python -m src.qa_bot.service.session_log p95
+    python -m src.qa_bot.service.session_log compact
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import struct
+import threading
+import zlib
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DATA_DIR = PROJECT_ROOT / "Data"
+DEFAULT_LOG_DIR = DATA_DIR / "ChatSessions"
+
+TURN, TITLE, DELETE = 1, 2, 3
+_KINDS = {"turn": TURN, "title": TITLE, "delete": DELETE}
+
+_HEADER = struct.Struct("<II")                  # payload length, crc32
+INDEX_DTYPE = np.dtype([("t", "<f8"), ("offset", "<u8"), ("length", "<u4"), ("kind", "u1"),
+                        ("seconds", "<f4"), ("session", "<u8")])
+
+
+def session_hash(session_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(session_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def to_epoch(timestamp: str) -> float:
+    """Seconds since the epoch for an ISO timestamp (naive ones are UTC)."""
+    parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _day(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%d")
+
+
+class SessionLog:
+    """
+    Args:
+        directory (Path): Folder holding the manifest, segments and indexes.
+        segment_bytes (int): Size at which the active segment is sealed.
+        compact_after (int): Sealed segments that trigger a compaction.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_LOG_DIR, segment_bytes: int = 4 << 20,
+                 compact_after: int = 8):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.compact_after = compact_after
+        self._lock = threading.RLock()
+        self._segments: List[int] = []
+        self._next = 1
+        self._sessions: Dict[int, int] = defaultdict(int)     # session hash -> turns
+        self._deleted = set()
+        self._log = None
+        self._idx = None
+        self._size = 0
+        self._open()
+
+    # ───────────────────────────── files ──────────────────────────────────
+    def _path(self, segment: int, suffix: str) -> Path:
+        return self.directory / f"{segment:06d}{suffix}"
+
+    @property
+    def _manifest(self) -> Path:
+        return self.directory / "manifest.json"
+
+    def _write_manifest(self) -> None:
+        tmp = self._manifest.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"segments": self._segments, "next": self._next}), encoding="utf-8")
+        tmp.replace(self._manifest)
+
+    def _open(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._manifest.exists():
+            manifest = json.loads(self._manifest.read_text(encoding="utf-8"))
+            self._segments, self._next = manifest["segments"], manifest["next"]
+            live = set(self._segments)
+            for path in list(self.directory.glob("*.log")) + list(self.directory.glob("*.idx")):
+                if path.stem.isdigit() and int(path.stem) not in live:
+                    path.unlink()               # left behind by an interrupted compaction
+        if not self._segments:
+            self._segments, self._next = [self._next], self._next + 1
+            self._write_manifest()
+        self._recover(self._segments[-1])
+        for segment in self._segments:
+            self._count(self._index(segment))
+        self._activate(self._segments[-1])
+
+    def _activate(self, segment: int) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._idx.close()
+        self._log = open(self._path(segment, ".log"), "ab")
+        self._idx = open(self._path(segment, ".idx"), "ab")
+        self._size = self._log.tell()
+
+    def _recover(self, segment: int) -> None:
+        """Indexes records written after the last index row; drops a torn tail."""
+        log_path, idx_path = self._path(segment, ".log"), self._path(segment, ".idx")
+        log_path.touch()
+        idx_path.touch()
+        rows = self._index(segment)
+        with open(idx_path, "r+b") as f:
+            f.truncate(len(rows) * INDEX_DTYPE.itemsize)
+        end = int(rows["offset"][-1]) + _HEADER.size + int(rows["length"][-1]) if len(rows) else 0
+        recovered = []
+        with open(log_path, "r+b") as f:
+            f.seek(end)
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                length, crc = _HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                recovered.append(self._row(json.loads(payload), end, length))
+                end += _HEADER.size + length
+            f.truncate(end)
+        if recovered:
+            with open(idx_path, "ab") as f:
+                f.write(np.concatenate(recovered).tobytes())
+
+    def _index(self, segment: int) -> np.ndarray:
+        data = self._path(segment, ".idx").read_bytes()
+        whole = len(data) - len(data) % INDEX_DTYPE.itemsize     # a row may be mid-write
+        return np.frombuffer(data[:whole], dtype=INDEX_DTYPE)
+
+    def _count(self, rows: np.ndarray) -> None:
+        for kind, session in zip(rows["kind"].tolist(), rows["session"].tolist()):
+            if kind == DELETE:
+                self._sessions.pop(session, None)
+                self._deleted.add(session)
+            elif kind == TURN:
+                self._sessions[session] += 1
+
+    @staticmethod
+    def _row(record: Dict[str, Any], offset: int, length: int) -> np.ndarray:
+        seconds = record.get("response_time")
+        return np.array([(to_epoch(record["timestamp"]), offset, length, _KINDS[record["kind"]],
+                          np.nan if seconds is None else seconds,
+                          session_hash(record.get("session") or ""))], dtype=INDEX_DTYPE)
+
+    # ───────────────────────────── writes ─────────────────────────────────
+    def _append(self, record: Dict[str, Any]) -> None:
+        payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        row = self._row(record, self._size, len(payload))
+        with self._lock:
+            row["offset"] = self._size
+            self._log.write(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            self._log.flush()
+            self._idx.write(row.tobytes())          # after the record, so readers never see a dangling row
+            self._idx.flush()
+            self._size += _HEADER.size + len(payload)
+            self._count(row)
+            if self._size >= self.segment_bytes:
+                self._roll()
+
+    def _roll(self) -> None:
+        self._segments.append(self._next)
+        self._next += 1
+        self._write_manifest()
+        self._activate(self._segments[-1])
+        sealed = self._segments[:-1]
+        # Live records are re-packed into as many segments as before, so
+        # only compact when there is something to drop
+        if len(sealed) >= self.compact_after and self._garbage(sealed)[2]:
+            self.compact()
+
+    def append_turn(self, session_id: Optional[str], question: Optional[str], answer: Optional[str],
+                    timestamp: str, response_time: Optional[float] = None) -> None:
+        record = {"kind": "turn", "session": session_id, "question": question, "answer": answer,
+                  "timestamp": timestamp}
+        if response_time is not None:
+            record["response_time"] = round(float(response_time), 4)
+        self._append(record)
+
+    def set_title(self, session_id: str, title: str, timestamp: str) -> None:
+        self._append({"kind": "title", "session": session_id, "title": title, "timestamp": timestamp})
+
+    def delete(self, session_id: str, timestamp: str) -> None:
+        self._append({"kind": "delete", "session": session_id, "timestamp": timestamp})
+
+    def close(self) -> None:
+        with self._lock:
+            self._log.close()
+            self._idx.close()
+
+    # ──────────────────────────── compaction ──────────────────────────────
+    def _garbage(self, sealed: List[int]) -> Tuple[set, Dict[int, Tuple[int, int]], int]:
+        """Deleted sessions, each session's last title, and how many records compaction drops."""
+        deleted, last_title, titles = set(), {}, 0
+        for segment in sealed:
+            rows = self._index(segment)
+            deleted.update(rows["session"][rows["kind"] == DELETE].tolist())
+            for i in np.flatnonzero(rows["kind"] == TITLE):
+                last_title[int(rows["session"][i])] = (segment, int(rows["offset"][i]))
+                titles += 1
+        dropped = titles - sum(1 for session in last_title if session not in deleted)
+        if deleted:
+            marked = np.fromiter(deleted, dtype=np.uint64)
+            for segment in sealed:
+                rows = self._index(segment)
+                dropped += int((np.isin(rows["session"], marked) & (rows["kind"] != TITLE)).sum())
+        return deleted, last_title, dropped
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Rewrites the sealed segments without deleted sessions and superseded
+        titles.  The active segment is left alone.
+        """
+        with self._lock:
+            sealed, active = self._segments[:-1], self._segments[-1]
+            if not sealed:
+                return {"segments": 0, "records": 0, "dropped": 0}
+            deleted, last_title, _ = self._garbage(sealed)
+
+            written: List[int] = []
+            log = idx = None
+            size = kept = dropped = 0
+            for segment in sealed:
+                rows = self._index(segment)
+                with open(self._path(segment, ".log"), "rb") as source:
+                    for row in rows:
+                        session, kind = int(row["session"]), int(row["kind"])
+                        if (kind == DELETE or session in deleted
+                                or (kind == TITLE and last_title[session] != (segment, int(row["offset"])))):
+                            dropped += 1
+                            continue
+                        if log is None or size >= self.segment_bytes:
+                            if log is not None:
+                                log.close()
+                                idx.close()
+                            written.append(self._next)
+                            self._next += 1
+                            log = open(self._path(written[-1], ".log"), "wb")
+                            idx = open(self._path(written[-1], ".idx"), "wb")
+                            size = 0
+                        source.seek(int(row["offset"]))
+                        log.write(source.read(_HEADER.size + int(row["length"])))
+                        moved = row.copy()
+                        moved["offset"] = size
+                        idx.write(moved.tobytes())
+                        size += _HEADER.size + int(row["length"])
+                        kept += 1
+            if log is not None:
+                log.close()
+                idx.close()
+            self._segments = written + [active]
+            self._write_manifest()
+            for segment in sealed:
+                self._path(segment, ".log").unlink()
+                self._path(segment, ".idx").unlink()
+            return {"segments": len(sealed), "records": kept, "dropped": dropped}
+
+    # ───────────────────────────── reads ──────────────────────────────────
+    def has(self, session_id: str) -> bool:
+        return session_hash(session_id) in self._sessions
+
+    def scan(self, since: Optional[float] = None, until: Optional[float] = None,
+             session: Optional[str] = None, kind: int = TURN) -> Iterator[Dict[str, Any]]:
+        """
+        Records of *kind* in log order, optionally limited to one session
+        and to ``since <= t < until`` (epoch seconds).  One segment's index
+        is held in memory at a time.
+        """
+        with self._lock:
+            segments = list(self._segments)
+        target = session_hash(session) if session is not None else None
+        for segment in segments:
+            rows = self._index(segment)
+            mask = rows["kind"] == kind
+            if target is not None:
+                mask &= rows["session"] == target
+            if since is not None:
+                mask &= rows["t"] >= since
+            if until is not None:
+                mask &= rows["t"] < until
+            if not mask.any():
+                continue
+            with open(self._path(segment, ".log"), "rb") as f:
+                for row in rows[mask]:
+                    if int(row["session"]) in self._deleted:
+                        continue
+                    f.seek(int(row["offset"]) + _HEADER.size)
+                    record = json.loads(f.read(int(row["length"])))
+                    if session is None or record.get("session") == session:
+                        yield record
+
+    def history(self, session_id: str) -> List[Dict[str, str]]:
+        """The session as ``{"role", "content", "timestamp"}`` messages."""
+        messages = []
+        for turn in self.scan(session=session_id):
+            if turn["question"] is not None:
+                messages.append({"role": "user", "content": turn["question"], "timestamp": turn["timestamp"]})
+            if turn["answer"] is not None:
+                messages.append({"role": "assistant", "content": turn["answer"], "timestamp": turn["timestamp"]})
+        return messages
+
+    def titles(self) -> Dict[str, str]:
+        return {r["session"]: r["title"] for r in self.scan(kind=TITLE)}
+
+    def questions(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        for turn in self.scan(since, until):
+            if turn["question"] is not None:
+                yield {"timestamp": turn["timestamp"], "session": turn["session"], "question": turn["question"],
+                       "response_time": turn.get("response_time")}
+
+    def response_times_by_day(self, since: Optional[float] = None,
+                              until: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Timed turns per UTC day, read from the indexes alone."""
+        with self._lock:
+            segments = list(self._segments)
+        days: Dict[int, List[np.ndarray]] = defaultdict(list)
+        for segment in segments:
+            rows = self._index(segment)
+            mask = (rows["kind"] == TURN) & ~np.isnan(rows["seconds"])
+            if since is not None:
+                mask &= rows["t"] >= since
+            if until is not None:
+                mask &= rows["t"] < until
+            rows = rows[mask]
+            day = (rows["t"] // 86400).astype(np.int64)
+            for d in np.unique(day):
+                days[int(d)].append(rows["seconds"][day == d])
+        return {_day(d * 86400): np.concatenate(parts) for d, parts in sorted(days.items())}
+
+    def percentile_by_day(self, q: float = 95, since: Optional[float] = None,
+                          until: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        return {day: {"turns": int(len(values)), f"p{q:g}": round(float(np.percentile(values, q)), 3)}
+                for day, values in self.response_times_by_day(since, until).items()}
+
+    def stats(self) -> Dict[str, Any]:
+        rows = sum(len(self._index(s)) for s in self._segments)
+        size = sum(self._path(s, ".log").stat().st_size for s in self._segments)
+        return {"segments": len(self._segments), "records": rows, "bytes": size, "sessions": len(self._sessions)}
+
+
+# ───────────────────────────── importer ───────────────────────────────────
+def _pair(messages: List[Dict[str, str]]) -> Iterator[Tuple[Optional[str], Optional[str], str]]:
+    """``(question, answer, timestamp)`` turns from a message list."""
+    question = None
+    for message in messages:
+        if message["role"] == "user":
+            if question is not None:
+                yield question["content"], None, question["timestamp"]
+            question = message
+        else:
+            yield (question or {}).get("content"), message["content"], (question or message)["timestamp"]
+            question = None
+    if question is not None:
+        yield question["content"], None, question["timestamp"]
+
+
+def import_session_file(log: SessionLog, path: Path) -> int:
+    """Appends a ``Data/ChatSessions`` JSON file as turns of the session named by its stem."""
+    turns = 0
+    for question, answer, timestamp in _pair(json.loads(path.read_text(encoding="utf-8"))):
+        log.append_turn(path.stem, question, answer, timestamp)
+        turns += 1
+    return turns
+
+
+def import_legacy(log: SessionLog, data_dir: Path = DATA_DIR) -> Dict[str, int]:
+    """
+    Imports session files, ``session_metadata.json`` titles and the
+    session-less ``timed_responses.json`` timings.  Sessions already in the
+    log are skipped, so running it twice is harmless; timings are only
+    imported into a log that has none yet.
+    """
+    counts = {"sessions": 0, "turns": 0, "titles": 0, "timings": 0}
+    for path in sorted((data_dir / "ChatSessions").glob("chat_session_*.json")):
+        if not log.has(path.stem):
+            counts["turns"] += import_session_file(log, path)
+            counts["sessions"] += 1
+    metadata = data_dir / "session_metadata.json"
+    if metadata.exists():
+        known = log.titles()
+        now = datetime.now(timezone.utc).isoformat()
+        for session_id, title in json.loads(metadata.read_text(encoding="utf-8")).items():
+            if known.get(session_id) != title:
+                log.set_title(session_id, title, now)
+                counts["titles"] += 1
+    timed = data_dir / "timed_responses.json"
+    if timed.exists() and not log.has(""):
+        for row in json.loads(timed.read_text(encoding="utf-8")):
+            log.append_turn(None, row["question"], None, row["timestamp"], row["response_time"])
+            counts["timings"] += 1
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append-only chat session log")
+    parser.add_argument("--dir", type=Path, default=DEFAULT_LOG_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("import", help="import Data/ChatSessions, session titles and timed responses")
+    for name in ("questions", "p95"):
+        p = sub.add_parser(name)
+        p.add_argument("--since", default=None, help="ISO date or timestamp (inclusive)")
+        p.add_argument("--until", default=None, help="ISO date or timestamp (exclusive)")
+    sub.add_parser("compact")
+    sub.add_parser("stats")
+    args = parser.parse_args(argv)
+
+    log = SessionLog(args.dir)
+    try:
+        if args.command == "import":
+            print(import_legacy(log))
+        elif args.command == "compact":
+            print(log.compact())
+        elif args.command == "stats":
+            print(log.stats())
+        else:
+            since = to_epoch(args.since) if args.since else None
+            until = to_epoch(args.until) if args.until else None
+            if args.command == "questions":
+                for q in log.questions(since, until):
+                    print(f"{q['timestamp']}  {q['session'] or '-':<38} {q['question']}")
+            else:
+                for day, row in log.percentile_by_day(95, since, until).items():
+                    print(f"{day}  {row['turns']:>5} turns  p95 {row['p95']:>8.2f}s")
+    finally:
+        log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+sessions.py
+===========
+
+Per-session chat memory backed by the append-only
+:class:`~src.qa_bot.service.session_log.SessionLog`.  Each turn is one
+record, so a long session no longer rewrites its whole file.  History comes
+back in the ``Data/ChatSessions`` message format:
+``{"role", "content", "timestamp"}``.  A legacy ``chat_session_*.json`` file
+in the same folder can be resumed by its file stem; it is imported into the
+log the first time it is used.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .session_log import DEFAULT_LOG_DIR, SessionLog, import_session_file
+
+DEFAULT_SESSION_DIR = DEFAULT_LOG_DIR
+
+_SESSION_ID = re.compile(r"^chat_session_[\w-]+$")
+
+
+def _timestamp() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class SessionStore:
+    """
+    Keeps recently used sessions in memory and appends every turn to the log.
+    Sessions beyond ``max_cached`` are dropped from memory, least recently
+    used first, and read back from the log when they are next used.
+
+    Args:
+        directory (Path): Folder with the session log (and any legacy
+            ``chat_session_*.json`` files).
+        max_cached (int): Sessions whose history is kept in memory.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_SESSION_DIR, max_cached: int = 256):
+        self.directory = Path(directory)
+        self.log = SessionLog(self.directory)
+        self.max_cached = max_cached
+        self._sessions: "OrderedDict[str, List[Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self) -> str:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        # Suffix keeps sessions opened in the same second apart
+        session_id = f"chat_session_{stamp}_{uuid.uuid4().hex[:6]}"
+        with self._lock:
+            self._cache(session_id, [])
+        return session_id
+
+    def _cache(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        self._sessions[session_id] = messages
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_cached:
+            self._sessions.popitem(last=False)
+
+    def exists(self, session_id: str) -> bool:
+        return session_id in self._sessions or (
+            bool(_SESSION_ID.match(session_id))
+            and (self.log.has(session_id) or self._legacy(session_id).exists()))
+
+    def history(self, session_id: str) -> List[Dict[str, str]]:
+        """Messages so far; raises ``KeyError`` for unknown sessions."""
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions.move_to_end(session_id)
+            else:
+                if not self.exists(session_id):
+                    raise KeyError(session_id)
+                if not self.log.has(session_id):
+                    import_session_file(self.log, self._legacy(session_id))
+                self._cache(session_id, self.log.history(session_id))
+            return list(self._sessions[session_id])
+
+    def append(self, session_id: str, user: str, assistant: str,
+               timestamp: Optional[str] = None, response_time: Optional[float] = None) -> None:
+        timestamp = timestamp or _timestamp()
+        self.history(session_id)                         # imports a legacy file if needed
+        with self._lock:
+            self.log.append_turn(session_id, user, assistant, timestamp, response_time)
+            messages = self._sessions.get(session_id)
+            if messages is not None:                     # else re-read from the log next time
+                messages.append({"role": "user", "content": user, "timestamp": timestamp})
+                messages.append({"role": "assistant", "content": assistant, "timestamp": timestamp})
+
+    def close(self) -> None:
+        self.log.close()
+
+    def _legacy(self, session_id: str) -> Path:
+        return self.directory / f"{session_id}.json"
@@ -0,0 +1,43 @@
+"""
+streaming.py
+============
+
+Callback handler that forwards only the *Final Answer* part of a ReAct
+agent's token stream, so clients never see the Thought/Action scratchpad.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+FINAL_ANSWER = "Final Answer:"
+
+
+class FinalAnswerStream(BaseCallbackHandler):
+    """
+    Args:
+        on_token (callable): Receives each answer fragment as it arrives.
+    """
+
+    def __init__(self, on_token: Callable[[str], None]):
+        self.on_token = on_token
+        self._buffer = ""
+        self._answering = False
+
+    def on_llm_start(self, *args: Any, **kwargs: Any) -> None:
+        # Every agent step is a new LLM call; only the last one answers
+        self._buffer = ""
+        self._answering = False
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if self._answering:
+            self.on_token(token)
+            return
+        self._buffer += token
+        marker = self._buffer.find(FINAL_ANSWER)
+        if marker >= 0:
+            self._answering = True
+            rest = self._buffer[marker + len(FINAL_ANSWER):].lstrip()
+            if rest:
+                self.on_token(rest)
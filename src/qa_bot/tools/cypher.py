@@ -1,11 +1,14 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from ..core.llm import llm
-from ..core.graph import graph
+from ..core.llm import get_llm
+from ..core.graph import get_graph
+from ..core.graph_snapshot import query_graph
+from ..core.kg_schema import get_schema_service
+from ..core.resources import registry
+from .cypher_cache import DEFAULT_PLAN_DIR, CachedCypherQA
 
-from langchain_neo4j import GraphCypherQAChain
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate
 
 CYPHER_GENERATION_TEMPLATE = """Task:Generate Cypher statement to query a graph database.
 Instructions:
@@ -56,13 +59,23 @@ cypher_generation_prompt = PromptTemplate(
     input_variables=["schema", "question"],
 )
 
-cypher_chain = GraphCypherQAChain.from_llm(
-    llm,
-    graph=graph,
-    cypher_prompt=cypher_generation_prompt,
-    verbose=True,
-    allow_dangerous_requests=True
-)
+def _build_cypher_chain():
+    from langchain_neo4j import GraphCypherQAChain
+    get_schema_service()                  # installs the shared schema on the graph
+    chain = GraphCypherQAChain.from_llm(
+        get_llm(),
+        graph=get_graph(),
+        cypher_prompt=cypher_generation_prompt,
+        verbose=True,
+        # CachedCypherQA rejects writes up front and runs the rest in read sessions
+        allow_dangerous_requests=True
+    )
+    # Writes are rejected and repeat question shapes reuse their Cypher; the
+    # Cypher runs on the snapshot or, index-rewritten, on Neo4j
+    return CachedCypherQA(chain, DEFAULT_PLAN_DIR / "cypher_tool.json", execute=query_graph)
+
+registry.register("cypher_chain", _build_cypher_chain)
 
 def run_cypher(q):
-    return cypher_chain.invoke({"query": q})
\ No newline at end of file
+    get_schema_service().current()
+    return registry.get("cypher_chain").invoke({"query": q})
\ No newline at end of file
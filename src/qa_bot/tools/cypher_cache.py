@@ -0,0 +1,319 @@
+"""
+cypher_cache.py
+===============
+
+Caches LLM-generated Cypher per *question shape* and refuses anything that
+could write to the graph.
+
+A question is reduced to a template by pulling out its entity slots (quoted
+strings, file extensions, identifiers such as ``LAS`` or ``CurveSettings``,
+and numbers):
+
+    "Which formats does LAS support?"  ->  "which formats does {} support"  ["LAS"]
+
+The first time a template is seen the LLM writes the Cypher.  Every literal
+that carries a slot value is then rewritten into a parameter
+(``'(?i)LAS'`` becomes ``'(?i)' + $e0``), and the parameterised query is
+stored.  Later questions with the same shape bind their own values and run
+the stored query directly.  This skips the generation call, and Neo4j reuses
+its plan for the identical query text.  A stored plan that returns no rows
+may have been written for a different label or entity, so it is regenerated
+once for the new question.
+"""
+from __future__ import annotations
+
+import json
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..core.graph import read_query
+from ..core.tracing import span
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_PLAN_DIR = PROJECT_ROOT / "Output" / "cypher_plans"
+
+
+class UnsafeCypherError(ValueError):
+    """Raised for Cypher that would modify the graph or call unknown procedures."""
+
+
+# ───────────────────────────── validation ─────────────────────────────────
+# Strings, quoted identifiers and comments are blanked before keyword checks
+# so `WHERE n.name = 'CREATE'` is not mistaken for a write.
+_OPAQUE = re.compile(
+    r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|//[^\n]*|/\*.*?\*/", re.S
+)
+_WRITE_CLAUSES = re.compile(
+    r"(?<![.$\w])(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|FOREACH|LOAD\s+CSV"
+    r"|IN\s+TRANSACTIONS|GRANT|REVOKE|DENY|ALTER|RENAME|TERMINATE|(?:START|STOP)\s+DATABASE)(?!\w)",
+    re.I,
+)
+_PROCEDURE_CALL = re.compile(r"(?<![.\w])CALL\s+([\w.]+)", re.I)
+_APOC_FUNCTION = re.compile(r"(?<![.\w$])(apoc\.[\w.]+)\s*\(", re.I)
+
+READ_ONLY_PROCEDURES = (
+    "db.labels", "db.relationshiptypes", "db.propertykeys", "db.schema.",
+    "db.index.fulltext.query", "db.index.vector.query",
+    "apoc.path.", "apoc.coll.", "apoc.text.", "apoc.meta.",
+)
+
+
+def validate_read_only(cypher: str) -> str:
+    """
+    Returns *cypher* unchanged, or raises :class:`UnsafeCypherError` if it
+    contains a write clause or calls a procedure or APOC function outside
+    ``READ_ONLY_PROCEDURES``.  This is a pre-check for a clear error: the
+    Cypher itself runs in a read-access session (``graph.read_query``).
+    """
+    code = _OPAQUE.sub("''", cypher)
+    match = _WRITE_CLAUSES.search(code)
+    if match:
+        raise UnsafeCypherError(f"write clause {match.group(1).upper()!r} is not allowed")
+    for name in _PROCEDURE_CALL.findall(code) + _APOC_FUNCTION.findall(code):
+        if not name.lower().startswith(READ_ONLY_PROCEDURES):
+            raise UnsafeCypherError(f"procedure {name!r} is not on the read-only allowlist")
+    return cypher
+
+
+# ───────────────────────────── templating ─────────────────────────────────
+_SLOT = re.compile(
+    r"(?<!\w)'([^']+)'(?!\w)|\"([^\"]+)\""            # quoted values
+    r"|(\.[A-Za-z0-9]{2,5})\b"                       # file extensions
+    r"|\b([A-Za-z]*[A-Z][A-Za-z0-9_]*[A-Z0-9_][A-Za-z0-9_]*|[a-z]+_[a-z0-9_]+)\b"  # LAS, CurveSettings, scale_type
+    r"|\b(\d+(?:\.\d+)?)\b"                          # numbers
+)
+
+
+def template_question(question: str) -> Tuple[str, List[str]]:
+    """Splits *question* into a normalised template and its slot values."""
+    slots: List[str] = []
+
+    def take(match):
+        slots.append(next(g for g in match.groups() if g is not None))
+        return " {} "
+
+    shape = _SLOT.sub(take, question)
+    words = re.sub(r"[^\w{}\s]", " ", shape.lower()).split()
+    return " ".join(words), slots
+
+
+_LITERAL = re.compile(r"'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\"|`[^`]*`|//[^\n]*"
+                      r"|(?<![\w.$])(\d+(?:\.\d+)?)(?![\w.])")
+
+_CASES: Dict[str, Callable[[str], str]] = {"same": str, "upper": str.upper, "lower": str.lower}
+
+
+def _quote(text: str) -> str:
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def parameterise(cypher: str, slots: List[str]) -> Tuple[str, List[Dict[str, Any]], bool]:
+    """
+    Replaces literals carrying slot values with ``$eN`` parameters.
+
+    Returns:
+        (query, bindings, complete) – *bindings* say which slot (and which
+        case transform) fills each parameter; *complete* is False if some
+        slot never appeared, in which case the query is not safe to reuse
+        for other values.
+    """
+    bindings: List[Dict[str, Any]] = []
+    used = set()
+
+    def param_for(slot: int, case: str) -> str:
+        for binding in bindings:
+            if (binding["slot"], binding["case"]) == (slot, case):
+                return "$" + binding["param"]
+        bindings.append({"param": f"e{len(bindings)}", "slot": slot, "case": case})
+        return f"$e{len(bindings) - 1}"
+
+    def rewrite(match):
+        text, number = match.group(1) or match.group(2), match.group(3)
+        if number is not None:
+            for i, value in enumerate(slots):
+                if value == number:
+                    used.add(i)
+                    return param_for(i, "same")
+            return match.group(0)
+        if text is None:
+            return match.group(0)
+        for i, value in sorted(enumerate(slots), key=lambda s: -len(s[1])):
+            start = text.lower().find(value.lower())
+            if start < 0 or not value.strip():
+                continue
+            found = text[start:start + len(value)]
+            case = next((c for c, fn in _CASES.items() if fn(value) == found), "same")
+            used.add(i)
+            pieces = [_quote(text[:start])] if start else []
+            pieces.append(param_for(i, case))
+            if text[start + len(value):]:
+                pieces.append(_quote(text[start + len(value):]))
+            return " + ".join(pieces)
+        return match.group(0)
+
+    query = _LITERAL.sub(rewrite, cypher)
+    return query, bindings, len(used) == len(slots)
+
+
+def bind(bindings: List[Dict[str, Any]], slots: List[str]) -> Dict[str, Any]:
+    params: Dict[str, Any] = {}
+    for binding in bindings:
+        value = _CASES[binding["case"]](slots[binding["slot"]])
+        if re.fullmatch(r"\d+", value):
+            params[binding["param"]] = int(value)
+        elif re.fullmatch(r"\d+\.\d+", value):
+            params[binding["param"]] = float(value)
+        else:
+            params[binding["param"]] = value
+    return params
+
+
+# ───────────────────────────── plan cache ─────────────────────────────────
+class CypherPlanCache:
+    """
+    Args:
+        generate (callable): ``question -> cypher`` (the LLM call).
+        execute (callable): ``(cypher, params) -> rows``.
+        path (Path | None): JSON file the plans persist to.
+        max_entries (int): LRU capacity.
+    """
+
+    def __init__(self, generate: Callable[[str], str], execute: Callable[[str, Dict], List[Dict]],
+                 path: Optional[Path] = None, max_entries: int = 500):
+        self.generate = generate
+        self.execute = execute
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self._plans: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def run(self, question: str) -> Tuple[str, List[Dict]]:
+        """Returns ``(cypher, rows)``, generating Cypher only on a template miss."""
+        template, slots = template_question(question)
+        with self._lock:
+            plan = self._plans.get(template)
+            if plan is not None:
+                self._plans.move_to_end(template)
+        with span("cypher.plan", template=template) as s:
+            empty = None
+            if plan is not None:
+                try:
+                    rows = self._execute(plan["query"], bind(plan["bindings"], slots))
+                except Exception:
+                    # Stored plan no longer fits the graph – regenerate it
+                    self.forget(template)
+                else:
+                    if rows:
+                        self.hits += 1
+                        s.set(**{"cache.plan": "hit"})
+                        return plan["query"], rows
+                    # No rows: the plan may fit another label or entity – regenerate once
+                    empty = (plan["query"], bind(plan["bindings"], slots))
+
+            self.misses += 1
+            s.set(**{"cache.plan": "empty" if empty else "miss"})
+            with span("cypher.generate"):
+                cypher = self.generate(question)
+            try:
+                validate_read_only(cypher)
+            except UnsafeCypherError:
+                self.rejected += 1
+                raise
+            query, bindings, complete = parameterise(cypher, slots)
+            params = bind(bindings, slots)
+            rows = [] if empty == (query, params) else self._execute(query, params)
+            if complete:
+                self._store(template, {"query": query, "bindings": bindings, "example": question})
+            return query, rows
+
+    def _execute(self, query: str, params: Dict) -> List[Dict]:
+        with span("neo4j.query", cypher=query) as s:
+            rows = self.execute(query, params)
+            s.set(rows=len(rows))
+            return rows
+
+    def forget(self, template: str) -> None:
+        with self._lock:
+            self._plans.pop(template, None)
+            self._save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+            self._save()
+
+    def stats(self) -> Dict[str, float]:
+        runs = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "rejected": self.rejected,
+                "hit_rate": self.hits / runs if runs else 0.0, "plans": len(self._plans)}
+
+    def _store(self, template: str, plan: dict) -> None:
+        with self._lock:
+            self._plans[template] = plan
+            self._plans.move_to_end(template)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+            self._save()
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._plans, indent=2, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.path)
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        for template, plan in json.loads(self.path.read_text(encoding="utf-8")).items():
+            try:
+                validate_read_only(plan["query"])      # the file may have been edited
+            except UnsafeCypherError:
+                continue
+            self._plans[template] = plan
+
+
+class CachedCypherQA:
+    """
+    Drop-in for ``GraphCypherQAChain.invoke`` that routes Cypher generation
+    through a :class:`CypherPlanCache` and only calls the LLM for the final
+    answer.  *execute* replaces the read-access ``chain.graph`` query for
+    running the Cypher (the agent passes the snapshot fast path).  *hints* adds text to the
+    generation prompt only (the agent passes linked entities), so templates
+    and answers still see the bare question.
+    """
+
+    def __init__(self, chain, path: Optional[Path] = None,
+                 execute: Optional[Callable[[str, Dict], List[Dict]]] = None,
+                 hints: Optional[Callable[[str], str]] = None):
+        from langchain_neo4j.chains.graph_qa.cypher import extract_cypher
+        self.chain = chain
+
+        def generate(question: str) -> str:
+            extra = hints(question) if hints else ""
+            cypher = extract_cypher(chain.cypher_generation_chain.invoke(
+                {"question": f"{question}\n\n{extra}" if extra else question, "schema": chain.graph_schema}))
+            if chain.cypher_query_corrector:
+                cypher = chain.cypher_query_corrector(cypher)
+            return cypher
+
+        self.plans = CypherPlanCache(generate, execute or (lambda q, p: read_query(chain.graph, q, p)), path)
+
+    def invoke(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        question = inputs[self.chain.input_key]
+        cypher, rows = self.plans.run(question)
+        context = rows[: self.chain.top_k]
+        if self.chain.return_direct:
+            result: Any = context
+        else:
+            with span("cypher.answer", context_rows=len(context)):
+                result = self.chain.qa_chain.invoke({"question": question, "context": context})
+        return {self.chain.output_key: result, "cypher": cypher}
@@ -0,0 +1,176 @@
+"""
+hybrid.py
+=========
+
+Hybrid retrieval over the GEO knowledge graph.
+
+1. **dense**   – top-k nodes from the ``type_vector_index`` and
+   ``filetype_vector_index`` vector indexes
+2. **lexical** – top-k nodes from a BM25 index over node names and text
+   (rebuilt only when the graph version changes)
+3. **fuse**    – reciprocal rank fusion, ``Σ 1 / (rrf_k + rank)``
+4. **expand**  – one batched query fetching at most ``per_hit``
+   ``HAS_ATTRIBUTE``/``HAS_FORMAT``/``HAS_FILE_TYPE`` neighbours of each fused
+   hit
+
+Work and context size depend on ``k`` and ``per_hit``, not on how many
+nodes the graph holds.  Every call records per-stage timings.
+"""
+from __future__ import annotations
+
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..core.resources import registry
+from ..core.tracing import span
+
+DENSE_INDEXES = ("type_vector_index", "filetype_vector_index")
+EXPAND_RELATIONSHIPS = ("HAS_ATTRIBUTE", "HAS_FORMAT", "HAS_FILE_TYPE")
+
+DENSE_QUERY = """
+UNWIND $indexes AS index
+CALL db.index.vector.queryNodes(index, $k, $embedding) YIELD node, score
+RETURN elementId(node) AS id, score
+ORDER BY score DESC
+LIMIT $k
+"""
+
+LEXICAL_SOURCE_QUERY = """
+MATCH (n)
+WHERE (n:Type OR n:FileType) AND n.name IS NOT NULL
+RETURN elementId(n) AS id, n.name AS title, coalesce(n.text, '') AS text
+"""
+
+EXPAND_QUERY = f"""
+UNWIND $ids AS id
+MATCH (n) WHERE elementId(n) = id
+CALL {{
+  WITH n
+  OPTIONAL MATCH (n)-[r:{'|'.join(EXPAND_RELATIONSHIPS)}]-(m)
+  WITH r, m LIMIT $per_hit
+  RETURN collect(CASE WHEN m IS NULL THEN NULL
+                 ELSE {{rel: type(r), label: labels(m)[0], name: m.name}} END) AS neighbours
+}}
+RETURN id, labels(n)[0] AS label, n.name AS name, n.text AS text, neighbours
+"""
+
+Ranked = List[Tuple[str, float]]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Ranked], k: int, rrf_k: int = 60) -> Ranked:
+    """Fuses ranked ``(id, score)`` lists; the input scores are ignored, only ranks count."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, (item, _) in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+
+
+class HybridRetriever:
+    """
+    Args:
+        dense (callable): ``(question, k) -> [(node id, score)]``.
+        lexical (callable): ``(question, k) -> [(node id, score)]``.
+        expand (callable): ``(node ids, per_hit) -> rows`` – one round trip.
+        k (int): Fused hits returned.
+        candidates (int): Hits taken from each ranker before fusion.
+        per_hit (int): Neighbour cap per hit.
+    """
+
+    def __init__(self, dense: Callable[[str, int], Ranked], lexical: Callable[[str, int], Ranked],
+                 expand: Callable[[List[str], int], List[Dict]], k: int = 5, candidates: int = 20,
+                 per_hit: int = 10, rrf_k: int = 60):
+        self.dense = dense
+        self.lexical = lexical
+        self.expand = expand
+        self.k = k
+        self.candidates = candidates
+        self.per_hit = per_hit
+        self.rrf_k = rrf_k
+        self.last_timings: Dict[str, float] = {}
+
+    def retrieve(self, question: str, k: Optional[int] = None) -> Dict:
+        """
+        Returns:
+            ``{"hits": [...], "timings": {stage: seconds}}``; each hit is the
+            expanded node plus its ``rrf``, ``dense_rank`` and ``lexical_rank``.
+        """
+        k = k or self.k
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        def stage(name, fn, *args):
+            began = time.perf_counter()
+            result = fn(*args)
+            timings[name] = time.perf_counter() - began
+            return result
+
+        dense = stage("dense", self.dense, question, self.candidates)
+        lexical = stage("lexical", self.lexical, question, self.candidates)
+        fused = stage("fuse", reciprocal_rank_fusion, [dense, lexical], k, self.rrf_k)
+        rows = stage("expand", self.expand, [item for item, _ in fused], self.per_hit) if fused else []
+        timings["total"] = time.perf_counter() - start
+        self.last_timings = timings
+
+        dense_rank = {item: rank for rank, (item, _) in enumerate(dense, start=1)}
+        lexical_rank = {item: rank for rank, (item, _) in enumerate(lexical, start=1)}
+        by_id = {row["id"]: row for row in rows}
+        hits = [
+            {**by_id[item], "rrf": score, "dense_rank": dense_rank.get(item),
+             "lexical_rank": lexical_rank.get(item)}
+            for item, score in fused if item in by_id
+        ]
+        return {"hits": hits, "timings": timings}
+
+
+def format_context(hits: List[Dict]) -> str:
+    """Compact, bounded text context for the LLM."""
+    blocks = []
+    for hit in hits:
+        lines = [f"[{hit['label']}] {hit['name']}"]
+        if hit.get("text"):
+            lines.append(hit["text"])
+        lines += [f"  -{n['rel']}- [{n['label']}] {n['name']}" for n in hit["neighbours"]]
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+# ───────────────────── lazy resources (no side-effects) ──────────────────
+def _build_hybrid_retriever() -> HybridRetriever:
+    from ...data_processing.search.bm25 import BM25Index
+    from ..core.embeddings import get_embeddings
+    from ..core.graph import get_graph
+    from ..core.graph_version import VersionWatcher, read_version
+
+    graph = get_graph()
+    version = VersionWatcher(lambda: read_version(graph))
+    lexical_index: Dict[str, object] = {}
+
+    def dense(question, k):
+        embedding = get_embeddings().embed_query(question)
+        rows = graph.query(DENSE_QUERY, {"indexes": list(DENSE_INDEXES), "k": k, "embedding": embedding})
+        return [(row["id"], row["score"]) for row in rows]
+
+    def lexical(question, k):
+        current = version.current()
+        if lexical_index.get("version") != current:
+            # Node names/text change only when a loader bumps the version
+            lexical_index["index"] = BM25Index.build(graph.query(LEXICAL_SOURCE_QUERY))
+            lexical_index["version"] = current
+        return [(doc["id"], score) for doc, score in lexical_index["index"].search(question, k)]
+
+    def expand(ids, per_hit):
+        return graph.query(EXPAND_QUERY, {"ids": ids, "per_hit": per_hit})
+
+    return HybridRetriever(dense, lexical, expand)
+
+
+registry.register("hybrid_retriever", _build_hybrid_retriever)
+
+
+def find_hybrid(q: str, k: int = 5) -> Dict:
+    """Hybrid hits, formatted context and per-stage timings for *q*."""
+    with span("retrieval.hybrid", k=k) as s:
+        result = registry.get("hybrid_retriever").retrieve(q, k)
+        s.set(hits=len(result["hits"]), **{f"seconds.{stage}": t for stage, t in result["timings"].items()})
+        return {**result, "context": format_context(result["hits"])}
@@ -0,0 +1,38 @@
+from typing import Dict, List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from ..core.resources import registry
+from ..core.tracing import span
+
+
+def _build_bm25_index():
+    from ...data_processing.search.bm25 import load_or_build
+    # Built from Data/whxdata on first use, then memory-mapped from Output/search
+    return load_or_build()
+
+
+registry.register("bm25_index", _build_bm25_index)
+
+
+class LexicalRetriever(BaseRetriever):
+    """BM25 retriever over the help guide; combine with the vector retrievers as needed."""
+
+    k: int = 5
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [
+            Document(page_content=doc.get("snippet", ""), metadata={**doc, "score": score})
+            for doc, score in registry.get("bm25_index").search(query, self.k)
+        ]
+
+
+def find_lexical(q: str, k: int = 5) -> List[Dict]:
+    """Top-*k* help topics for exact terms (mnemonics, extensions, limits)."""
+    with span("retrieval.lexical", k=k) as s:
+        hits = [{**doc, "score": score} for doc, score in registry.get("bm25_index").search(q, k)]
+        s.set(hits=len(hits))
+        return hits
@@ -1,48 +1,34 @@
-from huggingface_hub import login
-import os
-
-login(token=os.getenv("HUGGINGFACEHUB_API_TOKEN"))
-
 from dotenv import load_dotenv
 load_dotenv()
 
-from langchain_ollama import ChatOllama
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_neo4j import Neo4jGraph, Neo4jVector
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains.retrieval import create_retrieval_chain
 from langchain_core.prompts import ChatPromptTemplate
 
-llm = ChatOllama(
-    model="llama3.2:1b",
-    temperature=0
-)
-
-embedding_provider = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-graph = Neo4jGraph(
-    url=os.getenv('NEO4J_URI'),
-    username=os.getenv('NEO4J_USERNAME'),
-    password=os.getenv('NEO4J_PASSWORD')
-)
+from ..core.cassette import CassetteRetriever, get_cassette
+from ..core.embeddings import get_embeddings
+from ..core.graph import get_graph
+from ..core.resources import registry
+from ..core.tracing import callbacks as tracing_callbacks, span
 
-chunk_vector = Neo4jVector.from_existing_index(
-    embedding_provider,
-    graph=graph,
-    embedding_node_property="embedding",
-    index_name="type_vector_index",
-    text_node_property="text",
-    retrieval_query="""
-// Get the Type node and its formats
-MATCH (t:Type)
-OPTIONAL MATCH (t)-[:HAS_FORMAT]->(f:Format)
-OPTIONAL MATCH (t)-[:HAS_ATTRIBUTE]->(attr)
-RETURN 
-  t.name AS type_name,
-  collect(DISTINCT f.name) AS formats,
-  collect(DISTINCT labels(attr)[0]) + collect(DISTINCT attr.name) AS attributes
+# Appended by Neo4jVector after `YIELD node, score`: expands only the k hits,
+# each capped at 10 neighbours, instead of re-scanning every Type node
+RETRIEVAL_QUERY = """
+CALL {
+  WITH node
+  OPTIONAL MATCH (node)-[:HAS_FORMAT]->(f:Format)
+  WITH node, f LIMIT 10
+  RETURN collect(DISTINCT f.name) AS formats
+}
+CALL {
+  WITH node
+  OPTIONAL MATCH (node)-[:HAS_ATTRIBUTE]->(attr)
+  WITH attr LIMIT 10
+  RETURN collect(DISTINCT labels(attr)[0]) + collect(DISTINCT attr.name) AS attributes
+}
+RETURN
+  node.text AS text,
+  score,
+  {type_name: node.name, formats: formats, attributes: attributes} AS metadata
 """
-)
 
 instructions = (
     "Use the given context to answer the question."
@@ -58,12 +44,56 @@ prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-chunk_retriever = chunk_vector.as_retriever()
-chunk_chain = create_stuff_documents_chain(llm, prompt)
-chunk_retriever = create_retrieval_chain(
-    chunk_retriever, 
-    chunk_chain
-)
+
+# ───────────────────── lazy resources (no side-effects) ──────────────────
+def _build_ollama_llm():
+    from ..core.llm_gateway import GatewayChatModel
+    return GatewayChatModel(
+        backend="ollama",
+        model="llama3.2:1b",
+        temperature=0
+    )
+
+
+def _build_chunk_vector():
+    from langchain_neo4j import Neo4jVector
+    return Neo4jVector.from_existing_index(
+        get_embeddings(),
+        graph=get_graph(),
+        embedding_node_property="embedding",
+        index_name="type_vector_index",
+        text_node_property="text",
+        retrieval_query=RETRIEVAL_QUERY,
+    )
+
+
+def build_chunk_chain(llm, retriever):
+    """The retrieval chain over any chat model and LangChain retriever."""
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from langchain.chains.retrieval import create_retrieval_chain
+    chunk_chain = create_stuff_documents_chain(llm, prompt)
+    return create_retrieval_chain(retriever, chunk_chain)
+
+
+def chunk_retriever():
+    """The chunk chain's retriever, behind the process-wide cassette when there is one."""
+    cassette = get_cassette()
+    if cassette is None:
+        return registry.get("chunk_vector").as_retriever()
+    # Replay needs neither Neo4j nor the embedding model
+    inner = None if cassette.replaying else registry.get("chunk_vector").as_retriever()
+    return CassetteRetriever(cassette=cassette, inner=inner)
+
+
+def _build_chunk_chain():
+    return build_chunk_chain(registry.get("ollama_llm"), chunk_retriever())
+
+
+registry.register("ollama_llm", _build_ollama_llm)
+registry.register("chunk_vector", _build_chunk_vector)
+registry.register("chunk_chain", _build_chunk_chain)
+
 
 def find_chunk(q):
-    return chunk_retriever.invoke({"input": q})
\ No newline at end of file
+    with span("retrieval.chunk_chain"):
+        return registry.get("chunk_chain").invoke({"input": q}, config={"callbacks": tracing_callbacks()})
@@ -1,12 +1,31 @@
-from qa_bot.core.agent import generate_response
+import os
+
+from .qa_bot.core.agent import answer_cache_stats, generate_response, warm_up
+from .qa_bot.core.tracing import serve_metrics
 
 def main():
     print("Welcome to the GEO Help Guide Chatbot!")
     print("Type 'exit' to end the session.\n")
 
+    # QA_TRACE=1 records spans; this also exposes them for Prometheus
+    if os.getenv("QA_METRICS_PORT"):
+        serve_metrics(int(os.getenv("QA_METRICS_PORT")))
+
+    # Connect and build the agent before the first question, not during it
+    try:
+        timings = warm_up()
+        print("Ready (" + ", ".join(f"{k} {v:.1f}s" for k, v in timings.items()) + ")\n")
+    except Exception as e:
+        print(f"Warm-up failed, will retry on first question: {e}\n")
+
     while True:
         user_input = input("You: ")
         if user_input.strip().lower() in ['exit', 'quit']:
+            stats = answer_cache_stats()
+            if stats:
+                print(f"Answer cache: {stats['hit_rate']:.0%} hit rate "
+                      f"({stats['exact_hits']} exact, {stats['semantic_hits']} semantic, "
+                      f"{stats['misses']} misses)")
             print("Exiting chat. Goodbye!")
             break
 
@@ -0,0 +1,155 @@
+"""
+In-process stand-ins for the Neo4j driver API used by the loaders and
+exporters, so they can be exercised without a database, plus a synthetic
+graph to serve through them (also used by ``benchmarks.export_memory``).
+"""
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional
+
+
+class FakeRecord(dict):
+    def data(self):
+        return dict(self)
+
+    def value(self, key=0):
+        return list(self.values())[key] if isinstance(key, int) else self[key]
+
+
+class FakeResult:
+    def __init__(self, records):
+        self._records = [FakeRecord(r) for r in records]
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def single(self):
+        return self._records[0] if self._records else None
+
+    def data(self):
+        return [r.data() for r in self._records]
+
+    def consume(self):
+        return None
+
+
+class FakeTransaction:
+    def __init__(self, driver):
+        self.driver = driver
+        self.queries: List[tuple] = []
+        self.committed = False
+
+    def run(self, query, parameters=None, **kwargs):
+        params = dict(parameters or {}, **kwargs)
+        self.queries.append((query, params))
+        return FakeResult(self.driver.respond(query, params))
+
+    def commit(self):
+        if self.driver.commit_errors:
+            raise self.driver.commit_errors.pop(0)
+        self.committed = True
+        self.driver.transactions.append(self.queries)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, driver, database=None):
+        self.driver = driver
+        self.database = database
+
+    def begin_transaction(self):
+        return FakeTransaction(self.driver)
+
+    def run(self, query, parameters=None, **kwargs):
+        params = dict(parameters or {}, **kwargs)
+        self.driver.transactions.append([(query, params)])
+        return FakeResult(self.driver.respond(query, params))
+
+    def execute_read(self, fn, *args, **kwargs):
+        return fn(FakeTransaction(self.driver), *args, **kwargs)
+
+    def execute_write(self, fn, *args, **kwargs):
+        tx = FakeTransaction(self.driver)
+        result = fn(tx, *args, **kwargs)
+        tx.commit()
+        return result
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeDriver:
+    """
+    Records every committed transaction as a list of ``(query, params)``.
+
+    ``responder(query, params)`` may return rows for read queries, and any
+    exceptions queued in ``commit_errors`` are raised by successive commits.
+    """
+
+    def __init__(self, responder: Optional[Callable[[str, Dict], list]] = None):
+        self.responder = responder
+        self.transactions: List[List[tuple]] = []
+        self.commit_errors: List[Exception] = []
+        self.closed = False
+
+    def respond(self, query, params):
+        return self.responder(query, params) if self.responder else []
+
+    def session(self, database=None, **kwargs):
+        return FakeSession(self, database)
+
+    def close(self):
+        self.closed = True
+
+
+def synthetic_graph(n_nodes, fanout=2):
+    """``Curve`` nodes, each with *fanout* relationships to the next ones, in exporter row format."""
+    nodes = [
+        {"id": f"4:bench:{i:09d}", "labels": ["Curve"],
+         "props": {"name": f"Curve {i}", "description": "synthetic curve " * 4}}
+        for i in range(n_nodes)
+    ]
+    rels = []
+    for i in range(n_nodes):
+        for k in range(1, fanout + 1):
+            a, b = nodes[i], nodes[(i + k) % n_nodes]
+            rels.append({
+                "id": f"5:bench:{len(rels):09d}", "rel_type": "HAS_ATTRIBUTE", "props": {},
+                "a_id": a["id"], "a_labels": a["labels"], "a_props": a["props"],
+                "b_id": b["id"], "b_labels": b["labels"], "b_props": b["props"],
+            })
+    return nodes, rels
+
+
+def graph_responder(nodes, rels):
+    """``FakeDriver`` responder serving the exporter's full and keyset-paged reads of a graph."""
+    node_ids = [n["id"] for n in nodes]
+    rel_ids = [r["id"] for r in rels]
+
+    def respond(query, params):
+        if "$after" in query:
+            rows, ids = (rels, rel_ids) if "[r]" in query else (nodes, node_ids)
+            start = bisect_right(ids, params["after"])
+            return rows[start:start + params["limit"]]
+        if "[r]" in query:
+            return [{k: r[k] for k in ("rel_type", "props", "a_labels", "a_props", "b_labels", "b_props")}
+                    for r in rels]
+        return [{"labels": n["labels"], "props": n["props"]} for n in nodes]
+
+    return respond
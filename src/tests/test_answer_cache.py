@@ -0,0 +1,123 @@
+import threading
+
+import numpy as np
+
+from ..qa_bot.core.answer_cache import AnswerCache, normalize_question
+from ..qa_bot.core.graph_version import VersionWatcher
+
+VOCAB = ["curve", "scale", "format", "las", "settings", "export"]
+
+
+def bag_of_words(texts):
+    """Deterministic stand-in for a sentence embedder."""
+    return np.array([[normalize_question(t).split().count(w) for w in VOCAB] for t in texts],
+                    dtype=np.float32)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(tmp_path, **kwargs):
+    return AnswerCache(tmp_path, embed=bag_of_words, clock=kwargs.pop("clock", Clock()), **kwargs)
+
+
+def test_exact_hit_ignores_case_and_punctuation(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store("What is a LAS format?", "A well log format.")
+    assert cache.lookup("what is a las format") == "A well log format."
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_semantic_hit_respects_threshold(tmp_path):
+    cache = make_cache(tmp_path, threshold=0.9)
+    cache.store("export curve settings", "Use File > Export.")
+    assert cache.lookup("how do I export the curve settings") == "Use File > Export."
+    assert cache.lookup("scale format") is None
+    stats = cache.stats()
+    assert (stats["semantic_hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+    clock = Clock()
+    cache = make_cache(tmp_path, clock=clock, ttl=60, max_entries=2)
+    cache.store("curve", "a")
+    cache.store("scale", "b")
+    cache.lookup("curve")                    # "scale" is now least recently used
+    cache.store("format", "c")
+    assert cache.lookup("scale") is None
+    clock.now += 61
+    assert cache.lookup("curve") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_graph_version_change_invalidates(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.sync_graph_version(3) is False
+    cache.store("curve", "a")
+    assert cache.sync_graph_version(3) is False
+    assert cache.sync_graph_version(4) is True
+    assert cache.lookup("curve") is None
+
+
+def test_persists_across_restarts(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.sync_graph_version(7)
+    cache.store("export curve settings", "Use File > Export.")
+
+    reloaded = make_cache(tmp_path)
+    assert reloaded.graph_version == 7
+    assert reloaded.lookup("export the curve settings") == "Use File > Export."
+
+
+def test_answers_are_journaled_not_rewritten(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.sync_graph_version(1)
+    snapshot = (tmp_path / "answers.json").stat().st_mtime_ns
+    for question in ("curve", "scale", "format"):
+        cache.store(question, question.upper())
+    assert (tmp_path / "answers.json").stat().st_mtime_ns == snapshot
+    assert len((tmp_path / "journal.jsonl").read_text().splitlines()) == 4          # 3 puts, 1 eviction
+    with (tmp_path / "journal.jsonl").open("a") as f:
+        f.write('{"op": "put", "key": "lo')                                        # torn by a crash
+
+    reloaded = make_cache(tmp_path, max_entries=2)
+    assert [reloaded.lookup(q) for q in ("curve", "scale", "format")] == [None, "SCALE", "FORMAT"]
+    assert not (tmp_path / "journal.jsonl").exists()
+
+
+def test_embedding_runs_outside_the_lock(tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_embed(texts):
+        if texts == ["how do I export settings"]:
+            started.set()
+            release.wait(5)
+        return bag_of_words(texts)
+
+    cache = AnswerCache(tmp_path, embed=slow_embed)
+    cache.store("export curve settings", "Use File > Export.")
+    semantic = threading.Thread(target=cache.lookup, args=("how do I export settings",))
+    semantic.start()
+    assert started.wait(5)
+    answers = []
+    exact = threading.Thread(target=lambda: answers.append(cache.lookup("Export curve settings?")))
+    exact.start()
+    exact.join(2)                                               # not queued behind the model call
+    answered = list(answers)
+    release.set()
+    semantic.join()
+    assert answered == ["Use File > Export."]
+
+
+def test_version_watcher_memoises_reads():
+    reads, clock = [], Clock()
+    watcher = VersionWatcher(lambda: reads.append(1) or len(reads), interval=5, clock=clock)
+    assert watcher.current() == watcher.current() == 1
+    clock.now += 5
+    assert watcher.current() == 2
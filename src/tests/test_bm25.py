@@ -0,0 +1,49 @@
+import json
+
+import numpy as np
+
+from ..data_processing.search.bm25 import BM25Index, documents_from_whxdata, tokenize
+
+DOCS = [
+    {"id": "odf", "title": "Output Database File (ODF)", "text": "An ODF stores up to 200 tracks."},
+    {"id": "oif", "title": "ODF Interval Files (OIF)", "text": "OIF files hold intervals of an ODF."},
+    {"id": "gr", "title": "Gamma Ray", "text": "The GR_1 curve is a gamma ray log."},
+    {"id": "limits", "title": "GEO Limits", "text": "Maximum lithology types: 450. Curve shades: 250."},
+]
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    assert tokenize("The GR_1 curve, 0x0 and 3.5 in .LAS") == [
+        "gr_1", "gr", "1", "curve", "0x0", "3.5", "las"]
+
+
+def test_exact_terms_rank_first():
+    index = BM25Index.build(DOCS)
+    assert index.search("OIF", k=1)[0][0]["id"] == "oif"
+    assert index.search("gr_1", k=1)[0][0]["id"] == "gr"
+    assert index.search("450 lithology", k=1)[0][0]["id"] == "limits"
+    assert index.search("nothing matches", k=3) == []
+
+
+def test_array_postings_roundtrip(tmp_path):
+    index = BM25Index.build(DOCS)
+    assert index.doc_ids.dtype == np.int32 and index.offsets[-1] == len(index.doc_ids)
+    index.save(tmp_path)
+
+    loaded = BM25Index.load(tmp_path)
+    assert isinstance(loaded.doc_ids, np.memmap)
+    assert [(d["id"], round(s, 5)) for d, s in loaded.search("ODF tracks")] == \
+           [(d["id"], round(s, 5)) for d, s in index.search("ODF tracks")]
+
+
+def test_imports_robohelp_search_data(tmp_path):
+    (tmp_path / "text").mkdir()
+    topics = {"metadata": {"7": {"title": "GEO Limits", "relUrl": "Introduction/GEO_Limits.htm"}}}
+    (tmp_path / "search_topics.js").write_text(f"rh._.exports({json.dumps(json.dumps(topics))})")
+    fields = {"0": [[" ", "GEO Limits"]],
+              "1": [[" ", "Back", " ", "Forward"], [" ", "Lithology types", " ", "450"]], "id": "7"}
+    (tmp_path / "text" / "7.js").write_text(f"rh._.exports({json.dumps(fields)})")
+
+    docs = list(documents_from_whxdata(tmp_path))
+    assert docs == [{"id": "Introduction/GEO_Limits.htm", "title": "GEO Limits",
+                     "url": "Introduction/GEO_Limits.htm", "text": "Lithology types 450"}]
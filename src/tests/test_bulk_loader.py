@@ -0,0 +1,81 @@
+from neo4j.exceptions import CypherSyntaxError, TransientError
+import pytest
+
+from ..knowledge_graph.loaders.bulk_loader import (
+    BulkLoader,
+    NodeRecord,
+    RelationshipRecord,
+)
+from ..knowledge_graph.loaders.text_indexes import KEY_UPDATES
+from .fakes import FakeDriver
+
+
+def test_nodes_are_written_in_unwind_batches():
+    driver = FakeDriver()
+    loader = BulkLoader(driver, batch_size=2)
+    records = [NodeRecord("FileType", {"name": n}, {"ext": n.lower()}) for n in ("ODF", "ODT", "OIF")]
+
+    stats = loader.load_nodes(records)
+
+    assert (stats.rows, stats.batches, stats.failures) == (3, 2, 0)
+    assert [len(tx) for tx in driver.transactions] == [1, 1]
+    query, params = driver.transactions[0][0]
+    assert query.startswith("UNWIND $rows AS row")
+    assert "MERGE (n:`FileType` {`name`: row.key.`name`})" in query
+    assert params["rows"] == [{"key": {"name": "ODF"}, "props": {"ext": "odf"}},
+                              {"key": {"name": "ODT"}, "props": {"ext": "odt"}}]
+
+
+def test_derived_keys_are_an_opt_in_node_update():
+    driver = FakeDriver()
+    BulkLoader(driver).load_nodes([NodeRecord("FileType", {"name": "ODF"})])
+    assert "nameKey" not in driver.transactions[0][0][0]
+
+    BulkLoader(driver, node_updates=KEY_UPDATES).load_nodes([NodeRecord("FileType", {"name": "ODF"})])
+    query = driver.transactions[1][0][0]
+    assert query.endswith("\n".join(KEY_UPDATES))
+    assert "SET n.nameKey = CASE WHEN n.name IS :: STRING THEN toLower(trim(n.name)) END" in query
+
+
+def test_relationships_are_grouped_by_shape():
+    driver = FakeDriver()
+    stats = BulkLoader(driver).load_relationships([
+        RelationshipRecord("HAS_FILE_TYPE", "System", {"name": "GEO File System"}, "FileType", {"name": "ODF"}),
+        RelationshipRecord("HAS_FILE_TYPE", "System", {"name": "GEO File System"}, "FileType", {"name": "ODT"}),
+        RelationshipRecord("HAS_TEMPLATE", "FileType", {"name": "ODF"}, "FileType", {"name": "ODT"}),
+    ])
+
+    assert (stats.rows, stats.batches) == (3, 2)
+    assert "MERGE (a)-[r:`HAS_FILE_TYPE`]->(b)" in driver.transactions[0][0][0]
+
+
+def test_transient_errors_are_retried_then_counted():
+    driver = FakeDriver()
+    driver.commit_errors = [TransientError("deadlock")] * 3
+    loader = BulkLoader(driver, batch_size=10, max_retries=1, backoff=0)
+
+    stats = loader.write_rows("UNWIND $rows AS row RETURN row", [{"a": 1}])
+    assert (stats.retries, stats.failures, stats.rows) == (1, 1, 0)
+
+    stats = loader.write_rows("UNWIND $rows AS row RETURN row", [{"a": 1}])
+    assert (stats.retries, stats.failures, stats.rows) == (1, 0, 1)
+
+
+def test_non_transient_errors_propagate():
+    driver = FakeDriver()
+    driver.commit_errors = [CypherSyntaxError("bad")]
+    with pytest.raises(CypherSyntaxError):
+        BulkLoader(driver).write_rows("UNWIND $rows AS row RETURN row", [{"a": 1}])
+
+
+def test_schema_statements_get_their_own_transaction():
+    driver = FakeDriver()
+    stats = BulkLoader(driver, batch_size=10).run_statements([
+        "MERGE (:A {name: 'a'})",
+        "CREATE INDEX a_name FOR (a:A) ON (a.name)",
+        "MERGE (:A {name: 'b'})",
+        "MERGE (:A {name: 'c'})",
+    ])
+
+    assert stats.rows == 4
+    assert [len(tx) for tx in driver.transactions] == [1, 1, 2]
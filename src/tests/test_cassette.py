@@ -0,0 +1,74 @@
+import json
+
+from ..qa_bot.core import cassette as cassettes
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from ..qa_bot.core.cassette import (
+    Cassette, CassetteChatModel, CassetteGraph, Latency, cassette_retrieve, graph_key, request_key,
+)
+from ..qa_bot.core.graph import get_graph
+from ..qa_bot.core.resources import registry
+
+
+class CountingGraph:
+    def __init__(self):
+        self.calls = 0
+
+    def query(self, query, params=None):
+        self.calls += 1
+        return [{"name": "ODF", "limit": 200}]
+
+
+def test_compact_store_round_trips_and_reads_legacy_json(tmp_path):
+    recording = Cassette(tmp_path / "c.jsonl.gz", mode="record")
+    recording.put("llm", "k1", {"text": "answer", "usage": [3, 1]}, seconds=0.75)
+    recording.put("graph", "k2", [{"n": 1}], seconds=0.01)
+    recording.schema = {"node_props": {}}
+    recording.save()
+    (tmp_path / "old.json").write_text(json.dumps({"schema": None, "llm": {"k3": "bare text"}}))
+
+    replay = Cassette(tmp_path / "c.jsonl.gz")
+    assert replay.get("llm", "k1") == {"text": "answer", "usage": [3, 1]} and replay.seconds["llm"]["k1"] == 0.75
+    assert replay.schema == {"node_props": {}} and Cassette(tmp_path / "old.json").get("llm", "k3") == "bare text"
+    assert [Latency("recorded")(0.5), Latency("recorded*0.1")(0.5), Latency(0.2)(9.0), Latency("0")(1.0)] \
+        == [0.5, 0.05, 0.2, 0.0]
+
+
+def test_benchmark_cassettes_keep_their_key_scheme(tmp_path):
+    # Keyed the way the benchmark recorded before the process-wide hooks
+    legacy = {"schema": None,
+              "llm": {request_key("llm", [("system", "Be brief."), ("human", "What is  ODF?")], None): "A file."},
+              "retrieval": {request_key("retrieval", "What is  ODF?"): ["chunk"]}}
+    (tmp_path / "old.json").write_text(json.dumps(legacy))
+    Cassette(tmp_path / "old.json").save(tmp_path / "new.jsonl.gz")            # convert
+
+    for path in ("old.json", "new.jsonl.gz"):
+        cassette = Cassette(tmp_path / path)
+        assert cassette.key_version == 1
+        llm = CassetteChatModel(cassette=cassette)
+        assert llm.invoke([SystemMessage("Be brief."), HumanMessage("What is  ODF?")]).content == "A file."
+        assert cassette_retrieve(cassette)("What is  ODF?") == ["chunk"]
+    assert Cassette(tmp_path / "fresh.jsonl.gz").key_version == 2
+
+
+def test_env_switches_the_shared_graph_to_replay(tmp_path, monkeypatch):
+    path = tmp_path / "graph.jsonl.gz"
+    live = CountingGraph()
+    recording = Cassette(path, mode="record")
+    graph = CassetteGraph(recording, live)
+    assert graph.query("MATCH (n)\n  RETURN n", {"x": 1}) == graph.query("MATCH (n) RETURN n", {"x": 1})
+    assert live.calls == 2 and len(recording.entries["graph"]) == 1
+    recording.save()
+
+    monkeypatch.setenv("CASSETTE", "replay")
+    monkeypatch.setenv("CASSETTE_PATH", str(path))
+    monkeypatch.setenv("CASSETTE_LATENCY", "0")
+    registry.reset("cassette", "graph")
+    try:
+        shared = get_graph()                                            # no Neo4j connection made
+        assert isinstance(shared, CassetteGraph) and shared.inner is None
+        assert shared.query("MATCH (n) RETURN n", {"x": 1}) == [{"name": "ODF", "limit": 200}]
+        assert cassettes.get_cassette().stats()["hits"] == 1
+        assert graph_key("MATCH (n) RETURN n", {"x": 2}) not in cassettes.get_cassette().entries["graph"]
+    finally:
+        registry.reset("cassette", "graph")
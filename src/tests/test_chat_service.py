@@ -0,0 +1,111 @@
+import asyncio
+import json
+import threading
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from ..qa_bot.service.server import ChatService, make_app
+from ..qa_bot.service.sessions import SessionStore
+from ..qa_bot.service.streaming import FinalAnswerStream
+
+
+def echo_responder(message, history, on_token):
+    for word in message.split():
+        on_token(word)
+    return f"{message} (after {len(history)} messages)"
+
+
+def serve(tmp_path, scenario, **kwargs):
+    async def run():
+        if "sessions" not in kwargs:
+            kwargs["sessions"] = SessionStore(tmp_path)
+        service = ChatService(**kwargs)
+        async with TestClient(TestServer(make_app(service))) as client:
+            return await scenario(client, service)
+    return asyncio.run(run())
+
+
+def test_sessions_keep_memory_in_chat_session_format(tmp_path):
+    async def scenario(client, service):
+        first = await (await client.post("/chat", json={"message": "hello"})).json()
+        second = await (await client.post("/chat", json={"message": "again",
+                                                         "session_id": first["session_id"]})).json()
+        return first, second
+
+    first, second = serve(tmp_path, scenario, respond=echo_responder)
+    assert second["answer"] == "again (after 2 messages)"
+    saved = SessionStore(tmp_path).history(first["session_id"])            # reopened from the log
+    assert [m["role"] for m in saved] == ["user", "assistant", "user", "assistant"]
+    assert set(saved[0]) == {"role", "content", "timestamp"}
+
+
+def test_idle_sessions_do_not_accumulate(tmp_path):
+    async def scenario(client, service):
+        ids = []
+        for i in range(5):
+            ids.append((await (await client.post("/chat", json={"message": f"q{i}"})).json())["session_id"])
+        await asyncio.gather(*(client.post("/chat", json={"message": "again", "session_id": ids[0]})
+                               for _ in range(3)))
+        return ids, dict(service._session_locks), list(service.sessions._sessions)
+
+    ids, locks, cached = serve(tmp_path, scenario, respond=echo_responder,
+                               sessions=SessionStore(tmp_path, max_cached=2))
+    assert locks == {} and len(cached) == 2
+    assert len(SessionStore(tmp_path).history(ids[0])) == 8                 # evicted, then read back
+
+
+def test_websocket_streams_tokens_before_answer(tmp_path):
+    async def scenario(client, service):
+        ws = await client.ws_connect("/ws")
+        await ws.send_json({"message": "three word question"})
+        frames = []
+        while not frames or frames[-1]["type"] == "token":
+            frames.append(await ws.receive_json())
+        await ws.close()
+        return frames
+
+    frames = serve(tmp_path, scenario, respond=echo_responder)
+    assert [f["text"] for f in frames[:-1]] == ["three", "word", "question"]
+    assert frames[-1]["type"] == "answer"
+
+
+def test_full_queue_is_refused_with_503(tmp_path):
+    release = threading.Event()
+
+    def blocking(message, history, on_token):
+        release.wait(5)
+        return "done"
+
+    async def scenario(client, service):
+        running = asyncio.ensure_future(client.post("/chat", json={"message": "slow"}))
+        while not service.active:
+            await asyncio.sleep(0.01)
+        refused = await client.post("/chat", json={"message": "one too many"})
+        release.set()
+        return refused, await running, service.stats()
+
+    refused, running, stats = serve(tmp_path, scenario, respond=blocking,
+                                    max_concurrency=1, max_queue=0)
+    assert refused.status == 503 and refused.headers["Retry-After"]
+    assert running.status == 200
+    assert (stats["rejected"], stats["waiting"]) == (1, 0)
+
+
+def test_metrics_endpoint_exposes_service_counters(tmp_path):
+    async def scenario(client, service):
+        await client.post("/chat", json={"message": "hello"})
+        return await (await client.get("/metrics")).text()
+
+    text = serve(tmp_path, scenario, respond=echo_responder)
+    assert "qa_service_completed 1" in text and "qa_service_rejected 0" in text
+
+
+def test_final_answer_stream_hides_scratchpad():
+    tokens = []
+    handler = FinalAnswerStream(tokens.append)
+    for token in ["Thought: yes\nAction: kg_info", "\n"]:
+        handler.on_llm_new_token(token)
+    handler.on_llm_start()
+    for token in ["Thought: no\nFinal", " Answer: 200", " tracks"]:
+        handler.on_llm_new_token(token)
+    assert "".join(tokens) == "200 tracks"
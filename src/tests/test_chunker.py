@@ -0,0 +1,58 @@
+from ..data_processing.chunking.chunker import Chunker
+from ..data_processing.chunking.minhash import MinHashLSH, deduplicate
+
+BANNER = "*Maximize screen to view table of contents*"
+
+
+def page(path, title, sections, tables=()):
+    return {"path": path, "title": title, "text": " ".join(s[1] for s in sections),
+            "sections": [{"level": 1, "heading": h, "text": t} for h, t in sections],
+            "tables": list(tables)}
+
+
+def words(n, prefix="word"):
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+def test_strips_boilerplate_and_keeps_breadcrumbs():
+    chunks = Chunker().chunk([page("a.htm", "Add Lithology", [("", BANNER), ("Steps", "Click OK .")])])
+    assert [c["text"] for c in chunks] == ["Add Lithology > Steps\nClick OK ."]
+
+
+def test_respects_token_budget_and_packs_small_sections():
+    long_section = ". ".join(words(12, f"s{i}_") for i in range(20)) + "."
+    chunker = Chunker(max_tokens=60, min_tokens=20, dedup_threshold=None)
+    chunks = chunker.chunk([page("a.htm", "Limits", [("Short", "one"), ("Also short", "two"),
+                                                     ("Long", long_section)])])
+    assert all(c["tokens"] <= 60 for c in chunks)
+    assert chunks[0]["text"].split("\n")[1:] == ["one", "Also short", "two"]
+    assert len(chunks) > 3
+
+
+def test_tables_become_header_value_rows():
+    table = {"css_class": "", "rows": [["Component", "Example"], ["Name", "GR"], ["Unit", "API"]]}
+    chunks = Chunker().chunk([page("t.htm", "Curves", [("", "Name\nGR\nUnit\nAPI")], [table])])
+    assert [c["kind"] for c in chunks] == ["table"]
+    assert chunks[0]["text"] == "Curves > Component | Example\nComponent: Name; Example: GR\nComponent: Unit; Example: API"
+
+
+def test_near_duplicate_pages_are_dropped():
+    body = words(80)
+    chunker = Chunker()
+    chunks = chunker.chunk([
+        page("Curve_Data/Load.htm", "Load", [("", body)]),
+        page("Load_Curve_Data/Load.htm", "Load", [("", body + " extra")]),
+        page("Other.htm", "Other", [("", words(80, "other"))]),
+    ])
+    assert [c["path"] for c in chunks] == ["Curve_Data/Load.htm", "Other.htm"]
+    assert chunks[0]["duplicates"] == ["Load_Curve_Data/Load.htm#0"]
+    assert chunker.stats["duplicates_dropped"] == 1
+
+
+def test_minhash_estimates_jaccard():
+    lsh = MinHashLSH(num_perm=256, bands=32)
+    a, b = words(100), words(90) + " " + words(10, "x")
+    estimate = lsh.similarity(lsh.signature(a), lsh.signature(b))
+    assert abs(estimate - 86 / 106) < 0.08       # 3-word shingles: 86 shared of 106
+    kept, dropped = deduplicate([("a", a), ("b", a), ("c", words(50, "y"))])
+    assert kept == ["a", "c"] and dropped == {"b": "a"}
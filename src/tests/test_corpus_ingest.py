@@ -0,0 +1,52 @@
+import pyarrow.parquet as pq
+
+from ..data_processing.file_io import corpus
+
+PAGE = """<?xml version="1.0" encoding="utf-8" ?>
+<html><head><title>{title}</title></head><body>
+<table class="Table_Style_Back_Forward"><tr><td><a href="javascript:history.back();">Back</a></td></tr></table>
+<h1>{title}</h1>
+<p>{body}</p>
+<table class="Table_Style_1"><tr><td>Name</td><td>Extension</td></tr><tr><td>Output Database</td><td>ODF</td></tr></table>
+<p><a href="../Other/Page.htm">see also</a></p>
+</body></html>
+"""
+
+
+def _write(path, title, body):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(PAGE.format(title=title, body=body), encoding="utf-8")
+
+
+def test_parse_page_drops_navigation_and_keeps_structure():
+    row = corpus.parse_page(PAGE.format(title="Save an ODF", body="Click Save."), "a.htm")
+
+    assert row["title"] == "Save an ODF"
+    assert "Back" not in row["text"]
+    assert row["sections"][0]["heading"] == "Save an ODF"
+    assert "Click Save." in row["sections"][0]["text"]
+    assert row["tables"] == [{"css_class": "Table_Style_1",
+                              "rows": [["Name", "Extension"], ["Output Database", "ODF"]]}]
+    assert row["links"] == [{"href": "../Other/Page.htm", "text": "see also"}]
+
+
+def test_ingest_only_reparses_changed_pages(tmp_path):
+    data, out = tmp_path / "Data", tmp_path / "out"
+    _write(data / "Files" / "A.htm", "A", "first")
+    _write(data / "Files" / "B.htm", "B", "second")
+    _write(data / "template" / "skin.htm", "skin", "ignored")
+
+    assert corpus.ingest_corpus(data, out, workers=1) == {
+        "total": 2, "parsed": 2, "unchanged": 0, "removed": 0}
+    assert corpus.ingest_corpus(data, out, workers=1)["parsed"] == 0
+
+    _write(data / "Files" / "B.htm", "B", "edited")
+    (data / "Files" / "A.htm").unlink()
+    _write(data / "Files" / "C.htm", "C", "third")
+
+    assert corpus.ingest_corpus(data, out, workers=1) == {
+        "total": 2, "parsed": 2, "unchanged": 0, "removed": 1}
+
+    rows = pq.read_table(out / "pages.parquet").to_pylist()
+    assert [r["path"] for r in rows] == ["Files/B.htm", "Files/C.htm"]
+    assert "edited" in rows[0]["text"]
@@ -0,0 +1,133 @@
+import pytest
+
+from ..qa_bot.core.cassette import Cassette, CassetteGraph
+from ..qa_bot.core.graph import read_query
+from ..qa_bot.tools.cypher_cache import (
+    CypherPlanCache,
+    UnsafeCypherError,
+    parameterise,
+    template_question,
+    validate_read_only,
+)
+
+
+def test_template_pulls_out_entity_slots():
+    assert template_question("Which formats does LAS support?") == (
+        "which formats does {} support", ["LAS"])
+    assert template_question("What's in 'Curve Settings' for .dlis files?") == (
+        "what s in {} for {} files", ["Curve Settings", ".dlis"])
+
+
+@pytest.mark.parametrize("cypher", [
+    "MATCH (n) DETACH DELETE n",
+    "MATCH (n:Type) SET n.name = 'x' RETURN n",
+    "MERGE (n:Type {name: 'LAS'})",
+    "LOAD CSV FROM 'file:///x.csv' AS row RETURN row",
+    "CALL apoc.periodic.iterate('MATCH (n) RETURN n', 'DELETE n', {})",
+    "CALL dbms.killQueries(['1'])",
+    "MATCH (n) RETURN apoc.cypher.runFirstColumnSingle('CREATE (m) RETURN m', {})",
+    "STOP DATABASE neo4j",
+])
+def test_rejects_writes(cypher):
+    with pytest.raises(UnsafeCypherError):
+        validate_read_only(cypher)
+
+
+def test_allows_reads_mentioning_write_words_in_strings():
+    cypher = ("MATCH (n:Setting) WHERE n.name = 'CREATE SET' AND n.offset = 1 "
+              "CALL db.labels() YIELD label RETURN n.name, label")
+    assert validate_read_only(cypher) == cypher
+    aliased = "MATCH (start)-[r]->(stop) RETURN start.name AS start, stop.name AS stop"
+    assert validate_read_only(aliased) == aliased
+
+
+def test_read_query_opens_read_access_sessions(tmp_path):
+    class Neo4jLike:
+        _driver = object()
+
+        def __init__(self):
+            self.sessions = []
+
+        def query(self, query, params=None, session_params=None):
+            self.sessions.append(session_params)
+            return [{"n": 1}]
+
+    live = Neo4jLike()
+    recorded = CassetteGraph(Cassette(tmp_path / "c.json.gz", "record"), live)
+    assert read_query(live, "MATCH (n) RETURN 1 AS n") == read_query(recorded, "MATCH (n) RETURN 1 AS n")
+    assert live.sessions == [{"default_access_mode": "READ"}] * 2
+
+
+def test_parameterise_keeps_regex_prefix_and_case():
+    query, bindings, complete = parameterise(
+        "MATCH (t:Type)-[:HAS_FORMAT]->(f) WHERE t.name =~ '(?i)las' RETURN f.name LIMIT 5",
+        ["LAS", "5"])
+    assert query == ("MATCH (t:Type)-[:HAS_FORMAT]->(f) WHERE t.name =~ '(?i)' + $e0 "
+                     "RETURN f.name LIMIT $e1")
+    assert [b["case"] for b in bindings] == ["lower", "same"]
+    assert complete
+
+
+def test_repeat_shapes_skip_generation():
+    generated, executed = [], []
+
+    def generate(question):
+        generated.append(question)
+        return "MATCH (t:Type {name: 'LAS'})-[:HAS_FORMAT]->(f) RETURN f.name AS format"
+
+    def execute(query, params):
+        executed.append((query, params))
+        return [{"format": params["e0"] + "-1"}]
+
+    cache = CypherPlanCache(generate, execute)
+    cache.run("Which formats does LAS support?")
+    query, rows = cache.run("Which formats does DLIS support?")
+
+    assert len(generated) == 1
+    assert executed[0][0] == executed[1][0] == query
+    assert rows == [{"format": "DLIS-1"}]
+    assert cache.stats()["hits"] == 1
+
+
+def test_plans_with_no_rows_are_regenerated_once():
+    labels = iter(["t:Type", "f:Format"])
+    executed = []
+
+    def generate(question):
+        var_label, entity = next(labels), question.split()[-1]
+        return f"MATCH ({var_label}) WHERE {var_label[0]}.name = '{entity}' RETURN {var_label[0]}.name AS name"
+
+    def execute(query, params):
+        executed.append(query)
+        return [{"name": params["e0"]}] if query.startswith("MATCH (f:Format)") or params["e0"] == "LAS" else []
+
+    cache = CypherPlanCache(generate, execute)
+    cache.run("Show LAS")
+    query, rows = cache.run("Show DLIS")                 # DLIS is a Format, not a Type
+    assert query.startswith("MATCH (f:Format)") and rows == [{"name": "DLIS"}]
+    assert len(executed) == 3 and cache.stats()["hits"] == 0
+    assert cache.run("Show ODF")[0] == query and cache.stats()["hits"] == 1
+
+
+def test_unbound_slots_are_not_cached_and_writes_never_run(tmp_path):
+    executed = []
+    cache = CypherPlanCache(lambda q: "MATCH (t:Type) RETURN t.name",
+                            lambda q, p: executed.append(q) or [], tmp_path / "plans.json")
+    cache.run("Which formats does LAS support?")
+    assert cache.stats()["plans"] == 0
+
+    cache.generate = lambda q: "MATCH (t:Type) DETACH DELETE t"
+    with pytest.raises(UnsafeCypherError):
+        cache.run("Remove everything")
+    assert executed == ["MATCH (t:Type) RETURN t.name"]
+    assert cache.stats()["rejected"] == 1
+
+
+def test_plans_persist(tmp_path):
+    path = tmp_path / "plans.json"
+    cache = CypherPlanCache(lambda q: "MATCH (t:Type) WHERE t.name = 'LAS' RETURN t",
+                            lambda q, p: [], path)
+    cache.run("Show LAS")
+    reloaded = CypherPlanCache(lambda q: pytest.fail("should not generate"), lambda q, p: [{"t": {}}], path)
+    reloaded.run("Show DLIS")
+    assert reloaded.stats()["hits"] == 1
@@ -0,0 +1,93 @@
+import numpy as np
+
+from ..data_processing.embeddings.onnx_engine import agreement, length_buckets, length_shards, mean_pool
+from ..data_processing.embeddings.service import CachedEmbeddings, EmbeddingCache, EmbeddingService
+
+
+class CountingBackend:
+    """Deterministic 4-d 'model' that records every forward pass."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(t), t.count("a"), t.count("e"), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_only_cache_misses_reach_the_model(tmp_path):
+    backend = CountingBackend()
+    service = EmbeddingService("fake-model", tmp_path, batch_size=2, backend=backend)
+
+    first = service.embed(["alpha", "beta", "gamma", "alpha"])
+    assert len(backend.calls) == 2                      # 3 unique texts, batches of 2
+    assert np.array_equal(first[0], first[3])
+
+    second = service.embed(["  beta ", "delta"])        # whitespace-normalised hit
+    assert backend.calls[-1] == ["delta"]
+    assert np.array_equal(second[0], first[1])
+    assert service.stats()["hits"] == 2
+
+
+def test_unchanged_corpus_reindexes_with_zero_forward_passes(tmp_path):
+    corpus = [f"page {i} about ODF files" for i in range(50)]
+    EmbeddingService("fake-model", tmp_path, backend=CountingBackend()).embed(corpus)
+
+    backend = CountingBackend()
+    reopened = EmbeddingService("fake-model", tmp_path, backend=backend)
+    vectors = reopened.embed(corpus)
+
+    assert backend.calls == []
+    assert vectors.shape == (50, 4)
+    assert reopened.stats()["hit_rate"] == 1.0
+
+
+def test_torn_write_is_cut_back_before_appending(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    cache.add(["a", "b"], np.eye(2, 4, dtype=np.float32))
+    with (tmp_path / "vectors.f32").open("ab") as fh:       # crash: two rows and a half, one torn key
+        fh.write(np.full((2, 4), 9, dtype=np.float32).tobytes() + b"\x00" * 6)
+    with (tmp_path / "keys.txt").open("a") as fh:
+        fh.write("c")
+
+    reopened = EmbeddingCache(tmp_path)
+    assert len(reopened) == 2 and "c" not in reopened
+    reopened.add(["c"], np.full((1, 4), 3, dtype=np.float32))
+    assert reopened.get(["c"]).tolist() == [[3.0] * 4]
+    assert EmbeddingCache(tmp_path).get(["a", "c"]).tolist() == [[1.0, 0, 0, 0], [3.0] * 4]
+
+
+def test_models_do_not_share_entries(tmp_path):
+    backend = CountingBackend()
+    EmbeddingService("model-a", tmp_path, backend=backend).embed(["ODF"])
+    EmbeddingService("model-b", tmp_path, backend=backend).embed(["ODF"])
+    EmbeddingService("model-a", tmp_path, backend=backend, variant="onnx-int8").embed(["ODF"])
+    assert len(backend.calls) == 3
+
+
+def test_langchain_adapter(tmp_path):
+    embeddings = CachedEmbeddings(EmbeddingService("fake-model", tmp_path, backend=CountingBackend()))
+    assert embeddings.embed_query("abc") == [3.0, 1.0, 0.0, 1.0]
+    assert len(embeddings.embed_documents(["abc", "eee"])) == 2
+
+
+def test_onnx_batching_keeps_lengths_together():
+    lengths = [5, 250, 7, 6, 240, 30, 5, 31]
+    batches = length_buckets(lengths, batch_tokens=256)
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    assert all(len(b) * max(lengths[i] for i in b) <= 256 or len(b) == 1 for b in batches)
+    assert [sorted(lengths[i] for i in b) for b in batches] == [[5, 5, 6, 7, 30, 31], [240], [250]]
+
+    texts = ["a" * n for n in lengths]
+    shards = length_shards(texts, 3)
+    assert [[lengths[i] for i in s] for s in shards] == [[5, 5, 6], [7, 30, 31], [240, 250]]
+
+
+def test_mean_pool_matches_reference_pooling():
+    hidden = np.array([[[0.0, 0.0], [3.0, 4.0], [99.0, 99.0]]], dtype=np.float32)
+    pooled = mean_pool(hidden, np.array([[1, 1, 0]]))                    # padding is ignored
+    assert np.allclose(pooled, [[0.6, 0.8]])
+    vectors = np.eye(3, dtype=np.float32)
+    noisy = vectors + 0.01
+    result = agreement(lambda _: vectors, lambda _: noisy, ["a", "b", "c"])
+    assert result["texts"] == 3 and 0.99 < result["min"] <= result["mean"] < 1.0
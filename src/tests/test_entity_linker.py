@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from ..qa_bot.core.entity_linker import EntityLinker, entity_rows_from_snapshot, surface_forms
+from ..qa_bot.core.graph_snapshot import GraphSnapshot
+
+RECORDS = Path(__file__).parent / "records.json"
+
+
+def linker():
+    linker = EntityLinker()
+    linker.update(entity_rows_from_snapshot(GraphSnapshot.from_dump(RECORDS)))
+    return linker
+
+
+def names(mentions):
+    return [(m.text, sorted(e.name for e in m.entities)) for m in mentions]
+
+
+def test_surface_forms_cover_variants():
+    assert surface_forms("ODF", "Output Database File") >= {"odf", "odfs", "output database file",
+                                                          "output database files"}
+    assert surface_forms("CurveSettings") >= {"curvesettings", "curve settings", "curve setting"}
+    assert "left track edge values" in surface_forms("Left_Track_Edge_Value")
+
+
+def test_questions_are_tagged_leftmost_longest():
+    question = "Can an Output Database File hold curve settings, and what are ODTs? (Log type scales)"
+    assert names(linker().link(question)) == [
+        ("Output Database File", ["ODF"]), ("curve settings", ["Settings"]),
+        ("ODTs", ["ODT"]), ("Log type", ["Log Type"]), ("scales", ["Scales"])]
+    assert linker().link("godfather curves")[0].text == "curves"          # whole words only
+
+
+def test_update_only_touches_changed_nodes():
+    rows = entity_rows_from_snapshot(GraphSnapshot.from_dump(RECORDS))
+    entities = EntityLinker()
+    assert entities.update(rows) == (len(rows), 0)
+    assert entities.update(rows) == (0, 0)
+
+    renamed = [dict(r, name="LAS", fullName="Log ASCII Standard") if r["name"] == "ODF" else r for r in rows]
+    assert entities.update(renamed[1:]) == (1, 1)                         # ODF renamed, GEO dropped
+    assert names(entities.link("log ascii standard or odf")) == [("log ascii standard", ["LAS"])]
+    assert entities.link("GEO Help Guide") == []
+    assert "(:FileType {name: 'LAS'})" in entities.hints(entities.link("LAS"))
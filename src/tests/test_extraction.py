@@ -0,0 +1,76 @@
+import json
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+from ..data_processing.graph.extraction import GraphExtractor, parse_output, split_text
+from ..qa_bot.core.kg_schema import SchemaService
+
+RECORDS = Path(__file__).parent / "records.json"
+
+REPLY = {
+    "nodes": [
+        {"label": "FileType", "name": "ODF", "properties": {"fullName": "Output Database File", "colour": "red"}},
+        {"label": "Component", "name": "Header", "properties": {"details": "Well header"}},
+        {"label": "Left_Track_Edge_Value", "name": "Left edge", "properties": {"value": "40"}},
+        {"label": "Spaceship", "name": "Enterprise"},
+        {"label": "Component", "properties": {}},
+    ],
+    "relationships": [
+        {"source": "ODF", "type": "CONTAINS", "target": "Header"},
+        {"source": "Header", "type": "CONTAINS", "target": "ODF"},
+        {"source": "ODF", "type": "CONTAINS", "target": "Nowhere"},
+    ],
+}
+
+
+class CountingModel:
+    model = "stub"
+
+    def __init__(self, reply):
+        self.reply, self.calls = reply, 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self._lock:
+            self.calls += 1
+        return SimpleNamespace(content=self.reply)
+
+
+def pages(n):
+    return [{"path": f"p{i}.htm", "title": f"Page {i}", "text": f"ODF files contain a header. ({i})"} for i in range(n)]
+
+
+def test_outputs_are_validated_against_the_schema():
+    schema = SchemaService.from_dump(RECORDS).structured
+    model = CountingModel("```json\n" + json.dumps(REPLY) + "\n```")
+    nodes, rels, report = GraphExtractor(model, schema, cache_path=None).extract(pages(1))
+
+    by_name = {n.key["name"]: n for n in nodes}
+    assert sorted(by_name) == ["Header", "Left edge", "ODF"]
+    assert by_name["ODF"].properties == {"fullName": "Output Database File"}
+    assert by_name["Left edge"].properties == {"value": 40}
+    assert [(r.start_key["name"], r.type, r.end_key["name"]) for r in rels] == [("ODF", "CONTAINS", "Header")]
+    assert report.rejected == {"unknown label": 1, "unnamed node": 1, "unknown property": 1,
+                               "unknown relationship pattern": 1, "dangling relationship": 1}
+
+
+def test_unchanged_pages_are_served_from_the_cache(tmp_path):
+    schema = SchemaService.from_dump(RECORDS).structured
+    cache = tmp_path / "cache.jsonl"
+    model = CountingModel(json.dumps(REPLY))
+    _, _, first = GraphExtractor(model, schema, cache, concurrency=3).extract(pages(6))
+    assert model.calls == 6 and first.hit_rate == 0
+
+    again = CountingModel(json.dumps(REPLY))
+    nodes, _, second = GraphExtractor(again, schema, cache).extract(pages(7))
+    assert again.calls == 1 and second.cache_hits == 6 and len(nodes) == 3
+
+
+def test_unparseable_replies_are_not_cached(tmp_path):
+    schema = SchemaService.from_dump(RECORDS).structured
+    extractor = GraphExtractor(CountingModel("I cannot help with that."), schema, tmp_path / "cache.jsonl")
+    _, _, report = extractor.extract(pages(2))
+    assert report.invalid_outputs == 2 and len(extractor.cache) == 0
+    assert parse_output('{"nodes": null}') == {"nodes": [], "relationships": []}
+    assert split_text("a" * 5 + "\n" + "b" * 12, max_chars=8) == ["aaaaa", "bbbbbbbb", "bbbb"]
@@ -0,0 +1,121 @@
+from pathlib import Path
+
+import pytest
+
+from ..benchmarks.backends import StubChatModel
+from ..qa_bot.core import agent
+from ..qa_bot.core.graph_snapshot import GraphSnapshot, SnapshotGraph, fresh_snapshot
+from ..qa_bot.core.kg_schema import SchemaService
+from ..qa_bot.core.resources import registry
+from ..qa_bot.core.snapshot_cypher import UnsupportedQuery
+
+RECORDS = Path(__file__).parent / "records.json"
+
+
+@pytest.fixture(scope="module")
+def snapshot(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("snapshot")
+    GraphSnapshot.from_dump(RECORDS).save(directory)
+    return GraphSnapshot.load(directory)          # memory-mapped
+
+
+def test_snapshot_round_trips_adjacency_and_properties(snapshot):
+    assert (snapshot.node_count, snapshot.edge_count) == (17, 20)
+    [odf] = snapshot.find("odf", label="FileType")
+    assert snapshot.props(odf) == {"name": "ODF", "fullName": "Output Database File"}
+    [(edge, rel, system)] = snapshot.neighbours(odf, ["HAS_FILE_TYPE"], direction="in")
+    assert rel == "HAS_FILE_TYPE" and snapshot.edge_endpoints(edge) == (system, odf)
+    [scales] = snapshot.find("Scales", label="Scales")
+    attributes = snapshot.match_path([("HAS_ATTRIBUTE", "out", None)], start_label="Scales")
+    assert {snapshot.prop(path[-1], "name") for path in attributes} >= {"Linear Type", "Log Type"}
+    reached = snapshot.expand(snapshot.find(label="GEO"), max_hops=3)
+    assert max(r["depth"] for r in reached) == 3 and scales in {r["node"] for r in reached}
+
+
+@pytest.mark.parametrize("cypher, params, expected", [
+    ("MATCH (f:FileType {name: 'ODT'}) RETURN f.fullName AS name", {}, [{"name": "Template File"}]),
+    ("MATCH (n) WHERE n.name =~ '(?i)' + $e0 RETURN n.name", {"e0": "odf"}, [{"n.name": "ODF"}]),
+    ("MATCH (s:System)-[:HAS_FILE_TYPE]->(f) WHERE toLower(f.name) STARTS WITH 'od' "
+     "RETURN count(DISTINCT f) AS formats", {}, [{"formats": 2}]),
+    ("MATCH (a)<-[r:HAS_FILE_TYPE]-(s) WHERE a.name = 'ODF' RETURN r", {},
+     [{"r": ({"name": "GEO File System"}, "HAS_FILE_TYPE", {"name": "ODF", "fullName": "Output Database File"})}]),
+    ("MATCH (g:GEO)-[*2]->(f:FileType) RETURN f.name AS name ORDER BY name DESC LIMIT 2", {},
+     [{"name": "OIF"}, {"name": "ODT"}]),
+    # null comparisons are null, and NOT null is still null
+    ("MATCH (n) WHERE NOT n.fullName = 'Output Database File' RETURN count(n) AS n", {}, [{"n": 2}]),
+    # one row per path, not per end node
+    ("MATCH (g:GEO)-[*1..3]->(n) RETURN count(*) AS paths, count(DISTINCT n) AS ends", {},
+     [{"paths": 16, "ends": 12}]),
+    # one MATCH never binds a relationship twice, even across its patterns; separate MATCHes may
+    ("MATCH (a)-[r1]->(b), (a)-[r2]->(c) WHERE a.name = 'ODF' RETURN count(*) AS n", {}, [{"n": 2}]),
+    ("MATCH (a)-[r1]->(b) MATCH (a)-[r2]->(c) WHERE a.name = 'ODF' RETURN count(*) AS n", {}, [{"n": 4}]),
+])
+def test_agent_query_shapes_match_neo4j_rows(snapshot, cypher, params, expected):
+    assert snapshot.query(cypher, params) == expected
+
+
+@pytest.mark.parametrize("cypher", [
+    "MATCH (n) DETACH DELETE n",
+    "MATCH (a:FileType) WITH a RETURN a",
+    "CALL db.labels()",
+    "MATCH (a)-[*]->(b) RETURN b",
+    # evaluator type errors, and ids that only mean something inside the snapshot
+    "MATCH (n) RETURN size(n)",
+    "MATCH (n) RETURN labels(n.foo)",
+    "MATCH (n) WHERE n.name IN 'ODF' RETURN n",
+    "MATCH (n) RETURN coalesce(n.fullName, 0) AS v ORDER BY v",
+    "MATCH ()-[r]->() RETURN elementId(r)",
+    "MATCH (n) RETURN id(n)",
+])
+def test_unsupported_queries_are_left_to_neo4j(snapshot, cypher):
+    with pytest.raises(UnsupportedQuery):
+        snapshot.query(cypher)
+
+
+def test_save_swaps_the_whole_export_into_place(snapshot, tmp_path):
+    directory = tmp_path / "snapshot"
+    GraphSnapshot.from_dump(RECORDS).save(directory)
+    previous = GraphSnapshot.load(directory)     # still mapped while the export is replaced
+    (directory / "stale.npy").write_bytes(b"")
+    GraphSnapshot(snapshot.arrays, {**snapshot.meta, "version": 3}).save(directory)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["snapshot"]
+    assert not (directory / "stale.npy").exists()
+    assert GraphSnapshot.load(directory).version == 3
+    assert previous.node_count == 17 and previous.props(0) == snapshot.props(0)
+
+
+def test_only_exported_snapshots_are_served_for_the_live_graph(snapshot):
+    class Version:
+        def current(self):
+            return 0                                  # a graph that was never bumped
+
+    exported = GraphSnapshot(snapshot.arrays, {**snapshot.meta, "version": 0})
+    registry.reset("graph_snapshot", "graph_version")
+    try:
+        registry.override("graph_version", Version())
+        registry.override("graph_snapshot", snapshot)
+        assert snapshot.version is None and fresh_snapshot() is None
+        registry.override("graph_snapshot", exported)
+        assert fresh_snapshot() is exported
+    finally:
+        registry.reset("graph_snapshot", "graph_version")
+
+
+def test_agent_answers_without_a_database(snapshot, tmp_path, monkeypatch):
+    monkeypatch.setattr(agent, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(agent, "DEFAULT_PLAN_DIR", tmp_path)
+    graph = SnapshotGraph(snapshot)
+    schema = SchemaService.from_dump(RECORDS)
+    schema.apply_to(graph)
+    llm = StubChatModel(latency=0, answers={"log type": "Linear and log scales."},
+                        cypher="MATCH (s:Scales)-[:HAS_ATTRIBUTE]->(a) RETURN a.name AS attribute")
+    overridden = ("graph", "schema", "llm", "graph_snapshot", "graph_version", "kg_cypher_chain", "agent_executor")
+    registry.reset(*overridden)
+    try:
+        for name, instance in (("graph", graph), ("schema", schema), ("llm", llm), ("graph_snapshot", snapshot)):
+            registry.override(name, instance)
+        # the rows reach the answer prompt only if the snapshot served them
+        assert agent._kg_info("Which scale types are there?") == "Linear and log scales."
+        assert agent.generate_response("Which scale types are there?")
+    finally:
+        registry.reset(*overridden)
@@ -0,0 +1,92 @@
+import json
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from ..knowledge_graph.core.graph_visualizer import (
+    EDGE_PAGE_QUERY, NEIGHBOURHOOD_QUERY, NODE_PAGE_QUERY, GraphVisualizer, stable_id,
+)
+
+
+class PagedGraph:
+    """Two 5-node cliques joined by one relationship, served the way Neo4jGraph.query would."""
+
+    def __init__(self):
+        self.nodes = [{"id": f"4:g:{i:03d}", "labels": ["Curve" if i < 5 else "Settings"], "name": f"node {i}"}
+                      for i in range(10)]
+        pairs = [(base + i, base + j) for base in (0, 5) for i in range(5) for j in range(i + 1, 5)] + [(0, 5)]
+        self.edges = [{"id": f"5:g:{k:03d}", "type": "HAS_ATTRIBUTE", "source": self.nodes[a]["id"],
+                       "target": self.nodes[b]["id"]} for k, (a, b) in enumerate(pairs)]
+        self.queries = []
+
+    def query(self, query, params=None):
+        self.queries.append(query)
+        params = params or {}
+        if query in (NODE_PAGE_QUERY, EDGE_PAGE_QUERY):
+            rows = self.nodes if query == NODE_PAGE_QUERY else self.edges
+            return [r for r in rows if r["id"] > params["after"]][:params["limit"]]
+        if query == NEIGHBOURHOOD_QUERY:
+            out = []
+            for e in self.edges:
+                if params["id"] in (e["source"], e["target"]):
+                    other = e["target"] if e["source"] == params["id"] else e["source"]
+                    node = next(n for n in self.nodes if n["id"] == other)
+                    out.append({"rel_id": e["id"], "type": e["type"], "source": e["source"],
+                                "target": e["target"], **node})
+            return out[:params["limit"]]
+        return []                                # graph version: never bumped
+
+
+@pytest.fixture
+def visualizer(tmp_path):
+    return GraphVisualizer(PagedGraph(), cache_dir=tmp_path, page_size=4)
+
+
+def test_overview_streams_pages_and_caches_the_layout(visualizer, tmp_path):
+    overview = visualizer.overview()
+    assert len(overview.ids) == 10 and len(overview.edge_ids) == 21
+    assert visualizer.graph.queries.count(EDGE_PAGE_QUERY) == 6          # 21 rows in pages of 4
+    assert overview.community.tolist() == [0] * 5 + [1] * 5
+
+    fresh = GraphVisualizer(PagedGraph(), cache_dir=tmp_path)
+    cached = fresh.overview()
+    assert EDGE_PAGE_QUERY not in fresh.graph.queries
+    assert (cached.positions == overview.positions).all() and cached.ids == overview.ids
+
+
+def test_collapsed_view_expands_to_members_and_neighbourhoods(visualizer):
+    view = visualizer.collapsed("community")
+    assert [n["id"] for n in view["nodes"]] == ["community:0", "community:1"]
+    assert [(e["from"], e["to"], e["value"]) for e in view["edges"]] == [("community:0", "community:1", 1)]
+    assert {n["id"] for n in visualizer.collapsed("label")["nodes"]} == {"label:Curve", "label:Settings"}
+
+    members = visualizer.expand("community:1", limit=3)
+    assert len(members["nodes"]) == 3 and len(members["edges"]) == 3
+    neighbours = visualizer.expand("4:g:000")
+    assert {n["id"] for n in neighbours["nodes"]} == {f"4:g:{i:03d}" for i in (1, 2, 3, 4, 5)}
+    assert len({e["id"] for e in neighbours["edges"]}) == 5
+
+
+def test_stable_ids_do_not_depend_on_the_process():
+    assert stable_id({"elementId": "4:x:1", "name": "a"}) == "4:x:1"
+    assert stable_id({"name": "LAS", "fullName": "Log ASCII"}) == stable_id({"fullName": "Log ASCII", "name": "LAS"})
+
+
+def test_endpoint_serves_expansions(visualizer):
+    server = visualizer.serve(port=0)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        response = urlopen(Request(f"{base}/expand?id=community:0&limit=2", headers={"Origin": "null"}))
+        assert response.headers["Access-Control-Allow-Origin"] == "null"   # for overview.html on file://
+        expanded = json.load(response)
+        assert [n["id"] for n in expanded["nodes"]] == ["4:g:000", "4:g:001"]
+        page = json.load(urlopen(f"{base}/page?kind=edges&after=5:g:019"))
+        assert [r["id"] for r in page["rows"]] == ["5:g:020"]
+        other_site = urlopen(Request(f"{base}/page", headers={"Origin": "https://example.com"}))
+        assert "Access-Control-Allow-Origin" not in other_site.headers
+        with pytest.raises(HTTPError) as bad_limit:
+            urlopen(f"{base}/page?limit=abc")
+        assert bad_limit.value.code == 400
+    finally:
+        server.shutdown()
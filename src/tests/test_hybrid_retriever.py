@@ -0,0 +1,38 @@
+from ..qa_bot.tools.hybrid import EXPAND_QUERY, HybridRetriever, format_context, reciprocal_rank_fusion
+from ..qa_bot.tools.vector import RETRIEVAL_QUERY
+
+
+def test_rrf_rewards_agreement_between_rankers():
+    dense = [("a", 0.9), ("b", 0.8), ("c", 0.7)]
+    lexical = [("c", 12.0), ("d", 3.0)]
+    fused = reciprocal_rank_fusion([dense, lexical], k=2, rrf_k=60)
+    assert [item for item, _ in fused] == ["c", "a"]
+    assert fused[0][1] == 1 / 63 + 1 / 61
+
+
+def test_expansion_is_one_batched_call_over_fused_hits():
+    calls = []
+
+    def expand(ids, per_hit):
+        calls.append((ids, per_hit))
+        return [{"id": i, "label": "Type", "name": i.upper(), "text": "",
+                 "neighbours": [{"rel": "HAS_FORMAT", "label": "Format", "name": "LAS"}]} for i in ids]
+
+    retriever = HybridRetriever(
+        dense=lambda q, k: [("a", 0.9), ("b", 0.8)],
+        lexical=lambda q, k: [("b", 5.0), ("c", 1.0)],
+        expand=expand, k=2, per_hit=3,
+    )
+    result = retriever.retrieve("which formats")
+
+    assert calls == [(["b", "a"], 3)]
+    assert [(h["id"], h["dense_rank"], h["lexical_rank"]) for h in result["hits"]] == [
+        ("b", 2, 1), ("a", 1, None)]
+    assert set(result["timings"]) == {"dense", "lexical", "fuse", "expand", "total"}
+    assert "  -HAS_FORMAT- [Format] LAS" in format_context(result["hits"])
+
+
+def test_queries_are_anchored_on_hits_and_bounded():
+    assert "UNWIND $ids" in EXPAND_QUERY and "LIMIT $per_hit" in EXPAND_QUERY
+    assert "MATCH (t:Type)" not in RETRIEVAL_QUERY
+    assert "(node)-[:HAS_FORMAT]" in RETRIEVAL_QUERY and "score" in RETRIEVAL_QUERY
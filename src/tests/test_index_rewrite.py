@@ -0,0 +1,48 @@
+from ..qa_bot.core.index_rewrite import IndexRewriter, regex_as_text, rewrite
+
+
+def test_regex_literals_become_key_comparisons():
+    assert regex_as_text("(?i)odf") == ("=", "odf")
+    assert regex_as_text("(?i).*Output Database.*") == ("CONTAINS", "output database")
+    assert regex_as_text("(?i)v1\\.2.*") == ("STARTS WITH", "v1.2")
+    assert regex_as_text("(?i)od[ft]") is None and regex_as_text("odf") is None
+
+    result = rewrite("MATCH (f:FileType)-[:CONTAINS]->(c) WHERE f.name =~ '(?i)' + $e0 "
+                     "AND toLower(c.name) CONTAINS 'tree' RETURN c.name // f.name =~ '(?i)x'")
+    assert result.cypher == ("MATCH (f:FileType)-[:CONTAINS]->(c) WHERE f.nameKey = toLower($e0) "
+                             "AND c.nameKey CONTAINS 'tree' RETURN c.name // f.name =~ '(?i)x'")
+    assert result.fulltext is None
+
+
+def test_unlabelled_lookups_are_seeded_from_the_fulltext_index():
+    result = rewrite("MATCH (n)-[:HAS_ATTRIBUTE]->(a) WHERE n.name =~ '(?i)scales' RETURN a.name")
+    assert result.cypher == ("CALL db.index.fulltext.queryNodes('entity_text', 'name:\"scales\"') YIELD node AS n\n"
+                             "MATCH (n)-[:HAS_ATTRIBUTE]->(a) WHERE n.nameKey = 'scales' RETURN a.name")
+    # A disjunction could match nodes the index seed would miss
+    either = rewrite("MATCH (n) WHERE n.name =~ '(?i)odf' OR n.name =~ '(?i)odt' RETURN n")
+    assert either.fulltext is None and either.cypher.count("nameKey") == 2
+
+
+def test_rewriter_waits_for_keys_and_index():
+    answers = {"missing": [{"missing": 1}], "state": [{"state": "ONLINE", "labels": ["FileType"]}],
+               "uncovered": [{"uncovered": 1}]}
+    version = [1]
+
+    def query(cypher, params):
+        if cypher.startswith("SHOW INDEXES"):
+            return answers["state"]
+        return answers["missing"] if "missing" in cypher else answers["uncovered"]
+
+    rewriter = IndexRewriter(query, lambda: version[0])
+    cypher = "MATCH (f:FileType) WHERE f.name =~ '(?i)odf' RETURN f"
+    assert rewriter.apply(cypher) == cypher
+    answers["missing"] = []
+    assert rewriter.apply(cypher) == cypher             # readiness is cached per graph version
+    version[0] = 2
+    assert rewriter.apply(cypher) == "MATCH (f:FileType) WHERE f.nameKey = 'odf' RETURN f"
+    # Labels outside the full-text index (Type, Format, ...) would lose matches if seeded
+    unlabelled = "MATCH (n) WHERE n.name =~ '(?i)odf' RETURN n"
+    assert rewriter.apply(unlabelled) == "MATCH (n) WHERE n.nameKey = 'odf' RETURN n"
+    answers["uncovered"] = []
+    version[0] = 3
+    assert rewriter.apply(unlabelled).startswith("CALL db.index.fulltext.queryNodes('entity_text'")
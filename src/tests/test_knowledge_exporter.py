@@ -0,0 +1,34 @@
+import json
+
+from ..knowledge_graph.core.knowledge_exporter import CurveGraphLoader
+from .fakes import FakeDriver, graph_responder, synthetic_graph
+
+
+def _loader(n_nodes):
+    nodes, rels = synthetic_graph(n_nodes, fanout=1)
+    return CurveGraphLoader.from_driver(FakeDriver(graph_responder(nodes, rels)))
+
+
+def test_stream_export_matches_materialised_text(tmp_path):
+    loader = _loader(25)
+    node_list, rel_list = loader.extract_graph_data()
+    expected = loader.format_data_for_llm(node_list, rel_list)
+
+    written = loader.stream_export(tmp_path / "graph.txt", page_size=7)
+
+    assert written == 50
+    assert (tmp_path / "graph.txt").read_text(encoding="utf-8").splitlines() == expected
+
+
+def test_stream_export_formats_from_extension(tmp_path):
+    loader = _loader(3)
+
+    loader.stream_export(tmp_path / "graph.jsonl")
+    rows = [json.loads(line) for line in (tmp_path / "graph.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [r["kind"] for r in rows] == ["node"] * 3 + ["relationship"] * 3
+
+    loader.stream_export(tmp_path / "graph.nt")
+    triples = (tmp_path / "graph.nt").read_text(encoding="utf-8").splitlines()
+    assert all(t.endswith(" .") for t in triples)
+    assert '<http://geologix.com/geo-kg/property/name> "Curve 0" .' in triples[1]
+    assert triples[-1].split()[1] == "<http://geologix.com/geo-kg/relationship/HAS_ATTRIBUTE>"
@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+
+from ..qa_bot.core.cassette import Cassette, CassetteMiss
+from ..qa_bot.core.llm_gateway import Backend, GatewayChatModel, GatewayError, LLMGateway, TokenBucket
+
+
+class FakeLLMServer:
+    """Speaks just enough of Ollama's /api/chat and OpenAI's /v1/chat/completions."""
+
+    def __init__(self, delay=0.0, failures=0):
+        self.delay, self.failures = delay, failures
+        self.requests, self.active, self.peak = [], 0, 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with server.lock:
+                    server.requests.append((self.path, body))
+                    fail = server.failures > 0
+                    server.failures -= fail
+                    server.active += 1
+                    server.peak = max(server.peak, server.active)
+                try:
+                    time.sleep(server.delay)
+                    if fail:
+                        return self.reply(503, b"busy", "text/plain")
+                    prompt = body["messages"][-1]["content"]
+                    words = [f"{w} " for w in prompt.upper().split()]
+                    if self.path == "/api/chat":
+                        if body["stream"]:
+                            lines = [{"message": {"content": w}, "done": False} for w in words]
+                            lines.append({"message": {"content": ""}, "done": True,
+                                          "prompt_eval_count": 7, "eval_count": len(words)})
+                            return self.reply(200, "".join(json.dumps(x) + "\n" for x in lines).encode(),
+                                              "application/x-ndjson")
+                        data = {"message": {"content": "".join(words)}, "prompt_eval_count": 7,
+                                "eval_count": len(words)}
+                    else:
+                        usage = {"prompt_tokens": 7, "completion_tokens": len(words)}
+                        if body["stream"]:
+                            events = [{"choices": [{"delta": {"content": w}}]} for w in words]
+                            events.append({"choices": [], "usage": usage})
+                            text = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+                            return self.reply(200, text.encode(), "text/event-stream")
+                        data = {"choices": [{"message": {"content": "".join(words)}}], "usage": usage}
+                    self.reply(200, json.dumps(data).encode(), "application/json")
+                finally:
+                    with server.lock:
+                        server.active -= 1
+
+            def reply(self, status, payload, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = FakeLLMServer()
+    yield server
+    server.close()
+
+
+def gateway_for(server, cassette=None, **options):
+    backends = [Backend("ollama", "ollama", server.url, **options),
+                Backend("openai", "openai", server.url + "/v1", api_key="test", **options)]
+    return LLMGateway(backends, sleep=lambda seconds: None, cassette=cassette)
+
+
+def ask(text):
+    return [{"role": "user", "content": text}]
+
+
+def test_identical_concurrent_requests_are_coalesced(server):
+    server.delay = 0.2
+    gateway = gateway_for(server)
+    results = [None] * 5
+
+    def call(i):
+        results[i] = gateway.complete("ollama", "llama3.2:1b", ask("what is odf"), temperature=0).text
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["WHAT IS ODF "] * 5
+    assert len(server.requests) == 1 and gateway.stats()["ollama"]["coalesced"] == 4
+
+
+def test_concurrency_is_capped_per_backend(server):
+    server.delay = 0.05
+    gateway = gateway_for(server, max_concurrency=2)
+    depths = []
+    threads = [threading.Thread(target=gateway.complete, args=("openai", "gpt", ask(f"q{i}"))) for i in range(6)]
+    for t in threads:
+        t.start()
+    time.sleep(0.02)
+    depths.append(gateway.stats()["openai"]["queue_depth"])
+    for t in threads:
+        t.join()
+    assert server.peak == 2 and len(server.requests) == 6 and depths[0] > 0
+    assert server.requests[0][1]["model"] == "gpt" and gateway.stats()["openai"]["in_flight"] == 0
+
+
+def test_transient_failures_are_retried(server):
+    server.failures = 2
+    gateway = gateway_for(server)
+    result = gateway.complete("openai", "gpt", ask("hello"))
+    assert result.text == "HELLO " and result.attempts == 3 and gateway.stats()["openai"]["retries"] == 2
+
+    server.failures = 5
+    with pytest.raises(GatewayError):
+        gateway_for(server, max_retries=1).complete("ollama", "llama3.2:1b", ask("hello"))
+
+
+@pytest.mark.parametrize("backend", ["ollama", "openai"])
+def test_streaming_through_the_chat_model(server, backend):
+    llm = GatewayChatModel(backend=backend, model="m", gateway=gateway_for(server), max_tokens=20)
+    chunks = [c.content for c in llm.stream("one two three") if c.content]
+    assert chunks == ["ONE ", "TWO ", "THREE "]
+    message = llm.invoke("four")
+    assert message.content == "FOUR " and message.usage_metadata["input_tokens"] == 7
+    assert server.requests[0][1]["stream"] is True and server.requests[1][1]["stream"] is False
+
+
+def test_streaming_model_fires_token_callbacks_on_invoke(server):
+    class Tokens(BaseCallbackHandler):
+        def __init__(self):
+            self.tokens = []
+
+        def on_llm_new_token(self, token, **kwargs):
+            self.tokens.append(token)
+
+    handler = Tokens()
+    llm = GatewayChatModel(backend="ollama", model="m", gateway=gateway_for(server), streaming=True)
+    message = llm.invoke("five six", config={"callbacks": [handler]})
+    assert handler.tokens == ["FIVE ", "SIX "]
+    assert message.content == "FIVE SIX " and message.usage_metadata["input_tokens"] == 7
+    assert server.requests[0][1]["stream"] is True
+
+
+def test_token_bucket_waits_out_the_budget():
+    now, slept = [0.0], []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(600, clock=lambda: now[0], sleep=sleep)      # 10 tokens/s
+    assert bucket.acquire(600) == 0
+    assert bucket.acquire(50) == pytest.approx(5.0)
+    bucket.settle(estimated=50, actual=150)                            # used more than estimated
+    assert bucket.acquire(10) == pytest.approx(11.0)
+
+
+def test_cassette_replays_completions_and_streams_offline(server, tmp_path):
+    recording = Cassette(tmp_path / "llm.jsonl.gz", mode="record")
+    live = gateway_for(server, cassette=recording)
+    assert live.complete("ollama", "m", ask("what is  odf")).text == "WHAT IS ODF "
+    assert "".join(live.stream("openai", "gpt", ask("two words"))) == "TWO WORDS "
+    recording.save()
+    server.close()                                                      # nothing upstream from here on
+
+    delays = []
+    replay = Cassette(tmp_path / "llm.jsonl.gz", latency="recorded*2", sleep=delays.append)
+    offline = gateway_for(server, cassette=replay)
+    result = offline.complete("ollama", "m", ask("what is odf"))         # whitespace-normalised key
+    assert (result.text, result.prompt_tokens, result.completion_tokens) == ("WHAT IS ODF ", 7, 3)
+    tokens = offline.stream("openai", "gpt", ask("two words"))
+    assert list(tokens) == ["TWO ", "WORDS "] and tokens.completion.completion_tokens == 2
+    assert len(delays) == 2 and all(d > 0 for d in delays)
+    with pytest.raises(CassetteMiss):
+        offline.complete("ollama", "other-model", ask("what is odf"))
@@ -0,0 +1,82 @@
+import re
+
+from neo4j.exceptions import CypherSyntaxError
+
+from ..knowledge_graph.loaders.cypher_script import READ, SCHEMA, WRITE, split_script
+from ..knowledge_graph.loaders.migrations import (
+    CORE_SCRIPTS, LEDGER_QUERY, RECORD_QUERY, MigrationRunner, apply_scripts, write_groups,
+)
+from .fakes import FakeDriver
+
+
+def ledger_driver():
+    ledger = {}
+
+    def respond(query, params):
+        if query == LEDGER_QUERY:
+            return [{"script": k, "checksum": v} for k, v in ledger.items()]
+        if query == RECORD_QUERY:
+            ledger[params["script"]] = params["checksum"]
+        return []
+
+    return FakeDriver(respond), ledger
+
+
+def test_tokenizer_keeps_semicolons_in_strings_and_drops_comments():
+    statements = split_script(
+        "// setup; not a statement\n"
+        "MERGE (c:Component {name: 'A; B', note: \"it's\"});\n"
+        "/* block ; comment */ CREATE INDEX c_name FOR (c:Component) ON (c.name);\n"
+        "MATCH (`odd;label`) RETURN count(*)")
+    assert [(s.line, s.phase) for s in statements] == [(2, WRITE), (3, SCHEMA), (4, READ)]
+    assert statements[0].text == "MERGE (c:Component {name: 'A; B', note: \"it's\"})"
+    assert statements[1].text == "CREATE INDEX c_name IF NOT EXISTS FOR (c:Component) ON (c.name)"
+
+
+def test_independent_writes_are_grouped_apart():
+    statements = [("s", st) for st in split_script(
+        "MERGE (:Curve {name: 'a'}); MERGE (:FileType {name: 'ODF'});"
+        "MATCH (c:Curve), (s:Settings) MERGE (c)-[:HAS_ATTRIBUTE]->(s); MERGE (:Concept {name: 'x'})")]
+    assert [len(group) for group in write_groups(statements)] == [2, 1, 1]
+    unbounded = statements + [("s", split_script("MATCH (n) SET n.seen = true")[0])]
+    assert len(write_groups(unbounded)) == 1
+
+
+def test_setup_applies_once_then_is_a_no_op():
+    driver, ledger = ledger_driver()
+    report = apply_scripts(driver, CORE_SCRIPTS)
+    assert report.applied == list(CORE_SCRIPTS) and not report.failed
+    assert sorted(ledger) == sorted(CORE_SCRIPTS)
+    assert len(report.timings) == 16 + 7 + 7 + 17
+    schema = [tx for tx in driver.transactions if "INDEX" in tx[0][0]]
+    assert len(schema) == 7 + 15 and all(len(tx) == 1 and re.search(r"IF (NOT )?EXISTS", tx[0][0]) for tx in schema)
+
+    before = len(driver.transactions)
+    again = apply_scripts(driver, CORE_SCRIPTS)
+    assert again.skipped == list(CORE_SCRIPTS) and not again.changed
+    assert [tx[0][0] for tx in driver.transactions[before:]] == [LEDGER_QUERY]
+
+
+def test_failed_script_stays_pending(tmp_path):
+    script = tmp_path / "broken.cypher"
+    script.write_text("MERGE (:Curve {name: 'a'});\nMERGE (:Curve {name: 'b'})", encoding="utf-8")
+    driver, ledger = ledger_driver()
+    driver.commit_errors = [CypherSyntaxError("bad")]
+    report = MigrationRunner(driver).apply([script])
+    assert list(report.failed) == [script.as_posix()] and not ledger
+
+    report = MigrationRunner(driver).apply([script])
+    assert report.applied == [script.as_posix()]
+
+
+def test_changed_scripts_warn_about_bare_creates(tmp_path):
+    script = tmp_path / "curves.cypher"
+    script.write_text("CREATE (:Curve {name: 'a'});", encoding="utf-8")
+    driver, ledger = ledger_driver()
+    assert not MigrationRunner(driver).apply([script]).warnings
+
+    script.write_text("CREATE (:Curve {name: 'a'});\n"
+                      "MERGE (c:Curve {name: 'b'}) ON CREATE SET c.new = true;", encoding="utf-8")
+    report = MigrationRunner(driver).apply([script])
+    assert report.applied == [script.as_posix()]
+    assert report.warnings == [f"{script.as_posix()}:1 runs a bare CREATE again: CREATE (:Curve {{name: 'a'}})"]
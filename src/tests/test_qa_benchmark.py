@@ -0,0 +1,59 @@
+import pytest
+from langchain_core.prompts import ChatPromptTemplate
+
+from ..benchmarks.backends import (
+    Cassette, CassetteChatModel, CassetteGraph, CassetteMiss, MeteredGraph, StubChatModel, StubGraph,
+)
+from ..benchmarks.qa_benchmark import compare, load_questions, run_pipeline, score, summarize
+
+
+def test_score_checks_numbers_then_overlap():
+    assert score("You can define 200 tracks.", "200 tracks can be defined in one ODF.")["fact_match"]
+    assert not score("Up to 20 tracks.", "200 tracks can be defined in one ODF.")["fact_match"]
+    assert score("An unlimited number can be loaded", "An unlimited number of data files can be loaded.")["fact_match"]
+
+
+def test_questions_are_merged_across_sources():
+    questions = load_questions(["feedback", "timed", "log"])
+    texts = [q["question"].lower() for q in questions]
+    assert len(texts) == len(set(texts))
+    upper_limit = next(q for q in questions if q["question"].startswith("What is the upper limit on lithology"))
+    assert "450" in upper_limit["expected"]
+    assert any(q["recorded_seconds"] for q in questions)
+
+
+def test_cassette_replays_what_was_recorded(tmp_path):
+    chain = ChatPromptTemplate.from_template("Generate Cypher for: {q}")
+    recording = Cassette(tmp_path / "c.json")
+    live_llm = CassetteChatModel(cassette=recording, inner=StubChatModel(latency=0))
+    live_graph = MeteredGraph(CassetteGraph(recording, StubGraph(latency=0, rows=2)))
+
+    def answer(llm, graph):
+        return lambda q, callbacks: str(graph.query((chain | llm).invoke(
+            {"q": q}, config={"callbacks": callbacks}).content))
+
+    recorded = run_pipeline(answer(live_llm, live_graph), [{"question": "tracks"}], workers=1)
+    recording.save()
+
+    replay = Cassette(tmp_path / "c.json")
+    replayed = run_pipeline(answer(CassetteChatModel(cassette=replay), MeteredGraph(CassetteGraph(replay))),
+                            [{"question": "tracks"}, {"question": "scales"}], workers=2)
+    first, missing = replayed["samples"]
+    assert first["answer"] == recorded["samples"][0]["answer"]
+    assert first["calls"] == recorded["samples"][0]["calls"] == {"llm": 1, "graph": 1}
+    assert first["tokens"]["prompt"] > 0 and first["rows"] == 2
+    assert missing["error"].startswith("CassetteMiss") and replay.misses == 1
+    with pytest.raises(CassetteMiss):
+        replay.get("graph", "nope")
+
+
+def test_compare_flags_slower_p95_and_lost_accuracy():
+    def report(p95, fact):
+        run = {"wall_seconds": 1.0, "samples": [
+            {"stages": {"total": p95}, "calls": {}, "tokens": {"prompt": 1, "completion": 1}, "rows": 0,
+             "error": None, "score": {"fact_match": fact, "f1": 1.0}}]}
+        return {"pipelines": {"agent": summarize(run)}}
+
+    assert compare(report(0.10, True), report(0.10, True)) == []
+    problems = compare(report(0.20, False), report(0.10, True))
+    assert [p.split(":")[1].split()[0] for p in problems] == ["p95", "fact"]
@@ -0,0 +1,98 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from ..qa_bot.core.kg_schema import (
+    FINGERPRINT_QUERY,
+    NODE_PROPERTIES_QUERY,
+    REL_PROPERTIES_QUERY,
+    RELATIONSHIPS_QUERY,
+    SchemaService,
+)
+
+RECORDS = Path(__file__).parent / "records.json"
+
+
+class FakeGraph:
+    """Answers the schema procedures; ``version`` stands in for loader bumps."""
+
+    def __init__(self):
+        self.version = 1
+        self.calls = []
+        self.online = True
+
+    def query(self, cypher, params=None):
+        self.calls.append(cypher)
+        if not self.online:
+            raise ConnectionError("neo4j unavailable")
+        if cypher == FINGERPRINT_QUERY:
+            return [{"version": self.version, "nodes": 10, "rels": 9}]
+        if cypher == NODE_PROPERTIES_QUERY:
+            return [{"nodeLabels": ["FileType"], "propertyName": "name", "propertyTypes": ["String"]},
+                    {"nodeLabels": ["Type"], "propertyName": "embedding", "propertyTypes": ["DoubleArray"]},
+                    {"nodeLabels": ["GraphMeta"], "propertyName": "version", "propertyTypes": ["Long"]}]
+        if cypher == REL_PROPERTIES_QUERY:
+            return [{"relType": ":`HAS_FORMAT`", "propertyName": "since", "propertyTypes": ["Long"]}]
+        if cypher == RELATIONSHIPS_QUERY:
+            return [{"src": "System", "rel": "HAS_FILE_TYPE", "dst": "FileType"}]
+        raise AssertionError(cypher)
+
+
+def test_from_dump_matches_relationship_patterns():
+    service = SchemaService.from_dump(RECORDS)
+    schema = service.relationship_map()
+    assert schema["System"]["HAS_FILE_TYPE"] == ["FileType"]
+    assert schema["Scales"]["HAS_ATTRIBUTE"] == [
+        "Left_Track_Edge_Value", "Linear_Type", "Log_Type", "Right_Track_Edge_Value"]
+    assert {"property": "name", "type": "STRING"} in service.current()["node_props"]["GEO"]
+    assert "(:GEO)-[:HAS_TOPIC]->(:System)" in service.text()
+
+
+def test_fetches_once_and_refreshes_on_fingerprint_change(tmp_path):
+    graph, clock = FakeGraph(), SimpleNamespace(now=0.0)
+    changes = []
+    service = SchemaService(graph.query, tmp_path / "schema.json", interval=10, clock=lambda: clock.now)
+    service.subscribe(changes.append)
+
+    schema = service.current()
+    assert schema["node_props"]["Type"] == [{"property": "embedding", "type": "LIST"}]
+    assert "GraphMeta" not in schema["node_props"]
+    assert schema["rel_props"]["HAS_FORMAT"][0]["type"] == "INTEGER"
+
+    service.current()
+    clock.now = 10
+    service.current()
+    assert service.fetches == 1 and graph.calls.count(FINGERPRINT_QUERY) == 2
+
+    graph.version = 2
+    clock.now = 20
+    service.current()
+    assert service.fetches == 2 and len(changes) == 2
+
+
+def test_snapshot_serves_restarts_and_outages(tmp_path):
+    graph = FakeGraph()
+    SchemaService(graph.query, tmp_path / "schema.json").current()
+
+    graph.calls.clear()
+    restarted = SchemaService(graph.query, tmp_path / "schema.json")
+    restarted.current()
+    assert graph.calls == [FINGERPRINT_QUERY]        # fingerprint matched, nothing refetched
+
+    graph.online = False
+    offline = SchemaService(graph.query, tmp_path / "schema.json")
+    assert offline.relationship_map() == {"System": {"HAS_FILE_TYPE": ["FileType"]}}
+
+    with pytest.raises(ConnectionError):
+        SchemaService(graph.query, tmp_path / "missing.json").current()
+
+
+def test_apply_to_installs_langchain_compatible_schema(tmp_path):
+    service = SchemaService(FakeGraph().query, tmp_path / "schema.json")
+    service.current()
+    graph = SimpleNamespace()
+    service.apply_to(graph)
+    assert graph.structured_schema["relationships"] == [
+        {"start": "System", "type": "HAS_FILE_TYPE", "end": "FileType"}]
+    assert graph.schema.splitlines()[:2] == ["Node properties:", "FileType {name: STRING}"]
@@ -0,0 +1,80 @@
+import json
+
+from ..qa_bot.service.session_log import SessionLog, import_legacy, to_epoch
+from ..qa_bot.service.sessions import SessionStore
+
+
+def test_turns_survive_reopen_and_torn_tail(tmp_path):
+    log = SessionLog(tmp_path)
+    log.append_turn("chat_session_a", "hi", "hello", "2025-03-17T10:00:00Z", 1.5)
+    log.append_turn("chat_session_b", "other", "answer", "2025-03-17T10:00:01Z")
+    log.close()
+    with open(tmp_path / "000001.log", "ab") as f:
+        f.write(b"\x40\x00\x00\x00torn")                                  # crash mid-record
+
+    store = SessionStore(tmp_path)
+    assert [m["content"] for m in store.history("chat_session_a")] == ["hi", "hello"]
+    store.append("chat_session_a", "again", "still here")
+    store.close()
+    messages = SessionLog(tmp_path).history("chat_session_a")
+    assert [m["role"] for m in messages] == ["user", "assistant"] * 2
+    assert set(messages[0]) == {"role", "content", "timestamp"}
+
+
+def test_compaction_drops_deleted_sessions_and_old_titles(tmp_path):
+    log = SessionLog(tmp_path, segment_bytes=200, compact_after=100)
+    for i in range(6):
+        log.append_turn(f"chat_session_{i % 2}", f"question {i}", f"answer {i}", f"2025-03-17T10:00:0{i}Z")
+        log.set_title(f"chat_session_{i % 2}", f"title {i}", f"2025-03-17T10:00:0{i}Z")
+    log.delete("chat_session_1", "2025-03-17T10:01:00Z")
+    log.append_turn("chat_session_2", "last", "turn", "2025-03-17T10:02:00Z")
+    before = log.stats()
+    assert before["segments"] > 2
+
+    result = log.compact()
+    assert result["dropped"] == 6 + 2 + 1                     # session 1, older titles of 0, tombstone
+    assert log.stats()["segments"] < before["segments"]
+    assert log.titles() == {"chat_session_0": "title 4"}
+    log.close()
+    reopened = SessionLog(tmp_path)
+    assert [m["content"] for m in reopened.history("chat_session_0")][::2] == ["question 0", "question 2", "question 4"]
+    assert not reopened.has("chat_session_1") and reopened.has("chat_session_2")
+
+
+def test_rolling_only_compacts_when_records_can_be_dropped(tmp_path):
+    log = SessionLog(tmp_path, segment_bytes=200, compact_after=2)
+    for i in range(40):
+        log.append_turn(f"chat_session_{i}", f"question {i}", f"answer {i}", "2025-03-17T10:00:00Z")
+    segments = log.stats()["segments"]
+    assert segments > 10 and (tmp_path / "000001.log").exists()          # never rewritten
+
+    log.set_title("chat_session_0", "first", "2025-03-17T10:01:00Z")
+    log.set_title("chat_session_0", "second", "2025-03-17T10:01:01Z")
+    for _ in range(10):                                                 # seal the superseded title
+        log.append_turn("chat_session_x", "filler", "filler", "2025-03-17T10:02:00Z")
+    assert not (tmp_path / "000001.log").exists()
+    assert log.titles() == {"chat_session_0": "second"}
+    assert len(log.history("chat_session_39")) == 2
+
+
+def test_import_and_streaming_queries(tmp_path):
+    sessions = tmp_path / "ChatSessions"
+    sessions.mkdir()
+    (sessions / "chat_session_20250317_100000.json").write_text(json.dumps([
+        {"role": "user", "content": "How many curves?", "timestamp": "2025-03-17T10:00:00.000Z"},
+        {"role": "assistant", "content": "Many.", "timestamp": "2025-03-17T10:00:00.000Z"}]))
+    (tmp_path / "session_metadata.json").write_text(json.dumps({"chat_session_20250317_100000": "Curves"}))
+    (tmp_path / "timed_responses.json").write_text(json.dumps(
+        [{"question_number": str(i), "question": f"q{i}", "response_time": float(i),
+          "timestamp": f"2025-03-{17 + i // 10}T11:00:{i % 60:02d}Z"} for i in range(1, 21)]))
+
+    log = SessionLog(tmp_path / "log")
+    assert import_legacy(log, tmp_path) == {"sessions": 1, "turns": 1, "titles": 1, "timings": 20}
+    assert import_legacy(log, tmp_path) == {"sessions": 0, "turns": 0, "titles": 0, "timings": 0}
+
+    window = list(log.questions(to_epoch("2025-03-17"), to_epoch("2025-03-18")))
+    assert [q["question"] for q in window] == ["How many curves?"] + [f"q{i}" for i in range(1, 10)]
+    p95 = log.percentile_by_day(95)
+    assert {day: row["turns"] for day, row in p95.items()} == {"2025-03-17": 9, "2025-03-18": 10,
+                                                                "2025-03-19": 1}
+    assert p95["2025-03-18"]["p95"] == 18.55
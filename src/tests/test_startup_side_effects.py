@@ -0,0 +1,7 @@
+from ..benchmarks.startup import measure, problems
+
+
+def test_importing_qa_bot_is_side_effect_free():
+    """No model runtime, no sockets: every heavy resource is built lazily."""
+    report = measure()
+    assert problems(report) == []
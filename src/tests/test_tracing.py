@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from langchain_core.language_models import FakeListChatModel
+
+from ..qa_bot.core import tracing
+from ..qa_bot.core.tracing import NOOP_SPAN, Metrics, span
+from ..qa_bot.tools.cypher_cache import CypherPlanCache
+
+
+class Collect:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, s):
+        self.spans.append(s)
+
+
+@pytest.fixture
+def collected():
+    sink = Collect()
+    tracing.tracer.configure([sink, Metrics()])
+    yield sink
+    tracing.tracer.configure([])
+
+
+def test_disabled_tracing_hands_out_the_shared_noop():
+    tracing.tracer.configure([])
+    with span("anything", rows=3) as s:
+        assert s is NOOP_SPAN and s.set(cypher="x") is NOOP_SPAN
+    assert tracing.callbacks() == []
+
+
+def test_spans_nest_and_record_errors(collected):
+    with span("outer") as outer:
+        with span("inner", rows=2):
+            pass
+        with pytest.raises(KeyError):
+            with span("failing"):
+                raise KeyError("x")
+    inner, failing, root = collected.spans
+    assert inner.parent_id == failing.parent_id == root.span_id and root.parent_id is None
+    assert {s.trace_id for s in collected.spans} == {root.trace_id}
+    assert failing.error == "KeyError: 'x'" and inner.attrs == {"rows": 2}
+    assert outer.duration >= inner.duration
+
+
+def test_plan_cache_spans_feed_metrics(collected):
+    plans = CypherPlanCache(lambda q: "MATCH (f:FileType {name: 'LAS'}) RETURN f.name AS name",
+                            lambda cypher, params: [{"name": "LAS"}])
+    plans.run("What is LAS?")
+    plans.run("What is DLIS?")
+    names = [s.name for s in collected.spans]
+    assert names.count("cypher.plan") == 2 and names.count("cypher.generate") == 1
+    assert [s.attrs["cache.plan"] for s in collected.spans if s.name == "cypher.plan"] == ["miss", "hit"]
+    query = next(s for s in collected.spans if s.name == "neo4j.query")
+    assert "$e0" in query.attrs["cypher"] and query.attrs["rows"] == 1
+
+    text = tracing.render_metrics()
+    assert 'qa_span_seconds_count{span="cypher.plan"} 2' in text
+    assert 'qa_cache_lookups_total{cache="plan",result="hit"} 1' in text
+    assert 'qa_rows_total{span="neo4j.query"} 2' in text
+
+
+def test_llm_calls_become_spans_and_jsonl(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracing.configure("1", path)
+    try:
+        with span("qa.generate_response"):
+            FakeListChatModel(responses=["hi"]).invoke("hello", config={"callbacks": tracing.callbacks()})
+    finally:
+        tracing.configure("0")
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["name"] for r in rows] == ["llm", "qa.generate_response"]
+    assert rows[0]["parent_id"] == rows[1]["span_id"] and rows[0]["attrs"]["model"]
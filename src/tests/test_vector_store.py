@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from ..data_processing.graph.vector_store import VectorStore
+
+
+def _vectors(n, dim=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+@pytest.mark.parametrize("kind", ["flat", "ivf", "hnsw"])
+def test_upsert_delete_and_reload(tmp_path, kind):
+    vectors = _vectors(64)
+    ids = [f"chunk:{i}" for i in range(64)]
+    store = VectorStore(8, kind, nlist=4, nprobe=4)
+    store.upsert(ids, vectors, [{"text": str(i)} for i in range(64)])
+
+    assert store.search(vectors[5], k=1)[0][0][0]["chunk_id"] == "chunk:5"
+
+    store.upsert(["chunk:5"], vectors[6:7] + 10, [{"text": "moved"}])
+    assert store.search(vectors[6] + 10, k=1)[0][0][0]["text"] == "moved"
+    assert store.delete(["chunk:7", "missing"]) == 1
+    assert len(store) == 63
+    store.save(tmp_path)
+
+    reopened = VectorStore.load(tmp_path)                 # memory-mapped, read-only
+    hits = [m["chunk_id"] for m, _ in reopened.search(vectors[7], k=5)[0]]
+    assert "chunk:7" not in hits
+    reopened.delete(["chunk:8"])                          # first write reloads in memory
+    assert len(reopened) == 62
+
+
+def test_sync_embeds_only_changed_chunks(tmp_path):
+    calls = []
+
+    def embed(texts):
+        calls.append(texts)
+        return np.array([[len(t), t.count("a"), 0, 1] for t in texts], dtype=np.float32)
+
+    store = VectorStore(4)
+    assert store.sync({"a": {"text": "alpha"}, "b": {"text": "beta"}}, embed)["upserted"] == 2
+    stats = store.sync({"a": {"text": "alpha"}, "c": {"text": "gamma"}}, embed)
+
+    assert stats == {"upserted": 1, "deleted": 1, "unchanged": 1}
+    assert calls[-1] == ["gamma"]